@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Compare call-log throughput: open/append/close per line vs the buffered CallLogWriter.
+
+Simulates several concurrent calls each writing a stream of events and reports events/sec
+plus the per-append latency seen by the caller (what a webhook pays on the event loop).
+
+    python benchmarks/bench_call_log.py --calls 50 --events 200
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from call_log import CallLogWriter  # noqa: E402
+
+
+def legacy_append(path: str, message: str):
+    """The previous append_call_log: one open/write/close per event."""
+    ts = datetime.utcnow().isoformat()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"[{ts}] {message}\n")
+
+
+def run(label: str, append, paths: list[str], events: int, finish=None) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for i in range(events):
+        for path in paths:
+            t0 = time.perf_counter()
+            append(path, f"USER event {i} for {os.path.basename(path)}")
+            latencies.append(time.perf_counter() - t0)
+    if finish:
+        finish()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "label": label,
+        "events_per_sec": len(latencies) / elapsed,
+        "append_p50_us": statistics.median(latencies) * 1e6,
+        "append_p99_us": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50, help="concurrent calls (distinct log files)")
+    parser.add_argument("--events", type=int, default=200, help="events per call")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_call_log_")
+    try:
+        legacy_paths = [os.path.join(root, "legacy", f"call_{i}.log") for i in range(args.calls)]
+        os.makedirs(os.path.join(root, "legacy"))
+        results = [run("open-per-line", legacy_append, legacy_paths, args.events)]
+
+        writer = CallLogWriter()
+        writer.start()
+        buffered_paths = [os.path.join(root, "buffered", f"call_{i}.log") for i in range(args.calls)]
+        results.append(run("CallLogWriter", writer.write, buffered_paths, args.events,
+                           finish=lambda: writer.flush(wait=True, timeout=60)))
+        writer.stop()
+
+        print(f"{args.calls} calls x {args.events} events")
+        print(f"{'implementation':<16}{'events/s':>12}{'append p50 (us)':>18}{'append p99 (us)':>18}")
+        for r in results:
+            print(f"{r['label']:<16}{r['events_per_sec']:>12.0f}{r['append_p50_us']:>18.1f}{r['append_p99_us']:>18.1f}")
+        print(f"speedup: {results[1]['events_per_sec'] / results[0]['events_per_sec']:.1f}x")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Compare outbound HTTP connection handling against a local HTTPS Twilio stand-in.
+
+Runs a campaign-like mix of Calls.create requests (through the Twilio client) and
+recording downloads (through RecordingDownloader) from a thread pool, in three modes:
+
+  fresh     a new connection and TLS handshake for every request
+  separate  the previous setup: the Twilio client's default session plus the
+            downloader's own session, each with requests' default pool of 10
+  shared    one HttpTransport session sized for the worker count
+
+The server counts accepted connections (each one is a TCP + TLS handshake). Needs the
+openssl binary to create a throwaway self-signed certificate.
+
+    python benchmarks/bench_http_pool.py --requests 400 --workers 20
+"""
+import argparse
+import http.server
+import itertools
+import json
+import logging
+import os
+import shutil
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+from twilio.http.http_client import TwilioHttpClient  # noqa: E402
+from twilio.rest import Client  # noqa: E402
+
+from http_transport import HttpTransport  # noqa: E402
+from recordings import RecordingDownloader  # noqa: E402
+
+ACCOUNT_SID = "AC" + "0" * 32
+
+
+def make_certificate(workdir: str) -> tuple[str, str]:
+    cert, key = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-keyout", key, "-out", cert, "-subj", "/CN=localhost",
+                    "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+                   check=True, capture_output=True)
+    return cert, key
+
+
+class FakeTwilioHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    sids = itertools.count(1)
+
+    def setup(self):
+        self.request = self.server.tls.wrap_socket(self.request, server_side=True)
+        with self.server.lock:
+            self.server.connections += 1
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"sid": f"CA{next(self.sids):032x}", "account_sid": ACCOUNT_SID,
+                           "status": "queued"}).encode()
+        self._send(201, "application/json", body)
+
+    def do_GET(self):
+        self._send(200, "audio/mpeg", self.server.audio)
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeTwilioServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # listen backlog, so handshake storms don't stall on SYN retries
+
+
+def start_server(cert: str, key: str, recording_bytes: int) -> FakeTwilioServer:
+    server = FakeTwilioServer(("127.0.0.1", 0), FakeTwilioHandler)
+    server.tls = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server.tls.load_cert_chain(cert, key)
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.audio = os.urandom(recording_bytes)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def clients(mode: str, workers: int, dest_dir: str):
+    """(twilio client, recording downloader, transport or None) for one mode."""
+    transport = None
+    if mode == "shared":
+        transport = HttpTransport(pool_size=workers)
+        http_client, session, timeout = transport.twilio_http_client(), transport.session, transport.timeout
+    else:
+        # Without pooling TwilioHttpClient builds a new Session for every request
+        http_client = TwilioHttpClient(pool_connections=mode == "separate")
+        session, timeout = requests.Session(), 30
+        if mode == "fresh":
+            session.headers["Connection"] = "close"
+    twilio = Client(ACCOUNT_SID, "bench", http_client=http_client)
+    downloader = RecordingDownloader(dest_dir=dest_dir, auth=(ACCOUNT_SID, "bench"), session=session, timeout=timeout)
+    return twilio, downloader, transport
+
+
+def run(mode: str, args, base_url: str, server, workdir: str) -> dict:
+    dest_dir = os.path.join(workdir, mode)
+    twilio, downloader, transport = clients(mode, args.workers, dest_dir)
+    twilio.api.base_url = base_url
+    timings: list[float] = []
+
+    def one(i: int):
+        started = time.perf_counter()
+        if i % 2:
+            downloader.download(f"CA{i:032x}", f"{base_url}/2010-04-01/Accounts/{ACCOUNT_SID}/Recordings/RE{i:032x}")
+        else:
+            twilio.calls.create(to="+15555550100", from_="+15555550199", url="https://example.test/twiml")
+        timings.append(time.perf_counter() - started)
+
+    before = server.connections
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    if transport:
+        transport.close()
+    ordered = sorted(timings)
+    return {
+        "connections": server.connections - before,
+        "throughput": args.requests / elapsed,
+        "p50": statistics.median(ordered) * 1000,
+        "p95": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400, help="half call creations, half recording downloads")
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--recording-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--modes", default="fresh,separate,shared")
+    args = parser.parse_args()
+
+    logging.getLogger("urllib3").setLevel(logging.ERROR)  # "pool is full, discarding connection"
+    workdir = tempfile.mkdtemp(prefix="bench_http_")
+    try:
+        cert, key = make_certificate(workdir)
+        # requests lets this environment variable override Session.verify, so trust the certificate through it
+        os.environ["REQUESTS_CA_BUNDLE"] = cert
+        server = start_server(cert, key, args.recording_bytes)
+        base_url = f"https://localhost:{server.server_address[1]}"
+        print(f"{args.requests} requests from {args.workers} threads")
+        print(f"{'mode':<10}{'connections':>13}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for mode in args.modes.split(","):
+            r = run(mode, args, base_url, server, workdir)
+            print(f"{mode:<10}{r['connections']:>13}{r['throughput']:>10.1f}{r['p50']:>10.2f}{r['p95']:>10.2f}")
+        server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Lead analytics over a synthetic year of call logs.
+
+Writes `--calls` call logs spread over a year in the format `append_call_log` produces.
+Each call's caller turns plant a known unit preference, budget, timeline, financing
+and site-visit answer, and a share of the older logs are gzip-compressed as the log
+writer would leave them. Then it times a full run for each worker count, an
+incremental re-run with nothing changed and one after new calls arrive. Finally it
+checks the extracted fields against the planted ones. The planted phrases are written
+to fit the extraction rules, so that check catches regressions but says nothing about
+accuracy on real calls; tests/test_lead_analytics.py covers negated and look-alike phrases.
+
+    python benchmarks/bench_lead_analytics.py --calls 50000 --workers 1,2,4
+"""
+import argparse
+import datetime
+import gzip
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lead_analytics import _load_state, run_analytics  # noqa: E402
+
+UNITS = [("2 BHK", "2BHK"), ("3bhk", "3BHK"), ("do bhk", "2BHK"), ("1 bhk", "1BHK"), ("4 bedroom", "4BHK")]
+BUDGETS = [("around 60 lakhs", 60.0, 60.0), ("between 50 to 70 lakh", 50.0, 70.0), ("under 1.2 crore", None, 120.0),
+           ("80 लाख तक", None, 80.0), ("90 lakh se 1 crore", 90.0, 100.0)]
+TIMELINES = [("immediately", "immediate"), ("in 3 months", "3 months"), ("next year", "12 months"),
+             ("within 6 months", "6 months"), ("just exploring for now", "exploring")]
+FINANCING = [("I will take a home loan", "loan"), ("full payment, no loan", "self"), ("EMI is fine", "loan")]
+FILLER = ["Hello?", "Haan ji, boliye.", "Can you repeat that?", "Okay.", "What is the location exactly?",
+          "Is there parking?", "Thik hai."]
+
+
+def write_call(directory: str, start: datetime.datetime, index: int, rng: random.Random,
+               compress: bool) -> tuple[str, dict]:
+    sid = f"CA{index:032x}"
+    planted = {"unit": None, "budget": None, "timeline": None, "financing": None, "site_visit": False}
+    ts = start
+    lines = [f"CALL START {start:%Y-%m-%d %H:%M:%S} SID={sid}"]
+
+    def add(kind: str, text: str = ""):
+        nonlocal ts
+        ts += datetime.timedelta(seconds=rng.uniform(2, 9))
+        lines.append(f"[{ts.isoformat()}] {kind}{' ' + text if text else ''}")
+
+    if rng.random() < 0.3:
+        add("OUTBOUND", f"to=+9198{index:08d} from=+14155550100")
+    add("ASSISTANT", "Namaste! Main Priya bol rahi hoon. Aapka naam kya hai?")
+    add("USER", f"Mera naam Rahul {index} hai")
+    add("NAME_CAPTURED", f"Rahul {index}")
+    for _ in range(rng.randint(1, 4)):
+        add("ASSISTANT", "Ji, main aapki kaise madad kar sakti hoon?")
+        add("USER", rng.choice(FILLER))
+    if rng.random() < 0.8:
+        text, planted["unit"] = rng.choice(UNITS)
+        add("ASSISTANT", "Aap kaunsa configuration dekh rahe hain?")
+        add("USER", f"I am looking for a {text} flat")
+        add("INTENT", "property_inquiry")
+    if rng.random() < 0.7:
+        text, low, high = rng.choice(BUDGETS)
+        planted["budget"] = (low, high)
+        add("ASSISTANT", "Aapka budget kya hai?")
+        add("USER", f"My budget is {text}")
+    if rng.random() < 0.6:
+        text, planted["timeline"] = rng.choice(TIMELINES)
+        add("ASSISTANT", "Aap kab tak shift karna chahte hain?")
+        add("USER", f"We want to move {text}")
+    if rng.random() < 0.5:
+        text, planted["financing"] = rng.choice(FINANCING)
+        add("ASSISTANT", "Payment kaise karenge?")
+        add("USER", text)
+    add("ASSISTANT", "Kya aap site visit ke liye aana chahenge?")
+    planted["site_visit"] = rng.random() < 0.4
+    add("USER", "Yes, this Saturday works" if planted["site_visit"] else "No, not right now")
+    add("STATUS", "completed")
+    add("CALL END")
+
+    name = f"call_{start:%Y%m%d_%H%M%S}_{sid}.log"
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+    path = os.path.join(directory, name + (".gz" if compress else ""))
+    with (gzip.open(path, "wb") if compress else open(path, "wb")) as f:
+        f.write(data)
+    return path, planted
+
+
+def generate(directory: str, calls: int, first: int, rng: random.Random, compressed: float) -> dict:
+    year = datetime.datetime(2025, 1, 1)
+    planted = {}
+    for i in range(first, first + calls):
+        start = year + datetime.timedelta(seconds=rng.uniform(0, 365 * 86400))
+        _path, planted[f"CA{i:032x}"] = write_call(directory, start, i, rng, rng.random() < compressed)
+    return planted
+
+
+def check(output: str, planted: dict) -> dict[str, float]:
+    rows = _load_state(output + ".state.json")["rows"]
+    hits = {"unit": 0, "budget": 0, "timeline": 0, "financing": 0, "site_visit": 0}
+    for sid, want in planted.items():
+        row = rows[sid]
+        hits["unit"] += row["unit_preference"] == want["unit"]
+        hits["budget"] += (row["budget_min_lakhs"], row["budget_max_lakhs"]) == (want["budget"] or (None, None))
+        hits["timeline"] += row["timeline"] == want["timeline"]
+        hits["financing"] += row["financing"] == want["financing"]
+        hits["site_visit"] += row["site_visit"] == want["site_visit"]
+    return {field: n / len(planted) for field, n in hits.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000, help="call logs in the synthetic year")
+    parser.add_argument("--new", type=int, default=200, help="calls added before the last incremental run")
+    parser.add_argument("--compressed", type=float, default=0.8, help="share of logs stored as .log.gz")
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}")
+    parser.add_argument("--output", default="leads.parquet", help="summary file name (.parquet or .csv)")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="bench_leads_")
+    logs = os.path.join(workdir, "call_logs")
+    os.makedirs(logs)
+    try:
+        started = time.perf_counter()
+        planted = generate(logs, args.calls, 0, rng, args.compressed)
+        size = sum(e.stat().st_size for e in os.scandir(logs))
+        print(f"{args.calls} call logs, {size / 1e6:.1f} MB on disk, generated in {time.perf_counter() - started:.1f}s, "
+              f"{os.cpu_count()} CPUs")
+        output = os.path.join(workdir, "analytics", args.output)
+        print(f"{'run':<22}{'workers':>8}{'parsed':>8}{'skipped':>9}{'seconds':>9}{'logs/s':>9}")
+
+        def report(label: str, result: dict):
+            rate = result["parsed"] / result["seconds"] if result["parsed"] else 0
+            print(f"{label:<22}{result['workers']:>8}{result['parsed']:>8}{result['skipped']:>9}"
+                  f"{result['seconds']:>9.2f}{rate:>9.0f}")
+
+        for workers in sorted({int(w) for w in args.workers.split(",")}):
+            report("full", run_analytics(logs, output, workers, full=True))
+        report("incremental, no change", run_analytics(logs, output))
+        planted.update(generate(logs, args.new, args.calls, rng, 0.0))
+        report(f"incremental, +{args.new}", run_analytics(logs, output))
+        print(f"summary: {output} ({os.path.getsize(output) / 1e6:.2f} MB)")
+        accuracy = check(output, planted)
+        print("planted fields recovered: " + "  ".join(f"{k} {v:.1%}" for k, v in accuracy.items()))
+        if min(accuracy.values()) < 0.99:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Compare per-webhook logging cost on the calling thread: blocking handlers vs the queue pipeline.
+
+"blocking" reproduces the previous setup: a FileHandler and a stdout StreamHandler on the
+root logger, and the eight INFO lines the voice webhook used to write (including the form
+dict and up to 2 KB of TwiML). The other rows use logging_setup with the current webhook
+lines, with payload sampling off and on. Console output goes to /dev/null.
+
+    python benchmarks/bench_logging.py --webhooks 5000
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging_setup  # noqa: E402
+
+FORM = {
+    "CallSid": "CA" + "1" * 32, "AccountSid": "AC" + "2" * 32, "From": "+919800000000", "To": "+15550000000",
+    "CallStatus": "in-progress", "Direction": "outbound-api", "ApiVersion": "2010-04-01",
+    "SpeechResult": "what is the price of a two bhk flat", "Confidence": "0.92", "Language": "en-US",
+}
+TWIML = ('<?xml version="1.0" encoding="UTF-8"?><Response><Gather action="https://example.test/api/callback/twilio/voice" '
+         'input="speech"><Say>' + "Our 2BHK homes start around 72 lakhs. " * 30 + "</Say></Gather></Response>")
+
+
+def legacy_webhook(logger: logging.Logger):
+    call_sid, speech = FORM["CallSid"], FORM["SpeechResult"]
+    logger.info(f"=" * 80)
+    logger.info(f"WEBHOOK RECEIVED - CallSid: {call_sid}")
+    logger.info(f"From: {FORM['From']}, To: {FORM['To']}")
+    logger.info(f"SpeechResult: {speech}")
+    logger.info(f"Confidence: {FORM['Confidence']}")
+    logger.info(f"All form data: {dict(FORM)}")
+    logger.info(f"=" * 80)
+    logger.info(f"Processing speech result: {speech}")
+    truncated = TWIML if len(TWIML) <= 2000 else TWIML[:2000] + "... [truncated]"
+    logger.info("Returning TwiML (len=%d): %s", len(TWIML), truncated)
+
+
+def pipeline_webhook(logger: logging.Logger):
+    call_sid = FORM["CallSid"]
+    logger.info("Voice webhook: SID=%s speech=%r confidence=%s", call_sid, FORM["SpeechResult"], FORM["Confidence"],
+                extra={"call_sid": call_sid, "from_number": FORM["From"], "to_number": FORM["To"]})
+    logging_setup.log_payload(logger, "Twilio form", FORM, call_sid)
+    logging_setup.log_payload(logger, "Returning TwiML", TWIML, call_sid)
+
+
+def measure(label: str, webhook, logger: logging.Logger, n: int, drain=None) -> dict:
+    started = time.perf_counter()
+    for _ in range(n):
+        webhook(logger)
+    caller = time.perf_counter() - started
+    if drain:
+        drain()
+    total = time.perf_counter() - started
+    return {"label": label, "caller_us": caller / n * 1e6, "total_us": total / n * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--webhooks", type=int, default=5000)
+    args = parser.parse_args()
+
+    root_dir = tempfile.mkdtemp(prefix="bench_logging_")
+    real_stdout = sys.stdout
+    devnull = open(os.devnull, "w", encoding="utf-8")
+    logger = logging.getLogger("main")
+    root = logging.getLogger()
+    results = []
+    try:
+        sys.stdout = devnull
+        file_handler = logging.FileHandler(os.path.join(root_dir, "legacy.log"), encoding="utf-8")
+        for handler in (file_handler, logging.StreamHandler(devnull)):
+            handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+            root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        results.append(measure("blocking", legacy_webhook, logger, args.webhooks))
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+
+        for label, rate in (("queue+json", 0.0), ("queue+json sampled", 1.0)):
+            logging_setup.setup_logging("INFO", os.path.join(root_dir, f"{rate}.log"), "json", payload_sample_rate=rate)
+            results.append(measure(label, pipeline_webhook, logger, args.webhooks, drain=logging_setup.stop_logging))
+    finally:
+        sys.stdout = real_stdout
+        devnull.close()
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+    print(f"{args.webhooks} webhooks")
+    print(f"{'pipeline':<22}{'caller us/webhook':>20}{'incl. drain us':>18}")
+    for r in results:
+        print(f"{r['label']:<22}{r['caller_us']:>20.1f}{r['total_us']:>18.1f}")
+    print(f"caller-side speedup: {results[0]['caller_us'] / results[1]['caller_us']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
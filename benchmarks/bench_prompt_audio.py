@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Fixed prompts: <Say> synthesized on every play vs pre-rendered audio with <Play>.
+
+Runs the app in-process with `--projects` projects and a fake TTS backend whose first
+audio arrives after `--tts-latency` seconds, a stand-in for a TTS service. It times
+rendering every project's fixed prompts, then compares the time to first audio of a
+prompt played `--plays` times when it is synthesized each time (<Say>) with fetching the
+pre-rendered file (<Play>) cold and revalidating it by ETag; while Cache-Control keeps
+the file fresh, a caching client plays it without any request. It also checks that the
+TwiML plays every fixed prompt, the 304/206 responses, that a restart reuses the files,
+and that changing one project renders only its new prompts.
+
+    python benchmarks/bench_prompt_audio.py --projects 50 --tts-latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from media_stream import FakeTTS, register_tts  # noqa: E402
+
+
+def project_config(n: int) -> dict:
+    return {"projects": [{"key": f"p{i}", "company": f"Builder {i} Realty", "project": f"Tower {i}",
+                          "numbers": [f"+9112000{i:05d}"]} for i in range(n)]}
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def report(label: str, seconds: list[float], transferred: int):
+    print(f"{label:<28}{statistics.median(seconds) * 1000:>10.2f}{percentile(seconds, 0.95) * 1000:>10.2f}"
+          f"{transferred / 1e3:>12.1f}")
+
+
+async def first_audio(tts: FakeTTS, text: str) -> float:
+    started = time.perf_counter()
+    async for _chunk in tts.synthesize(text):
+        break
+    return time.perf_counter() - started
+
+
+async def run(args, workdir: str):
+    import httpx
+    import main
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench")
+    async with main.lifespan(main.app):
+        started = time.perf_counter()
+        await main.PROMPT_RENDER["task"]
+        prompts = sum(len(t.twiml.prompts) for t in main.TENANTS.tenants())
+        stats = main.PROMPT_AUDIO.stats()
+        print(f"rendered {prompts} prompts of {len(main.TENANTS)} projects as {stats['assets']} recordings "
+              f"({stats['bytes'] / 1e6:.2f} MB) in {time.perf_counter() - started:.2f}s")
+
+        # Every fixed phrase in the TwiML now plays a recording; only the generated reply is still <Say>
+        greeting = (await client.post("/api/callback/twilio/voice", data={"CallSid": "CAbench", "To": "+911200000003"})).text
+        urls = re.findall(r"<Play>([^<]+)</Play>", greeting)
+        reply = main.TENANTS.find("p3").twiml.reply.render(reply="Namaste!", seq=2).decode()
+        assert urls and "<Say" not in greeting and reply.count("<Say") == 1 and "<Play>" in reply, greeting
+        path = urls[0].replace(main.PUBLIC_URL, "")
+
+        full = await client.get(path)
+        assert full.status_code == 200 and full.headers["cache-control"].endswith("immutable")
+        etag, size = full.headers["etag"], len(full.content)
+        partial = await client.get(path, headers={"Range": "bytes=100-"})
+        assert partial.status_code == 206 and partial.content == full.content[100:]
+        assert (await client.get(path, headers={"Range": f"bytes={size}-"})).status_code == 416
+
+        text = main.TENANTS.find("p3").twiml.inbound_greeting_text
+        tts = FakeTTS(first_chunk_delay=args.tts_latency)
+        say = [await first_audio(tts, text) for _ in range(args.plays)]
+        cold, revalidate = [], []
+        for _ in range(args.plays):
+            t0 = time.perf_counter()
+            response = await client.get(path)
+            cold.append(time.perf_counter() - t0)
+            assert response.status_code == 200
+            t0 = time.perf_counter()
+            response = await client.get(path, headers={"If-None-Match": etag})
+            revalidate.append(time.perf_counter() - t0)
+            assert response.status_code == 304
+        print(f"\n{args.plays} plays of the greeting ({size / 1e3:.1f} kB), time to first audio:")
+        print(f"{'':<28}{'p50 ms':>10}{'p95 ms':>10}{'kB moved':>12}")
+        report(f"<Say>, TTS {args.tts_latency * 1000:.0f} ms", say, 0)
+        report("<Play>, cold GET", cold, size * args.plays)
+        report("<Play>, ETag revalidation", revalidate, 0)
+        print(f"{'<Play>, fresh in cache':<28}{'no request':>20}")
+
+        # Restart: a new store over the same directory finds every recording without rendering
+        t0 = time.perf_counter()
+        store = main.PromptAudio(main.PROMPT_AUDIO.directory, tts, main.PROMPT_AUDIO_TTS, main.PROMPT_AUDIO.base_url)
+        loaded = store.load()
+        rerendered = await store.render(p for t in main.TENANTS.tenants() for p in t.twiml.prompts)
+        print(f"\nrestart: loaded {loaded} recordings in {(time.perf_counter() - t0) * 1000:.1f} ms, "
+              f"{rerendered} re-rendered")
+        assert loaded == stats["assets"] and rerendered == 0
+
+        # Renaming one builder changes only that project's greetings: three outbound, one of
+        # which is also the inbound greeting and shares its recording
+        config = project_config(args.projects)
+        config["projects"][3]["company"] = "Renamed Realty"
+        with open(main.PROJECTS_FILE, "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        t0 = time.perf_counter()
+        await asyncio.to_thread(main.TENANTS.reload, True)
+        main.record_project_reload(True, None)
+        await main.PROMPT_RENDER["task"]
+        added = main.PROMPT_AUDIO.stats()["assets"] - stats["assets"]
+        greeting = main.TENANTS.find("p3").twiml.inbound_greeting.render().decode()
+        print(f"reload with one project changed: {added} new recordings in {time.perf_counter() - t0:.2f}s")
+        assert added == 3 and "<Say" not in greeting
+    await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--plays", type=int, default=200)
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="seconds to first audio from the TTS")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_prompts_")
+    projects_file = os.path.join(workdir, "projects.json")
+    with open(projects_file, "w", encoding="utf-8") as f:
+        json.dump(project_config(args.projects), f)
+    register_tts("bench", lambda: FakeTTS(first_chunk_delay=args.tts_latency))
+    os.environ.update(PROMPT_AUDIO_TTS="bench", PROMPT_AUDIO_DIR=os.path.join(workdir, "prompts"),
+                      PROJECTS_FILE=projects_file, PROJECTS_RELOAD_SECONDS="0", WARM_UP_PROVIDERS="false",
+                      LOG_FILE="", LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"))
+    cwd = os.getcwd()
+    # The app writes call logs relative to the working directory
+    os.chdir(workdir)
+    try:
+        asyncio.run(run(args, workdir))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Recording post-processing throughput vs worker processes.
+
+Synthesizes dual-channel call recordings (alternating caller/agent speech bursts over
+low background noise, with silence before and after the conversation), encodes them as
+MP3 with ffmpeg, then backfills the directory through RecordingProcessor once per worker
+count. Reports recordings/s, the size reduction, and how far the measured talk time is
+from the synthesized speech time. Needs ffmpeg with libmp3lame and libopus (or --ffmpeg).
+
+    python benchmarks/bench_recordings.py --recordings 24 --seconds 90 --workers 1,2,4
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from recording_processing import ProcessingOptions, RecordingProcessor  # noqa: E402
+
+RATE = 8000
+
+
+def synthesize(seconds: float, lead: float, tail: float, rng: np.random.Generator) -> tuple[np.ndarray, float]:
+    """Stereo int16 call audio and its total speech time (either channel)."""
+    n = int(seconds * RATE)
+    audio = rng.normal(0, 20, size=(n, 2))  # line noise, about -64 dBFS
+    t = lead
+    speech = 0.0
+    channel = 0
+    while t < seconds - tail - 0.5:
+        burst = min(rng.uniform(1.0, 6.0), seconds - tail - t)
+        start, end = int(t * RATE), int((t + burst) * RATE)
+        k = np.arange(end - start) / RATE
+        voice = np.sin(2 * np.pi * rng.uniform(120, 260) * k) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * k))
+        audio[start:end, channel] += 6000 * voice
+        speech += burst
+        t += burst + rng.uniform(0.3, 1.5)
+        channel = 1 - channel
+    return np.clip(audio, -32768, 32767).astype("<i2"), speech
+
+
+def write_mp3(path: str, samples: np.ndarray, ffmpeg: str):
+    subprocess.run([ffmpeg, "-nostdin", "-v", "error", "-y", "-f", "s16le", "-ar", str(RATE), "-ac", "2", "-i", "-",
+                    "-c:a", "libmp3lame", "-b:a", "32k", path], input=samples.tobytes(), check=True)
+
+
+async def backfill(directory: str, workers: int, options: ProcessingOptions) -> tuple[float, list[dict], int]:
+    results: list[dict] = []
+    errors = []
+    processor = RecordingProcessor(workers=workers, options=options,
+                                   on_complete=lambda _sid, result: results.append(result),
+                                   on_result=lambda sid, _s, error: error and errors.append((sid, error)))
+    # Start the worker processes before timing, as a running server would have them warm
+    await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(processor._pool(), time.sleep, 0.05)
+                           for _ in range(workers)))
+    started = time.perf_counter()
+    processor.backfill(directory)
+    while processor.pending():
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await processor.stop()
+    for sid, error in errors:
+        print(f"error: {sid}: {error}")
+    return elapsed, results, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=90.0, help="length of each recording")
+    parser.add_argument("--lead", type=float, default=4.0, help="silence before the conversation (s)")
+    parser.add_argument("--tail", type=float, default=6.0, help="silence after the conversation (s)")
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count() or 1}")
+    parser.add_argument("--ffmpeg", default=os.getenv("FFMPEG_BINARY", "ffmpeg"))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    if not shutil.which(args.ffmpeg):
+        sys.exit(f"{args.ffmpeg} not found; pass --ffmpeg or set FFMPEG_BINARY")
+
+    rng = np.random.default_rng(args.seed)
+    sources = tempfile.mkdtemp(prefix="bench_recordings_")
+    try:
+        speech = {}
+        for i in range(args.recordings):
+            sid = f"CA{i:032x}"
+            samples, speech[sid] = synthesize(args.seconds, args.lead, args.tail, rng)
+            write_mp3(os.path.join(sources, f"recording_{sid}.mp3"), samples, args.ffmpeg)
+        print(f"{args.recordings} recordings of {args.seconds:.0f}s, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8}{'seconds':>10}{'rec/s':>8}{'speedup':>9}{'MB in':>8}{'MB out':>8}"
+              f"{'trimmed s':>11}{'talk err s':>12}")
+        base = None
+        for workers in sorted({int(w) for w in args.workers.split(",")}):
+            # Processing replaces the MP3s, so every run works on a fresh copy
+            run_dir = os.path.join(sources, f"run_{workers}")
+            os.makedirs(run_dir)
+            for name in os.listdir(sources):
+                if name.endswith(".mp3"):
+                    shutil.copy(os.path.join(sources, name), run_dir)
+            elapsed, results, errors = asyncio.run(backfill(run_dir, workers, ProcessingOptions(ffmpeg=args.ffmpeg)))
+            base = base or elapsed
+            talk_error = np.mean([abs(r["talk_seconds"] - speech[os.path.basename(r["path"])[10:-5]]) for r in results])
+            print(f"{workers:>8}{elapsed:>10.2f}{len(results) / elapsed:>8.1f}{base / elapsed:>8.1f}x"
+                  f"{sum(r['bytes_in'] for r in results) / 1e6:>8.2f}{sum(r['bytes_out'] for r in results) / 1e6:>8.2f}"
+                  f"{np.mean([r['trimmed_seconds'] for r in results]):>11.1f}{talk_error:>12.2f}")
+            if errors:
+                sys.exit(1)
+    finally:
+        shutil.rmtree(sources, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Measure worker startup: import cost of main and time to first request / readiness.
+
+Each measurement runs in a fresh interpreter. The importtime report lists the slowest
+direct imports of `main` (from `python -X importtime`). The startup rows time
+import, app startup, the first /api/health response and the first 200 from /api/ready:
+
+  lazy   providers warm on a background thread after startup (the default)
+  eager  Gemini and Twilio clients are built before serving, as an import-time
+         initialization would
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+ENV = {
+    "PUBLIC_URL": "https://voice.example.test",
+    "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+    "TWILIO_AUTH_TOKEN": "startup-test",
+    "GEMINI_API_KEY": "startup-test",
+    "LOG_FILE": "",
+    "LOG_LEVEL": "WARNING",
+}
+
+
+def child(mode: str):
+    """Runs in the measured interpreter; prints one JSON line of timings in seconds."""
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import httpx
+    import main
+    imported = time.perf_counter()
+
+    async def serve() -> dict:
+        if mode == "eager":
+            main.WARM_UP_PROVIDERS = False
+            for provider in main.PROVIDERS:
+                provider.get()
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://startup.test") as client:
+                assert (await client.get("/api/health")).status_code == 200
+                first = time.perf_counter()
+                while (await client.get("/api/ready")).status_code != 200:
+                    await asyncio.sleep(0.005)
+                return {"first_request": first - started, "ready": time.perf_counter() - started}
+
+    timings = asyncio.run(serve())
+    print(json.dumps({"import": imported - started, **timings}))
+
+
+def run_child(mode: str, workdir: str) -> dict:
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode], cwd=workdir,
+                         env={**os.environ, **ENV}, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_report(workdir: str, top: int):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {ROOT!r}); import main"],
+                         cwd=workdir, env={**os.environ, **ENV}, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        m = IMPORT_RE.match(line)
+        if m:
+            rows.append((int(m.group(2)), len(m.group(3)), m.group(4)))
+    total = next(us for us, _depth, name in rows if name == "main")
+    # Modules imported directly by main are indented one level below it
+    nested = sorted((r for r in rows if r[1] == 3), reverse=True)[:top]
+    names = {name for _us, _depth, name in rows}
+    print(f"import main: {total / 1000:.1f} ms")
+    for us, _depth, name in nested:
+        print(f"  {name:<40}{us / 1000:>9.1f} ms")
+    for heavy in ("google.generativeai", "twilio.rest"):
+        print(f"  {heavy} imported: {'yes' if heavy in names else 'no (deferred)'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--child", choices=("lazy", "eager"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        import_report(workdir, args.top)
+        print(f"\n{'mode':<8}{'import ms':>12}{'first request ms':>19}{'ready ms':>12}   (median of {args.runs})")
+        for mode in ("lazy", "eager"):
+            runs = [run_child(mode, workdir) for _ in range(args.runs)]
+            med = {k: statistics.median(r[k] for r in runs) * 1000 for k in runs[0]}
+            print(f"{mode:<8}{med['import']:>12.1f}{med['first_request']:>19.1f}{med['ready']:>12.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Compare per-response TwiML build cost: VoiceResponse/Gather trees vs precompiled templates.
+
+The legacy builders below are the per-request code the webhooks used before
+twiml_templates; each pair is checked for identical XML before timing.
+
+    python benchmarks/bench_twiml.py --iterations 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twilio.twiml.voice_response import Gather, VoiceResponse  # noqa: E402
+
+from twiml_templates import TwimlTemplates  # noqa: E402
+
+CALLBACK_URL = "https://example.ngrok.app/api/callback/twilio/voice"
+RESULT_URL = "https://example.ngrok.app/api/callback/twilio/voice/result"
+COMPANY, UNIT_TYPES, PRICE = "Basant Realty", "1BHK–3BHK", "₹55 lakhs"
+REPLY = "Our 2BHK homes start around ₹72 lakhs & include covered parking. Would you like a site visit?"
+
+
+def legacy_reply(ai_resp: str, seq: int) -> str:
+    vr = VoiceResponse()
+    gather = Gather(input='speech', speechTimeout='auto', action=f"{CALLBACK_URL}?seq={seq}", method='POST',
+                    language='en-US hi-IN', timeout=5, profanityFilter=False,
+                    hints='sell, property, home, Basant, price, location, घर, संपत्ति, बेचना, बसंत, कीमत')
+    gather.say(ai_resp, voice='Polly.Aditi', language='hi-IN')
+    vr.append(gather)
+    vr.say("Are you still there? क्या आप अभी भी हैं?", voice='Polly.Aditi', language='hi-IN')
+    vr.redirect(CALLBACK_URL)
+    return str(vr)
+
+
+def legacy_greeting() -> str:
+    vr = VoiceResponse()
+    greet = (f"Hello! नमस्ते! I’m your real‑estate advisor from {COMPANY}. "
+             f"Before we begin, may I know your name?")
+    gather = Gather(input='speech', speechTimeout='auto', action=f"{CALLBACK_URL}?seq=1", method='POST',
+                    language='en-US hi-IN', timeout=5, profanityFilter=False,
+                    hints='my name is, I am, this is, नाम, मेरा नाम')
+    gather.say(greet, voice='Polly.Aditi', language='hi-IN')
+    vr.append(gather)
+    vr.say("If I didn’t hear you, please tell me your name.", voice='Polly.Joanna', language='en-US')
+    vr.redirect(CALLBACK_URL)
+    return str(vr)
+
+
+def legacy_holding(turn: int, seq: int) -> str:
+    vr = VoiceResponse()
+    vr.say("One moment, please. एक क्षण।", voice='Polly.Aditi', language='hi-IN')
+    vr.pause(length=1)
+    vr.redirect(f"{RESULT_URL}?turn={turn}&wait=0&seq={seq}", method='POST')
+    return str(vr)
+
+
+def same_xml(a, b) -> bool:
+    def canon(x):
+        return ET.canonicalize(x.decode() if isinstance(x, bytes) else x)
+    return canon(a) == canon(b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    templates = TwimlTemplates(CALLBACK_URL, RESULT_URL, COMPANY, UNIT_TYPES, PRICE)
+    cases = [
+        ("reply", lambda: legacy_reply(REPLY, 3), lambda: templates.reply.render(reply=REPLY, seq=3)),
+        ("greeting", legacy_greeting, templates.inbound_greeting.render),
+        ("holding", lambda: legacy_holding(3, 3), lambda: templates.holding[True].render(turn=3, wait=0, seq=3)),
+    ]
+    print(f"{'response':<10}{'builders (us)':>16}{'template (us)':>16}{'speedup':>10}")
+    for name, legacy, compiled in cases:
+        assert same_xml(legacy(), compiled()), f"{name}: template output differs from builder output"
+        before = timeit.timeit(legacy, number=args.iterations) / args.iterations * 1e6
+        after = timeit.timeit(compiled, number=args.iterations) / args.iterations * 1e6
+        print(f"{name:<10}{before:>16.2f}{after:>16.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
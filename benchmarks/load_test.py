@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""Offline load test for main:app with local Gemini and Twilio stand-ins.
+
+Simulates N concurrent callers playing scripted multi-turn Gather conversations against
+the real FastAPI app, either in-process (ASGI) or over HTTP on a local port. Gemini is
+replaced by a fake model with configurable latency and jitter; Twilio REST (outbound
+calls) and recording downloads go to a local fake server. Reports throughput, p50/p95/p99
+latency per webhook and per caller turn, and event-loop lag.
+
+    python benchmarks/load_test.py --callers 50 --turns 6
+    python benchmarks/load_test.py --transport http --callers 200 --llm-latency 0.8 --llm-jitter 0.3
+    python benchmarks/load_test.py --think-then-speak --outbound --recordings
+    python benchmarks/load_test.py --retry-rate 0.3   # duplicate webhooks the way Twilio retries them
+    python benchmarks/load_test.py --primary-error-rate 1   # primary model down: breaker + fallback model
+    python benchmarks/load_test.py --projects 40   # callers spread over 40 projects, routed by dialed number
+    python benchmarks/load_test.py --save-baseline baseline.json
+    python benchmarks/load_test.py --baseline baseline.json --max-regression 0.2   # exits 1 on regression
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse, Response  # noqa: E402
+
+PUBLIC_URL = "http://voice-agent.test"
+API_KEY = "load-test-key"
+
+# {i} is the caller index; lines without it repeat across callers and exercise the reply cache
+SCRIPT = [
+    "Ravi {i}",
+    "what is the price",
+    "tell me about the amenities near tower {i}",
+    "is there a home loan facility",
+    "how far is the metro station from the project",
+    "can I visit the site on saturday with my family {i}",
+    "what is the possession date for the second phase",
+    "okay bye",
+]
+REDIRECT_RE = re.compile(r"<Redirect[^>]*>([^<]+)</Redirect>")
+ACTION_RE = re.compile(r'<Gather action="([^"]+)"')
+PAUSE_RE = re.compile(r'<Pause length="(\d+)"')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+class FakeGeminiModel:
+    """Stands in for genai.GenerativeModel: sleeps latency +/- jitter, then echoes the question
+    (or raises, for `error_rate` of calls)."""
+
+    def __init__(self, latency: float, jitter: float, seed: int, error_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def generate_content(self, contents, request_options=None):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("fake Gemini upstream error")
+        question = contents[-1]["parts"][0].splitlines()[-1]
+        return SimpleNamespace(text=f"Happy to help. About '{question[:80]}': our advisor will share details.")
+
+
+def fake_twilio_app(recording_bytes: int) -> FastAPI:
+    """Minimal Twilio REST calls API plus a recording file server."""
+    app = FastAPI()
+    sids = itertools.count(1)
+    audio = b"\xff\xfb" + os.urandom(max(0, recording_bytes - 2))
+
+    @app.post("/2010-04-01/Accounts/{account_sid}/Calls.json")
+    async def create_call(account_sid: str, request: Request):
+        form = await request.form()
+        sid = f"CA{next(sids):032x}"
+        return JSONResponse(status_code=201, content={
+            "sid": sid, "account_sid": account_sid, "status": "queued",
+            "to": form.get("To"), "from": form.get("From"),
+        })
+
+    @app.get("/recordings/{name}")
+    async def recording(name: str):
+        return Response(audio, media_type="audio/mpeg")
+
+    return app
+
+
+def start_fake_twilio(recording_bytes: int) -> tuple[str, uvicorn.Server]:
+    """Run the fake Twilio server on its own thread and loop so it never competes with the app's loop."""
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(fake_twilio_app(recording_bytes), host="127.0.0.1", port=port,
+                                           log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, name="fake-twilio", daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
+
+
+def load_app(args, workdir: str, twilio_url: str):
+    """Import main with offline settings and swap in the fake Gemini model and Twilio endpoint."""
+    os.environ.update({
+        "PUBLIC_URL": PUBLIC_URL,
+        "API_KEY": API_KEY,
+        "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+        "TWILIO_AUTH_TOKEN": "load-test",
+        "TWILIO_PHONE_NUMBER": "+15550000000",
+        "GEMINI_API_KEY": "load-test",
+        "STATE_BACKEND": args.state_backend,
+        "THINK_THEN_SPEAK": "1" if args.think_then_speak else "0",
+        "LLM_TIMEOUT_SECONDS": str(args.llm_timeout),
+        "CALL_STORE_PATH": os.path.join(workdir, "call_logs", "calls.db"),
+        "LOG_LEVEL": args.log_level,
+    })
+    os.environ.pop("RESPONSE_CACHE_FILE", None)
+    if args.projects:
+        path = os.path.join(workdir, "projects.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"projects": [project_config(n) for n in range(args.projects)]}, f, ensure_ascii=False)
+        os.environ["PROJECTS_FILE"] = path
+    else:
+        os.environ.pop("PROJECTS_FILE", None)
+    os.chdir(workdir)
+    import main
+    # The fallback model is faster and healthy; --primary-error-rate degrades only the primary
+    primary = FakeGeminiModel(args.llm_latency, args.llm_jitter, args.seed, args.primary_error_rate)
+    fallback = FakeGeminiModel(args.llm_latency / 2, args.llm_jitter / 2, args.seed + 1)
+    main.get_persona_model = lambda model_name, _persona: primary if model_name == main.GEMINI_MODEL else fallback
+    main.TWILIO.get().api.base_url = twilio_url
+    return main, [primary, fallback]
+
+
+def project_config(n: int) -> dict:
+    return {"key": f"project-{n}", "company": f"Builder {n}", "project": f"Tower {n}",
+            "starting_price": f"₹{40 + n} lakhs", "numbers": [f"+1555900{n:04d}"], "campaigns": [f"campaign-{n}"]}
+
+
+class Stats:
+    def __init__(self):
+        self.latency: dict[str, list[float]] = {}
+        self.turns: list[float] = []
+        self.errors: list[str] = []
+        self.fallbacks = 0
+        self.retries = 0
+        self.tiers: dict[str, int] = {}
+        self.recordings = 0
+        self.loop_lag: list[float] = []
+
+    def record(self, endpoint: str, seconds: float):
+        self.latency.setdefault(endpoint, []).append(seconds)
+
+
+async def post(client: httpx.AsyncClient, stats: Stats, endpoint: str, url: str, **kwargs) -> str:
+    started = time.perf_counter()
+    try:
+        resp = await client.post(url, **kwargs)
+    except Exception as e:
+        stats.errors.append(f"{endpoint}: {e!r}")
+        return ""
+    stats.record(endpoint, time.perf_counter() - started)
+    if resp.status_code >= 400:
+        stats.errors.append(f"{endpoint}: HTTP {resp.status_code}")
+    return resp.text
+
+
+def local_path(url: str) -> str:
+    target = urlsplit(url.replace("&amp;", "&"))
+    return f"{target.path}?{target.query}" if target.query else target.path
+
+
+async def retry_webhook(client: httpx.AsyncClient, stats: Stats, url: str, data: dict, delay: float) -> str:
+    """Resend a webhook after `delay` seconds, like Twilio does when the first attempt is slow."""
+    await asyncio.sleep(delay)
+    stats.retries += 1
+    return await post(client, stats, "voice_retry", url, data=data)
+
+
+async def run_caller(i: int, client: httpx.AsyncClient, args, stats: Stats, twilio_url: str):
+    rng = random.Random(args.seed + i)
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+    project = project_config(i % args.projects) if args.projects else None
+    if args.outbound:
+        started = time.perf_counter()
+        body = {"to_number": f"+1555{i:07d}", "project": project and project["campaigns"][0]}
+        resp = await client.post("/api/call/outbound", json=body, headers={"X-API-Key": API_KEY})
+        stats.record("outbound", time.perf_counter() - started)
+        if resp.status_code != 200:
+            stats.errors.append(f"outbound: HTTP {resp.status_code}")
+            return
+        call_sid = resp.json()["call_sid"]
+    else:
+        call_sid = f"CA{i:032d}"
+    base = {"CallSid": call_sid, "From": f"+1555{i:07d}", "To": project["numbers"][0] if project else "+15550000000"}
+    twiml = await post(client, stats, "voice", "/api/callback/twilio/voice", data=base)
+
+    lines = SCRIPT[1:-1]
+    script = [SCRIPT[0]] + [lines[n % len(lines)] for n in range(max(0, args.turns - 2))] + [SCRIPT[-1]]
+    for utterance in script:
+        await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think_time)
+        # Post where the last <Gather> said to, so the turn sequence matches what Twilio would send
+        action = local_path(m.group(1)) if (m := ACTION_RE.search(twiml)) else "/api/callback/twilio/voice"
+        data = {**base, "SpeechResult": utterance.format(i=i), "Confidence": "0.9"}
+        retry = None
+        if rng.random() < args.retry_rate:
+            retry = asyncio.create_task(retry_webhook(client, stats, action, data, rng.uniform(0, args.llm_latency)))
+        turn_started = time.perf_counter()
+        twiml = await post(client, stats, "voice", action, data=data)
+        if retry is not None and await retry != twiml:
+            stats.errors.append(f"{call_sid}: retried webhook got different TwiML")
+        # Follow think-then-speak redirects the way Twilio would, honouring <Pause>
+        while (m := REDIRECT_RE.search(twiml)) and "/voice/result" in m.group(1):
+            if p := PAUSE_RE.search(twiml):
+                await asyncio.sleep(int(p.group(1)) * args.pause_scale)
+            twiml = await post(client, stats, "result", local_path(m.group(1)), data={"CallSid": call_sid})
+        # Caller-perceived: from end of speech to the reply TwiML, including holding pauses
+        stats.turns.append(time.perf_counter() - turn_started)
+        if project and utterance == "what is the price" and f"Prices at {project['project']} " not in twiml:
+            stats.errors.append(f"{call_sid}: price answer is not from {project['key']}")
+
+    await post(client, stats, "status", "/api/callback/twilio/status", data={**base, "CallStatus": "completed"})
+    if args.recordings:
+        await post(client, stats, "recording", "/api/callback/twilio/recording", data={
+            "CallSid": call_sid, "RecordingStatus": "completed", "RecordingUrl": f"{twilio_url}/recordings/{call_sid}",
+        })
+
+
+async def monitor_loop_lag(stats: Stats, interval: float = 0.01):
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        stats.loop_lag.append(max(0.0, loop.time() - started - interval))
+
+
+async def drive(app_module, args, stats: Stats, twilio_url: str) -> float:
+    monitor = asyncio.create_task(monitor_loop_lag(stats))
+    server = None
+    try:
+        if args.transport == "http":
+            port = free_port()
+            server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+            server_task = asyncio.create_task(server.serve())
+            while not server.started:
+                await asyncio.sleep(0.01)
+            client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60,
+                                       limits=httpx.Limits(max_connections=args.callers))
+            lifespan = None
+        else:
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app_module.app), base_url=PUBLIC_URL, timeout=60)
+            lifespan = app_module.lifespan(app_module.app)
+            await lifespan.__aenter__()
+        started = time.perf_counter()
+        async with client:
+            await asyncio.gather(*(run_caller(i, client, args, stats, twilio_url) for i in range(args.callers)))
+        elapsed = time.perf_counter() - started
+        stats.fallbacks = int(app_module.LLM_FALLBACKS.total())
+        stats.tiers = {tier: int(app_module.LLM_REPLIES.value(tier=tier)) for tier in app_module.LLM_GUARD.models + ["local"]}
+        if args.recordings:
+            await asyncio.wait_for(app_module.RECORDING_DOWNLOADER.join(), 60)
+            stats.recordings = len(app_module.RECORDING_DOWNLOADS.keys())
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+        if server is not None:
+            server.should_exit = True
+            await server_task
+        return elapsed
+    finally:
+        monitor.cancel()
+
+
+def summarize(stats: Stats, elapsed: float, models: list[FakeGeminiModel], args) -> dict:
+    requests = sum(len(v) for v in stats.latency.values())
+    result = {
+        "callers": args.callers,
+        "turns_per_caller": args.turns,
+        "transport": args.transport,
+        "elapsed_s": round(elapsed, 3),
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "turns": len(stats.turns),
+        "turns_per_s": round(len(stats.turns) / elapsed, 2) if elapsed else 0.0,
+        "errors": len(stats.errors),
+        "llm_calls": sum(m.calls for m in models),
+        "llm_fallbacks": stats.fallbacks,
+        "llm_tiers": stats.tiers,
+        "webhook_retries": stats.retries,
+        "recordings_downloaded": stats.recordings,
+        "endpoints": {},
+    }
+    series = dict(stats.latency, turn=stats.turns, loop_lag=stats.loop_lag)
+    for name, values in series.items():
+        result["endpoints"][name] = {
+            "count": len(values),
+            **{f"p{p}_ms": round(percentile(values, p) * 1000, 2) for p in (50, 95, 99)},
+            "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+        }
+    return result
+
+
+def print_report(result: dict, errors: list[str]):
+    print(f"{result['callers']} callers x {result['turns_per_caller']} turns over {result['transport']} "
+          f"in {result['elapsed_s']:.2f}s")
+    print(f"requests: {result['requests']} ({result['throughput_rps']:.1f}/s)   turns: {result['turns']} "
+          f"({result['turns_per_s']:.1f}/s)   LLM calls: {result['llm_calls']}   fallbacks: {result['llm_fallbacks']}   "
+          f"retries: {result.get('webhook_retries', 0)}   "
+          f"replies by tier: {result.get('llm_tiers', {})}   "
+          f"recordings: {result['recordings_downloaded']}   errors: {result['errors']}")
+    print(f"{'series':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, s in result["endpoints"].items():
+        print(f"{name:<12}{s['count']:>8}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+    for e in errors[:10]:
+        print(f"  error: {e}")
+
+
+def check_regressions(result: dict, baseline: dict, max_regression: float, min_delta_ms: float) -> list[str]:
+    """Compare p95/p99 of every series and throughput against a saved run."""
+    failures = []
+    for name, current in result["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            limit = before[key] * (1 + max_regression) + min_delta_ms
+            if current[key] > limit:
+                failures.append(f"{name} {key} {current[key]:.2f} > {limit:.2f} (baseline {before[key]:.2f})")
+    floor = baseline.get("throughput_rps", 0) * (1 - max_regression)
+    if result["throughput_rps"] < floor:
+        failures.append(f"throughput {result['throughput_rps']:.1f}/s < {floor:.1f}/s")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=50, help="concurrent simulated callers")
+    parser.add_argument("--turns", type=int, default=6, help="speech turns per caller, including name and goodbye")
+    parser.add_argument("--ramp", type=float, default=1.0, help="spread caller start times over this many seconds")
+    parser.add_argument("--think-time", type=float, default=0.2, help="mean seconds between a reply and the next utterance")
+    parser.add_argument("--transport", choices=("asgi", "http"), default="asgi")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="fake Gemini mean latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="fake Gemini latency jitter, +/- (s)")
+    parser.add_argument("--llm-timeout", type=float, default=8.0)
+    parser.add_argument("--primary-error-rate", type=float, default=0.0,
+                        help="fraction of primary-model generations that fail (the fallback model stays healthy)")
+    parser.add_argument("--think-then-speak", action="store_true", help="enable the two-phase filler/poll turn mode")
+    parser.add_argument("--pause-scale", type=float, default=1.0,
+                        help="scale <Pause> waits before following think-then-speak redirects (0 = poll immediately)")
+    parser.add_argument("--retry-rate", type=float, default=0.0,
+                        help="fraction of speech webhooks re-sent while the first attempt may still be running")
+    parser.add_argument("--outbound", action="store_true", help="start each call through /api/call/outbound (fake Twilio REST)")
+    parser.add_argument("--recordings", action="store_true", help="send a recording callback per call (fake recording server)")
+    parser.add_argument("--recording-bytes", type=int, default=256 * 1024)
+    parser.add_argument("--projects", type=int, default=0, help="serve this many projects from a PROJECTS_FILE")
+    parser.add_argument("--state-backend", default="memory")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--json", help="write the result as JSON to this path")
+    parser.add_argument("--save-baseline", help="write the result as a baseline for later --baseline runs")
+    parser.add_argument("--baseline", help="fail (exit 1) if p95/p99 or throughput regress against this result")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="absolute slack added to latency limits")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if the caller turn p95 exceeds this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="voice_load_")
+    cwd = os.getcwd()
+    twilio_url, twilio_server = start_fake_twilio(args.recording_bytes)
+    try:
+        app_module, models = load_app(args, workdir, twilio_url)
+        stats = Stats()
+        # The app prints call banners to stdout; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()) if args.log_level != "DEBUG" else contextlib.nullcontext():
+            elapsed = asyncio.run(drive(app_module, args, stats, twilio_url))
+        result = summarize(stats, elapsed, models, args)
+    finally:
+        twilio_server.should_exit = True
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(result, stats.errors)
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures += check_regressions(result, json.load(f), args.max_regression, args.min_delta_ms)
+    if args.max_p95_ms is not None and result["endpoints"]["turn"]["p95_ms"] > args.max_p95_ms:
+        failures.append(f"turn p95 {result['endpoints']['turn']['p95_ms']:.2f} ms > {args.max_p95_ms:.2f} ms")
+    if result["errors"]:
+        failures.append(f"{result['errors']} request error(s)")
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Fake Twilio Media Streams client for the stream-mode WebSocket.
+
+Drives /api/stream/twilio in-process over ASGI with N concurrent callers. Each caller
+acts like Twilio: it sends a start event, then streams μ-law frames in real time (a tone
+while "speaking", silence otherwise), plays back the agent's audio on a simulated clock,
+and echoes marks when their audio has "played". STT/TTS use the fake backends, and
+Gemini is replaced by a fake streaming model. Reports mouth-to-ear latency (end of caller
+speech to first agent audio, including endpointing silence), how long barge-in takes to
+produce a clear event, and how turns were answered.
+
+    python benchmarks/media_stream_client.py --callers 10 --turns 4
+    python benchmarks/media_stream_client.py --barge-in --time-scale 0.25 --llm-first-chunk 0.6
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import media_stream  # noqa: E402
+
+QUESTIONS = [
+    "tell me what the neighbourhood is like for families",
+    "how far is the nearest metro station from the project",
+    "what kind of amenities do you have for children",
+    "can you explain the payment plan in simple terms",
+    "is there a club house and a swimming pool",
+]
+FRAME_SECONDS = media_stream.FRAME_MS / 1000
+
+
+class FakeStreamingModel:
+    """Stands in for genai.GenerativeModel with stream=True: first chunk after a delay, then a few words at a time."""
+
+    def __init__(self, first_chunk: float, per_chunk: float):
+        self.first_chunk = first_chunk
+        self.per_chunk = per_chunk
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def generate_content(self, contents, stream=False, request_options=None):
+        with self._lock:
+            self.calls += 1
+        question = contents[-1]["parts"][0].splitlines()[-1][:60]
+        text = (f"Happy to help with that. About '{question}', our advisor can share the details. "
+                f"Would you like to schedule a site visit this weekend?")
+        words = text.split(" ")
+
+        def chunks():
+            time.sleep(self.first_chunk)
+            for i in range(0, len(words), 4):
+                yield SimpleNamespace(text=" ".join(words[i:i + 4]) + " ")
+                time.sleep(self.per_chunk)
+        if stream:
+            return chunks()
+        return SimpleNamespace(text="".join(c.text for c in chunks()))
+
+
+class FakeTwilioStream:
+    """One Media Streams connection, talking to the ASGI app through in-memory queues."""
+
+    def __init__(self, app, call_sid: str, time_scale: float):
+        self.app = app
+        self.call_sid = call_sid
+        self.time_scale = time_scale
+        self.stream_sid = "MZ" + call_sid[2:]
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self.play_until = 0.0
+        self.outstanding: set[str] = set()
+        self.drained = asyncio.Event()
+        self.drained.set()
+        self.audio_at: list[float] = []
+        self.clears: list[float] = []
+        self.closed = asyncio.Event()
+        self._generation = 0
+        self._tasks: list[asyncio.Task] = []
+
+    async def connect(self):
+        scope = {"type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": "/api/stream/twilio",
+                 "raw_path": b"/api/stream/twilio", "root_path": "", "query_string": b"", "headers": [],
+                 "client": ("127.0.0.1", 0), "server": ("testserver", 80), "subprotocols": []}
+        await self._to_app.put({"type": "websocket.connect"})
+        self._tasks.append(asyncio.create_task(self.app(scope, self._to_app.get, self._from_app.put)))
+        accepted = await self._from_app.get()
+        assert accepted["type"] == "websocket.accept", accepted
+        self._tasks.append(asyncio.create_task(self._receive()))
+        await self.send({"event": "connected", "protocol": "Call", "version": "1.0.0"})
+        await self.send({"event": "start", "streamSid": self.stream_sid, "start": {
+            "streamSid": self.stream_sid, "callSid": self.call_sid, "tracks": ["inbound"],
+            "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": 8000, "channels": 1}}})
+
+    async def send(self, message: dict):
+        await self._to_app.put({"type": "websocket.receive", "text": json.dumps(message)})
+
+    async def close(self):
+        await self.send({"event": "stop", "streamSid": self.stream_sid})
+        await self._to_app.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait(self._tasks, timeout=5)
+        for task in self._tasks:
+            task.cancel()
+
+    async def _receive(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await self._from_app.get()
+            if message["type"] == "websocket.close":
+                self.closed.set()
+                return
+            data = json.loads(message["text"])
+            now = loop.time()
+            if data["event"] == "media":
+                self.audio_at.append(now)
+                seconds = len(base64.b64decode(data["media"]["payload"])) / media_stream.SAMPLE_RATE
+                self.play_until = max(self.play_until, now) + seconds * self.time_scale
+            elif data["event"] == "mark":
+                self.outstanding.add(data["mark"]["name"])
+                self.drained.clear()
+                asyncio.create_task(self._echo_mark(data["mark"]["name"], self.play_until - now, self._generation))
+            elif data["event"] == "clear":
+                self.clears.append(now)
+                self._generation += 1
+                self.play_until = now
+                self.outstanding.clear()
+                self.drained.set()
+
+    async def _echo_mark(self, name: str, delay: float, generation: int):
+        await asyncio.sleep(max(0.0, delay))
+        if generation != self._generation or name not in self.outstanding:
+            return
+        self.outstanding.discard(name)
+        await self.send({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}})
+        if not self.outstanding:
+            self.drained.set()
+
+    async def stream_audio(self, audio: bytes):
+        """Send audio as 20 ms media frames, paced like a live call."""
+        frame = media_stream.FRAME_BYTES
+        for i in range(0, len(audio), frame):
+            await self.send({"event": "media", "streamSid": self.stream_sid,
+                             "media": {"track": "inbound", "payload": base64.b64encode(audio[i:i + frame]).decode()}})
+            await asyncio.sleep(FRAME_SECONDS * self.time_scale)
+
+    async def wait_for_agent(self, after: float, timeout: float = 30):
+        """Wait until the agent has started speaking after `after` and its audio has finished playing."""
+        deadline = time.monotonic() + timeout
+        while not (self.audio_at and self.audio_at[-1] > after and self.drained.is_set()):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{self.call_sid}: agent did not answer")
+            await asyncio.sleep(0.01)
+
+
+async def run_caller(app, index: int, args, results: dict, hangups: dict):
+    loop = asyncio.get_running_loop()
+    call_sid = f"CA{index:032x}"
+    client = FakeTwilioStream(app, call_sid, args.time_scale)
+    speech = media_stream.tone(args.speech_ms, frequency=220)
+    gap = media_stream.silence(args.silence_ms)
+    try:
+        await client.connect()
+        await client.wait_for_agent(0.0)  # greeting
+        last = args.turns + 1  # name, questions, goodbye
+        barging = False
+        for turn in range(last + 1):
+            spoke_at = loop.time()
+            await client.stream_audio(speech)
+            ended_at = loop.time()
+            await client.stream_audio(gap)
+            if barging:
+                clears = [t for t in client.clears if t >= spoke_at]
+                if clears:
+                    results["barge_in"].append(clears[0] - spoke_at)
+                barging = False
+            if turn == last:
+                await asyncio.wait_for(hangups[call_sid].wait(), timeout=30)
+                break
+            if args.barge_in and turn == 1:
+                # Talk over the first answer shortly after it starts playing
+                while not any(t > ended_at for t in client.audio_at):
+                    await asyncio.sleep(0.005)
+                await asyncio.sleep(0.3 * args.time_scale)
+                barging = True
+            else:
+                await client.wait_for_agent(ended_at)
+            results["mouth_to_ear"].append(next(t for t in client.audio_at if t > ended_at) - ended_at)
+    except Exception as e:
+        results["errors"].append(f"{call_sid}: {e!r}")
+    finally:
+        await client.close()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def drive(main, args) -> dict:
+    script = ["Asha Rao"] + [QUESTIONS[i % len(QUESTIONS)] for i in range(args.turns)] + ["thank you, bye"]
+    main.STREAM_STT = media_stream.FakeSTT(script, end_silence_ms=args.silence_ms - 100)
+    main.STREAM_TTS = media_stream.FakeTTS(ms_per_char=args.tts_ms_per_char, first_chunk_delay=args.tts_first_chunk)
+    hangups: dict[str, asyncio.Event] = {f"CA{i:032x}": asyncio.Event() for i in range(args.callers)}
+
+    async def hang_up(call_sid: str):
+        hangups[call_sid].set()
+    main.hang_up_call = hang_up
+
+    results: dict = {"mouth_to_ear": [], "barge_in": [], "errors": []}
+    started = time.perf_counter()
+    async with main.lifespan(main.app):
+        await asyncio.gather(*(run_caller(main.app, i, args, results, hangups) for i in range(args.callers)))
+    results["elapsed"] = time.perf_counter() - started
+    results["turns"] = {path: main.TURNS.value(path=path) for path in ("name", "intent", "stream", "farewell")}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=3, help="questions per call (plus name and goodbye)")
+    parser.add_argument("--barge-in", action="store_true", help="talk over one answer per call")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="scale audio pacing and playback (0.25 = 4x faster)")
+    parser.add_argument("--speech-ms", type=int, default=600)
+    parser.add_argument("--silence-ms", type=int, default=500, help="pause after speaking; STT endpoints 100 ms earlier")
+    parser.add_argument("--llm-first-chunk", type=float, default=0.4)
+    parser.add_argument("--llm-per-chunk", type=float, default=0.05)
+    parser.add_argument("--tts-first-chunk", type=float, default=0.05)
+    parser.add_argument("--tts-ms-per-char", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="voice_stream_")
+    cwd = os.getcwd()
+    os.environ.update({
+        "PUBLIC_URL": "https://voice.example.test",
+        "CONVERSATION_MODE": "stream",
+        "ALLOW_FAKE_BACKENDS": "true",
+        "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+        "TWILIO_AUTH_TOKEN": "stream-test",
+        "GEMINI_API_KEY": "stream-test",
+        "CALL_STORE_PATH": os.path.join(workdir, "call_logs", "calls.db"),
+        "LOG_FILE": "",
+        "LOG_LEVEL": "WARNING",
+    })
+    os.environ.pop("RESPONSE_CACHE_FILE", None)
+    try:
+        os.chdir(workdir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import main as app_main
+            model = FakeStreamingModel(args.llm_first_chunk, args.llm_per_chunk)
+            app_main.get_persona_model = lambda _model_name, _persona: model
+            results = asyncio.run(drive(app_main, args))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.callers} callers, {args.turns} questions each, {results['elapsed']:.1f}s, "
+          f"{model.calls} Gemini streams, turns {results['turns']}")
+    for label, values in (("mouth-to-ear", results["mouth_to_ear"]), ("barge-in to clear", results["barge_in"])):
+        if values:
+            print(f"{label:<18} n={len(values):<4} p50={percentile(values, 50) * 1000:7.1f} ms  "
+                  f"p95={percentile(values, 95) * 1000:7.1f} ms  mean={statistics.mean(values) * 1000:7.1f} ms")
+    for error in results["errors"]:
+        print("error:", error)
+    sys.exit(1 if results["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
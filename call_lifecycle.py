@@ -0,0 +1,132 @@
+"""Call lifecycle tracking and eviction of per-call state.
+
+Every call gets an activity record in a shared StateStore: when it was last seen and,
+once a terminal status arrives, when it ended. A periodic sweep evicts calls that ended
+more than `grace_seconds` ago (leaving room for late recording callbacks) and calls idle
+for longer than `idle_ttl_seconds` that never reported a terminal status. The latter are
+counted as leaked. Entries in the tracked stores that have no activity record (e.g.
+written after an eviction) are adopted so their idle clock starts and they expire too.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from state_store import StateStore
+
+logger = logging.getLogger(__name__)
+
+
+class CallLifecycle:
+    def __init__(self, activity: StateStore, tracked: tuple[StateStore, ...] = (),
+                 grace_seconds: float = 300, idle_ttl_seconds: float = 3600,
+                 on_evict: Optional[Callable[[str, str], None]] = None, clock: Callable[[], float] = time.time):
+        self.activity = activity
+        self.tracked = tracked
+        self.grace_seconds = grace_seconds
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.on_evict = on_evict
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._counters = {"evicted": 0, "leaked": 0, "adopted": 0, "sweeps": 0}
+
+    def touch(self, call_sid: Optional[str]):
+        """Record activity for a call, starting its lifecycle if needed."""
+        if call_sid:
+            self.activity.update(call_sid, *self._seen())
+
+    async def atouch(self, call_sid: Optional[str]):
+        """`touch` for async callers; the store write does not block the event loop."""
+        if call_sid:
+            await self.activity.aupdate(call_sid, *self._seen())
+
+    def mark_ended(self, call_sid: Optional[str], status: str):
+        """Start the grace period for a call that reported a terminal status."""
+        if call_sid:
+            self.activity.update(call_sid, *self._ended(status))
+
+    async def amark_ended(self, call_sid: Optional[str], status: str):
+        if call_sid:
+            await self.activity.aupdate(call_sid, *self._ended(status))
+
+    def _seen(self) -> tuple[Callable[[dict], None], dict]:
+        now = self.clock()
+
+        def seen(record: dict):
+            record["last_seen"] = now
+        return seen, {"started": now, "last_seen": now, "ended_at": None}
+
+    def _ended(self, status: str) -> tuple[Callable[[dict], None], dict]:
+        now = self.clock()
+
+        def ended(record: dict):
+            record["last_seen"] = now
+            if record.get("ended_at") is None:
+                record["ended_at"] = now
+                record["status"] = status
+        return ended, {"started": now, "last_seen": now, "ended_at": None}
+
+    def sweep(self, now: Optional[float] = None) -> list[tuple[str, str]]:
+        """Evict expired calls; returns (call_sid, reason) pairs, reason being "ended" or "leaked"."""
+        now = self.clock() if now is None else now
+        evicted = []
+        for call_sid in self.activity.keys():
+            record = self.activity.get(call_sid)
+            if record is None:
+                continue
+            if record.get("ended_at") is not None:
+                if now - record["ended_at"] < self.grace_seconds:
+                    continue
+                reason = "ended"
+            elif now - record.get("last_seen", 0) >= self.idle_ttl_seconds:
+                reason = "leaked"
+            else:
+                continue
+            if not self._claim(call_sid, record):
+                continue  # touched again, or claimed by another worker's sweep
+            try:
+                if self.on_evict:
+                    self.on_evict(call_sid, reason)
+            except Exception as e:
+                logger.warning("Eviction hook failed for %s: %s", call_sid, e, extra={"call_sid": call_sid})
+            for store in self.tracked:
+                store.delete(call_sid)
+            self.activity.delete(call_sid)
+            evicted.append((call_sid, reason))
+        adopted = self._adopt_orphans(now)
+        with self._lock:
+            self._counters["sweeps"] += 1
+            self._counters["adopted"] += adopted
+            for _, reason in evicted:
+                self._counters["evicted"] += 1
+                if reason == "leaked":
+                    self._counters["leaked"] += 1
+        return evicted
+
+    def _claim(self, call_sid: str, seen: dict) -> bool:
+        def claim(record: dict) -> bool:
+            if record.get("evicting") or record.get("last_seen") != seen.get("last_seen"):
+                return False
+            record["evicting"] = True
+            return True
+        return bool(self.activity.update(call_sid, claim))
+
+    def _adopt_orphans(self, now: float) -> int:
+        adopted = 0
+        for store in self.tracked:
+            for call_sid in store.keys():
+                if self.activity.add(call_sid, {"started": now, "last_seen": now, "ended_at": None}):
+                    adopted += 1
+        return adopted
+
+    def stats(self) -> dict:
+        records = [r for r in (self.activity.get(k) for k in self.activity.keys()) if r is not None]
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "live": sum(1 for r in records if r.get("ended_at") is None),
+            "ending": sum(1 for r in records if r.get("ended_at") is not None),
+            **counters,
+            "grace_seconds": self.grace_seconds,
+            "idle_ttl_seconds": self.idle_ttl_seconds,
+        }
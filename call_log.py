@@ -0,0 +1,172 @@
+"""Buffered per-call log writer.
+
+Webhooks only enqueue lines; a single background thread owns all file I/O. It keeps an
+LRU of open file handles and writes buffered lines in batches once `flush_lines` lines
+are pending or `flush_interval` seconds have passed, whichever comes first. Logs that
+have been idle for a while are gzip-compressed by the same thread.
+"""
+import glob
+import gzip
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class CallLogWriter:
+    """Single-writer queue for call log files."""
+
+    def __init__(self, max_open_files: int = 64, flush_lines: int = 200, flush_interval: float = 0.5):
+        self.max_open_files = max_open_files
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._handles: OrderedDict[str, TextIO] = OrderedDict()
+        self._buffers: dict[str, list[str]] = {}
+        self._pending = 0
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="call-log-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Flush everything, close all files and stop the writer thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def write(self, path: str, line: str):
+        """Queue one line (without trailing newline) for `path`; never blocks on disk."""
+        if self._thread is None:
+            self.start()
+        self._queue.put((path, line))
+
+    def flush(self, path: Optional[str] = None, close: bool = False, wait: bool = False, timeout: float = 5.0) -> bool:
+        """Force buffered lines (for `path`, or all files) to disk, optionally closing the handle.
+
+        With `wait=True` the call blocks until the writer has processed the request.
+        """
+        if self._thread is None:
+            self.start()
+        done = threading.Event()
+        self._queue.put(("__flush__", path, close, done))
+        return done.wait(timeout) if wait else True
+
+    def compress_idle(self, directory: str, older_than_seconds: float, timeout: float = 300.0) -> list[tuple[str, str]]:
+        """Gzip `*.log` files in `directory` not modified for `older_than_seconds`.
+
+        Blocks until the writer thread has finished; returns (old path, new path) pairs.
+        """
+        if self._thread is None:
+            self.start()
+        done = threading.Event()
+        result: list[tuple[str, str]] = []
+        self._queue.put(("__compress__", directory, older_than_seconds, done, result))
+        done.wait(timeout)
+        return result
+
+    def _run(self):
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush_all()
+                for handle in self._handles.values():
+                    handle.close()
+                self._handles.clear()
+                return
+            if item is not None:
+                if item[0] == "__compress__":
+                    _, directory, older_than, done, result = item
+                    result.extend(self._compress_idle(directory, older_than))
+                    done.set()
+                elif item[0] == "__flush__":
+                    _, path, close, done = item
+                    if path is None:
+                        self._flush_all()
+                    else:
+                        self._flush_path(path)
+                        if close and path in self._handles:
+                            self._handles.pop(path).close()
+                    done.set()
+                else:
+                    path, line = item
+                    self._buffers.setdefault(path, []).append(line + "\n")
+                    self._pending += 1
+            if self._pending >= self.flush_lines or time.monotonic() >= deadline:
+                self._flush_all()
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush_all(self):
+        for path in list(self._buffers):
+            self._flush_path(path)
+        self._pending = 0
+
+    def _flush_path(self, path: str):
+        lines = self._buffers.pop(path, None)
+        if not lines:
+            return
+        self._pending = max(0, self._pending - len(lines))
+        try:
+            handle = self._handle(path)
+            handle.write("".join(lines))
+            handle.flush()
+        except Exception as e:
+            logger.warning("Failed to write call log %s: %s", path, e)
+
+    def _compress_idle(self, directory: str, older_than: float) -> list[tuple[str, str]]:
+        cutoff = time.time() - older_than
+        compressed = []
+        for path in glob.glob(os.path.join(directory, "*.log")):
+            try:
+                if path in self._buffers or os.path.getmtime(path) > cutoff:
+                    continue
+                handle = self._handles.pop(path, None)
+                if handle is not None:
+                    handle.close()
+                compressed.append((path, compress_file(path)))
+            except Exception as e:
+                logger.warning("Failed to compress call log %s: %s", path, e)
+        return compressed
+
+    def _handle(self, path: str) -> TextIO:
+        handle = self._handles.get(path)
+        if handle is not None:
+            self._handles.move_to_end(path)
+            return handle
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handle = open(path, "a", encoding="utf-8")
+        self._handles[path] = handle
+        while len(self._handles) > self.max_open_files:
+            _, oldest = self._handles.popitem(last=False)
+            oldest.close()
+        return handle
+
+
+def compress_file(path: str) -> str:
+    """Gzip `path` to `path + ".gz"` atomically and remove the original."""
+    target = path + ".gz"
+    tmp = target + ".tmp"
+    with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, target)
+    os.remove(path)
+    return target
@@ -0,0 +1,263 @@
+"""Indexed, queryable store of calls and their typed events (SQLite in WAL mode).
+
+Writes are queued and committed in batches by one background thread; reads open their
+own per-thread connection, so API queries never wait on the writer. Listings use keyset
+(cursor) pagination over indexed columns, so a page costs the same no matter how many
+calls are on disk.
+"""
+import base64
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Event types written by append_call_log; anything else is stored under its leading token
+EVENT_TYPES = ("USER", "ASSISTANT", "STATUS", "RECORDING", "NAME_CAPTURED")
+TERMINAL_STATUSES = ("completed", "failed", "no-answer", "busy", "canceled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    call_sid TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    ended_at TEXT,
+    from_number TEXT,
+    to_number TEXT,
+    status TEXT,
+    log_path TEXT
+);
+CREATE INDEX IF NOT EXISTS calls_started ON calls(started_at, call_sid);
+CREATE INDEX IF NOT EXISTS calls_from ON calls(from_number, started_at, call_sid);
+CREATE INDEX IF NOT EXISTS calls_to ON calls(to_number, started_at, call_sid);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    call_sid TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    type TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_call ON events(call_sid, id);
+CREATE INDEX IF NOT EXISTS events_type ON events(type, id);
+CREATE INDEX IF NOT EXISTS events_ts ON events(ts);
+"""
+
+UPSERT_CALL = """
+INSERT INTO calls (call_sid, started_at, ended_at, from_number, to_number, status, log_path)
+VALUES (:call_sid, :started_at, :ended_at, :from_number, :to_number, :status, :log_path)
+ON CONFLICT(call_sid) DO UPDATE SET
+    ended_at = COALESCE(excluded.ended_at, calls.ended_at),
+    from_number = COALESCE(excluded.from_number, calls.from_number),
+    to_number = COALESCE(excluded.to_number, calls.to_number),
+    status = COALESCE(excluded.status, calls.status),
+    log_path = COALESCE(excluded.log_path, calls.log_path)
+"""
+
+_STOP = object()
+
+
+def parse_event(message: str) -> tuple[str, str]:
+    """Split a call-log message ("USER hello") into (type, text)."""
+    if message.startswith("CALL END"):
+        return "CALL_END", ""
+    head, _, rest = message.partition(" ")
+    if head.startswith("RECORDING"):
+        return "RECORDING", message
+    return head, rest
+
+
+def encode_cursor(values: list[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, *types: type) -> list[Any]:
+    """The values of a cursor from encode_cursor, which must be one of each of `types`.
+
+    Cursors come from clients, so anything else raises ValueError rather than reaching SQL.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("invalid cursor")
+    if (not isinstance(values, list) or len(values) != len(types)
+            or any(isinstance(v, bool) or not isinstance(v, t) for v, t in zip(values, types))):
+        raise ValueError("invalid cursor")
+    return values
+
+
+class CallStore:
+    """Calls and call events with batched background writes and cursor-paginated reads."""
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 0.2):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._local = threading.local()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # ---- writes (queued) ----
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="call-store-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far is committed."""
+        if self._thread is None:
+            self.start()
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def upsert_call(self, call_sid: str, started_at: str, ended_at: Optional[str] = None,
+                    from_number: Optional[str] = None, to_number: Optional[str] = None,
+                    status: Optional[str] = None, log_path: Optional[str] = None):
+        self._put(("call", {
+            "call_sid": call_sid, "started_at": started_at, "ended_at": ended_at,
+            "from_number": from_number, "to_number": to_number, "status": status, "log_path": log_path,
+        }))
+
+    def record_event(self, call_sid: str, ts: str, message: str):
+        event_type, text = parse_event(message)
+        self._put(("event", (call_sid, ts, event_type, text)))
+
+    def set_log_path(self, call_sid: str, log_path: str):
+        self._put(("log_path", (log_path, call_sid)))
+
+    def _put(self, item):
+        if self._thread is None:
+            self.start()
+        self._queue.put(item)
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            try:
+                # Wait briefly for more work so bursts commit in one transaction
+                while len(batch) < self.batch_size and batch[-1] is not _STOP and batch[-1][0] != "flush":
+                    batch.append(self._queue.get(timeout=self.flush_interval) if len(batch) == 1 else self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            items = [i for i in batch if i is not _STOP]
+            calls = [i[1] for i in items if i[0] == "call"]
+            events = [i[1] for i in items if i[0] == "event"]
+            log_paths = [i[1] for i in items if i[0] == "log_path"]
+            try:
+                with conn:
+                    if calls:
+                        conn.executemany(UPSERT_CALL, calls)
+                    if events:
+                        conn.executemany("INSERT INTO events (call_sid, ts, type, text) VALUES (?, ?, ?, ?)", events)
+                    if log_paths:
+                        conn.executemany("UPDATE calls SET log_path = ? WHERE call_sid = ?", log_paths)
+            except Exception as e:
+                logger.warning("Failed to write %s call(s)/%s event(s) to call store: %s", len(calls), len(events), e)
+            for i in items:
+                if i[0] == "flush":
+                    i[1].set()
+            if batch[-1] is _STOP:
+                conn.close()
+                return
+
+    # ---- reads ----
+    def list_calls(self, phone: Optional[str] = None, status: Optional[str] = None,
+                   since: Optional[str] = None, until: Optional[str] = None,
+                   cursor: Optional[str] = None, limit: int = 50) -> tuple[list[dict], Optional[str]]:
+        """Calls newest first; returns (page, next_cursor)."""
+        where, args = [], []
+        if status:
+            where.append("status = ?")
+            args.append(status)
+        if since:
+            where.append("started_at >= ?")
+            args.append(since)
+        if until:
+            where.append("started_at < ?")
+            args.append(until)
+        if cursor:
+            started_at, call_sid = decode_cursor(cursor, str, str)
+            where.append("(started_at, call_sid) < (?, ?)")
+            args += [started_at, call_sid]
+        order = " ORDER BY started_at DESC, call_sid DESC LIMIT ?"
+        if phone:
+            # One index-ordered scan per column, merged; an OR filter would sort every match
+            parts, part_args = [], []
+            for column in ("from_number", "to_number"):
+                clause = " AND ".join([f"{column} = ?"] + where)
+                parts.append(f"SELECT * FROM (SELECT * FROM calls WHERE {clause}{order})")
+                part_args += [phone] + args + [limit + 1]
+            sql = " UNION ".join(parts) + order
+            params = part_args + [limit + 1]
+        else:
+            sql = "SELECT * FROM calls" + (" WHERE " + " AND ".join(where) if where else "") + order
+            params = args + [limit + 1]
+        rows = [dict(r) for r in self._reader().execute(sql, params)]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1]["started_at"], rows[-1]["call_sid"]])
+        return rows, next_cursor
+
+    def list_events(self, call_sid: Optional[str] = None, event_type: Optional[str] = None,
+                    since: Optional[str] = None, until: Optional[str] = None,
+                    cursor: Optional[str] = None, limit: int = 200) -> tuple[list[dict], Optional[str]]:
+        """Events oldest first; returns (page, next_cursor)."""
+        where, args = [], []
+        if call_sid:
+            where.append("call_sid = ?")
+            args.append(call_sid)
+        if event_type:
+            where.append("type = ?")
+            args.append(event_type.upper())
+        if since:
+            where.append("ts >= ?")
+            args.append(since)
+        if until:
+            where.append("ts < ?")
+            args.append(until)
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            where.append("id > ?")
+            args.append(last_id)
+        sql = "SELECT id, call_sid, ts, type, text FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id LIMIT ?"
+        rows = [dict(r) for r in self._reader().execute(sql, args + [limit + 1])]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1]["id"]])
+        return rows, next_cursor
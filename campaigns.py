@@ -0,0 +1,410 @@
+"""Bulk outbound dialing campaigns.
+
+A campaign is an uploaded lead list dialed by one asyncio task. Every dial goes through
+a token bucket shared by all campaigns (calls per second for the whole account), and a
+campaign keeps at most `max_concurrent` calls live. A slot is freed when the call's
+status callback reports a terminal status, or after `live_timeout_seconds` if that
+callback never arrives. Busy and no-answer outcomes (and failed dial requests) are
+retried with exponential backoff up to `max_attempts`.
+
+Campaigns, the bucket and the live-call slots are held in memory by one worker: with a
+shared `store` (see state_store) the scheduler only runs on the worker holding the
+"leader" lease, and the others refuse to create campaigns (NotLeaderError). A status
+callback that lands on another worker is written to the store under the call SID, and
+the leader picks it up within a second to free the slot.
+
+`dial(to_number, language_pref, project)` is a blocking callable returning an object with
+a `sid` (a Twilio call), or None on failure; it runs in a worker thread. `project` is the
+lead's project key or campaign code (see tenants), or None for the default project.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from state_store import StateStore
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {"busy", "no-answer", "dial-error"}
+TERMINAL_STATUSES = {"completed", "failed", "busy", "no-answer", "canceled"}
+PHONE_COLUMNS = ("to_number", "phone", "number", "to", "mobile")
+LEADER_KEY = "leader"
+
+
+class NotLeaderError(RuntimeError):
+    """Campaigns are scheduled by another worker."""
+
+
+@dataclass
+class Lead:
+    to_number: str
+    name: Optional[str] = None
+    language_pref: str = "both"
+    project: Optional[str] = None
+    # pending | dialing | live | retry | completed | busy | no-answer | failed | canceled | dial-error | timeout
+    status: str = "pending"
+    attempts: int = 0
+    call_sid: Optional[str] = None
+    next_attempt_at: float = 0.0
+    # Wall-clock time of the latest dial attempt
+    dialed_at: float = 0.0
+
+
+def parse_leads(data: bytes, filename: str = "", content_type: str = "", language_pref: str = "both",
+                project: Optional[str] = None) -> list[Lead]:
+    """Parse a CSV (with a phone/to_number column, or one number per line) or JSON lead list.
+
+    A `project` (or `campaign`) column overrides the `project` given for the whole list.
+
+    JSON may be a list of numbers, a list of objects, or {"leads": [...]}. Duplicate and
+    blank numbers are dropped. Raises ValueError if the list is malformed or has no leads.
+    """
+    text = data.decode("utf-8-sig")
+    stripped = text.lstrip()
+    if filename.lower().endswith(".json") or "json" in (content_type or "") or stripped[:1] in ("[", "{"):
+        payload = json.loads(text)
+        rows = payload.get("leads") if isinstance(payload, dict) else payload
+        if not isinstance(rows, list):
+            raise ValueError('JSON leads must be a list or {"leads": [...]}')
+        if any(not isinstance(r, (dict, str, int)) or isinstance(r, bool) for r in rows):
+            raise ValueError("each JSON lead must be a phone number or an object")
+        rows = [r if isinstance(r, dict) else {"to_number": str(r)} for r in rows]
+    else:
+        reader = csv.reader(io.StringIO(text))
+        lines = [r for r in reader if r and any(c.strip() for c in r)]
+        header = [c.strip().lower() for c in lines[0]] if lines else []
+        if any(c in PHONE_COLUMNS for c in header):
+            rows = [dict(zip(header, r)) for r in lines[1:]]
+        else:
+            rows = [{"to_number": r[0]} for r in lines]
+
+    leads, seen = [], set()
+    for row in rows:
+        row = {str(k).strip().lower(): v for k, v in row.items()}
+        number = next((str(row[c]).strip() for c in PHONE_COLUMNS if row.get(c)), "")
+        if not number or number in seen:
+            continue
+        seen.add(number)
+        leads.append(Lead(
+            to_number=number,
+            name=(str(row["name"]).strip() or None) if row.get("name") else None,
+            language_pref=str(row.get("language_pref") or language_pref),
+            project=str(row.get("project") or row.get("campaign") or "").strip() or project,
+        ))
+    if not leads:
+        raise ValueError("no leads found (expected a phone/to_number column or one number per line)")
+    return leads
+
+
+class TokenBucket:
+    """Async rate limiter: `rate` acquisitions per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Campaign:
+    def __init__(self, leads: list[Lead], max_concurrent: int, max_attempts: int, retry_backoff_seconds: float):
+        self.campaign_id = uuid.uuid4().hex[:12]
+        self.leads = leads
+        self.max_concurrent = max_concurrent
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.state = "running"  # running | completed | canceled
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.live = 0
+        self._next = 0  # leads before this index have been dialed at least once
+        self._retries: list[Lead] = []
+        self.wake = asyncio.Event()
+
+    def summary(self, include_leads: bool = False) -> dict[str, Any]:
+        counts: dict[str, int] = {}
+        for lead in self.leads:
+            counts[lead.status] = counts.get(lead.status, 0) + 1
+        summary = {
+            "campaign_id": self.campaign_id,
+            "state": self.state,
+            "total": len(self.leads),
+            "live": self.live,
+            "attempts": sum(lead.attempts for lead in self.leads),
+            "counts": counts,
+            "max_concurrent": self.max_concurrent,
+            "max_attempts": self.max_attempts,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if include_leads:
+            summary["leads"] = [vars(lead).copy() for lead in self.leads]
+        return summary
+
+    def next_due(self, now: float) -> tuple[Optional[Lead], Optional[float]]:
+        """Return (lead ready to dial, or None; seconds until the next retry is due)."""
+        while self._next < len(self.leads) and self.leads[self._next].status != "pending":
+            self._next += 1
+        if self._next < len(self.leads):
+            lead = self.leads[self._next]
+            self._next += 1
+            return lead, None
+        if not self._retries:
+            return None, None
+        lead = min(self._retries, key=lambda r: r.next_attempt_at)
+        if lead.next_attempt_at <= now:
+            self._retries.remove(lead)
+            return lead, None
+        return None, lead.next_attempt_at - now
+
+    def finished(self) -> bool:
+        return self._next >= len(self.leads) and not self._retries and self.live == 0
+
+
+class CampaignScheduler:
+    def __init__(self, dial: Callable[[str, str, Optional[str]], Any], calls_per_second: float = 1.0, max_concurrent: int = 5,
+                 max_attempts: int = 3, retry_backoff_seconds: float = 300, live_timeout_seconds: float = 1800,
+                 keep_finished: int = 50, store: Optional[StateStore] = None, worker_id: Optional[str] = None,
+                 lease_seconds: float = 30):
+        self.dial = dial
+        self.bucket = TokenBucket(calls_per_second)
+        self.max_concurrent = max_concurrent
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.live_timeout_seconds = live_timeout_seconds
+        self.keep_finished = keep_finished
+        self._campaigns: OrderedDict[str, Campaign] = OrderedDict()
+        self._tasks: dict[str, asyncio.Task] = {}
+        # Live calls: (campaign, lead, time.monotonic() at dial) by call SID
+        self._by_sid: dict[str, tuple[Campaign, Lead, float]] = {}
+        self.store = store
+        self.worker_id = worker_id or uuid.uuid4().hex
+        self.lease_seconds = lease_seconds
+        self.is_leader = store is None
+        self._lease_task: Optional[asyncio.Task] = None
+
+    async def claim_leadership(self) -> bool:
+        """Take or renew the scheduling lease; False while another worker holds it."""
+        if self.store is None:
+            return True
+        now = time.time()
+
+        def claim(lease: dict) -> bool:
+            if lease.get("worker") not in (None, self.worker_id) and lease.get("expires", 0) > now:
+                return False
+            lease.update(worker=self.worker_id, expires=now + self.lease_seconds)
+            return True
+        was_leader, self.is_leader = self.is_leader, bool(await self.store.aupdate(LEADER_KEY, claim, default={}))
+        if self.is_leader != was_leader:
+            logger.info("Campaign scheduling lease %s by worker %s", "taken" if self.is_leader else "lost",
+                        self.worker_id)
+        return self.is_leader
+
+    async def start(self):
+        """Keep renewing the lease, so another worker takes over if this one dies."""
+        if self.store is not None and self._lease_task is None:
+            self._lease_task = asyncio.create_task(self._keep_lease())
+
+    async def _keep_lease(self):
+        while True:
+            try:
+                await self.claim_leadership()
+            except Exception as e:
+                logger.warning("Campaign lease renewal failed: %s", e)
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    def create(self, leads: list[Lead], max_concurrent: Optional[int] = None, max_attempts: Optional[int] = None,
+               retry_backoff_seconds: Optional[float] = None) -> Campaign:
+        """Register a campaign and start dialing it on the running event loop.
+
+        Raises NotLeaderError on a worker that does not hold the scheduling lease.
+        """
+        if not self.is_leader:
+            raise NotLeaderError("campaigns are scheduled by another worker")
+        campaign = Campaign(
+            leads,
+            max_concurrent=max_concurrent or self.max_concurrent,
+            max_attempts=max_attempts or self.max_attempts,
+            retry_backoff_seconds=self.retry_backoff_seconds if retry_backoff_seconds is None else retry_backoff_seconds,
+        )
+        self._campaigns[campaign.campaign_id] = campaign
+        self._tasks[campaign.campaign_id] = asyncio.create_task(self._run(campaign))
+        self._prune()
+        logger.info("Campaign %s started with %s lead(s)", campaign.campaign_id, len(leads))
+        return campaign
+
+    def get(self, campaign_id: str) -> Optional[Campaign]:
+        return self._campaigns.get(campaign_id)
+
+    def list(self) -> list[Campaign]:
+        return list(self._campaigns.values())
+
+    def cancel(self, campaign_id: str) -> bool:
+        """Stop dialing new leads; calls already live are left to finish."""
+        campaign = self._campaigns.get(campaign_id)
+        if campaign is None or campaign.state != "running":
+            return False
+        campaign.state = "canceled"
+        campaign.finished_at = time.time()
+        for lead in campaign.leads:
+            if lead.status in ("pending", "retry"):
+                lead.status = "canceled"
+        campaign.wake.set()
+        return True
+
+    async def on_status(self, call_sid: Optional[str], status: Optional[str]) -> bool:
+        """Feed a Twilio status callback; returns True if the call belongs to a campaign.
+
+        A terminal status for a call dialed by the leader on another worker is handed over
+        through the store.
+        """
+        if not call_sid:
+            return False
+        entry = self._by_sid.get(call_sid)
+        if entry is None:
+            if self.store is None or status not in TERMINAL_STATUSES:
+                return False
+
+            def hand_over(record: dict) -> bool:
+                record["status"] = status
+                return True
+            return bool(await self.store.aupdate(_call_key(call_sid), hand_over))
+        if status in TERMINAL_STATUSES:
+            del self._by_sid[call_sid]
+            self._finish(entry[0], entry[1], status)
+            if self.store is not None:
+                await self.store.adelete(_call_key(call_sid))
+        return True
+
+    async def stop(self):
+        tasks = list(self._tasks.values()) + ([self._lease_task] if self._lease_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._lease_task = None
+        if self.store is not None and self.is_leader:
+            # Let another worker take over at once rather than after the lease expires
+            def release(lease: dict):
+                if lease.get("worker") == self.worker_id:
+                    lease["expires"] = 0
+            try:
+                await self.store.aupdate(LEADER_KEY, release)
+            except Exception as e:
+                logger.warning("Campaign lease release failed: %s", e)
+            self.is_leader = False
+
+    async def _run(self, campaign: Campaign):
+        try:
+            while campaign.state == "running":
+                await self._check_live(campaign)
+                if campaign.finished():
+                    campaign.state = "completed"
+                    campaign.finished_at = time.time()
+                    logger.info("Campaign %s completed: %s", campaign.campaign_id, campaign.summary()["counts"])
+                    break
+                wait = 1.0
+                if campaign.live < campaign.max_concurrent:
+                    lead, retry_in = campaign.next_due(time.time())
+                    if lead is not None:
+                        await self.bucket.acquire()
+                        if campaign.state != "running":
+                            lead.status = "canceled"
+                            break
+                        lead.status = "dialing"
+                        lead.attempts += 1
+                        lead.dialed_at = time.time()
+                        campaign.live += 1
+                        asyncio.create_task(self._dial(campaign, lead, time.monotonic()))
+                        continue
+                    if retry_in is not None:
+                        wait = min(wait, retry_in)
+                campaign.wake.clear()
+                try:
+                    await asyncio.wait_for(campaign.wake.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._tasks.pop(campaign.campaign_id, None)
+
+    async def _dial(self, campaign: Campaign, lead: Lead, started: float):
+        try:
+            call = await asyncio.to_thread(self.dial, lead.to_number, lead.language_pref, lead.project)
+        except Exception as e:
+            logger.warning("Campaign %s dial to %s failed: %s", campaign.campaign_id, lead.to_number, e)
+            call = None
+        if call is None:
+            self._finish(campaign, lead, "dial-error")
+            return
+        lead.call_sid = str(call.sid)
+        lead.status = "live"
+        self._by_sid[lead.call_sid] = (campaign, lead, started)
+        if self.store is not None:
+            try:
+                await self.store.aset(_call_key(lead.call_sid), {"campaign": campaign.campaign_id, "status": None})
+            except Exception as e:
+                # Callbacks on other workers go unseen; the live timeout still frees the slot
+                logger.warning("Campaign %s could not share call %s: %s", campaign.campaign_id, lead.call_sid, e)
+
+    def _finish(self, campaign: Campaign, lead: Lead, status: str):
+        campaign.live = max(0, campaign.live - 1)
+        if status in RETRY_STATUSES and lead.attempts < campaign.max_attempts and campaign.state == "running":
+            lead.status = "retry"
+            lead.next_attempt_at = time.time() + campaign.retry_backoff_seconds * 2 ** (lead.attempts - 1)
+            campaign._retries.append(lead)
+        else:
+            lead.status = status
+        campaign.wake.set()
+
+    async def _check_live(self, campaign: Campaign):
+        """Free slots of calls that ended on another worker or whose status never arrived."""
+        deadline = time.monotonic() - self.live_timeout_seconds
+        for sid, (owner, lead, started) in list(self._by_sid.items()):
+            if owner is not campaign:
+                continue
+            status = None
+            if self.store is not None:
+                try:
+                    status = ((await self.store.aget(_call_key(sid))) or {}).get("status")
+                except Exception as e:
+                    logger.warning("Campaign %s could not read call %s: %s", campaign.campaign_id, sid, e)
+            if status is None and started >= deadline:
+                continue
+            if sid not in self._by_sid:
+                continue  # the callback arrived here while the store was read
+            # Ended elsewhere, or the terminal status callback never arrived
+            del self._by_sid[sid]
+            self._finish(campaign, lead, status or "timeout")
+            if self.store is not None:
+                try:
+                    await self.store.adelete(_call_key(sid))
+                except Exception as e:
+                    logger.warning("Campaign %s could not drop call %s: %s", campaign.campaign_id, sid, e)
+
+    def _prune(self):
+        finished = [cid for cid, c in self._campaigns.items() if c.state != "running"]
+        for cid in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._campaigns[cid]
+
+
+def _call_key(call_sid: str) -> str:
+    return f"call:{call_sid}"
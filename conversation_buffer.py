@@ -0,0 +1,86 @@
+"""Fixed-capacity, array-backed ring buffer for the in-memory conversation log.
+
+Every entry gets a monotonically increasing sequence number. Entry `seq` lives in slot
+`seq % capacity`, so resuming from a cursor is O(1) and a page costs O(page size) no
+matter how long the process has been running. The oldest entries are overwritten once
+the buffer is full.
+"""
+import threading
+from datetime import datetime
+from typing import Iterator, Optional
+
+
+class ConversationRecord:
+    __slots__ = ("seq", "timestamp", "speaker", "text", "call_sid")
+
+    def __init__(self, seq: int, timestamp: str, speaker: str, text: str, call_sid: Optional[str]):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.speaker = speaker
+        self.text = text
+        self.call_sid = call_sid
+
+    def as_dict(self) -> dict:
+        return {"seq": self.seq, "timestamp": self.timestamp, "speaker": self.speaker,
+                "text": self.text, "call_sid": self.call_sid}
+
+
+class ConversationBuffer:
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        self._slots: list[Optional[ConversationRecord]] = [None] * capacity
+        self._next_seq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self._next_seq, self.capacity)
+
+    @property
+    def first_seq(self) -> int:
+        return max(0, self._next_seq - self.capacity)
+
+    def append(self, speaker: str, text: str, call_sid: Optional[str] = None) -> int:
+        with self._lock:
+            seq = self._next_seq
+            self._slots[seq % self.capacity] = ConversationRecord(
+                seq, datetime.utcnow().isoformat(), speaker, text, call_sid
+            )
+            self._next_seq = seq + 1
+            return seq
+
+    def page(self, cursor: Optional[int] = None, limit: int = 100, call_sid: Optional[str] = None,
+             speaker: Optional[str] = None, max_scan: Optional[int] = None) -> tuple[list[ConversationRecord], Optional[int]]:
+        """Entries after `cursor` (oldest first) matching the filters.
+
+        Returns (entries, next_cursor); next_cursor is the last seq examined and can be
+        passed back to continue (or to poll for new entries). At most `max_scan` entries
+        (default 20 x limit) are examined, so filtered polls stay bounded too. Cursors
+        older than the buffer resume from the oldest retained entry.
+        """
+        out: list[ConversationRecord] = []
+        with self._lock:
+            seq = self.first_seq if cursor is None else max(cursor + 1, self.first_seq)
+            end = min(self._next_seq, seq + (max_scan or limit * 20))
+            while seq < end and len(out) < limit:
+                record = self._slots[seq % self.capacity]
+                seq += 1
+                if record is None:
+                    continue
+                if call_sid is not None and record.call_sid != call_sid:
+                    continue
+                if speaker is not None and record.speaker != speaker:
+                    continue
+                out.append(record)
+        next_cursor = seq - 1 if seq > 0 else cursor
+        return out, next_cursor
+
+    def iter(self, cursor: Optional[int] = None, call_sid: Optional[str] = None,
+             speaker: Optional[str] = None, chunk: int = 500) -> Iterator[ConversationRecord]:
+        """Iterate matching entries after `cursor` up to the current end, one locked chunk at a time."""
+        last = self._next_seq - 1
+        while cursor is None or cursor < last:
+            records, next_cursor = self.page(cursor, chunk, call_sid, speaker)
+            yield from records
+            if next_cursor is None or next_cursor == cursor:
+                return
+            cursor = next_cursor
@@ -0,0 +1,57 @@
+"""Per-call conversation memory kept under a character budget.
+
+Recent turns are kept verbatim in the call's state; older turns are folded into a compact
+running summary, so the request sent to Gemini stays roughly the same size however long
+the call runs. State is plain JSON-friendly data (lists and strings).
+"""
+from typing import Optional
+
+ROLE_LABELS = {"user": "Caller", "model": "Agent"}
+SNIPPET_CHARS = 120
+
+
+def remember_turn(state: dict, role: str, text: str, budget: int = 2400, summary_budget: int = 600):
+    """Append a turn ("user" or "model") and roll the oldest turns into the summary when over budget."""
+    history: list = state.setdefault("history", [])
+    history.append([role, text])
+    used = sum(len(t) for _, t in history)
+    # Always keep the latest exchange verbatim
+    while used > budget and len(history) > 2:
+        old_role, old_text = history.pop(0)
+        used -= len(old_text)
+        _summarize(state, old_role, old_text, summary_budget)
+
+
+def _summarize(state: dict, role: str, text: str, summary_budget: int):
+    snippet = " ".join(text.split())
+    if len(snippet) > SNIPPET_CHARS:
+        snippet = snippet[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+    summary = f"{state.get('summary') or ''} {ROLE_LABELS.get(role, role)}: {snippet}".strip()
+    if len(summary) > summary_budget:
+        # Drop the oldest summarized lines first
+        cut = summary.find(" Caller: ", len(summary) - summary_budget)
+        summary = summary[cut + 1:] if cut != -1 else summary[-summary_budget:]
+    state["summary"] = summary
+
+
+def has_context(state: Optional[dict]) -> bool:
+    """True once the call has turns (or a summary) that a reply could depend on."""
+    return bool(state and (state.get("history") or state.get("summary")))
+
+
+def history_contents(state: Optional[dict]) -> list[dict]:
+    """Verbatim recent turns in Gemini `contents` format."""
+    if not state:
+        return []
+    return [{"role": role, "parts": [text]} for role, text in state.get("history", [])]
+
+
+def framed_utterance(state: Optional[dict], utterance: str) -> str:
+    """The caller's latest utterance, prefixed with their name and the running summary."""
+    lines = []
+    if state and state.get("name"):
+        lines.append(f"Caller name: {state['name']}")
+    if state and state.get("summary"):
+        lines.append(f"Earlier in this call: {state['summary']}")
+    lines.append(f"Caller said: {utterance}")
+    return "\n".join(lines)
@@ -0,0 +1,52 @@
+"""Shared keep-alive HTTP transport for outbound requests.
+
+The Twilio REST client and the recording downloader send through one requests.Session
+whose adapter keeps a pool of persistent connections per host. Dialing and recording
+fetches both go to api.twilio.com, so after warm-up they reuse open TLS connections
+instead of paying a TCP and TLS handshake per request. Both callers run their blocking
+requests in worker threads; size the pool for that concurrency.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+
+class HttpTransport:
+    """A pooled session plus (connect, read) timeouts, shared by every outbound HTTP client."""
+
+    def __init__(self, pool_size: int = 20, pool_hosts: int = 4, connect_timeout: float = 5.0,
+                 read_timeout: float = 30.0, pool_block: bool = False, max_retries: int = 0):
+        self.pool_size = pool_size
+        self.timeout: tuple[float, float] = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        # pool_block=False opens extra short-lived connections past pool_size instead of waiting for one
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size,
+                                   pool_block=pool_block, max_retries=max_retries)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def twilio_http_client(self):
+        """A TwilioHttpClient that sends through this session with its (connect, read) timeouts."""
+        from twilio.http.http_client import TwilioHttpClient  # imported with the Twilio client, not this module
+
+        # The constructor only accepts a single positive timeout; the pair is set afterwards
+        client = TwilioHttpClient(pool_connections=False, timeout=self.timeout[1])
+        client.session = self.session
+        client.timeout = self.timeout  # type: ignore[assignment]
+        return client
+
+    def stats(self) -> dict:
+        """Connections opened vs requests sent over the live per-host pools."""
+        manager = self.adapter.poolmanager
+        pools = [manager.pools[key] for key in manager.pools.keys()]
+        opened = sum(p.num_connections for p in pools)
+        sent = sum(p.num_requests for p in pools)
+        return {
+            "hosts": len(pools),
+            "pool_size": self.pool_size,
+            "connections_opened": opened,
+            "requests": sent,
+            "reuse_ratio": round(1 - opened / sent, 4) if sent else 0.0,
+        }
+
+    def close(self):
+        self.session.close()
+
@@ -0,0 +1,279 @@
+"""Local intent fast path: answers predictable caller questions without calling Gemini.
+
+Phrases for every intent (English, Hinglish and Devanagari) are compiled once into a
+single Aho-Corasick automaton, so classifying an utterance is one pass over its text
+regardless of how many phrases are configured.
+"""
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+WHITESPACE = re.compile(r"\s+")
+
+# Intent name -> trigger phrases (matched case-insensitively)
+INTENT_PHRASES: dict[str, list[str]] = {
+    "end": [
+        "goodbye", "bye", "end call", "hang up", "thank you bye", "that's all", "stop",
+        "अलविदा", "फोन रखो", "कॉल बंद",
+    ],
+    "price": [
+        "price", "cost", "rate", "how much", "kitne ka", "kitna hai", "kya rate", "daam",
+        "कीमत", "दाम", "रेट", "कितने का", "कितना है", "प्राइस",
+    ],
+    "configuration": [
+        "configuration", "bhk", "1 bhk", "2 bhk", "3 bhk", "4 bhk", "bedroom", "unit types", "flat size",
+        # Callers mostly type the size without a space, which the word-boundary check would reject
+        "1bhk", "2bhk", "3bhk", "4bhk",
+        "बीएचके", "कमरे", "बेडरूम",
+    ],
+    "location": [
+        "location", "where is", "where exactly", "address", "kahan hai", "kaha hai",
+        # Bare "पता" is also "know" ("मुझे नहीं पता"); only asking for the address counts
+        "कहाँ", "कहां", "लोकेशन", "पता क्या", "पता बता", "एड्रेस",
+    ],
+    "loan": [
+        "loan", "emi", "finance", "financing", "bank", "mortgage",
+        "लोन", "ऋण", "ईएमआई", "बैंक",
+    ],
+    "site_visit": [
+        "site visit", "visit", "visiting the site", "visiting the project", "sample flat", "show flat",
+        "see the flat", "see the property", "dekhne",
+        "साइट विजिट", "विजिट", "विज़िट", "देखने", "दिखा",
+    ],
+}
+
+# Intents whose phrases keep plain substring semantics (e.g. "bye" inside "goodbye")
+SUBSTRING_INTENTS = {"end"}
+PLURAL_SUFFIXES = ("es", "s")
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher built once and reused for every utterance."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: list[str] = list(patterns)
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+        for idx, pattern in enumerate(self.patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(idx)
+        # Breadth-first construction of failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, int]]:
+        """Yield (start index, pattern index) for every pattern occurrence in text."""
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx in out[node]:
+                yield i - len(self.patterns[idx]) + 1, idx
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    intent: str
+    phrase: str
+    answer: Optional[str] = None
+
+
+@dataclass
+class IntentCounters:
+    """Hit/miss counters, shared by the engines that replace each other when a project reloads."""
+    hits: dict[str, int] = field(default_factory=dict)
+    misses: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class IntentEngine:
+    """Classifies caller utterances and answers templated intents from project config."""
+
+    def __init__(self, answers: dict[str, dict[str, str]], phrases: Optional[dict[str, list[str]]] = None,
+                 max_words: int = 14):
+        phrases = phrases or INTENT_PHRASES
+        self.answers = answers
+        self.max_words = max_words
+        self._intents: list[str] = []
+        keys: list[str] = []
+        for intent, items in phrases.items():
+            for phrase in items:
+                keys.append(_normalize(phrase))
+                self._intents.append(intent)
+        self._matcher = AhoCorasick(keys)
+        self._counters = IntentCounters()
+
+    def share_stats(self, other: "IntentEngine"):
+        """Count this engine's turns together with `other`'s, e.g. the engine it replaces on a reload."""
+        self._counters = other._counters
+
+    def classify(self, text: str) -> list[IntentMatch]:
+        """Return the distinct intents found in text, in order of first occurrence."""
+        norm = _normalize(text)
+        found: dict[str, IntentMatch] = {}
+        for start, idx in self._matcher.iter_matches(norm):
+            intent = self._intents[idx]
+            if intent in found:
+                continue
+            phrase = self._matcher.patterns[idx]
+            if intent not in SUBSTRING_INTENTS and phrase.isascii() and not _whole_word(norm, start, len(phrase)):
+                continue
+            found[intent] = IntentMatch(intent, phrase)
+        return list(found.values())
+
+    def is_end_of_call(self, text: str) -> bool:
+        return any(m.intent == "end" for m in self.classify(text))
+
+    def respond(self, text: str) -> Optional[IntentMatch]:
+        """Return a templated answer when the utterance is a single, known question.
+
+        Compound or long, open-ended utterances return None and should go to the LLM.
+        """
+        matches = [m for m in self.classify(text) if m.intent != "end"]
+        answer = None
+        if len(matches) == 1 and len(text.split()) <= self.max_words:
+            lang = "hi" if DEVANAGARI.search(text) else "en"
+            answer = self.answers.get(matches[0].intent, {}).get(lang)
+        counters = self._counters
+        with counters.lock:
+            if answer:
+                counters.hits[matches[0].intent] = counters.hits.get(matches[0].intent, 0) + 1
+            else:
+                counters.misses += 1
+        return IntentMatch(matches[0].intent, matches[0].phrase, answer) if answer else None
+
+    def degraded_answer(self, text: str) -> str:
+        """Best local answer when the LLM is unavailable.
+
+        Unlike `respond`, any recognised intent is answered, even in a long or compound
+        utterance; otherwise a templated overview of what we can help with.
+        """
+        lang = "hi" if DEVANAGARI.search(text) else "en"
+        for match in self.classify(text):
+            answer = self.answers.get(match.intent, {}).get(lang)
+            if answer:
+                return answer
+        return self.answers["overview"][lang]
+
+    def stats(self) -> dict:
+        counters = self._counters
+        with counters.lock:
+            hits = sum(counters.hits.values())
+            total = hits + counters.misses
+            return {
+                "turns": total,
+                "hits": hits,
+                "misses": counters.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "hits_by_intent": dict(counters.hits),
+            }
+
+
+def combined_stats(engines: Iterable[IntentEngine]) -> dict:
+    """`stats()` summed over several engines (one per project)."""
+    hits_by_intent: dict[str, int] = {}
+    hits = misses = 0
+    for engine in engines:
+        stats = engine.stats()
+        hits += stats["hits"]
+        misses += stats["misses"]
+        for intent, n in stats["hits_by_intent"].items():
+            hits_by_intent[intent] = hits_by_intent.get(intent, 0) + n
+    total = hits + misses
+    return {
+        "turns": total,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+        "hits_by_intent": hits_by_intent,
+    }
+
+
+def _whole_word(text: str, start: int, length: int) -> bool:
+    """Whether text[start:start + length] is a whole word, or one with a plural ending.
+
+    "rate" should not fire on "separate", nor "cost" on "costume" or "visit" on "visitor";
+    "prices" and "site visits" still count. Devanagari phrases are not checked: suffixes
+    attach directly to the stem ("दिखा" in "दिखाइए").
+    """
+    if start > 0 and text[start - 1].isalnum():
+        return False
+    end = start + length
+    for suffix in PLURAL_SUFFIXES:
+        if text.startswith(suffix, end) and not text[end + len(suffix):end + len(suffix) + 1].isalnum():
+            return True
+    return end >= len(text) or not text[end].isalnum()
+
+
+def _normalize(text: str) -> str:
+    return WHITESPACE.sub(" ", text.casefold()).strip()
+
+
+def build_intent_engine(company: str, project: str, location: str, price: str, unit_types: str) -> IntentEngine:
+    """Build the engine with answers rendered from the current project configuration."""
+    where = f" in {location}" if location else ""
+    answers: dict[str, dict[str, str]] = {
+        "price": {
+            "en": f"Prices at {project} start from {price}, depending on the configuration and floor. "
+                  f"Which configuration are you considering—1BHK, 2BHK or 3BHK?",
+            "hi": f"{project} में कीमतें {price} से शुरू होती हैं, जो कॉन्फ़िगरेशन और फ़्लोर पर निर्भर करती हैं। "
+                  f"आप कौन सा कॉन्फ़िगरेशन देख रहे हैं—1BHK, 2BHK या 3BHK?",
+        },
+        "configuration": {
+            "en": f"{project} offers {unit_types} homes, with prices starting from {price}. "
+                  f"Which configuration suits your family best?",
+            "hi": f"{project} में {unit_types} घर उपलब्ध हैं, और कीमतें {price} से शुरू होती हैं। "
+                  f"आपके परिवार के लिए कौन सा कॉन्फ़िगरेशन सही रहेगा?",
+        },
+        "loan": {
+            "en": "Our team can guide you through home-loan options and the documents you need. "
+                  "Would you be looking at financing for your purchase?",
+            "hi": "हमारी टीम होम-लोन के विकल्पों और ज़रूरी दस्तावेज़ों में आपकी मदद कर सकती है। "
+                  "क्या आप खरीद के लिए लोन लेना चाहेंगे?",
+        },
+        "site_visit": {
+            "en": f"We'd be happy to arrange a site visit to {project}{where}. "
+                  f"Which day works best for you—a weekday or the weekend?",
+            "hi": f"हम {project} की साइट विजिट ख़ुशी से करवा सकते हैं। "
+                  f"आपके लिए कौन सा दिन ठीक रहेगा—सप्ताह के दिन या वीकेंड?",
+        },
+    }
+    # Not an intent: spoken by degraded_answer when nothing in the utterance is recognised
+    answers["overview"] = {
+        "en": f"I can tell you about prices from {price}, our {unit_types} homes at {project}, home loans, "
+              f"or arrange a site visit. Which would you like to know about?",
+        "hi": f"मैं आपको {price} से शुरू होने वाली कीमतों, {project} के {unit_types} घरों, होम लोन "
+              f"या साइट विजिट के बारे में बता सकता हूँ। आप किस बारे में जानना चाहेंगे?",
+    }
+    if location:
+        # Without a configured location there is nothing reliable to say; let the LLM handle it
+        answers["location"] = {
+            "en": f"{project} by {company} is located in {location}. "
+                  f"Where do you currently work, so I can tell you about the commute?",
+            "hi": f"{company} का {project} {location} में स्थित है। "
+                  f"आप अभी कहाँ काम करते हैं, ताकि मैं आने-जाने के बारे में बता सकूँ?",
+        }
+    return IntentEngine(answers)
@@ -0,0 +1,402 @@
+"""Batch lead-qualification analytics over per-call logs.
+
+Every call log (`call_logs/call_<date>_<time>_<sid>.log`, or `.log.gz` once compressed)
+is stream-parsed line by line in a pool of worker processes. Local rules pull the
+qualification fields out of the caller's USER turns: unit preference, budget range,
+timeline, financing and site-visit intent. The rows go to one columnar summary file:
+Parquet when pyarrow is installed, CSV otherwise. A state file next to the summary
+records each parsed log's size and mtime. Re-runs only parse new or changed logs,
+which includes live calls still being written and logs that were compressed since.
+
+    python lead_analytics.py --logs call_logs --output analytics/leads.parquet
+"""
+import argparse
+import csv
+import gzip
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+LOG_NAME = re.compile(r"^call_(\d{8})_(\d{6})_(.+?)\.log(\.gz)?$")
+LINE = re.compile(r"^\[([^\]]+)\] (\S+)(?: (.*))?$")
+
+# ---- Qualification rules (matched against lower-cased caller speech) ----
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "twelve": 12,
+    "ek": 1, "do": 2, "teen": 3, "char": 4, "एक": 1, "दो": 2, "तीन": 3, "चार": 4, "छह": 6,
+}
+# Number words must end at a word boundary ("do" is not "done"); digits may run into a unit ("2bhk", "50l")
+_NUM = r"(?<![\w.])(\d+(?:\.\d+)?|(?:" + "|".join(NUMBER_WORDS) + r")(?!\w))"
+UNIT = re.compile(_NUM + r"\s*-?\s*(?:bhk|b\.h\.k|bed\s?rooms?|बीएचके|बेडरूम)")
+# Amounts in lakhs; crores are converted
+_AMOUNT_UNIT = r"(lakhs?|lacs?|l\b|crores?|cr\b|लाख|करोड़|करोड)"
+BUDGET_RANGE = re.compile(_NUM + r"\s*" + _AMOUNT_UNIT + r"?\s*(?:-|–|to|se|से|and)\s*" + _NUM + r"\s*" + _AMOUNT_UNIT)
+BUDGET_AMOUNT = re.compile(r"(?:(under|below|less than|up ?to|upto|within|max(?:imum)?|above|over|more than|"
+                           r"at least|min(?:imum)?)\s+)?(?:rs\.?\s*|₹\s*)?" + _NUM + r"\s*" + _AMOUNT_UNIT + r"(\s+(?:tak|तक))?")
+BUDGET_MAX_WORDS = {"under", "below", "less than", "up to", "upto", "within", "max", "maximum"}
+TIMELINE_IMMEDIATE = re.compile(r"\b(?:immediately|asap|as soon as possible|right away|urgent(?:ly)?|ready to move|"
+                                r"this month)\b|तुरंत|जल्द")
+TIMELINE_PERIOD = re.compile(r"\b(?:in|within|next|after|in the next)\s+" + _NUM + r"\s+(months?|years?)\b|"
+                             + _NUM + r"\s+(mahine|mahino|saal|महीने|महीनों|साल)")
+TIMELINE_NEXT_YEAR = re.compile(r"\bnext year\b|अगले साल")
+TIMELINE_EXPLORING = re.compile(r"\b(?:just (?:looking|exploring|checking)|no hurry|not (?:now|urgent|in a hurry)|"
+                                r"someday|in future)\b")
+FINANCING_SELF = re.compile(r"\b(?:cash|self[- ]?funded|own funds?|full payment|no loan|without (?:a )?loan)\b")
+FINANCING_LOAN = re.compile(r"\b(?:home loan|loan|emi|finance|financing|mortgage|bank)\b|लोन|ईएमआई")
+VISIT = re.compile(r"\b(?:site visit|visit|come (?:and|to) see|see the (?:flat|property|site|project)|"
+                   r"book a visit)\b|dekhne|देखने|विजिट|विज़िट")
+NEGATION = re.compile(r"\b(?:no|not|don't|dont|never|nahi|nahin)\b|नहीं")
+# Hindi puts the negation after the noun: "loan nahi chahiye", "लोन की ज़रूरत नहीं"
+NEGATION_AFTER = re.compile(r"^(?:\s+\S+){0,3}?\s+(?:(?:nahi|nahin|not needed|not required)(?!\w)|नहीं)")
+CLAUSE_BREAK = re.compile(r"[.,;!?]|\bbut\b|\blekin\b|लेकिन")
+AFFIRMATIVE = re.compile(r"^\W*(?:yes|yeah|yep|sure|ok(?:ay)?|of course|definitely|haan|han|ji|हाँ|हां|जी|ठीक)\b")
+VISIT_WHEN = re.compile(r"\b(today|tomorrow|this weekend|weekend|saturday|sunday|monday|tuesday|wednesday|thursday|"
+                        r"friday|next week)\b|(कल|शनिवार|रविवार)")
+
+# Bumped when COLUMNS or the rules change so earlier results are parsed again
+STATE_VERSION = 3
+COLUMNS = [
+    ("call_sid", str), ("log_path", str), ("started_at", str), ("ended_at", str), ("complete", bool),
+    ("project", str), ("direction", str), ("to_number", str), ("status", str), ("caller_name", str),
+    ("user_turns", int), ("assistant_turns", int), ("intents", str),
+    ("unit_preference", str), ("budget_min_lakhs", float), ("budget_max_lakhs", float),
+    ("timeline", str), ("timeline_months", float), ("financing", str),
+    ("site_visit", bool), ("site_visit_when", str), ("lead_score", int), ("lead_tier", str),
+]
+
+
+def _number(token: str) -> float:
+    return float(NUMBER_WORDS.get(token, token))
+
+
+def _negated(text: str, match: re.Match) -> bool:
+    """Whether the clause holding `match` negates it ("I do not want a loan", "loan nahi chahiye")."""
+    before = CLAUSE_BREAK.split(text[:match.start()])[-1]
+    after = CLAUSE_BREAK.split(text[match.end():])[0]
+    return bool(NEGATION.search(before) or NEGATION_AFTER.search(after))
+
+
+def _lakhs(amount: str, unit: Optional[str]) -> float:
+    value = _number(amount)
+    return round(value * 100 if unit and unit.startswith(("cr", "करोड")) else value, 2)
+
+
+class LeadExtractor:
+    """Accumulates qualification fields over one call's caller turns."""
+
+    def __init__(self):
+        self.units: set[str] = set()
+        self.budget_min: Optional[float] = None
+        self.budget_max: Optional[float] = None
+        self.timeline: Optional[str] = None
+        self.timeline_months: Optional[float] = None
+        self.financing: Optional[str] = None
+        self.site_visit = False
+        self.site_visit_when: Optional[str] = None
+        self._visit_offered = False
+
+    def assistant(self, text: str):
+        # A bare "yes" only means something if the agent just offered a visit
+        self._visit_offered = bool(VISIT.search(text.lower()))
+
+    def user(self, text: str):
+        text = text.lower()
+        for m in UNIT.finditer(text):
+            self.units.add(f"{int(_number(m.group(1)))}BHK")
+        self._budget(text)
+        self._timeline(text)
+        loan = FINANCING_LOAN.search(text)
+        if FINANCING_SELF.search(text) or (loan and _negated(text, loan)):
+            self.financing = "self"
+        elif loan:
+            self.financing = "loan"
+        visit = VISIT.search(text)
+        if visit and not _negated(text, visit):
+            self.site_visit = True
+        elif self._visit_offered and AFFIRMATIVE.search(text):
+            self.site_visit = True
+        elif self._visit_offered and NEGATION.search(text):
+            self.site_visit = False
+        when = VISIT_WHEN.search(text)
+        if when and (visit or self._visit_offered):
+            self.site_visit_when = when.group(0)
+        self._visit_offered = False
+
+    def _budget(self, text: str):
+        found = BUDGET_RANGE.search(text)
+        if found:
+            low_unit = found.group(2) or found.group(4)
+            low, high = _lakhs(found.group(1), low_unit), _lakhs(found.group(3), found.group(4))
+            self.budget_min, self.budget_max = min(low, high), max(low, high)
+            return
+        found = BUDGET_AMOUNT.search(text)
+        if not found:
+            return
+        qualifier, amount = found.group(1), _lakhs(found.group(2), found.group(3))
+        if qualifier in BUDGET_MAX_WORDS or found.group(4):
+            self.budget_min, self.budget_max = None, amount
+        elif qualifier:
+            self.budget_min, self.budget_max = amount, None
+        else:
+            self.budget_min = self.budget_max = amount
+
+    def _timeline(self, text: str):
+        if TIMELINE_IMMEDIATE.search(text):
+            self.timeline, self.timeline_months = "immediate", 0.0
+            return
+        m = TIMELINE_PERIOD.search(text)
+        if m:
+            amount, unit = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+            months = _number(amount) * (12 if unit.startswith(("year", "saal", "साल")) else 1)
+            self.timeline, self.timeline_months = f"{months:g} months", months
+        elif TIMELINE_NEXT_YEAR.search(text):
+            self.timeline, self.timeline_months = "12 months", 12.0
+        elif TIMELINE_EXPLORING.search(text):
+            self.timeline, self.timeline_months = "exploring", None
+
+    def fields(self) -> dict:
+        score = (bool(self.units) + (self.budget_min is not None or self.budget_max is not None)
+                 + (self.timeline_months is not None and self.timeline_months <= 6)
+                 + (self.financing is not None) + 2 * self.site_visit)
+        return {
+            "unit_preference": ",".join(sorted(self.units)) or None,
+            "budget_min_lakhs": self.budget_min,
+            "budget_max_lakhs": self.budget_max,
+            "timeline": self.timeline,
+            "timeline_months": self.timeline_months,
+            "financing": self.financing,
+            "site_visit": self.site_visit,
+            "site_visit_when": self.site_visit_when,
+            "lead_score": score,
+            "lead_tier": "hot" if score >= 4 else "warm" if score >= 2 else "cold",
+        }
+
+
+def _lines(path: str) -> Iterator[str]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:  # type: ignore[operator]
+        for line in f:
+            yield line.rstrip("\n")
+
+
+def parse_call_log(path: str) -> Optional[dict]:
+    """One summary row for a call log, read as a stream; None if the name is not a call log."""
+    name = LOG_NAME.match(os.path.basename(path))
+    if not name:
+        return None
+    date, clock, call_sid = name.group(1), name.group(2), name.group(3)
+    row: dict = {
+        "call_sid": call_sid, "log_path": path, "complete": False, "direction": "inbound",
+        "started_at": f"{date[:4]}-{date[4:6]}-{date[6:]}T{clock[:2]}:{clock[2:4]}:{clock[4:]}",
+        "ended_at": None, "project": None, "to_number": None, "status": None, "caller_name": None,
+        "user_turns": 0, "assistant_turns": 0,
+    }
+    intents: set[str] = set()
+    lead = LeadExtractor()
+    for line in _lines(path):
+        m = LINE.match(line)
+        if not m:
+            continue
+        ts, kind, rest = m.group(1), m.group(2), m.group(3) or ""
+        if kind == "USER":
+            row["user_turns"] += 1
+            lead.user(rest)
+        elif kind == "ASSISTANT":
+            row["assistant_turns"] += 1
+            lead.assistant(rest)
+        elif kind == "PROJECT":
+            row["project"] = rest
+        elif kind == "NAME_CAPTURED":
+            row["caller_name"] = rest
+        elif kind == "INTENT":
+            intents.add(rest)
+        elif kind == "STATUS":
+            row["status"] = rest
+        elif kind == "OUTBOUND":
+            row["direction"] = "outbound"
+            to = re.search(r"\bto=(\S+)", rest)
+            row["to_number"] = to.group(1) if to else None
+        elif kind == "CALL" and rest.startswith("END"):
+            row["complete"] = True
+            row["ended_at"] = ts
+    row["intents"] = ",".join(sorted(intents)) or None
+    row.update(lead.fields())
+    return row
+
+
+def parse_batch(paths: list[str]) -> list[dict]:
+    """Worker entry point: rows for a batch of logs (unreadable logs are skipped)."""
+    rows = []
+    for path in paths:
+        try:
+            row = parse_call_log(path)
+        except (OSError, EOFError, UnicodeError) as e:
+            logger.warning("Skipping unreadable call log %s: %s", path, e)
+            continue
+        if row:
+            rows.append(row)
+    return rows
+
+
+def find_call_logs(directory: str) -> Iterator[tuple[str, int, int]]:
+    """(path, size, mtime_ns) of every call log in `directory`."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and LOG_NAME.match(entry.name):
+                st = entry.stat()
+                yield entry.path, st.st_size, st.st_mtime_ns
+
+
+def _batches(items: list[str], size: int) -> Iterator[list[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def default_output() -> str:
+    try:
+        import pyarrow  # noqa: F401  # type: ignore
+    except ImportError:
+        return os.path.join("analytics", "leads.csv")
+    return os.path.join("analytics", "leads.parquet")
+
+
+def write_summary(rows: Iterable[dict], output: str):
+    """Write rows atomically as Parquet (needs pyarrow) or CSV, chosen by the file extension."""
+    rows = list(rows)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    tmp = output + ".tmp"
+    if output.endswith(".parquet"):
+        try:
+            import pyarrow as pa  # type: ignore
+            import pyarrow.parquet as pq  # type: ignore
+        except ImportError as e:
+            raise RuntimeError("Parquet output requires the 'pyarrow' package (pip install pyarrow); "
+                               "use a .csv output instead") from e
+        types = {str: pa.string(), bool: pa.bool_(), int: pa.int64(), float: pa.float64()}
+        schema = pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+        table = pa.Table.from_pylist(rows, schema=schema)
+        pq.write_table(table, tmp, compression="zstd")
+    else:
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=[name for name, _kind in COLUMNS], extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+    os.replace(tmp, output)
+
+
+def _load_state(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") == STATE_VERSION:
+            return state
+    except (OSError, ValueError):
+        pass
+    return {"version": STATE_VERSION, "files": {}, "rows": {}}
+
+
+def _save_state(path: str, state: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def run_analytics(logs_dir: str = "call_logs", output: Optional[str] = None, workers: Optional[int] = None,
+                  full: bool = False, batch_size: int = 200) -> dict:
+    """Parse new or changed call logs in parallel, merge with earlier results and rewrite the summary.
+
+    Returns run stats: logs found, parsed and skipped, rows written, seconds and output path.
+    """
+    started = time.perf_counter()
+    output = output or default_output()
+    state_path = output + ".state.json"
+    state = {"version": STATE_VERSION, "files": {}, "rows": {}} if full else _load_state(state_path)
+    seen_files, rows = state["files"], state["rows"]
+
+    found = {path: [size, mtime] for path, size, mtime in find_call_logs(logs_dir)} if os.path.isdir(logs_dir) else {}
+    changed = [p for p, fingerprint in found.items() if seen_files.get(p, [None])[:2] != fingerprint]
+    # Logs that disappeared were either compressed (a new path, parsed below) or deleted
+    for path in set(seen_files) - set(found):
+        sid = seen_files.pop(path)[2]
+        if rows.get(sid, {}).get("log_path") == path:
+            rows.pop(sid)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, math.ceil(len(changed) / batch_size) or 1))
+    if changed:
+        batches = list(_batches(sorted(changed), batch_size))
+        if workers == 1:
+            results = map(parse_batch, batches)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            results = pool.map(parse_batch, batches)
+        try:
+            for batch_rows in results:
+                for row in batch_rows:
+                    seen_files[row["log_path"]] = found[row["log_path"]] + [row["call_sid"]]
+                    rows[row["call_sid"]] = row
+        finally:
+            if workers > 1:
+                pool.shutdown(cancel_futures=True)
+
+    write_summary(sorted(rows.values(), key=lambda r: (r["started_at"], r["call_sid"])), output)
+    _save_state(state_path, state)
+    return {
+        "logs": len(found),
+        "parsed": len(changed),
+        "skipped": len(found) - len(changed),
+        "rows": len(rows),
+        "workers": workers,
+        "seconds": round(time.perf_counter() - started, 3),
+        "output": output,
+    }
+
+
+def summarize(output: str) -> dict:
+    """Lead counts by project, tier, unit preference, financing and timeline from the state of the last run."""
+    state = _load_state(output + ".state.json")
+    projects: dict[str, int] = {}
+    tiers: dict[str, int] = {}
+    units: dict[str, int] = {}
+    financing: dict[str, int] = {}
+    timeline: dict[str, int] = {}
+    site_visits = 0
+    for row in state["rows"].values():
+        # Calls logged before projects were recorded belong to the default project
+        project = row["project"] or "default"
+        projects[project] = projects.get(project, 0) + 1
+        tiers[row["lead_tier"]] = tiers.get(row["lead_tier"], 0) + 1
+        for unit in (row["unit_preference"] or "").split(","):
+            if unit:
+                units[unit] = units.get(unit, 0) + 1
+        if row["financing"]:
+            financing[row["financing"]] = financing.get(row["financing"], 0) + 1
+        if row["timeline"]:
+            timeline[row["timeline"]] = timeline.get(row["timeline"], 0) + 1
+        site_visits += bool(row["site_visit"])
+    return {"calls": len(state["rows"]), "projects": projects, "tiers": tiers, "unit_preference": units, "financing": financing,
+            "timeline": timeline, "site_visits": site_visits}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", default="call_logs", help="directory of call logs")
+    parser.add_argument("--output", help="summary file, .parquet (needs pyarrow) or .csv; default analytics/leads.*")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--full", action="store_true", help="ignore earlier results and parse every log again")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    result = run_analytics(args.logs, args.output, args.workers, args.full)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
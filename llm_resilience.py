@@ -0,0 +1,275 @@
+"""Resilience for LLM calls: a bulkhead, per-model circuit breakers and a model fallback chain.
+
+The bulkhead caps concurrent generations across all calls; a request that cannot get a
+slot within its queue timeout is rejected instead of piling onto a degraded upstream.
+Each model has a circuit breaker over a sliding window of recent calls: when too many
+fail or are slow it opens and requests skip that model without waiting, then after a
+cool-down a few probe requests decide whether it closes again. ResilientLLM tries the
+models in order and reports why it gave up, so the caller can answer locally.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class BulkheadFull(Exception):
+    """No generation slot became free within the queue timeout."""
+
+
+class Slot:
+    """One admitted generation. A blocking call that outlives its caller keeps the slot."""
+
+    def __init__(self):
+        self.work: Optional[concurrent.futures.Future] = None
+
+    def hold_until(self, work: concurrent.futures.Future):
+        """Keep the slot taken until `work` (running in a worker thread) finishes."""
+        self.work = work
+
+
+_CURRENT_SLOT: contextvars.ContextVar[Optional[Slot]] = contextvars.ContextVar("bulkhead_slot", default=None)
+
+
+def current_slot() -> Optional[Slot]:
+    """The bulkhead slot the running task holds, if any."""
+    return _CURRENT_SLOT.get()
+
+
+class Bulkhead:
+    """Caps concurrent generations. A thread cannot be interrupted, so a timed-out call that
+    registered its worker with Slot.hold_until keeps its slot until the upstream request ends."""
+
+    def __init__(self, max_concurrent: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.abandoned = 0
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        wait = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=max(wait, 0.0))
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise BulkheadFull(f"no LLM slot free within {wait:.2f}s") from None
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        slot = Slot()
+        token = _CURRENT_SLOT.set(slot)
+        try:
+            yield slot
+        finally:
+            _CURRENT_SLOT.reset(token)
+            if slot.work is None or slot.work.done():
+                self._release()
+            else:
+                self.abandoned += 1
+                loop = asyncio.get_running_loop()
+                slot.work.add_done_callback(lambda _: self._release_threadsafe(loop))
+
+    def _release(self, abandoned: bool = False):
+        if abandoned:
+            self.abandoned -= 1
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def _release_threadsafe(self, loop: asyncio.AbstractEventLoop):
+        try:
+            loop.call_soon_threadsafe(self._release, True)
+        except RuntimeError:
+            # The loop is closed (shutdown); nobody is waiting for the slot any more
+            pass
+
+    def stats(self) -> dict:
+        return {"max_concurrent": self.max_concurrent, "queue_timeout": self.queue_timeout,
+                "in_flight": self.in_flight, "waiting": self.waiting, "rejected": self.rejected,
+                "abandoned": self.abandoned}
+
+
+class CircuitBreaker:
+    """Opens when, over the last `window` calls (at least `min_calls`), the share of failures
+    or of calls slower than `slow_call_seconds` reaches its threshold."""
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5, failure_threshold: float = 0.5,
+                 slow_call_seconds: float = 5.0, slow_threshold: float = 0.8, open_seconds: float = 30.0,
+                 half_open_probes: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_threshold = slow_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (ok, seconds) of recent calls
+        self._calls: deque = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.opened = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; every allowed call must be followed by `record`."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            self.short_circuited += 1
+            return False
+
+    def release(self):
+        """Give back an allowed call that never reached the model (e.g. rejected by the bulkhead)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, ok: bool, seconds: float):
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                if ok and seconds < self.slow_call_seconds:
+                    self._state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open()
+                return
+            if state == OPEN:
+                return
+            self._calls.append((ok, seconds))
+            if len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for c in self._calls if not c[0]) / len(self._calls)
+            slow = sum(1 for c in self._calls if c[1] >= self.slow_call_seconds) / len(self._calls)
+            if failures >= self.failure_threshold or slow >= self.slow_threshold:
+                self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._calls.clear()
+        self.opened += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            calls = list(self._calls)
+            return {
+                "name": self.name,
+                "state": state,
+                "recent_calls": len(calls),
+                "failure_rate": round(sum(1 for c in calls if not c[0]) / len(calls), 4) if calls else 0.0,
+                "slow_rate": round(sum(1 for c in calls if c[1] >= self.slow_call_seconds) / len(calls), 4) if calls else 0.0,
+                "retry_in_seconds": round(max(0.0, self.open_seconds - (self._clock() - self._opened_at)), 2)
+                                    if state == OPEN else 0.0,
+                "opened": self.opened,
+                "short_circuited": self.short_circuited,
+            }
+
+
+class ResilientLLM:
+    """Tries models in order, each behind its own breaker and all behind one bulkhead.
+
+    Every model except the last gets `primary_share` of the remaining deadline, so a hung
+    primary still leaves time for the fallback.
+    """
+
+    def __init__(self, models: list[str], bulkhead: Bulkhead, breaker: Callable[[str], CircuitBreaker],
+                 primary_share: float = 0.6):
+        self.models = [m for i, m in enumerate(models) if m and m not in models[:i]]
+        self.bulkhead = bulkhead
+        self.breakers = {m: breaker(m) for m in self.models}
+        self.primary_share = primary_share
+
+    def available_model(self) -> Optional[str]:
+        """First model whose breaker admits a call (the caller must `record` its outcome)."""
+        for model in self.models:
+            if self.breakers[model].allow():
+                return model
+        return None
+
+    def record(self, model: str, ok: bool, seconds: float):
+        self.breakers[model].record(ok, seconds)
+
+    def release(self, model: str):
+        self.breakers[model].release()
+
+    async def generate(self, call: Callable[[str, float], Awaitable[Optional[str]]],
+                       timeout: float) -> tuple[Optional[str], Optional[str], str]:
+        """Run `call(model, seconds)` down the chain until one returns text.
+
+        `call` must give up after `seconds` by raising asyncio.TimeoutError.
+
+        Returns (text, model, outcome); outcome is "ok", or why the last tier failed:
+        "breaker_open", "bulkhead_full", "timeout" or "error".
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        outcome = "breaker_open"
+        for i, model in enumerate(self.models):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            breaker = self.breakers[model]
+            if not breaker.allow():
+                outcome = "breaker_open"
+                continue
+            budget = remaining if i == len(self.models) - 1 else remaining * self.primary_share
+            started = loop.time()
+            try:
+                async with self.bulkhead.slot(budget):
+                    text = await call(model, max(budget - (loop.time() - started), 0.0))
+            except BulkheadFull:
+                # Not the model's fault, and every tier shares the bulkhead: give up on the LLM for this turn
+                breaker.release()
+                return None, None, "bulkhead_full"
+            except asyncio.TimeoutError:
+                breaker.record(False, loop.time() - started)
+                outcome = "timeout"
+                continue
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception:
+                breaker.record(False, loop.time() - started)
+                outcome = "error"
+                continue
+            elapsed = loop.time() - started
+            if text:
+                breaker.record(True, elapsed)
+                return text, model, "ok"
+            breaker.record(False, elapsed)
+            outcome = "error"
+        return None, None, outcome
+
+    def stats(self) -> dict:
+        return {"models": self.models, "bulkhead": self.bulkhead.stats(),
+                "breakers": [self.breakers[m].stats() for m in self.models]}
@@ -0,0 +1,125 @@
+"""Non-blocking logging: handlers run on a background listener thread.
+
+The root logger gets a single QueueHandler, so a log call on the event loop only builds
+a LogRecord and enqueues it; message formatting, JSON encoding and file/console I/O
+happen on the QueueListener thread. Verbose payloads (Twilio form dicts, TwiML) go
+through `log_payload`, which logs them at DEBUG, or at INFO for a sampled fraction of
+calls, and costs a single level check otherwise.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_payload_sample_rate = 0.0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, any `extra` fields, and exc when present."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records without formatting them; the listener's handlers format.
+
+    Only exception info is rendered eagerly, since tracebacks reference live frames.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+
+def setup_logging(level: str = "INFO", path: Optional[str] = "voice_agent.log", fmt: str = "json",
+                  console: bool = True, payload_sample_rate: float = 0.0) -> logging.handlers.QueueListener:
+    """Route all logging through a queue to file/console handlers on a listener thread.
+
+    Safe to call again (e.g. to change level); the previous listener is stopped first.
+    """
+    global _listener, _payload_sample_rate
+    if _listener is not None:
+        _listener.stop()
+    _payload_sample_rate = payload_sample_rate
+
+    formatter: logging.Formatter = JsonFormatter() if fmt == "json" else logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    handlers: list[logging.Handler] = []
+    if path:
+        handlers.append(logging.FileHandler(path, encoding="utf-8"))
+    if console:
+        handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_LazyQueueHandler(log_queue))
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Drain the queue and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def sampled(call_sid: Optional[str]) -> bool:
+    """Whether payloads are logged for this call; a call is either fully sampled or not at all."""
+    if _payload_sample_rate <= 0:
+        return False
+    if call_sid:
+        return zlib.crc32(call_sid.encode()) % 10000 < _payload_sample_rate * 10000
+    return random.random() < _payload_sample_rate
+
+
+def log_payload(logger: logging.Logger, label: str, payload: Any, call_sid: Optional[str] = None,
+                max_chars: int = 2000):
+    """Log a verbose payload at DEBUG, or at INFO for sampled calls.
+
+    The payload is only stringified when the record will actually be emitted.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        level = logging.DEBUG
+    elif sampled(call_sid) and logger.isEnabledFor(logging.INFO):
+        level = logging.INFO
+    else:
+        return
+    text = payload.decode("utf-8", errors="replace") if isinstance(payload, bytes) else str(payload)
+    size = len(text)
+    if size > max_chars:
+        text = text[:max_chars] + "... [truncated]"
+    logger.log(level, "%s (len=%d): %s", label, size, text, extra={"call_sid": call_sid, "payload": label})
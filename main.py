@@ -1,112 +1,412 @@
-import google.generativeai as genai
 import os
+import glob
 from dotenv import load_dotenv
-import requests
-import io
 from datetime import datetime
 import json
-from twilio.rest import Client
-from twilio.twiml.voice_response import VoiceResponse, Gather
-from fastapi import FastAPI, Request, Form, Header, HTTPException, Depends
-from fastapi.responses import Response, JSONResponse
-from typing import Optional, List
+from fastapi import FastAPI, Request, Form, Header, HTTPException, Depends, Query, UploadFile, File, WebSocket
+from fastapi.responses import Response, JSONResponse, StreamingResponse, PlainTextResponse
+from typing import AsyncIterator, Awaitable, Callable, Optional, List
 from pydantic import BaseModel, Field
-import uvicorn
 import logging
 import sys
-
-# Ensure stdout/stderr use UTF-8 on Windows to avoid UnicodeEncodeError for Devanagari/emojis
-try:
-    if hasattr(sys.stdout, "buffer"):
-        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")  # type: ignore
-    if hasattr(sys.stderr, "buffer"):
-        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")  # type: ignore
-except Exception:
-    pass
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 import traceback
+import time
+import hashlib
+from functools import lru_cache
+from intents import build_intent_engine, combined_stats
+from response_cache import ResponseCache, replace_name
+import conversation_memory
+from recordings import RecordingDownloader
+from recording_processing import ProcessingOptions, RecordingProcessor
+from lead_analytics import default_output as default_lead_output, run_analytics, summarize as summarize_leads
+from call_log import CallLogWriter
+from call_store import CallStore, TERMINAL_STATUSES
+from conversation_buffer import ConversationBuffer
+from state_store import make_state_store
+from call_lifecycle import CallLifecycle
+from campaigns import CampaignScheduler, NotLeaderError, parse_leads
+from twiml_templates import FAREWELL, QUALIFY_HINTS, REPLY_HINTS, TwimlTemplates, with_query
+from tenants import DEFAULT_KEY, Project, Tenant, TenantRegistry, project_hints
+from metrics import Registry, monitor_event_loop_lag
+from logging_setup import log_payload, setup_logging
+from llm_resilience import Bulkhead, BulkheadFull, CircuitBreaker, ResilientLLM, current_slot
+from http_transport import HttpTransport
+from media_stream import HANGUP, MediaStreamSession, make_stt, make_tts
+from prompt_audio import NAME as PROMPT_NAME, PromptAudio, byte_range
+from providers import Provider
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging (UTF-8 safe)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('voice_agent.log', encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
+_logging_configured = False
+
 
-logger.info("="*60)
-logger.info("Voice Agent Application Starting")
-logger.info("="*60)
+def configure_logging():
+    """UTF-8 console streams and the queued log pipeline; done at startup rather than on import."""
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    # Ensure stdout/stderr use UTF-8 on Windows to avoid UnicodeEncodeError for Devanagari/emojis
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.reconfigure(encoding="utf-8", errors="replace")  # type: ignore[union-attr]
+        except Exception:
+            pass
+    # Handlers run on a background listener thread
+    setup_logging(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        path=os.getenv("LOG_FILE", "voice_agent.log") or None,
+        fmt=os.getenv("LOG_FORMAT", "json"),
+        payload_sample_rate=float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0")),
+    )
+    logger.info("="*60)
+    logger.info("Voice Agent Application Starting")
+    logger.info("="*60)
 
 
-def safe_log_twiml(twiml: str):
-    """Safely log TwiML content without causing UnicodeEncodeError; truncates long output."""
+def safe_log_twiml(twiml: str | bytes, call_sid: Optional[str] = None):
+    """Log outgoing TwiML at DEBUG or for sampled calls; truncates long output."""
     try:
-        truncated = twiml if len(twiml) <= 2000 else twiml[:2000] + "... [truncated]"
-        logger.info("Returning TwiML (len=%d): %s", len(twiml), truncated)
+        log_payload(logger, "Returning TwiML", twiml, call_sid)
     except Exception as e:
-        logger.warning(f"Failed to log TwiML safely: {e}")
+        logger.warning("Failed to log TwiML safely: %s", e)
+
+def load_gemini():
+    """Import and configure the Gemini SDK (about a second of imports, so only on warm-up or first use)."""
+    import google.generativeai as genai
+    try:
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))  # type: ignore[attr-defined]
+    except Exception:
+        logger.warning("Failed to configure Gemini API key; proceeding without explicit configuration.")
+    return genai
+
+
+GEMINI = Provider("gemini", load_gemini)
+# Warm providers on a worker thread at startup; off leaves them to the first request that needs them
+WARM_UP_PROVIDERS = os.getenv("WARM_UP_PROVIDERS", "true").lower() in ("1", "true", "yes")
 
-# Load API Keys from Environment Variables
-try:
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))  # type: ignore[attr-defined]
-except Exception:
-    logger.warning("Failed to configure Gemini API key; proceeding without explicit configuration.")
+# Gemini model name; the model itself is built per persona prompt (see get_persona_model)
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
 
-# Initialize Gemini model
-model = genai.GenerativeModel('gemini-2.0-flash')  # type: ignore
+# Gemini calls are blocking; run them in a bounded pool so the event loop keeps serving other calls
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "8"))
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "16"))
+# Every generation holds a bulkhead slot until its worker thread returns, so with at least one
+# worker per slot an admitted generation never queues behind abandoned ones
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", str(LLM_MAX_WORKERS)))
+if LLM_MAX_CONCURRENT > LLM_MAX_WORKERS:
+    raise RuntimeError(f"LLM_MAX_CONCURRENT={LLM_MAX_CONCURRENT} needs at least as many LLM_MAX_WORKERS "
+                       f"(got {LLM_MAX_WORKERS})")
+LLM_TIMEOUT_FALLBACK = "Sorry, I need a moment to check that. Could you please repeat your question?"
+llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="gemini")
 
-# Initialize Twilio client
-twilio_client = Client(
-    os.getenv("TWILIO_ACCOUNT_SID"),
-    os.getenv("TWILIO_AUTH_TOKEN")
+# Resilience: a bulkhead caps concurrent generations, each model has a circuit breaker, and turns
+# fall back from GEMINI_MODEL to GEMINI_FALLBACK_MODEL to a local templated answer
+GEMINI_FALLBACK_MODEL = os.getenv("GEMINI_FALLBACK_MODEL", "gemini-2.0-flash-lite")
+LLM_PRIMARY_TIMEOUT_SHARE = float(os.getenv("LLM_PRIMARY_TIMEOUT_SHARE", "0.6"))
+# A call is cancelled once it uses up its budget, so the slow-call threshold must sit below the
+# primary model's share of LLM_TIMEOUT_SECONDS or the breaker never sees a slow call
+LLM_PRIMARY_BUDGET_SECONDS = LLM_TIMEOUT_SECONDS * LLM_PRIMARY_TIMEOUT_SHARE
+LLM_SLOW_CALL_SECONDS = float(os.getenv("LLM_SLOW_CALL_SECONDS", str(round(LLM_PRIMARY_BUDGET_SECONDS * 0.75, 3))))
+if LLM_SLOW_CALL_SECONDS >= LLM_PRIMARY_BUDGET_SECONDS:
+    raise RuntimeError(f"LLM_SLOW_CALL_SECONDS={LLM_SLOW_CALL_SECONDS:g} must be below the primary model's budget "
+                       f"(LLM_TIMEOUT_SECONDS x LLM_PRIMARY_TIMEOUT_SHARE = {LLM_PRIMARY_BUDGET_SECONDS:g}s)")
+LLM_GUARD = ResilientLLM(
+    [GEMINI_MODEL, GEMINI_FALLBACK_MODEL],
+    Bulkhead(
+        max_concurrent=LLM_MAX_CONCURRENT,
+        queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "1")),
+    ),
+    lambda model: CircuitBreaker(
+        model,
+        window=int(os.getenv("LLM_BREAKER_WINDOW", "20")),
+        min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", "5")),
+        failure_threshold=float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+        slow_call_seconds=LLM_SLOW_CALL_SECONDS,
+        slow_threshold=float(os.getenv("LLM_BREAKER_SLOW_RATE", "0.8")),
+        open_seconds=float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30")),
+    ),
+    primary_share=LLM_PRIMARY_TIMEOUT_SHARE,
 )
 
+# Prometheus metrics served at /metrics; gauges that read app state are registered once those objects exist
+METRICS = Registry()
+STAGE_SECONDS = METRICS.histogram("voice_agent_stage_seconds", "Time spent per handler stage", ("handler", "stage"))
+LLM_REQUESTS = METRICS.counter("voice_agent_llm_requests_total", "Gemini generations by outcome (ok, error, timeout)", ("outcome",))
+LLM_FALLBACKS = METRICS.counter("voice_agent_llm_fallbacks_total", "Turns answered with a canned fallback instead of Gemini", ("reason",))
+TURNS = METRICS.counter("voice_agent_turns_total", "Caller turns by how they were answered", ("path",))
+OUTBOUND_CALLS = METRICS.counter("voice_agent_outbound_calls_total", "Outbound call requests to Twilio by outcome", ("outcome",))
+RECORDING_ATTEMPTS = METRICS.counter("voice_agent_recording_download_attempts_total", "Recording download attempts by outcome", ("outcome",))
+RECORDINGS_PROCESSED = METRICS.counter("voice_agent_recordings_processed_total", "Recording post-processing runs by outcome", ("outcome",))
+RECORDING_BYTES_SAVED = METRICS.counter("voice_agent_recording_bytes_saved_total", "Bytes removed from disk by transcoding and trimming recordings")
+LOOP_LAG = METRICS.histogram("voice_agent_event_loop_lag_seconds", "How late the event loop ran a 0.5s timer",
+                             buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+LOOP_LAG_LAST = METRICS.gauge("voice_agent_event_loop_lag_last_seconds", "Most recent event loop lag sample")
+STREAM_BARGE_INS = METRICS.counter("voice_agent_stream_barge_ins_total", "Media-stream replies cut off by the caller speaking")
+LLM_REPLIES = METRICS.counter("voice_agent_llm_replies_total", "LLM-path replies by the tier that produced them "
+                              "(model name, or local)", ("tier",))
+
+# Two-phase "think then speak" mode: the voice webhook returns a filler immediately and
+# Twilio polls the result endpoint until the generated reply is ready.
+THINK_THEN_SPEAK = os.getenv("THINK_THEN_SPEAK", "false").lower() in ("1", "true", "yes")
+PENDING_TURN_TIMEOUT_SECONDS = float(os.getenv("PENDING_TURN_TIMEOUT_SECONDS", "25"))
+PENDING_POLL_SECONDS = int(os.getenv("PENDING_POLL_SECONDS", "1"))
+
+# Outbound HTTP (Twilio REST API and recording downloads) shares one keep-alive connection pool
+HTTP_TRANSPORT = HttpTransport(
+    pool_size=int(os.getenv("HTTP_POOL_SIZE", "20")),
+    connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5")),
+    read_timeout=float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "30")),
+    pool_block=os.getenv("HTTP_POOL_BLOCK", "false").lower() in ("1", "true", "yes"),
+)
+
+def build_twilio_client():
+    from twilio.rest import Client
+    return Client(
+        os.getenv("TWILIO_ACCOUNT_SID"),
+        os.getenv("TWILIO_AUTH_TOKEN"),
+        http_client=HTTP_TRANSPORT.twilio_http_client()
+    )
+
+
+# Twilio REST client, built on warm-up or first use
+TWILIO = Provider("twilio", build_twilio_client)
+PROVIDERS = (GEMINI, TWILIO)
+
 # Global variables for recording and conversation logging
-conversation_log = []
+conversation_log = ConversationBuffer(int(os.getenv("CONVERSATION_LOG_CAPACITY", "10000")))
 API_KEY = os.getenv("API_KEY")  # Optional API key for securing endpoints
-CALL_LOG_FILES: dict[str, str] = {}
-RECORDING_DOWNLOADS: dict[str, str] = {}
+# Per-call state lives in a pluggable store (memory | sqlite:///path | redis://...) so that
+# several workers or hosts can serve the same call
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+# A locked or unreachable store fails the request after this long instead of holding it
+STATE_TIMEOUT_SECONDS = float(os.getenv("STATE_TIMEOUT_SECONDS", "2"))
+CALL_LOG_FILES = make_state_store(STATE_BACKEND, "call_log_files", STATE_TIMEOUT_SECONDS)
+RECORDING_DOWNLOADS = make_state_store(STATE_BACKEND, "recording_downloads", STATE_TIMEOUT_SECONDS)
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 TARGET_PHONE_NUMBER = os.getenv("TARGET_PHONE_NUMBER")
 PUBLIC_URL = os.getenv("PUBLIC_URL", os.getenv("CALLBACK_URL", "http://localhost:8000"))
 CALLBACK_URL = f"{PUBLIC_URL}/api/callback/twilio/voice"
+RESULT_URL = f"{PUBLIC_URL}/api/callback/twilio/voice/result"
+# "stream" answers calls with <Connect><Stream> and talks over the Media Streams WebSocket;
+# "gather" keeps the webhook-per-turn flow
+CONVERSATION_MODE = os.getenv("CONVERSATION_MODE", "gather").lower()
+STREAM_URL = PUBLIC_URL.replace("https://", "wss://", 1).replace("http://", "ws://", 1) + "/api/stream/twilio"
+STREAM_STT_BACKEND = os.getenv("STREAM_STT", "fake")
+STREAM_TTS_BACKEND = os.getenv("STREAM_TTS", "fake")
+# The fake backends exist for tests and benchmarks: callers would hear a tone and never be understood
+ALLOW_FAKE_BACKENDS = os.getenv("ALLOW_FAKE_BACKENDS", "false").lower() == "true"
+if CONVERSATION_MODE == "stream" and "fake" in (STREAM_STT_BACKEND, STREAM_TTS_BACKEND) and not ALLOW_FAKE_BACKENDS:
+    raise RuntimeError("CONVERSATION_MODE=stream needs real STREAM_STT and STREAM_TTS backends "
+                       "(register them in media_stream.py); set ALLOW_FAKE_BACKENDS=true to run on the fakes")
+STREAM_STT = make_stt(STREAM_STT_BACKEND)
+STREAM_TTS = make_tts(STREAM_TTS_BACKEND)
+# The default project; PROJECTS_FILE adds more, routed per call by number or campaign (see tenants)
 COMPANY_NAME = os.getenv("COMPANY_NAME", "XYZ")
 PROJECT_NAME = os.getenv("PROJECT_NAME", "XYZ Apartments")
 PROJECT_LOCATION = os.getenv("PROJECT_LOCATION", "")
 STARTING_PRICE = os.getenv("STARTING_PRICE", "₹55 lakhs")
 UNIT_TYPES = os.getenv("UNIT_TYPES", "1BHK–3BHK")
+PROJECTS_FILE = os.getenv("PROJECTS_FILE", "")
+PROJECTS_RELOAD_SECONDS = float(os.getenv("PROJECTS_RELOAD_SECONDS", "2"))
+# Fixed prompts (greetings, reprompts, farewell, error) rendered once with this TTS backend and
+# played with <Play>; empty keeps <Say> for everything
+PROMPT_AUDIO_TTS = os.getenv("PROMPT_AUDIO_TTS", "")
+if PROMPT_AUDIO_TTS == "fake" and not ALLOW_FAKE_BACKENDS:
+    raise RuntimeError("PROMPT_AUDIO_TTS=fake would play a tone to callers; "
+                       "set ALLOW_FAKE_BACKENDS=true to run on the fake for testing")
+PROMPT_AUDIO = (PromptAudio(os.getenv("PROMPT_AUDIO_DIR", "prompt_audio"), make_tts(PROMPT_AUDIO_TTS),
+                            PROMPT_AUDIO_TTS, f"{PUBLIC_URL}/api/prompts") if PROMPT_AUDIO_TTS else None)
+# Asset names change with their content, so clients may cache them for good
+PROMPT_AUDIO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PROMPT_RENDER = {"task": None, "again": False}
+
+# Generated replies keyed on normalized utterance + project config
+RESPONSE_CACHE = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "2000")),
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(24 * 3600))),
+    path=os.getenv("RESPONSE_CACHE_FILE") or None
+)
+CACHE_NAME_PLACEHOLDER = "{caller_name}"
+# Per-call conversation memory budget (characters of verbatim turns / running summary)
+HISTORY_CHAR_BUDGET = int(os.getenv("HISTORY_CHAR_BUDGET", "2400"))
+SUMMARY_CHAR_BUDGET = int(os.getenv("SUMMARY_CHAR_BUDGET", "600"))
+# Running Gemini latency totals, used to estimate what the intent fast path saves
+LLM_LATENCY = {"count": 0, "total_seconds": 0.0}
 
 # Track per-call state like captured name, stage
-CALL_STATE: dict[str, dict] = {}
+CALL_STATE = make_state_store(STATE_BACKEND, "call_state", STATE_TIMEOUT_SECONDS)
+# In-flight replies for think-then-speak mode started by this process, keyed by (CallSid, turn number)
+PENDING_TURNS: dict[tuple[str, int], asyncio.Task] = {}
+# Webhooks being processed by this process, keyed by (CallSid, dedupe key); retries wait on these
+INFLIGHT_WEBHOOKS: dict[tuple[str, str], asyncio.Future] = {}
+# Answered webhooks remembered per call (in CALL_STATE) so Twilio retries get the same TwiML
+WEBHOOK_DEDUPE_KEEP = int(os.getenv("WEBHOOK_DEDUPE_KEEP", "16"))
+WEBHOOK_RETRY_WAIT_SECONDS = float(os.getenv("WEBHOOK_RETRY_WAIT_SECONDS", str(max(LLM_TIMEOUT_SECONDS, PENDING_TURN_TIMEOUT_SECONDS) + 2)))
+WEBHOOK_RETRIES = METRICS.counter("voice_agent_webhook_retries_total",
+                                  "Retried Twilio webhooks answered from the first attempt, by where it was "
+                                  "(in_flight, completed, expired)", ("state",))
+
+# All per-call log file I/O happens on one background writer thread
+CALL_LOG_WRITER = CallLogWriter(
+    max_open_files=int(os.getenv("CALL_LOG_MAX_OPEN_FILES", "64")),
+    flush_lines=int(os.getenv("CALL_LOG_FLUSH_LINES", "200")),
+    flush_interval=float(os.getenv("CALL_LOG_FLUSH_INTERVAL", "0.5"))
+)
+
+# Structured, indexed copy of every call and call-log event for the /api/calls and /api/events queries
+CALL_STORE = CallStore(os.getenv("CALL_STORE_PATH", os.path.join("call_logs", "calls.db")))
+CALL_LOG_COMPRESS_AFTER_SECONDS = float(os.getenv("CALL_LOG_COMPRESS_AFTER_SECONDS", str(24 * 3600)))
+
+# Lead-qualification analytics over call_logs/, run on demand in a process pool (see lead_analytics)
+LEAD_ANALYTICS_OUTPUT = os.getenv("LEAD_ANALYTICS_OUTPUT", "")  # empty: analytics/leads.parquet, or .csv without pyarrow
+LEAD_ANALYTICS_WORKERS = int(os.getenv("LEAD_ANALYTICS_WORKERS", "0")) or None
+LEAD_ANALYTICS: dict = {"task": None, "last_run": None, "error": None}
 
 def create_call_log(call_sid: str) -> str:
-    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    os.makedirs("call_logs", exist_ok=True)
+    now = datetime.utcnow()
+    ts = now.strftime("%Y%m%d_%H%M%S")
     path = os.path.join("call_logs", f"call_{ts}_{call_sid}.log")
-    CALL_LOG_FILES[call_sid] = path
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(f"CALL START {ts} SID={call_sid}\n")
+    if not CALL_LOG_FILES.add(call_sid, path):
+        # Another worker created the log first
+        return CALL_LOG_FILES.get(call_sid)
+    CALL_LOG_WRITER.write(path, f"CALL START {ts} SID={call_sid}")
+    CALL_STORE.upsert_call(call_sid, started_at=now.isoformat(), log_path=path)
+    CALL_LIFECYCLE.touch(call_sid)
     return path
 
 def append_call_log(call_sid: str | None, message: str):
     if not call_sid:
         return
-    path = CALL_LOG_FILES.get(call_sid) or create_call_log(call_sid)
-    ts = datetime.utcnow().isoformat()
-    try:
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(f"[{ts}] {message}\n")
-    except Exception as e:
-        logger.warning(f"Failed to write call log for {call_sid}: {e}")
+    with STAGE_SECONDS.time(handler="call_log", stage="append"):
+        path = CALL_LOG_FILES.get(call_sid) or create_call_log(call_sid)
+        ts = datetime.utcnow().isoformat()
+        CALL_LOG_WRITER.write(path, f"[{ts}] {message}")
+        CALL_STORE.record_event(call_sid, ts, message)
+
+async def compress_call_logs_periodically(interval: float = 3600):
+    """Gzip call logs idle for CALL_LOG_COMPRESS_AFTER_SECONDS and point the call store at the archive."""
+    while True:
+        await asyncio.sleep(interval)
+        compressed = await asyncio.to_thread(CALL_LOG_WRITER.compress_idle, "call_logs", CALL_LOG_COMPRESS_AFTER_SECONDS)
+        for old_path, new_path in compressed:
+            # call_<YYYYmmdd>_<HHMMSS>_<sid>.log
+            call_sid = os.path.basename(old_path)[:-len(".log")].split("_", 3)[-1]
+            if CALL_LOG_FILES.get(call_sid) == old_path:
+                CALL_LOG_FILES.delete(call_sid)
+            CALL_STORE.set_log_path(call_sid, new_path)
+        if compressed:
+            logger.info("Compressed %s idle call log(s)", len(compressed))
 
 def finalize_call(call_sid: str):
     append_call_log(call_sid, "CALL END")
+    path = CALL_LOG_FILES.get(call_sid)
+    if path:
+        CALL_LOG_WRITER.flush(path, close=True)
+    for key in [k for k in PENDING_TURNS if k[0] == call_sid]:
+        PENDING_TURNS.pop(key).cancel()
+
+def record_download(call_sid: str, path: str):
+    RECORDING_DOWNLOADS.set(call_sid, path)
+    if RECORDING_POSTPROCESS and RECORDING_PROCESSOR.submit(call_sid, path):
+        append_call_log(call_sid, "RECORDING_PROCESS_QUEUED")
+
+def record_processed(call_sid: str, result: dict):
+    if RECORDING_DOWNLOADS.get(call_sid):
+        RECORDING_DOWNLOADS.set(call_sid, result["path"])
+    RECORDING_BYTES_SAVED.inc(max(0, result["bytes_in"] - result["bytes_out"]))
+
+def observe_recording_processing(_call_sid: str, seconds: float, error: Optional[Exception]):
+    STAGE_SECONDS.observe(seconds, handler="recording_process", stage="total")
+    RECORDINGS_PROCESSED.inc(outcome="error" if error else "ok")
+
+def log_recording_event(call_sid: str, message: str):
+    """Post-processing often finishes after the call's state was evicted (always, for a backfill):
+    record the event in the call store and append it to the call's log file if it is not compressed yet,
+    rather than let append_call_log start a new log."""
+    if CALL_LOG_FILES.get(call_sid):
+        append_call_log(call_sid, message)
+        return
+    ts = datetime.utcnow().isoformat()
+    CALL_STORE.record_event(call_sid, ts, message)
+    logs = glob.glob(os.path.join("call_logs", f"call_*_{call_sid}.log"))
+    if logs:
+        CALL_LOG_WRITER.write(logs[0], f"[{ts}] {message}")
+
+def observe_recording_attempt(_call_sid: str, seconds: float, error: Optional[Exception]):
+    STAGE_SECONDS.observe(seconds, handler="recording_download", stage="download")
+    RECORDING_ATTEMPTS.inc(outcome="error" if error else "ok")
+
+def evict_call(call_sid: str, reason: str):
+    """Release everything this process holds for a call; the lifecycle then drops its shared state."""
+    path = CALL_LOG_FILES.get(call_sid)
+    if reason == "leaked" and path:
+        # No terminal status ever arrived: close the log as if the call had ended
+        append_call_log(call_sid, "CALL END leaked")
+        now = datetime.utcnow().isoformat()
+        CALL_STORE.upsert_call(call_sid, started_at=now, ended_at=now)
+    if path:
+        CALL_LOG_WRITER.flush(path, close=True)
+    for key in [k for k in PENDING_TURNS if k[0] == call_sid]:
+        PENDING_TURNS.pop(key).cancel()
+
+# Per-call state is evicted CALL_END_GRACE_SECONDS after a terminal status, or after
+# CALL_IDLE_TTL_SECONDS without any activity (a dropped call that never reported one)
+CALL_LIFECYCLE = CallLifecycle(
+    make_state_store(STATE_BACKEND, "call_lifecycle", STATE_TIMEOUT_SECONDS),
+    tracked=(CALL_STATE, CALL_LOG_FILES, RECORDING_DOWNLOADS),
+    grace_seconds=float(os.getenv("CALL_END_GRACE_SECONDS", "300")),
+    idle_ttl_seconds=float(os.getenv("CALL_IDLE_TTL_SECONDS", "3600")),
+    on_evict=evict_call,
+)
+CALL_SWEEP_INTERVAL_SECONDS = float(os.getenv("CALL_SWEEP_INTERVAL_SECONDS", "60"))
+
+async def sweep_calls_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            evicted = await asyncio.to_thread(CALL_LIFECYCLE.sweep)
+            if evicted:
+                logger.info("Evicted state for %s call(s): %s", len(evicted), evicted)
+        except Exception as e:
+            logger.warning("Call state sweep failed: %s", e)
+
+# Downloaded recordings are trimmed, analyzed and re-encoded as low-bitrate Opus in a process pool
+RECORDING_POSTPROCESS = os.getenv("RECORDING_POSTPROCESS", "true").lower() in ("1", "true", "yes")
+RECORDING_PROCESSOR = RecordingProcessor(
+    workers=int(os.getenv("RECORDING_PROCESS_WORKERS", "0")) or None,
+    options=ProcessingOptions(
+        ffmpeg=os.getenv("FFMPEG_BINARY", "ffmpeg"),
+        silence_dbfs=float(os.getenv("RECORDING_SILENCE_DBFS", "-45")),
+        pad_ms=int(os.getenv("RECORDING_TRIM_PAD_MS", "300")),
+        bitrate=os.getenv("RECORDING_BITRATE", "16k"),
+        channels=int(os.getenv("RECORDING_OUTPUT_CHANNELS", "1")),
+        keep_original=os.getenv("RECORDING_KEEP_ORIGINAL", "false").lower() in ("1", "true", "yes"),
+    ),
+    on_event=log_recording_event,
+    on_complete=record_processed,
+    on_result=observe_recording_processing,
+)
+
+# Recording downloads run in background workers so the callback can acknowledge immediately
+RECORDING_DOWNLOADER = RecordingDownloader(
+    dest_dir="recordings",
+    workers=int(os.getenv("RECORDING_WORKERS", "2")),
+    queue_size=int(os.getenv("RECORDING_QUEUE_SIZE", "1000")),
+    max_retries=int(os.getenv("RECORDING_MAX_RETRIES", "4")),
+    auth=(os.getenv("TWILIO_ACCOUNT_SID") or "", os.getenv("TWILIO_AUTH_TOKEN") or ""),
+    session=HTTP_TRANSPORT.session,
+    timeout=HTTP_TRANSPORT.timeout,
+    on_event=append_call_log,
+    on_complete=record_download,
+    on_attempt=observe_recording_attempt
+)
+
 tags_metadata = [
     {
         "name": "twilio",
@@ -126,7 +426,51 @@ tags_metadata = [
     }
 ]
 
+async def warm_up_providers():
+    started = time.perf_counter()
+    await asyncio.gather(*(provider.warm() for provider in PROVIDERS))
+    logger.info("Provider warm-up finished in %.3fs: %s", time.perf_counter() - started,
+                {p.name: p.status()["state"] for p in PROVIDERS})
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Start and stop background resources owned by the app."""
+    configure_logging()
+    warmup = asyncio.create_task(warm_up_providers()) if WARM_UP_PROVIDERS else None
+    RESPONSE_CACHE.load()
+    CALL_LOG_WRITER.start()
+    CALL_STORE.start()
+    await RECORDING_DOWNLOADER.start()
+    await CAMPAIGN_SCHEDULER.start()
+    compressor = asyncio.create_task(compress_call_logs_periodically())
+    sweeper = asyncio.create_task(sweep_calls_periodically(CALL_SWEEP_INTERVAL_SECONDS))
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag(LOOP_LAG, LOOP_LAG_LAST))
+    project_watcher = (asyncio.create_task(TENANTS.watch(PROJECTS_RELOAD_SECONDS, record_project_reload))
+                       if PROJECTS_FILE and PROJECTS_RELOAD_SECONDS > 0 else None)
+    schedule_prompt_render(load=True)
+    yield
+    if PROMPT_RENDER["task"]:
+        PROMPT_RENDER["task"].cancel()
+    if project_watcher:
+        project_watcher.cancel()
+    if warmup:
+        warmup.cancel()
+    if LEAD_ANALYTICS["task"]:
+        LEAD_ANALYTICS["task"].cancel()
+    lag_monitor.cancel()
+    sweeper.cancel()
+    compressor.cancel()
+    await CAMPAIGN_SCHEDULER.stop()
+    await RECORDING_DOWNLOADER.stop()
+    await RECORDING_PROCESSOR.stop()
+    llm_executor.shutdown(wait=False, cancel_futures=True)
+    CALL_LOG_WRITER.stop()
+    CALL_STORE.stop()
+    RESPONSE_CACHE.save()
+    HTTP_TRANSPORT.close()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Real Estate Voice Agent API",
     description="AI powered bilingual (English/Hindi) real estate voice assistant integrating Twilio + Gemini.",
     version="1.0.0",
@@ -146,6 +490,7 @@ app = FastAPI(
 class OutboundCallRequest(BaseModel):
     to_number: Optional[str] = Field(None, description="Destination E.164 number; falls back to TARGET_PHONE_NUMBER.")
     language_pref: str = Field("both", description="Greeting language: english | hindi | both")
+    project: Optional[str] = Field(None, description="Project key or campaign code; the default project if omitted.")
 
 class OutboundCallResponse(BaseModel):
     call_sid: str
@@ -153,12 +498,16 @@ class OutboundCallResponse(BaseModel):
     to: str
 
 class ConversationEntry(BaseModel):
+    seq: int
     timestamp: str
     speaker: str
     text: str
+    call_sid: Optional[str] = None
 
 class ConversationLogResponse(BaseModel):
     count: int
+    buffered: int = Field(..., description="Entries currently retained in the ring buffer")
+    next_cursor: Optional[int] = Field(None, description="Pass as `cursor` to continue or to poll for newer entries")
     log: List[ConversationEntry]
 
 class ConfigResponse(BaseModel):
@@ -166,16 +515,164 @@ class ConfigResponse(BaseModel):
     target_number: Optional[str]
     has_api_key: bool
 
+class ProjectResponse(BaseModel):
+    key: str
+    company: str
+    project: str
+    location: str
+    starting_price: str
+    unit_types: str
+    numbers: List[str] = Field(..., description="Twilio numbers routed to this project")
+    campaigns: List[str] = Field(..., description="Campaign codes routed to this project")
+
+class ProjectsResponse(BaseModel):
+    path: Optional[str] = Field(None, description="PROJECTS_FILE, if set")
+    reloads: int
+    loaded_at: Optional[float]
+    error: Optional[str] = Field(None, description="Last failed reload; the previous config is still served")
+    projects: List[ProjectResponse]
+
 class HealthResponse(BaseModel):
     status: str
     timestamp: str
 
-def get_gemini_response(question: str, _language_pref: str = "both") -> Optional[str]:
-    """AI response generator with detailed real estate agent persona."""
-    logger.info(f"Gemini generating for: {question}")
-    try:
-        system_prompt = f"""You are a friendly, trustworthy real-estate sales agent for {COMPANY_NAME} selling apartments at {PROJECT_NAME}{(' in ' + PROJECT_LOCATION) if PROJECT_LOCATION else ''}.
-            Inventory: {UNIT_TYPES}. Pricing starts from {STARTING_PRICE} (all-inclusive ranges only if asked).
+class ProviderStatus(BaseModel):
+    state: str = Field(..., description="pending, initializing, ready or failed")
+    init_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    providers: dict[str, ProviderStatus]
+
+class CallRecord(BaseModel):
+    call_sid: str
+    started_at: str
+    ended_at: Optional[str] = None
+    from_number: Optional[str] = None
+    to_number: Optional[str] = None
+    status: Optional[str] = None
+    log_path: Optional[str] = None
+
+class CallListResponse(BaseModel):
+    count: int
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page; null on the last page")
+    calls: List[CallRecord]
+
+class CallEvent(BaseModel):
+    id: int
+    call_sid: str
+    ts: str
+    type: str = Field(..., description="USER | ASSISTANT | STATUS | RECORDING | NAME_CAPTURED | ...")
+    text: str
+
+class CallEventListResponse(BaseModel):
+    count: int
+    next_cursor: Optional[str] = None
+    events: List[CallEvent]
+
+class LeadAnalyticsRun(BaseModel):
+    logs: int = Field(..., description="Call logs found")
+    parsed: int = Field(..., description="New or changed logs parsed by this run")
+    skipped: int = Field(..., description="Logs unchanged since an earlier run")
+    rows: int
+    workers: int
+    seconds: float
+    output: str
+
+class LeadSummary(BaseModel):
+    calls: int
+    projects: dict[str, int]
+    tiers: dict[str, int]
+    unit_preference: dict[str, int]
+    financing: dict[str, int]
+    timeline: dict[str, int]
+    site_visits: int
+
+class LeadAnalyticsResponse(BaseModel):
+    running: bool
+    last_run: Optional[LeadAnalyticsRun] = None
+    error: Optional[str] = None
+    summary: Optional[LeadSummary] = None
+
+class CacheStatsResponse(BaseModel):
+    entries: int
+    max_entries: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+    persistent: bool = Field(..., description="Whether RESPONSE_CACHE_FILE persistence is enabled")
+
+class CampaignStatusResponse(BaseModel):
+    campaign_id: str
+    state: str = Field(..., description="running | completed | canceled")
+    total: int
+    live: int = Field(..., description="Calls currently dialing or in progress")
+    attempts: int
+    counts: dict[str, int] = Field(..., description="Leads per status (pending, live, retry, completed, busy, no-answer, ...)")
+    max_concurrent: int
+    max_attempts: int
+    created_at: float
+    finished_at: Optional[float] = None
+    leads: Optional[List[dict]] = None
+
+class CampaignListResponse(BaseModel):
+    count: int
+    campaigns: List[CampaignStatusResponse]
+
+class RecordingBackfillResponse(BaseModel):
+    queued: int = Field(..., description="Recordings newly queued for post-processing")
+    pending: int = Field(..., description="Recordings queued or running in total")
+
+class LifecycleStatsResponse(BaseModel):
+    live: int = Field(..., description="Calls with state and no terminal status yet")
+    ending: int = Field(..., description="Ended calls waiting out the grace period")
+    evicted: int = Field(..., description="Calls whose state was evicted since startup")
+    leaked: int = Field(..., description="Evicted calls that went idle without a terminal status")
+    adopted: int = Field(..., description="Orphaned state entries picked up by the sweeper")
+    sweeps: int
+    grace_seconds: float
+    idle_ttl_seconds: float
+
+class BreakerStats(BaseModel):
+    name: str = Field(..., description="Model behind this breaker")
+    state: str = Field(..., description="closed | open | half_open")
+    recent_calls: int = Field(..., description="Calls in the sliding window")
+    failure_rate: float
+    slow_rate: float
+    retry_in_seconds: float = Field(..., description="Time until an open breaker lets a probe through")
+    opened: int = Field(..., description="Times the breaker has opened since startup")
+    short_circuited: int = Field(..., description="Requests that skipped this model because the breaker was open")
+
+class BulkheadStats(BaseModel):
+    max_concurrent: int
+    queue_timeout: float
+    in_flight: int
+    waiting: int
+    rejected: int = Field(..., description="Requests that found no free slot within the queue timeout")
+    abandoned: int = Field(..., description="Slots still held by timed-out generations whose upstream request is running")
+
+class LLMResilienceResponse(BaseModel):
+    models: List[str] = Field(..., description="Fallback order; a local templated answer follows the last model")
+    bulkhead: BulkheadStats
+    breakers: List[BreakerStats]
+
+class IntentStatsResponse(BaseModel):
+    turns: int = Field(..., description="Caller turns evaluated by the intent engine")
+    hits: int = Field(..., description="Turns answered locally without Gemini")
+    misses: int = Field(..., description="Turns sent to Gemini")
+    hit_rate: float
+    hits_by_intent: dict[str, int]
+    avg_llm_latency_ms: float = Field(..., description="Mean observed Gemini latency")
+    estimated_llm_seconds_saved: float = Field(..., description="hits x mean Gemini latency")
+
+@lru_cache(maxsize=16)
+def build_persona_prompt(company: str, project: str, location: str, price: str, unit_types: str) -> str:
+    """Static real estate agent persona, built once per project config and sent as the system instruction."""
+    return f"""You are a friendly, trustworthy real-estate sales agent for {company} selling apartments at {project}{(' in ' + location) if location else ''}.
+            Inventory: {unit_types}. Pricing starts from {price} (all-inclusive ranges only if asked).
 
             Primary goals:
             1) On the first turn: politely ASK the caller's name before sharing project details.
@@ -189,9 +686,10 @@ def get_gemini_response(question: str, _language_pref: str = "both") -> Optional
             - If asked out-of-scope, briefly answer if possible then steer back to the property.
             - Be transparent: if you don't know exact figures, give best range + offer brochure/price sheet.
             - Don't invent facts. Mention typical USPs only if true (quality construction, strong connectivity, amenities, RERA status, loan assistance).
+            - Remember what the caller already told you in this call; don't ask the same question twice.
 
             Project talking points (adapt/limit to truth):
-            - Starting price: {STARTING_PRICE}; configurations: {UNIT_TYPES}.
+            - Starting price: {price}; configurations: {unit_types}.
             - Highlights: good connectivity, essential amenities, quality construction, loan assistance (if applicable).
             - Next steps: share brochure/price sheet, answer queries, propose site visit slots.
 
@@ -206,26 +704,209 @@ def get_gemini_response(question: str, _language_pref: str = "both") -> Optional
             - If user is busy: offer to send brochure (WhatsApp/email) and propose a callback time.
             - If user wants to end: thank them and close politely.
 
-            User said: {question}
-
             Respond naturally following the guidelines above."""
-        
-        resp = model.generate_content(system_prompt)  # type: ignore
-        return resp.text.strip()
+
+@lru_cache(maxsize=256)
+def get_persona_model(model_name: str, persona: str):
+    """GenerativeModel with the persona as system instruction, reused across turns and calls."""
+    return GEMINI.get().GenerativeModel(model_name, system_instruction=persona)  # type: ignore
+
+def compile_tenant(project: Project) -> Tenant:
+    """Persona prompt, intent answers, speech hints and TwiML for one project."""
+    # Twilio posts back to the URLs in our TwiML, so a project's calls carry its key on every turn;
+    # the default project keeps the plain URLs
+    query = "" if project.key == DEFAULT_KEY else f"campaign={project.key}"
+    reply_hints, qualify_hints = project_hints(project, REPLY_HINTS, QUALIFY_HINTS)
+    return Tenant(
+        project=project,
+        persona=build_persona_prompt(project.company, project.project, project.location,
+                                     project.starting_price, project.unit_types),
+        # Local intent fast path for predictable questions (price, configurations, location, loans, site visits)
+        intents=build_intent_engine(project.company, project.project, project.location,
+                                    project.starting_price, project.unit_types),
+        twiml=TwimlTemplates(
+            with_query(CALLBACK_URL, query) if query else CALLBACK_URL,
+            with_query(RESULT_URL, query) if query else RESULT_URL,
+            project.company, project.unit_types, project.starting_price, PENDING_POLL_SECONDS, STREAM_URL,
+            reply_hints=reply_hints, qualify_hints=qualify_hints,
+            stream_parameters={"campaign": project.key},
+            audio=(lambda text, voice: PROMPT_AUDIO.url(text, voice["voice"], voice["language"]))
+            if PROMPT_AUDIO else None,
+        ),
+        cache_config=(GEMINI_MODEL, project.company, project.project, project.location,
+                      project.starting_price, project.unit_types),
+        from_number=project.numbers[0] if project.numbers else TWILIO_PHONE_NUMBER,
+    )
+
+TENANTS = TenantRegistry(
+    compile_tenant,
+    Project(DEFAULT_KEY, COMPANY_NAME, PROJECT_NAME, PROJECT_LOCATION, STARTING_PRICE, UNIT_TYPES),
+    PROJECTS_FILE or None,
+)
+PROJECT_RELOADS = METRICS.counter("voice_agent_project_reloads_total",
+                                  "Reloads of PROJECTS_FILE after it changed, by outcome (ok, error)", ("outcome",))
+METRICS.gauge("voice_agent_projects", "Projects served, including the default", fn=lambda: len(TENANTS))
+
+def record_project_reload(ok: bool, error: Optional[str]):
+    PROJECT_RELOADS.inc(outcome="ok" if ok else "error")
+    log_conversation("SYSTEM", f"Projects reloaded from {PROJECTS_FILE}: {len(TENANTS)} project(s)" if ok
+                     else f"Projects reload from {PROJECTS_FILE} failed, keeping current config: {error}")
+    if ok:
+        # New or changed projects have prompts that are not rendered yet
+        schedule_prompt_render()
+
+PROMPT_AUDIO_REQUESTS = METRICS.counter("voice_agent_prompt_audio_requests_total",
+                                        "Prompt audio requests by response status", ("status",))
+METRICS.gauge("voice_agent_prompt_assets", "Pre-rendered prompt recordings available",
+              fn=lambda: len(PROMPT_AUDIO) if PROMPT_AUDIO else 0)
+
+async def render_prompt_audio(load: bool):
+    """Render every project's fixed prompts that have no recording yet, then recompile the
+    projects so their TwiML plays them. Calls keep <Say> for anything not rendered."""
+    added = await asyncio.to_thread(PROMPT_AUDIO.load) if load else 0
+    while True:
+        PROMPT_RENDER["again"] = False
+        started = time.perf_counter()
+        prompts = [prompt for tenant in TENANTS.tenants() for prompt in tenant.twiml.prompts]
+        rendered = await PROMPT_AUDIO.render(prompts)
+        if added or rendered:
+            await asyncio.to_thread(TENANTS.rebuild)
+            logger.info("Prompt audio: %s recording(s), %s rendered in %.2fs", len(PROMPT_AUDIO), rendered,
+                        time.perf_counter() - started)
+        added = 0
+        # A reload while rendering may have brought in more prompts
+        if not PROMPT_RENDER["again"]:
+            return
+
+def schedule_prompt_render(load: bool = False):
+    if PROMPT_AUDIO is None:
+        return
+    task = PROMPT_RENDER["task"]
+    if task is not None and not task.done():
+        PROMPT_RENDER["again"] = True
+        return
+    PROMPT_RENDER["task"] = asyncio.create_task(render_prompt_audio(load))
+
+def get_gemini_response(question: str, _language_pref: str = "both", history: Optional[list] = None,
+                        model_name: str = GEMINI_MODEL, persona: Optional[str] = None) -> Optional[str]:
+    """AI response generator with detailed real estate agent persona.
+
+    `history` holds earlier turns of the call in Gemini `contents` format; `persona` defaults
+    to the default project's.
+    """
+    logger.debug("Gemini generating for: %s", question)
+    try:
+        persona = persona or TENANTS.default.persona
+        contents = list(history or []) + [{"role": "user", "parts": [question]}]
+        with STAGE_SECONDS.time(handler="gemini", stage="generate"):
+            resp = get_persona_model(model_name, persona).generate_content(contents, request_options={"timeout": LLM_TIMEOUT_SECONDS})
+        text = resp.text.strip()
+        LLM_REQUESTS.inc(outcome="ok")
+        return text
     except Exception as e:
-        logger.error(f"Gemini error: {e}")
+        logger.error("Gemini error: %s", e)
+        LLM_REQUESTS.inc(outcome="error")
         return None
 
-def log_conversation(speaker: str, text: str):
-    conversation_log.append({"timestamp": datetime.utcnow().isoformat(), "speaker": speaker, "text": text})
+async def get_gemini_response_async(question: str, _language_pref: str = "both", timeout: Optional[float] = None,
+                                    history: Optional[list] = None, model_name: str = GEMINI_MODEL,
+                                    persona: Optional[str] = None) -> Optional[str]:
+    """Non-blocking wrapper around get_gemini_response with a hard per-turn deadline.
+
+    The generation runs in `llm_executor`. Raises asyncio.TimeoutError once the deadline passes;
+    a queued generation is cancelled and a running one is abandoned (its SDK request carries the same timeout).
+    An abandoned generation keeps the caller's bulkhead slot until its thread finishes, so timeouts
+    cannot pile up more upstream requests than the bulkhead admits.
+    """
+    deadline = timeout if timeout is not None else LLM_TIMEOUT_SECONDS
+    work = llm_executor.submit(get_gemini_response, question, _language_pref, history, model_name, persona)
+    slot = current_slot()
+    if slot is not None:
+        slot.hold_until(work)
+    future = asyncio.wrap_future(work)
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(future, timeout=deadline)
+        elapsed = time.perf_counter() - started
+        LLM_LATENCY["count"] += 1
+        LLM_LATENCY["total_seconds"] += elapsed
+        # Includes time queued for a free llm_executor worker
+        STAGE_SECONDS.observe(elapsed, handler="gemini", stage="total")
+        return result
+    except asyncio.TimeoutError:
+        logger.warning("Gemini (%s) exceeded %.1fs deadline", model_name, deadline)
+        LLM_REQUESTS.inc(outcome="timeout")
+        raise
+
+async def stream_gemini_response(question: str, history: Optional[list] = None, timeout: Optional[float] = None,
+                                 model_name: str = GEMINI_MODEL, persona: Optional[str] = None) -> AsyncIterator[str]:
+    """Yield Gemini's reply text chunk by chunk as it is generated.
+
+    The blocking SDK stream is consumed in `llm_executor` and handed over through a queue;
+    like get_gemini_response_async, the producer holds the caller's bulkhead slot until it returns.
+    Raises asyncio.TimeoutError if the next chunk takes longer than the deadline, and
+    RuntimeError if generation fails.
+    """
+    deadline = timeout if timeout is not None else LLM_TIMEOUT_SECONDS
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    done = object()
+    abandoned = False
+
+    def produce():
+        started = time.perf_counter()
+        try:
+            contents = list(history or []) + [{"role": "user", "parts": [question]}]
+            stream = get_persona_model(model_name, persona or TENANTS.default.persona).generate_content(
+                contents, stream=True, request_options={"timeout": LLM_TIMEOUT_SECONDS})
+            for chunk in stream:
+                if abandoned:
+                    return
+                text = chunk.text
+                if text:
+                    loop.call_soon_threadsafe(chunks.put_nowait, text)
+            LLM_REQUESTS.inc(outcome="ok")
+            STAGE_SECONDS.observe(time.perf_counter() - started, handler="gemini", stage="stream")
+            loop.call_soon_threadsafe(chunks.put_nowait, done)
+        except Exception as e:
+            logger.error("Gemini stream error: %s", e)
+            LLM_REQUESTS.inc(outcome="error")
+            loop.call_soon_threadsafe(chunks.put_nowait, e)
+
+    work = llm_executor.submit(produce)
+    slot = current_slot()
+    if slot is not None:
+        # The producer may be blocked in the SDK when the caller gives up; it keeps the slot until it returns
+        slot.hold_until(work)
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(chunks.get(), timeout=deadline)
+            except asyncio.TimeoutError:
+                logger.warning("Gemini stream stalled for %.1fs", deadline)
+                LLM_REQUESTS.inc(outcome="timeout")
+                raise
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise RuntimeError("Gemini stream failed") from item
+            yield item
+    finally:
+        # Stops the producer at its next chunk if the caller hung up or barged in
+        abandoned = True
+
+def log_conversation(speaker: str, text: str, call_sid: Optional[str] = None):
+    conversation_log.append(speaker, text, call_sid)
 
 
-def initiate_twilio_call(to_number=None, language_pref="both"):
-    """Initiate a phone call using Twilio."""
-    logger.info(f"Initiating Twilio call to {to_number} with language pref: {language_pref}")
+def initiate_twilio_call(to_number=None, language_pref="both", project=None):
+    """Initiate a phone call using Twilio, for `project` (a project key or campaign code) or the default project."""
+    logger.info("Initiating Twilio call to %s with language pref: %s", to_number, language_pref)
     try:
+        tenant = TENANTS.resolve(project)
+        from_number = tenant.from_number
         phone_number = to_number or TARGET_PHONE_NUMBER
-        logger.debug(f"Resolved phone number: {phone_number}")
+        logger.debug("Resolved phone number: %s", phone_number)
         
         if not phone_number:
             logger.error("No target phone number configured")
@@ -233,95 +914,404 @@ def initiate_twilio_call(to_number=None, language_pref="both"):
             print("Please set TARGET_PHONE_NUMBER in your .env file")
             return None
         
-        if not TWILIO_PHONE_NUMBER:
+        if not from_number:
             logger.error("No Twilio phone number configured")
             print("❌ Error: No Twilio phone number configured.")
             print("Please set TWILIO_PHONE_NUMBER in your .env file")
             return None
         
-        logger.info(f"📞 Initiating call to {phone_number}...")
-        logger.info(f"🌐 Using callback URL: {CALLBACK_URL}")
-        
-        # Create TwiML for the call
-        twiml = VoiceResponse()
-        logger.debug("Created initial TwiML response object.")
+        logger.info("📞 Initiating call to %s...", phone_number)
+        logger.info("🌐 Using callback URL: %s", CALLBACK_URL)
         
-        # Initial greeting: ask for name first (no project details yet)
-        if language_pref == "english":
-            greeting = f"Hello! This is your real estate advisor from {COMPANY_NAME}. Before we begin, may I know your name?"
-            voice = 'Polly.Joanna'; lang = 'en-US'
-        elif language_pref == "hindi":
-            greeting = f"नमस्ते! मैं {COMPANY_NAME} से आपका रियल एस्टेट सलाहकार हूँ। शुरू करने से पहले, आपका नाम जान सकता/सकती हूँ?"
-            voice = 'Polly.Aditi'; lang = 'hi-IN'
+        # Greeting TwiML is precompiled per language preference: ask for name first (no project details yet).
+        # In stream mode the call is connected to the media WebSocket, which greets the callee itself.
+        twiml_templates = tenant.twiml
+        if CONVERSATION_MODE == "stream":
+            template = twiml_templates.stream_connect
         else:
-            greeting = f"Hello! नमस्ते! I’m your real‑estate advisor from {COMPANY_NAME}. Before we begin, may I know your name?"
-            voice = 'Polly.Aditi'; lang = 'hi-IN'
-        
-        twiml.say(greeting, voice=voice, language=lang)
-        logger.debug(f"Added greeting to TwiML: {greeting}")
-        
-        # Gather input from the user with enhanced settings
-        gather = Gather(
-            input='speech',
-            action=CALLBACK_URL,
-            method='POST',
-            language='en-US hi-IN',  # Support both English and Hindi
-            speechTimeout='auto',
-            timeout=5,
-            profanityFilter=False,
-            hints='my name is, I am, this is, नाम, मेरा नाम'
-        )
-        # After the greeting above, Gather will capture the name
-        twiml.append(gather)
-        logger.debug("Added Gather block to TwiML for user input.")
-        
-        # If no input, redirect
-        twiml.say("I didn't hear you. Please tell me your name. मैंने नहीं सुना—कृपया अपना नाम बताइए।", voice='Polly.Aditi', language='hi-IN')
-        twiml.redirect(CALLBACK_URL)
+            template = twiml_templates.outbound_greeting.get(language_pref, twiml_templates.outbound_greeting["both"])
+        twiml = template.render().decode("utf-8")
         
         # Make the call
         status_callback_url = f"{PUBLIC_URL}/api/callback/twilio/status"
         recording_callback_url = f"{PUBLIC_URL}/api/callback/twilio/recording"
         
-        logger.info(f"Creating Twilio call: to={phone_number}, from={TWILIO_PHONE_NUMBER}")
-        logger.info(f"Voice callback: {CALLBACK_URL}")
-        logger.info(f"Status callback: {status_callback_url}")
-        logger.info(f"Recording callback: {recording_callback_url}")
+        logger.info("Creating Twilio call: to=%s, from=%s, project=%s", phone_number, from_number, tenant.key)
+        logger.info("Voice callback: %s", CALLBACK_URL)
+        logger.info("Status callback: %s", status_callback_url)
+        logger.info("Recording callback: %s", recording_callback_url)
         
-        call = twilio_client.calls.create(
-            to=phone_number,
-            from_=TWILIO_PHONE_NUMBER,
-            twiml=str(twiml),
-            record=True,  # Record the call
-            recording_status_callback=recording_callback_url,
-            status_callback=status_callback_url,
-            status_callback_event=['initiated', 'ringing', 'answered', 'completed']
-        )
+        with STAGE_SECONDS.time(handler="outbound", stage="twilio_create"):
+            call = TWILIO.get().calls.create(
+                to=phone_number,
+                from_=from_number,
+                twiml=twiml,
+                record=True,  # Record the call
+                recording_status_callback=recording_callback_url,
+                status_callback=status_callback_url,
+                status_callback_event=['initiated', 'ringing', 'answered', 'completed']
+            )
+        OUTBOUND_CALLS.inc(outcome="ok")
         
-        logger.info(f"Call initiated successfully! SID: {call.sid}, Status: {call.status}")
+        logger.info("Call initiated successfully! SID: %s, Status: %s", call.sid, call.status,
+                    extra={"call_sid": call.sid})
         print(f"✅ Call initiated successfully!")
         print(f"📞 Call SID: {call.sid}")
         print(f"📱 Calling: {phone_number}")
-        print(f"📞 From: {TWILIO_PHONE_NUMBER}")
+        print(f"📞 From: {from_number}")
         print(f"⏳ Status: {call.status}")
         
         # Log the call initiation
-        log_conversation("SYSTEM", f"Twilio call initiated to {phone_number}. Call SID: {call.sid}")
+        log_conversation("SYSTEM", f"Twilio call initiated to {phone_number}. Call SID: {call.sid}", str(call.sid))
         # Per-call log file
         create_call_log(str(call.sid))
-        append_call_log(str(call.sid), f"OUTBOUND to={phone_number} from={TWILIO_PHONE_NUMBER} status={call.status}")
+        append_call_log(str(call.sid), f"OUTBOUND to={phone_number} from={from_number} status={call.status}")
+        CALL_STORE.upsert_call(str(call.sid), started_at=datetime.utcnow().isoformat(),
+                               from_number=from_number, to_number=phone_number, status=call.status)
         logger.debug("Call initiation logged in conversation log.")
         
         return call
         
     except Exception as e:
-        logger.error(f"Error initiating Twilio call: {e}")
+        logger.error("Error initiating Twilio call: %s", e)
         logger.error(traceback.format_exc())
         print(f"❌ Error initiating Twilio call: {e}")
+        OUTBOUND_CALLS.inc(outcome="error")
         log_conversation("SYSTEM", f"Error initiating Twilio call: {e}")
         logger.debug("Error logged in conversation log.")
         return None
 
+# Bulk campaigns share one dial rate (Twilio CPS is per account); each campaign caps its live calls.
+# Only the worker holding the lease in the shared state store schedules campaigns.
+CAMPAIGN_SCHEDULER = CampaignScheduler(
+    dial=initiate_twilio_call,
+    calls_per_second=float(os.getenv("CAMPAIGN_CALLS_PER_SECOND", "1")),
+    max_concurrent=int(os.getenv("CAMPAIGN_MAX_CONCURRENT", "5")),
+    max_attempts=int(os.getenv("CAMPAIGN_MAX_ATTEMPTS", "3")),
+    retry_backoff_seconds=float(os.getenv("CAMPAIGN_RETRY_BACKOFF_SECONDS", "300")),
+    live_timeout_seconds=float(os.getenv("CAMPAIGN_LIVE_TIMEOUT_SECONDS", "1800")),
+    store=make_state_store(STATE_BACKEND, "campaigns", STATE_TIMEOUT_SECONDS),
+)
+
+async def require_campaign_leader():
+    """Campaigns live in the leader's memory; other workers can neither see nor start them."""
+    if not await CAMPAIGN_SCHEDULER.claim_leadership():
+        raise HTTPException(status_code=503, detail="Campaigns are scheduled by another worker; retry the request")
+
+# Gauges read at scrape time
+METRICS.gauge("voice_agent_active_calls", "Calls with state and no terminal status yet",
+              fn=lambda: CALL_LIFECYCLE.stats()["live"])
+METRICS.gauge("voice_agent_call_state_entries", "Entries in CALL_STATE", fn=lambda: len(CALL_STATE))
+METRICS.gauge("voice_agent_pending_turns", "Think-then-speak replies being generated in this process",
+              fn=lambda: len(PENDING_TURNS))
+METRICS.gauge("voice_agent_recording_queue_depth", "Recording downloads waiting for a worker",
+              fn=lambda: RECORDING_DOWNLOADER.pending())
+METRICS.gauge("voice_agent_recording_process_pending", "Recordings queued or running in the post-processing pool",
+              fn=lambda: RECORDING_PROCESSOR.pending())
+METRICS.gauge("voice_agent_response_cache_entries", "Cached Gemini replies", fn=lambda: RESPONSE_CACHE.stats()["entries"])
+METRICS.gauge("voice_agent_llm_breaker_open", "1 when a model's circuit breaker is open, 0.5 when half-open", ("model",),
+              fn=lambda: {b["name"]: {"closed": 0, "half_open": 0.5, "open": 1}[b["state"]] for b in LLM_GUARD.stats()["breakers"]})
+METRICS.gauge("voice_agent_llm_in_flight", "Generations holding a bulkhead slot", fn=lambda: LLM_GUARD.bulkhead.in_flight)
+METRICS.gauge("voice_agent_llm_waiting", "Generations waiting for a bulkhead slot", fn=lambda: LLM_GUARD.bulkhead.waiting)
+METRICS.gauge("voice_agent_http_connections_opened", "Connections opened by the shared outbound HTTP pool",
+              fn=lambda: HTTP_TRANSPORT.stats()["connections_opened"])
+METRICS.gauge("voice_agent_http_requests", "Requests sent through the shared outbound HTTP pool",
+              fn=lambda: HTTP_TRANSPORT.stats()["requests"])
+METRICS.gauge("voice_agent_campaign_live_calls", "Live calls across running campaigns",
+              fn=lambda: sum(c.live for c in CAMPAIGN_SCHEDULER.list() if c.state == "running"))
+
+def build_reply_twiml(tenant: Tenant, ai_resp: str, seq: int) -> bytes:
+    """TwiML that speaks an assistant reply and gathers the caller's next utterance (turn `seq`)."""
+    return tenant.twiml.reply.render(reply=ai_resp, seq=seq)
+
+def build_holding_twiml(tenant: Tenant, turn: int, seq: int, filler: bool = True, wait: int = 0) -> bytes:
+    """TwiML that keeps the caller on the line and redirects to the pending-result endpoint."""
+    return tenant.twiml.holding[filler].render(turn=turn, wait=wait, seq=seq)
+
+async def remember_exchange(call_sid: Optional[str], speech: str, reply: str):
+    """Record a caller/agent exchange in the call's bounded conversation memory."""
+    def remember(state: dict):
+        conversation_memory.remember_turn(state, "user", speech, HISTORY_CHAR_BUDGET, SUMMARY_CHAR_BUDGET)
+        conversation_memory.remember_turn(state, "model", reply, HISTORY_CHAR_BUDGET, SUMMARY_CHAR_BUDGET)
+    if call_sid:
+        await CALL_STATE.aupdate(call_sid, remember)
+
+async def generate_reply(tenant: Tenant, call_sid: Optional[str], speech: str, timeout: Optional[float] = None) -> str:
+    """Generate and log the assistant reply for one caller utterance."""
+    state = await CALL_STATE.aget(call_sid) if call_sid else None
+    caller_name = (state or {}).get("name") or ""
+    # Replies only depend on the utterance until the call has history, so only those are cacheable;
+    # the caller's name is stored as a placeholder so a cached reply can be reused for other callers.
+    cacheable = not conversation_memory.has_context(state)
+    cache_key = ResponseCache.make_key(speech, tenant.cache_config)
+    cached = RESPONSE_CACHE.get(cache_key) if cacheable else None
+    if cached is not None:
+        TURNS.inc(path="cache")
+        append_call_log(call_sid, "CACHE_HIT")
+        ai_resp = cached.replace(CACHE_NAME_PLACEHOLDER, caller_name)
+    else:
+        TURNS.inc(path="llm")
+        # Generate AI response from the persona, recent turns and running summary (off the event loop),
+        # falling back to the cheaper model and then to a local templated answer
+        question = conversation_memory.framed_utterance(state, speech)
+        history = conversation_memory.history_contents(state)
+        generated, model, outcome = await LLM_GUARD.generate(
+            lambda model_name, seconds: get_gemini_response_async(question, timeout=seconds, history=history,
+                                                                  model_name=model_name, persona=tenant.persona),
+            timeout if timeout is not None else LLM_TIMEOUT_SECONDS,
+        )
+        if generated:
+            ai_resp = generated
+            LLM_REPLIES.inc(tier=model)
+            if model != GEMINI_MODEL:
+                append_call_log(call_sid, f"LLM_FALLBACK model={model}")
+        else:
+            ai_resp = tenant.intents.degraded_answer(speech)
+            LLM_REPLIES.inc(tier="local")
+            LLM_FALLBACKS.inc(reason=outcome)
+            append_call_log(call_sid, f"LLM_FALLBACK local reason={outcome}")
+        # Only primary-model replies are cached; fallback replies should not outlive the incident
+        if generated and cacheable and model == GEMINI_MODEL:
+            RESPONSE_CACHE.put(cache_key, replace_name(generated, caller_name, CACHE_NAME_PLACEHOLDER))
+            if RESPONSE_CACHE.needs_save():
+                asyncio.get_running_loop().run_in_executor(None, RESPONSE_CACHE.save)
+    await remember_exchange(call_sid, speech, ai_resp)
+    log_conversation("ASSISTANT", ai_resp, call_sid)
+    append_call_log(call_sid, f"ASSISTANT {ai_resp}")
+    logger.info("Sending AI response: %.100s...", ai_resp, extra={"call_sid": call_sid})
+    return ai_resp
+
+async def capture_caller_name(call_sid: Optional[str], speech: str) -> Optional[str]:
+    """Store the first utterance of a call as the caller's name; returns it, or None once a name is known."""
+    def capture(state: dict) -> Optional[str]:
+        if state.get("name") not in (None, ""):
+            return None
+        name_text = speech.strip()
+        # Heuristic: take first 2 words max as name
+        parts = name_text.split()
+        state["name"] = " ".join(parts[:2]) if parts else name_text
+        state["stage"] = "qualified_intro"
+        return state["name"]
+    return await CALL_STATE.aupdate(call_sid, capture) if call_sid else None
+
+async def start_pending_turn(tenant: Tenant, call_sid: str, speech: str) -> int:
+    """Start generating the reply in the background and return its turn number.
+
+    The finished reply is also written to the call state, so a result poll that lands
+    on another worker can serve it.
+    """
+    def next_turn(state: dict) -> int:
+        turn = state["turn"] = state.get("turn", 0) + 1
+        state.setdefault("pending", {})[str(turn)] = None
+        return turn
+    turn = await CALL_STATE.aupdate(call_sid, next_turn, default={"name": None, "stage": "intro"})
+    PENDING_TURNS[(call_sid, turn)] = asyncio.create_task(run_pending_turn(tenant, call_sid, turn, speech))
+    append_call_log(call_sid, f"PENDING turn={turn}")
+    return turn
+
+async def run_pending_turn(tenant: Tenant, call_sid: str, turn: int, speech: str) -> str:
+    try:
+        ai_resp = await generate_reply(tenant, call_sid, speech, timeout=PENDING_TURN_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.error("Pending turn %s for %s failed: %s", turn, call_sid, e, extra={"call_sid": call_sid})
+        ai_resp = LLM_TIMEOUT_FALLBACK
+    def store_reply(state: dict):
+        state.setdefault("pending", {})[str(turn)] = ai_resp
+    await CALL_STATE.aupdate(call_sid, store_reply)
+    return ai_resp
+
+async def take_pending_reply(call_sid: str, turn: int) -> tuple[bool, Optional[str]]:
+    """Return (known, reply) for a think-then-speak turn; a known turn with no reply is still generating."""
+    def take(state: dict) -> tuple[bool, Optional[str]]:
+        pending = state.get("pending", {})
+        if str(turn) not in pending:
+            return False, None
+        reply = pending[str(turn)]
+        if reply is not None:
+            del pending[str(turn)]
+        return True, reply
+    return await CALL_STATE.aupdate(call_sid, take) or (False, None)
+
+async def stream_reply(tenant: Tenant, call_sid: str, speech: str) -> AsyncIterator:
+    """Reply to one media-stream utterance as a stream of text (and HANGUP after the farewell).
+
+    Same turn logic as the voice webhook: name capture, farewell, templated intents, then
+    Gemini, whose output is yielded as it arrives so speech can start on the first sentence.
+    If the caller barges in, the exchange is remembered with whatever was generated so far.
+    """
+    await CALL_LIFECYCLE.atouch(call_sid)
+    log_conversation("USER", speech, call_sid)
+    append_call_log(call_sid, f"USER {speech}")
+    caller_name = await capture_caller_name(call_sid, speech)
+    if caller_name is not None:
+        TURNS.inc(path="name")
+        append_call_log(call_sid, f"NAME_CAPTURED {caller_name}")
+        yield tenant.twiml.name_intro_text(caller_name)
+        return
+    if tenant.intents.is_end_of_call(speech):
+        TURNS.inc(path="farewell")
+        log_conversation("ASSISTANT", FAREWELL, call_sid)
+        append_call_log(call_sid, f"ASSISTANT {FAREWELL}")
+        yield FAREWELL
+        yield HANGUP
+        return
+    match = tenant.intents.respond(speech)
+    if match is not None:
+        TURNS.inc(path="intent")
+        log_conversation("ASSISTANT", match.answer, call_sid)
+        append_call_log(call_sid, f"INTENT {match.intent}")
+        append_call_log(call_sid, f"ASSISTANT {match.answer}")
+        await remember_exchange(call_sid, speech, match.answer)
+        yield match.answer
+        return
+
+    TURNS.inc(path="stream")
+    state = await CALL_STATE.aget(call_sid)
+    spoken: list[str] = []
+    try:
+        model = LLM_GUARD.available_model()
+        outcome = "breaker_open" if model is None else "ok"
+        if model is not None:
+            started = time.perf_counter()
+            judged = False
+            try:
+                async with LLM_GUARD.bulkhead.slot():
+                    async for chunk in stream_gemini_response(conversation_memory.framed_utterance(state, speech),
+                                                              conversation_memory.history_contents(state),
+                                                              model_name=model, persona=tenant.persona):
+                        spoken.append(chunk)
+                        yield chunk
+                LLM_GUARD.record(model, True, time.perf_counter() - started)
+                judged = True
+                LLM_REPLIES.inc(tier=model)
+            except BulkheadFull:
+                outcome = "bulkhead_full"
+            except (asyncio.TimeoutError, RuntimeError) as e:
+                LLM_GUARD.record(model, False, time.perf_counter() - started)
+                judged = True
+                outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+            finally:
+                if not judged:
+                    # Rejected by the bulkhead, or cut off by barge-in/hang-up: no verdict on the model
+                    LLM_GUARD.release(model)
+        if outcome != "ok":
+            LLM_FALLBACKS.inc(reason=outcome)
+            if not spoken:
+                LLM_REPLIES.inc(tier="local")
+                spoken.append(tenant.intents.degraded_answer(speech))
+                yield spoken[-1]
+    finally:
+        ai_resp = "".join(spoken).strip()
+        if ai_resp:
+            await remember_exchange(call_sid, speech, ai_resp)
+            log_conversation("ASSISTANT", ai_resp, call_sid)
+            append_call_log(call_sid, f"ASSISTANT {ai_resp}")
+
+async def hang_up_call(call_sid: str):
+    """End a media-stream call through the REST API once the farewell has played."""
+    try:
+        await asyncio.to_thread(lambda: TWILIO.get().calls(call_sid).update(status="completed"))
+    except Exception as e:
+        logger.warning("Hang-up for %s failed: %s", call_sid, e, extra={"call_sid": call_sid})
+
+def start_stream_call(tenant: Tenant, call_sid: str):
+    CALL_LIFECYCLE.touch(call_sid)
+    if CALL_STATE.add(call_sid, {"name": None, "stage": "intro"}):
+        CALL_STORE.upsert_call(call_sid, started_at=datetime.utcnow().isoformat())
+    create_call_log(call_sid)
+    append_call_log(call_sid, f"PROJECT {tenant.key}")
+    log_conversation("ASSISTANT", tenant.twiml.inbound_greeting_text, call_sid)
+    append_call_log(call_sid, f"ASSISTANT {tenant.twiml.inbound_greeting_text}")
+
+def log_stream_event(call_sid: str, message: str):
+    if message == "BARGE_IN":
+        STREAM_BARGE_INS.inc()
+    append_call_log(call_sid, message)
+
+def webhook_key(seq: Optional[int], speech: Optional[str], token: Optional[str]) -> Optional[str]:
+    """Dedupe key for a voice webhook: the Gather's turn sequence plus a hash of the speech.
+
+    Requests without a sequence (e.g. TwiML issued before it was added) fall back to
+    Twilio's I-Twilio-Idempotency-Token; with neither they are not deduplicated.
+    """
+    if seq is not None:
+        return f"{seq}:{hashlib.sha1((speech or '').encode('utf-8')).hexdigest()[:16]}"
+    return f"token:{token}" if token else None
+
+async def claim_webhook(call_sid: str, key: str) -> Optional[tuple[bool, Optional[str]]]:
+    """Claim a webhook for processing. Returns (claimed, TwiML of the first attempt if it finished),
+    or None when the call has no state yet."""
+    def claim(state: dict) -> tuple[bool, Optional[str]]:
+        seen = state.setdefault("webhooks", {})
+        if key in seen:
+            return False, seen[key]
+        seen[key] = None
+        while len(seen) > WEBHOOK_DEDUPE_KEEP:
+            del seen[next(iter(seen))]
+        return True, None
+    return await CALL_STATE.aupdate(call_sid, claim)
+
+async def settle_webhook(call_sid: str, key: str, twiml: Optional[bytes]):
+    """Store the answer for a claimed webhook, or release the claim (None) so a retry reprocesses it."""
+    def settle(state: dict):
+        seen = state.setdefault("webhooks", {})
+        if twiml is None:
+            seen.pop(key, None)
+        else:
+            seen[key] = twiml.decode("utf-8")
+    await CALL_STATE.aupdate(call_sid, settle)
+
+async def wait_for_webhook(call_sid: str, key: str, timeout: float) -> Optional[bytes]:
+    """TwiML of an in-flight first attempt: awaited directly if it runs here, polled from CALL_STATE otherwise."""
+    future = INFLIGHT_WEBHOOKS.get((call_sid, key))
+    if future is not None:
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            return None
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+        twiml = ((await CALL_STATE.aget(call_sid) or {}).get("webhooks") or {}).get(key)
+        if twiml is not None:
+            return twiml.encode("utf-8")
+    return None
+
+async def deduplicated(call_sid: Optional[str], key: Optional[str], handle: Callable[[], Awaitable[Response]],
+                       fallback: Callable[[], bytes]) -> Response:
+    """Run `handle` once per (call, key); Twilio retries get the first attempt's TwiML instead.
+
+    A retry that arrives while the first attempt is still running waits for it. If the first
+    attempt never finishes (e.g. its worker died), the retry answers with `fallback`.
+    """
+    claimed = await claim_webhook(call_sid, key) if call_sid and key else None
+    if claimed is None:
+        return await handle()
+    is_first, twiml = claimed
+    if not is_first:
+        state = "completed" if twiml is not None else "in_flight"
+        body = twiml.encode("utf-8") if twiml is not None else await wait_for_webhook(call_sid, key, WEBHOOK_RETRY_WAIT_SECONDS)
+        if body is None:
+            state = "expired"
+            body = fallback()
+        WEBHOOK_RETRIES.inc(state=state)
+        logger.info("Retried webhook for %s (key=%s) answered from first attempt (%s)", call_sid, key, state,
+                    extra={"call_sid": call_sid})
+        return Response(content=body, media_type="application/xml")
+    future = asyncio.get_running_loop().create_future()
+    INFLIGHT_WEBHOOKS[(call_sid, key)] = future
+    try:
+        response = await handle()
+    except BaseException:
+        await settle_webhook(call_sid, key, None)
+        future.cancel()
+        raise
+    finally:
+        INFLIGHT_WEBHOOKS.pop((call_sid, key), None)
+    await settle_webhook(call_sid, key, response.body)
+    future.set_result(response.body)
+    return response
+
 # ============================
 # FastAPI Helper & Middleware
 # ============================
@@ -340,139 +1330,182 @@ async def twilio_voice_webhook(
     From: Optional[str] = Form(None),
     To: Optional[str] = Form(None),
     CallSid: Optional[str] = Form(None),
-    Confidence: Optional[str] = Form(None)
+    Confidence: Optional[str] = Form(None),
+    seq: Optional[int] = Query(None, description="Turn sequence of the Gather that posted this request"),
+    campaign: Optional[str] = Query(None, description="Project key or campaign code; otherwise routed by To/From number"),
+    idempotency_token: Optional[str] = Header(None, alias="I-Twilio-Idempotency-Token")
 ):
-    """Handle initial Twilio voice interaction or subsequent Gather speech results."""
+    """Handle initial Twilio voice interaction or subsequent Gather speech results.
+
+    Twilio retries a slow webhook with the same form; a retry is answered with the first
+    attempt's TwiML (waiting for it if necessary) without generating or logging the turn again.
+    """
+    started = time.perf_counter()
+    next_seq = (seq or 0) + 1
+    tenant = TENANTS.resolve(campaign, To, From)
+    try:
+        return await deduplicated(
+            CallSid, webhook_key(seq, SpeechResult, idempotency_token),
+            lambda: handle_voice_webhook(tenant, request, SpeechResult, From, To, CallSid, Confidence, next_seq),
+            fallback=lambda: build_reply_twiml(tenant, LLM_TIMEOUT_FALLBACK, next_seq),
+        )
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, handler="voice", stage="total")
+
+async def handle_voice_webhook(tenant: Tenant, request: Request, SpeechResult: Optional[str], From: Optional[str],
+                               To: Optional[str], CallSid: Optional[str], Confidence: Optional[str],
+                               next_seq: int) -> Response:
     # Log all form data for debugging
-    form_data = await request.form()
-    logger.info(f"=" * 80)
-    logger.info(f"WEBHOOK RECEIVED - CallSid: {CallSid}")
-    logger.info(f"From: {From}, To: {To}")
-    logger.info(f"SpeechResult: {SpeechResult}")
-    logger.info(f"Confidence: {Confidence}")
-    logger.info(f"All form data: {dict(form_data)}")
-    logger.info(f"=" * 80)
+    with STAGE_SECONDS.time(handler="voice", stage="form"):
+        form_data = await request.form()
+    logger.info("Voice webhook: SID=%s speech=%r confidence=%s", CallSid, SpeechResult, Confidence,
+                extra={"call_sid": CallSid, "from_number": From, "to_number": To})
+    log_payload(logger, "Twilio form", form_data, CallSid)
     
     try:
-        vr = VoiceResponse()
+        with STAGE_SECONDS.time(handler="voice", stage="state"):
+            await CALL_LIFECYCLE.atouch(CallSid)
 
-        # Ensure call state exists
-        if CallSid and CallSid not in CALL_STATE:
-            CALL_STATE[CallSid] = {"name": None, "stage": "intro"}
+            # Ensure call state exists
+            if CallSid and await CALL_STATE.aadd(CallSid, {"name": None, "stage": "intro"}):
+                CALL_STORE.upsert_call(CallSid, started_at=datetime.utcnow().isoformat(), from_number=From, to_number=To)
+                append_call_log(CallSid, f"PROJECT {tenant.key}")
 
         if SpeechResult:
             # Log user speech
-            logger.info(f"Processing speech result: {SpeechResult}")
-            log_conversation("USER", SpeechResult)
+            log_conversation("USER", SpeechResult, CallSid)
             append_call_log(CallSid, f"USER {SpeechResult}")
             # Try to capture name if not set yet
-            if CallSid and CALL_STATE.get(CallSid, {}).get("name") in (None, ""):
-                name_text = SpeechResult.strip()
-                # Heuristic: take first 2 words max as name
-                parts = name_text.split()
-                caller_name = " ".join(parts[:2]) if parts else ""
-                CALL_STATE[CallSid]["name"] = caller_name or name_text
-                CALL_STATE[CallSid]["stage"] = "qualified_intro"
-                append_call_log(CallSid, f"NAME_CAPTURED {CALL_STATE[CallSid]['name']}")
+            with STAGE_SECONDS.time(handler="voice", stage="state"):
+                caller_name = await capture_caller_name(CallSid, SpeechResult)
+            if caller_name is not None:
+                TURNS.inc(path="name")
+                append_call_log(CallSid, f"NAME_CAPTURED {caller_name}")
 
                 # Personalized intro and next qualifying question
-                intro = (
-                    f"Nice to meet you, {CALL_STATE[CallSid]['name']}. "
-                    f"We have {UNIT_TYPES} homes with prices starting around {STARTING_PRICE}. "
-                    f"Do you prefer 1BHK, 2BHK or 3BHK—or a budget range?"
-                )
-                gather = Gather(
-                    input='speech',
-                    speechTimeout='auto',
-                    action=CALLBACK_URL,
-                    method='POST',
-                    language='en-US hi-IN',
-                    timeout=5,
-                    profanityFilter=False,
-                    hints='1BHK,2BHK,3BHK,budget,price,कीमत,बजट'
-                )
-                gather.say(intro, voice='Polly.Aditi', language='hi-IN')
-                vr.append(gather)
-                vr.say("If I didn’t hear you, please share your preferred configuration or budget.", voice='Polly.Joanna', language='en-US')
-                vr.redirect(CALLBACK_URL)
-                twiml_response = str(vr)
-                safe_log_twiml(twiml_response)
+                with STAGE_SECONDS.time(handler="voice", stage="twiml"):
+                    twiml_response = tenant.twiml.name_intro.render(caller_name=caller_name, seq=next_seq)
+                safe_log_twiml(twiml_response, CallSid)
                 return Response(content=twiml_response, media_type="application/xml")
             
-            # Check for end conversation keywords
-            end_keywords = ["goodbye", "bye", "end call", "hang up", "thank you bye", "that's all", "stop"]
-            if any(keyword in SpeechResult.lower() for keyword in end_keywords):
+            # Check for end conversation keywords, then for a templated answer
+            with STAGE_SECONDS.time(handler="voice", stage="intent"):
+                end_of_call = tenant.intents.is_end_of_call(SpeechResult)
+                match = None if end_of_call else tenant.intents.respond(SpeechResult)
+            if end_of_call:
                 logger.info("User requested to end call")
-                farewell = "Thank you for calling! Have a great day! धन्यवाद और शुभ दिन!"
-                log_conversation("ASSISTANT", farewell)
-                append_call_log(CallSid, f"ASSISTANT {farewell}")
-                vr.say(farewell, voice='Polly.Aditi', language='hi-IN')
-                vr.hangup()
+                TURNS.inc(path="farewell")
+                log_conversation("ASSISTANT", FAREWELL, CallSid)
+                append_call_log(CallSid, f"ASSISTANT {FAREWELL}")
+                twiml_response = tenant.twiml.farewell.render()
+            elif match is not None:
+                # Templated answer from project config; no Gemini round trip
+                TURNS.inc(path="intent")
+                log_conversation("ASSISTANT", match.answer, CallSid)
+                append_call_log(CallSid, f"INTENT {match.intent}")
+                append_call_log(CallSid, f"ASSISTANT {match.answer}")
+                await remember_exchange(CallSid, SpeechResult, match.answer)
+                with STAGE_SECONDS.time(handler="voice", stage="twiml"):
+                    twiml_response = build_reply_twiml(tenant, match.answer, next_seq)
+                safe_log_twiml(twiml_response, CallSid)
+                return Response(content=twiml_response, media_type="application/xml")
             else:
-                # Generate AI response with project framing
-                ai_resp = get_gemini_response(
-                    f"Project: {PROJECT_NAME} by {COMPANY_NAME} {('in ' + PROJECT_LOCATION) if PROJECT_LOCATION else ''}. "
-                    f"Inventory: {UNIT_TYPES}. Starting price: {STARTING_PRICE}.\n"
-                    f"User said: {SpeechResult}\n"
-                    f"Respond briefly (2-3 short sentences) and end with one relevant question."
-                ) or "I'm having trouble. Please ask again."
-                log_conversation("ASSISTANT", ai_resp)
-                append_call_log(CallSid, f"ASSISTANT {ai_resp}")
-                logger.info(f"Sending AI response: {ai_resp[:100]}...")
-                
-                # Continue conversation with another gather
-                gather = Gather(
-                    input='speech', 
-                    speechTimeout='auto', 
-                    action=CALLBACK_URL, 
-                    method='POST',
-                    language='en-US hi-IN',  # Support both languages
-                    timeout=5,
-                    profanityFilter=False,
-                    hints='sell, property, home, Basant, price, location, घर, संपत्ति, बेचना, बसंत, कीमत'
-                )
-                gather.say(ai_resp, voice='Polly.Aditi', language='hi-IN')
-                vr.append(gather)
-                
-                # If user doesn't respond, prompt them
-                vr.say("Are you still there? क्या आप अभी भी हैं?", voice='Polly.Aditi', language='hi-IN')
-                vr.redirect(CALLBACK_URL)
+                if THINK_THEN_SPEAK and CallSid:
+                    # Two-phase turn: answer now with a filler and let the caller poll for the reply
+                    TURNS.inc(path="pending")
+                    turn = await start_pending_turn(tenant, CallSid, SpeechResult)
+                    twiml_response = build_holding_twiml(tenant, turn, next_seq)
+                else:
+                    with STAGE_SECONDS.time(handler="voice", stage="llm"):
+                        ai_resp = await generate_reply(tenant, CallSid, SpeechResult)
+                    with STAGE_SECONDS.time(handler="voice", stage="twiml"):
+                        twiml_response = build_reply_twiml(tenant, ai_resp, next_seq)
+                safe_log_twiml(twiml_response, CallSid)
+                return Response(content=twiml_response, media_type="application/xml")
         else:
+            if CONVERSATION_MODE == "stream":
+                # Hand the call to the media WebSocket; it greets and converses from there
+                append_call_log(CallSid, "STREAM_CONNECT")
+                twiml_response = tenant.twiml.stream_connect.render()
+                safe_log_twiml(twiml_response, CallSid)
+                return Response(content=twiml_response, media_type="application/xml")
             # First-time or no speech: ask for name (keep consistent with initiation)
             logger.info("No speech yet – asking for caller name")
-            greet = (
-                f"Hello! नमस्ते! I’m your real‑estate advisor from {COMPANY_NAME}. "
-                f"Before we begin, may I know your name?"
-            )
-            log_conversation("ASSISTANT", greet)
+            greet = tenant.twiml.inbound_greeting_text
+            log_conversation("ASSISTANT", greet, CallSid)
             append_call_log(CallSid, f"ASSISTANT {greet}")
+            twiml_response = tenant.twiml.inbound_greeting.render()
 
-            gather = Gather(
-                input='speech',
-                speechTimeout='auto',
-                action=CALLBACK_URL,
-                method='POST',
-                language='en-US hi-IN',
-                timeout=5,
-                profanityFilter=False,
-                hints='my name is, I am, this is, नाम, मेरा नाम'
-            )
-            gather.say(greet, voice='Polly.Aditi', language='hi-IN')
-            vr.append(gather)
+        safe_log_twiml(twiml_response, CallSid)
+        return Response(content=twiml_response, media_type="application/xml")
+    except Exception as e:
+        logger.error("Error in voice webhook: %s", e, extra={"call_sid": CallSid})
+        logger.error(traceback.format_exc())
+        # Return error TwiML
+        return Response(content=tenant.twiml.error.render(), media_type="application/xml")
 
-            vr.say("If I didn’t hear you, please tell me your name.", voice='Polly.Joanna', language='en-US')
-            vr.redirect(CALLBACK_URL)
+@app.post("/api/callback/twilio/voice/result", summary="Pending reply for think-then-speak turns", tags=["twilio"])
+async def twilio_voice_result(turn: int, wait: int = 0, seq: int = 1, campaign: Optional[str] = None,
+                              CallSid: Optional[str] = Form(None), From: Optional[str] = Form(None),
+                              To: Optional[str] = Form(None)):
+    """Serve the generated reply for a turn, or another short wait while it is still being generated.
+
+    Taking a reply consumes it, so retried polls are answered from the first attempt.
+    """
+    logger.info("Result poll: SID=%s turn=%s wait=%s", CallSid, turn, wait, extra={"call_sid": CallSid})
+    started = time.perf_counter()
+    tenant = TENANTS.resolve(campaign, To, From)
+    try:
+        return await deduplicated(
+            CallSid, f"result:{turn}:{wait}",
+            lambda: handle_voice_result(tenant, turn, wait, seq, CallSid),
+            fallback=lambda: build_reply_twiml(tenant, LLM_TIMEOUT_FALLBACK, seq),
+        )
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, handler="voice_result", stage="total")
 
-        twiml_response = str(vr)
-        safe_log_twiml(twiml_response)
+async def handle_voice_result(tenant: Tenant, turn: int, wait: int, seq: int, CallSid: Optional[str]) -> Response:
+    await CALL_LIFECYCLE.atouch(CallSid)
+    try:
+        task = PENDING_TURNS.get((CallSid, turn)) if CallSid else None
+        if task is not None and task.done():
+            PENDING_TURNS.pop((CallSid, turn), None)
+        known, ai_resp = await take_pending_reply(CallSid, turn) if CallSid else (False, None)
+        max_waits = int(PENDING_TURN_TIMEOUT_SECONDS / max(PENDING_POLL_SECONDS, 1)) + 5
+        if ai_resp is not None:
+            twiml_response = build_reply_twiml(tenant, ai_resp, seq)
+        elif known and wait < max_waits:
+            # Still generating, here or on another worker
+            twiml_response = build_holding_twiml(tenant, turn, seq, filler=False, wait=wait + 1)
+        else:
+            # Unknown or abandoned turn (e.g. worker restarted): ask the caller to repeat
+            LLM_FALLBACKS.inc(reason="abandoned_turn")
+            twiml_response = build_reply_twiml(tenant, LLM_TIMEOUT_FALLBACK, seq)
+        safe_log_twiml(twiml_response, CallSid)
         return Response(content=twiml_response, media_type="application/xml")
     except Exception as e:
-        logger.error(f"Error in voice webhook: {e}")
+        logger.error("Error in result webhook: %s", e, extra={"call_sid": CallSid})
         logger.error(traceback.format_exc())
-        # Return error TwiML
-        error_vr = VoiceResponse()
-        error_vr.say("I'm sorry, an error occurred. Please try again later.", voice='Polly.Aditi', language='hi-IN')
-        return Response(content=str(error_vr), media_type="application/xml")
+        return Response(content=tenant.twiml.error.render(), media_type="application/xml")
+
+@app.websocket("/api/stream/twilio")
+async def twilio_media_stream(websocket: WebSocket):
+    """Twilio Media Streams connection for calls answered in stream mode."""
+    await websocket.accept()
+
+    def tenant() -> Tenant:
+        # The <Stream> carries the project key as a custom parameter, known once the stream starts
+        return TENANTS.resolve(session.parameters.get("campaign"))
+
+    session = MediaStreamSession(
+        websocket, STREAM_STT, STREAM_TTS, lambda call_sid, text: stream_reply(tenant(), call_sid, text),
+        greeting=lambda _call_sid: tenant().twiml.inbound_greeting_text,
+        on_start=lambda call_sid: start_stream_call(tenant(), call_sid),
+        on_event=log_stream_event,
+        on_first_audio=lambda _call_sid, seconds: STAGE_SECONDS.observe(seconds, handler="stream", stage="first_audio"),
+        on_hangup=hang_up_call,
+    )
+    await session.run()
 
 @app.post("/api/callback/twilio/status", summary="Twilio Call Status Callback", tags=["twilio"])
 async def twilio_status_callback(
@@ -481,11 +1514,18 @@ async def twilio_status_callback(
     From: Optional[str] = Form(None),
     To: Optional[str] = Form(None)
 ):
-    logger.info(f"Status callback: SID={CallSid} Status={CallStatus} From={From} To={To}")
-    log_conversation("SYSTEM", f"Status update: SID={CallSid} Status={CallStatus} From={From} To={To}")
+    logger.info("Status callback: SID=%s Status=%s From=%s To=%s", CallSid, CallStatus, From, To,
+                extra={"call_sid": CallSid})
+    log_conversation("SYSTEM", f"Status update: SID={CallSid} Status={CallStatus} From={From} To={To}", CallSid)
     append_call_log(CallSid, f"STATUS {CallStatus}")
-    if CallStatus == "completed" and CallSid:
+    if CallSid:
+        now = datetime.utcnow().isoformat()
+        CALL_STORE.upsert_call(CallSid, started_at=now, from_number=From, to_number=To, status=CallStatus,
+                               ended_at=now if CallStatus in TERMINAL_STATUSES else None)
+    if CallStatus in TERMINAL_STATUSES and CallSid:
         finalize_call(CallSid)
+        await CALL_LIFECYCLE.amark_ended(CallSid, CallStatus)
+    await CAMPAIGN_SCHEDULER.on_status(CallSid, CallStatus)
     return JSONResponse({"ok": True})
 
 @app.post(
@@ -510,11 +1550,90 @@ async def api_outbound_call(request: OutboundCallRequest):
     to_number = request.to_number or TARGET_PHONE_NUMBER
     if not to_number:
         raise HTTPException(status_code=400, detail="to_number missing and TARGET_PHONE_NUMBER not configured")
-    call = initiate_twilio_call(to_number, request.language_pref)
+    if request.project and TENANTS.find(request.project) is None:
+        raise HTTPException(status_code=400, detail=f"Unknown project {request.project!r}")
+    call = await asyncio.to_thread(initiate_twilio_call, to_number, request.language_pref, request.project)
     if not call:
         raise HTTPException(status_code=500, detail="Failed to initiate call")
     return OutboundCallResponse(call_sid=call.sid, status=call.status, to=to_number)
 
+@app.post(
+    "/api/campaigns",
+    summary="Start a bulk outbound campaign from a lead list",
+    tags=["calls"],
+    response_model=CampaignStatusResponse,
+    dependencies=[Depends(verify_api_key), Depends(require_campaign_leader)],
+    responses={400: {"description": "Lead list could not be parsed"},
+               503: {"description": "Another worker schedules campaigns"}}
+)
+async def create_campaign(
+    file: UploadFile = File(..., description="CSV with a phone/to_number column (optional name, language_pref, project) "
+                                             "or JSON list"),
+    language_pref: str = Form("both"),
+    project: Optional[str] = Form(None, description="Project key or campaign code for leads without their own"),
+    max_concurrent: Optional[int] = Form(None, ge=1),
+    max_attempts: Optional[int] = Form(None, ge=1),
+):
+    """Upload leads and start dialing them under the configured concurrency and calls-per-second limits."""
+    try:
+        leads = parse_leads(await file.read(), file.filename or "", file.content_type or "", language_pref, project)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid lead list: {e}")
+    unknown = sorted({lead.project for lead in leads if lead.project and TENANTS.find(lead.project) is None})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown project(s): {', '.join(unknown)}")
+    try:
+        campaign = CAMPAIGN_SCHEDULER.create(leads, max_concurrent=max_concurrent, max_attempts=max_attempts)
+    except NotLeaderError as e:
+        # The lease moved since require_campaign_leader ran
+        raise HTTPException(status_code=503, detail=str(e))
+    log_conversation("SYSTEM", f"Campaign {campaign.campaign_id} started with {len(leads)} lead(s)")
+    return CampaignStatusResponse(**campaign.summary())
+
+@app.get(
+    "/api/campaigns",
+    summary="List campaigns",
+    tags=["calls"],
+    response_model=CampaignListResponse,
+    dependencies=[Depends(verify_api_key), Depends(require_campaign_leader)],
+    responses={503: {"description": "Another worker schedules campaigns"}}
+)
+async def list_campaigns():
+    campaigns = [CampaignStatusResponse(**c.summary()) for c in CAMPAIGN_SCHEDULER.list()]
+    return CampaignListResponse(count=len(campaigns), campaigns=campaigns)
+
+@app.get(
+    "/api/campaigns/{campaign_id}",
+    summary="Campaign progress",
+    tags=["calls"],
+    response_model=CampaignStatusResponse,
+    dependencies=[Depends(verify_api_key), Depends(require_campaign_leader)],
+    responses={404: {"description": "Unknown campaign"}, 503: {"description": "Another worker schedules campaigns"}}
+)
+async def campaign_status(campaign_id: str, include_leads: bool = Query(False, description="Include per-lead status")):
+    campaign = CAMPAIGN_SCHEDULER.get(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Unknown campaign")
+    return CampaignStatusResponse(**campaign.summary(include_leads))
+
+@app.post(
+    "/api/campaigns/{campaign_id}/cancel",
+    summary="Stop dialing a campaign",
+    tags=["calls"],
+    response_model=CampaignStatusResponse,
+    dependencies=[Depends(verify_api_key), Depends(require_campaign_leader)],
+    responses={404: {"description": "Unknown campaign"}, 409: {"description": "Campaign already finished"},
+               503: {"description": "Another worker schedules campaigns"}}
+)
+async def cancel_campaign(campaign_id: str):
+    """Cancel remaining leads; calls already in progress are left to finish."""
+    campaign = CAMPAIGN_SCHEDULER.get(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Unknown campaign")
+    if not CAMPAIGN_SCHEDULER.cancel(campaign_id):
+        raise HTTPException(status_code=409, detail=f"Campaign is {campaign.state}")
+    return CampaignStatusResponse(**campaign.summary())
+
 @app.get(
     "/api/conversation/current",
     summary="Get current conversation log",
@@ -522,12 +1641,72 @@ async def api_outbound_call(request: OutboundCallRequest):
     response_model=ConversationLogResponse,
     dependencies=[Depends(verify_api_key)]
 )
-async def get_current_conversation():
+async def get_current_conversation(
+    cursor: Optional[int] = Query(None, description="Return entries after this sequence number"),
+    limit: int = Query(100, ge=1, le=1000),
+    call_sid: Optional[str] = None,
+    speaker: Optional[str] = Query(None, description="USER | ASSISTANT | SYSTEM"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="`ndjson` streams every matching entry after `cursor`")
+):
     """Return the in-memory conversation log captured during current runtime.
 
-    Entries are also written to a timestamped JSON file as they are appended.
+    The log is a fixed-capacity ring buffer (CONVERSATION_LOG_CAPACITY); the oldest entries are dropped first.
+    Page forward with `cursor`, or use `format=ndjson` for a bulk export.
     """
-    return ConversationLogResponse(count=len(conversation_log), log=conversation_log)  # type: ignore[arg-type]
+    if format == "ndjson":
+        lines = (json.dumps(r.as_dict(), ensure_ascii=False) + "\n" for r in conversation_log.iter(cursor, call_sid, speaker))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    records, next_cursor = conversation_log.page(cursor, limit, call_sid, speaker)
+    return ConversationLogResponse(
+        count=len(records),
+        buffered=len(conversation_log),
+        next_cursor=next_cursor,
+        log=[ConversationEntry(**r.as_dict()) for r in records]
+    )
+
+@app.get(
+    "/api/calls",
+    summary="Search recorded calls",
+    tags=["conversation"],
+    response_model=CallListResponse,
+    dependencies=[Depends(verify_api_key)]
+)
+async def list_calls(
+    phone: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Page through calls (newest first), filtered by phone number (from or to), status and start time (ISO 8601)."""
+    try:
+        calls, next_cursor = await asyncio.to_thread(CALL_STORE.list_calls, phone, status, since, until, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CallListResponse(count=len(calls), next_cursor=next_cursor, calls=calls)  # type: ignore[arg-type]
+
+@app.get(
+    "/api/events",
+    summary="Search call events",
+    tags=["conversation"],
+    response_model=CallEventListResponse,
+    dependencies=[Depends(verify_api_key)]
+)
+async def list_events(
+    call_sid: Optional[str] = None,
+    type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000)
+):
+    """Page through typed call events (oldest first), e.g. all USER turns of one call."""
+    try:
+        events, next_cursor = await asyncio.to_thread(CALL_STORE.list_events, call_sid, type, since, until, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CallEventListResponse(count=len(events), next_cursor=next_cursor, events=events)  # type: ignore[arg-type]
 
 @app.get(
     "/api/health",
@@ -539,6 +1718,21 @@ async def health():
     """Basic application liveness probe."""
     return HealthResponse(status="ok", timestamp=datetime.utcnow().isoformat()) 
 
+@app.get(
+    "/api/ready",
+    summary="Readiness check",
+    tags=["system"],
+    response_model=ReadinessResponse,
+    responses={503: {"model": ReadinessResponse, "description": "Gemini or Twilio client not initialized yet"}}
+)
+async def ready(response: Response):
+    """Readiness probe: 200 once the Gemini and Twilio clients are initialized, 503 while warming up or failed."""
+    statuses = {p.name: ProviderStatus(**p.status()) for p in PROVIDERS}
+    is_ready = all(p.ready for p in PROVIDERS)
+    if not is_ready:
+        response.status_code = 503
+    return ReadinessResponse(ready=is_ready, providers=statuses)
+
 @app.get(
     "/api/config",
     summary="Basic config info",
@@ -549,6 +1743,200 @@ async def health():
 async def config():
     """Return limited configuration details (does not expose secrets)."""
     return ConfigResponse(twilio_number=TWILIO_PHONE_NUMBER, target_number=TARGET_PHONE_NUMBER, has_api_key=bool(API_KEY))
+
+def projects_response() -> ProjectsResponse:
+    status = TENANTS.status()
+    return ProjectsResponse(
+        path=status["path"], reloads=status["reloads"], loaded_at=status["loaded_at"], error=status["error"],
+        projects=[ProjectResponse(**{**vars(t.project), "numbers": list(t.project.numbers),
+                                     "campaigns": list(t.project.campaigns)}) for t in TENANTS.tenants()],
+    )
+
+@app.get(
+    "/api/projects",
+    summary="Projects served by this worker",
+    tags=["system"],
+    response_model=ProjectsResponse,
+    dependencies=[Depends(verify_api_key)]
+)
+async def list_projects():
+    """The default project (from the environment) and every project loaded from PROJECTS_FILE."""
+    return projects_response()
+
+@app.post(
+    "/api/projects/reload",
+    summary="Reload PROJECTS_FILE now",
+    tags=["system"],
+    response_model=ProjectsResponse,
+    dependencies=[Depends(verify_api_key)],
+    responses={400: {"description": "Invalid file; the current projects are kept"},
+               409: {"description": "PROJECTS_FILE is not set"}}
+)
+async def reload_projects():
+    """Re-read the file in this worker now; other workers pick the change up from their watchers.
+
+    Calls in progress are not interrupted.
+    """
+    if not PROJECTS_FILE:
+        raise HTTPException(status_code=409, detail="PROJECTS_FILE is not set")
+    try:
+        await asyncio.to_thread(TENANTS.reload, True)
+    except (ValueError, OSError) as e:
+        record_project_reload(False, str(e))
+        raise HTTPException(status_code=400, detail=f"Invalid projects file: {e}")
+    record_project_reload(True, None)
+    return projects_response()
+
+@app.api_route(
+    "/api/prompts/{name}",
+    methods=["GET", "HEAD"],
+    summary="Pre-rendered prompt audio for <Play>",
+    tags=["twilio"],
+    responses={304: {"description": "Not modified (If-None-Match)"},
+               206: {"description": "Partial content (Range)"},
+               404: {"description": "No such recording"},
+               416: {"description": "Range not satisfiable"}}
+)
+async def get_prompt_audio(name: str, request: Request):
+    """An 8 kHz μ-law WAV of a fixed prompt. Fetched by Twilio, so no API key; names are
+    content hashes, so responses are cacheable for good and revalidate by ETag."""
+    asset = PROMPT_AUDIO.get(name) if PROMPT_AUDIO and PROMPT_NAME.match(name) else None
+    if asset is None:
+        PROMPT_AUDIO_REQUESTS.inc(status="404")
+        raise HTTPException(status_code=404, detail="Prompt audio not found")
+    headers = {"ETag": asset.etag, "Cache-Control": PROMPT_AUDIO_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or asset.etag in [t.strip() for t in if_none_match.split(",")]):
+        PROMPT_AUDIO_REQUESTS.inc(status="304")
+        return Response(status_code=304, headers=headers)
+    size = len(asset.data)
+    try:
+        # A Range only applies while the client still holds this version
+        if_range = request.headers.get("if-range")
+        span = byte_range(request.headers.get("range"), size) if not if_range or if_range == asset.etag else None
+    except ValueError:
+        PROMPT_AUDIO_REQUESTS.inc(status="416")
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    status, body = 200, asset.data
+    if span is not None:
+        status, body = 206, asset.data[span[0]:span[1] + 1]
+        headers["Content-Range"] = f"bytes {span[0]}-{span[1]}/{size}"
+    PROMPT_AUDIO_REQUESTS.inc(status=str(status))
+    headers["Content-Length"] = str(len(body))
+    return Response(b"" if request.method == "HEAD" else body, status_code=status, headers=headers,
+                    media_type="audio/wav")
+
+async def run_lead_analytics(full: bool):
+    # Lines still buffered by the writer thread belong in this run
+    await asyncio.to_thread(CALL_LOG_WRITER.flush, wait=True)
+    try:
+        result = await asyncio.to_thread(run_analytics, "call_logs", LEAD_ANALYTICS_OUTPUT or default_lead_output(),
+                                         LEAD_ANALYTICS_WORKERS, full)
+    except Exception as e:
+        LEAD_ANALYTICS["error"] = str(e)
+        logger.warning("Lead analytics run failed: %s", e)
+        return
+    LEAD_ANALYTICS.update(last_run=result, error=None)
+    log_conversation("SYSTEM", f"Lead analytics: parsed {result['parsed']} of {result['logs']} call log(s) "
+                               f"in {result['seconds']}s -> {result['output']}")
+
+def lead_analytics_status() -> LeadAnalyticsResponse:
+    task, last_run = LEAD_ANALYTICS["task"], LEAD_ANALYTICS["last_run"]
+    return LeadAnalyticsResponse(
+        running=bool(task and not task.done()),
+        last_run=LeadAnalyticsRun(**last_run) if last_run else None,
+        error=LEAD_ANALYTICS["error"],
+        summary=LeadSummary(**summarize_leads(last_run["output"])) if last_run else None,
+    )
+
+@app.post(
+    "/api/analytics/leads/run",
+    summary="Extract lead-qualification fields from all call logs",
+    tags=["conversation"],
+    status_code=202,
+    response_model=LeadAnalyticsResponse,
+    dependencies=[Depends(verify_api_key)],
+    responses={409: {"description": "A run is already in progress"}}
+)
+async def start_lead_analytics(full: bool = Query(False, description="Re-parse every log instead of only new or changed ones")):
+    """Start a background run; poll GET /api/analytics/leads for its result."""
+    task = LEAD_ANALYTICS["task"]
+    if task and not task.done():
+        raise HTTPException(status_code=409, detail="Lead analytics is already running")
+    LEAD_ANALYTICS["task"] = asyncio.create_task(run_lead_analytics(full))
+    return lead_analytics_status()
+
+@app.get(
+    "/api/analytics/leads",
+    summary="Lead analytics status and summary",
+    tags=["conversation"],
+    response_model=LeadAnalyticsResponse,
+    dependencies=[Depends(verify_api_key)]
+)
+async def lead_analytics():
+    """Last run's stats plus lead counts by tier, unit preference, financing and timeline."""
+    return await asyncio.to_thread(lead_analytics_status)
+
+@app.get(
+    "/api/intents/stats",
+    summary="Intent fast-path hit rate",
+    tags=["system"],
+    response_model=IntentStatsResponse,
+    dependencies=[Depends(verify_api_key)]
+)
+async def intent_stats():
+    """Report how many caller turns were answered locally instead of by Gemini."""
+    stats = combined_stats(t.intents for t in TENANTS.tenants())
+    avg_llm = LLM_LATENCY["total_seconds"] / LLM_LATENCY["count"] if LLM_LATENCY["count"] else 0.0
+    return IntentStatsResponse(
+        **stats,
+        avg_llm_latency_ms=round(avg_llm * 1000, 1),
+        estimated_llm_seconds_saved=round(stats["hits"] * avg_llm, 2)
+    )
+
+@app.get(
+    "/api/cache/stats",
+    summary="Gemini response cache statistics",
+    tags=["system"],
+    response_model=CacheStatsResponse,
+    dependencies=[Depends(verify_api_key)]
+)
+async def cache_stats():
+    """Report size, hit/miss counters and evictions of the reply cache."""
+    return CacheStatsResponse(**RESPONSE_CACHE.stats())
+
+@app.get(
+    "/api/calls/lifecycle",
+    summary="Per-call state lifecycle counters",
+    tags=["system"],
+    response_model=LifecycleStatsResponse,
+    dependencies=[Depends(verify_api_key)]
+)
+async def lifecycle_stats():
+    """Report live, ending, evicted and leaked calls tracked by the state sweeper."""
+    return LifecycleStatsResponse(**await asyncio.to_thread(CALL_LIFECYCLE.stats))
+
+@app.get(
+    "/api/llm/resilience",
+    summary="LLM circuit breaker and bulkhead state",
+    tags=["system"],
+    response_model=LLMResilienceResponse,
+    dependencies=[Depends(verify_api_key)]
+)
+async def llm_resilience():
+    """Report each model's breaker state and the generation bulkhead's occupancy."""
+    return LLMResilienceResponse(**LLM_GUARD.stats())
+
+@app.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    tags=["system"],
+    response_class=PlainTextResponse
+)
+async def metrics():
+    """Per-stage latency histograms, LLM/outbound/recording counters and state gauges in Prometheus text format."""
+    return PlainTextResponse(await asyncio.to_thread(METRICS.render), media_type="text/plain; version=0.0.4")
+
 @app.get(
     "/api/docs/openapi.json",
     summary="Download OpenAPI specification JSON",
@@ -559,34 +1947,50 @@ async def download_openapi():
     """Return the generated OpenAPI schema allowing external tooling (e.g. Swagger UI, Postman import)."""
     return app.openapi()
 
+@app.post(
+    "/api/recordings/backfill",
+    summary="Post-process recordings downloaded earlier",
+    tags=["calls"],
+    response_model=RecordingBackfillResponse,
+    dependencies=[Depends(verify_api_key)],
+    responses={503: {"description": "Post-processing disabled or ffmpeg not installed"}}
+)
+async def backfill_recordings():
+    """Queue every MP3 in recordings/ without a processed .opus for trimming, stats and re-encoding."""
+    if not RECORDING_POSTPROCESS or not RECORDING_PROCESSOR.available:
+        raise HTTPException(status_code=503, detail="Recording post-processing is unavailable")
+    queued = RECORDING_PROCESSOR.backfill(RECORDING_DOWNLOADER.dest_dir)
+    log_conversation("SYSTEM", f"Recording backfill queued {queued} recording(s)")
+    return RecordingBackfillResponse(queued=queued, pending=RECORDING_PROCESSOR.pending())
+
 @app.post("/api/callback/twilio/recording", summary="Recording status callback", tags=["twilio"]) 
 async def recording_status_callback(CallSid: Optional[str] = Form(None), RecordingUrl: Optional[str] = Form(None), RecordingStatus: Optional[str] = Form(None)):
-    logger.info(f"Recording callback: SID={CallSid} Status={RecordingStatus} Url={RecordingUrl}")
-    log_conversation("SYSTEM", f"Recording callback: SID={CallSid} Status={RecordingStatus} Url={RecordingUrl}")
+    logger.info("Recording callback: SID=%s Status=%s Url=%s", CallSid, RecordingStatus, RecordingUrl,
+                extra={"call_sid": CallSid})
+    started = time.perf_counter()
+    log_conversation("SYSTEM", f"Recording callback: SID={CallSid} Status={RecordingStatus} Url={RecordingUrl}", CallSid)
     append_call_log(CallSid, f"RECORDING status={RecordingStatus} url={RecordingUrl}")
     if RecordingStatus == "completed" and RecordingUrl and CallSid:
-        try:
-            audio_url = RecordingUrl + ".mp3" if not RecordingUrl.endswith(".mp3") else RecordingUrl
-            account_sid = os.getenv("TWILIO_ACCOUNT_SID") or ""
-            auth_token = os.getenv("TWILIO_AUTH_TOKEN") or ""
-            r = requests.get(audio_url, auth=(account_sid, auth_token), timeout=30)
-            if r.status_code == 200:
-                os.makedirs("recordings", exist_ok=True)
-                fname = os.path.join("recordings", f"recording_{CallSid}.mp3")
-                with open(fname, "wb") as f:
-                    f.write(r.content)
-                RECORDING_DOWNLOADS[CallSid] = fname
-                append_call_log(CallSid, f"RECORDING_DOWNLOADED {fname}")
-                logger.info(f"Recording saved as {fname}")
-            else:
-                append_call_log(CallSid, f"RECORDING_DOWNLOAD_FAILED status={r.status_code}")
-                logger.warning(f"Failed to download recording {RecordingUrl}: {r.status_code}")
-        except Exception as e:
-            append_call_log(CallSid, f"RECORDING_DOWNLOAD_ERROR {e}")
-            logger.warning(f"Recording download error: {e}")
+        audio_url = RecordingUrl + ".mp3" if not RecordingUrl.endswith(".mp3") else RecordingUrl
+        if RECORDING_DOWNLOADER.submit(CallSid, audio_url):
+            append_call_log(CallSid, "RECORDING_QUEUED")
+        else:
+            append_call_log(CallSid, "RECORDING_DOWNLOAD_ERROR queue full")
+            logger.warning("Recording download queue full; dropping %s", audio_url, extra={"call_sid": CallSid})
+    STAGE_SECONDS.observe(time.perf_counter() - started, handler="recording_callback", stage="total")
     return {"ok": True}
 
 
-if __name__ == "__main__":
+def run():
+    """`python main.py`: replace this process with `python -m uvicorn main:app`.
+
+    Spawned recording workers re-import a script __main__ as __mp_main__, which would build
+    the whole app in each of them; under uvicorn they only import recording_processing.
+    """
     print("Starting FastAPI server on port 9004... (docs at /docs)")
-    uvicorn.run("main:app", host="0.0.0.0", port=9004, reload=False)
\ No newline at end of file
+    os.execv(sys.executable, [sys.executable, "-m", "uvicorn", "main:app", "--host", "0.0.0.0", "--port", "9004",
+                              "--app-dir", os.path.dirname(os.path.abspath(__file__))])
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,404 @@
+"""Real-time conversation over Twilio Media Streams.
+
+Twilio sends the caller's audio as base64 μ-law 8 kHz frames over a WebSocket and plays
+back whatever μ-law we send on the same socket. A MediaStreamSession feeds inbound audio
+to a streaming STT backend. On each final transcript it streams the reply text, speaks it
+sentence by sentence through a streaming TTS backend, and sends a mark after each
+sentence so it knows when playback has finished. If the caller starts talking while the
+agent is speaking (barge-in), the reply is cancelled and Twilio is told to clear its
+playback buffer.
+
+STT and TTS are pluggable (`register_stt` / `register_tts`); the built-in "fake" backends
+need no external service: FakeSTT is an energy detector that "transcribes" each utterance
+as the next line of a script, and FakeTTS renders a tone whose length follows the text.
+"""
+import asyncio
+import base64
+import json
+import logging
+import math
+import re
+import struct
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 8000
+FRAME_MS = 20
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000  # μ-law: one byte per sample
+
+# Yielded by a reply stream to hang up once everything before it has been played
+HANGUP = object()
+
+
+# ---- G.711 μ-law ----
+def _ulaw_decode(u: int) -> int:
+    u = ~u & 0xFF
+    sample = (((u & 0x0F) << 3) + 0x84) << ((u >> 4) & 0x07)
+    return (0x84 - sample) if u & 0x80 else (sample - 0x84)
+
+
+def _ulaw_encode(sample: int) -> int:
+    # The reference G.711 encoder (and audioop) works on 14 bits: the arithmetic shift rounds
+    # negative samples toward minus infinity before the sign is taken
+    value = sample >> 2
+    if value < 0:
+        value, mask = -value, 0x7F
+    else:
+        mask = 0xFF
+    value = min(value, 8159) + 0x21
+    exponent = value.bit_length() - 6
+    if exponent > 7:
+        return 0x7F ^ mask
+    return ((exponent << 4) | ((value >> (exponent + 1)) & 0x0F)) ^ mask
+
+
+_DECODE = [struct.pack("<h", _ulaw_decode(u)) for u in range(256)]
+
+
+@lru_cache(maxsize=None)
+def _encode_table() -> bytes:
+    # 64K entries take tens of milliseconds to build; only stream mode and the fakes need it
+    return bytes(_ulaw_encode(s - 65536 if s >= 32768 else s) for s in range(65536))
+
+
+def ulaw_to_pcm16(data: bytes) -> bytes:
+    """μ-law bytes to 16-bit little-endian PCM."""
+    return b"".join(map(_DECODE.__getitem__, data))
+
+
+def pcm16_to_ulaw(pcm: bytes) -> bytes:
+    """16-bit little-endian PCM to μ-law bytes."""
+    samples = array("H")
+    samples.frombytes(pcm)
+    return bytes(map(_encode_table().__getitem__, samples))
+
+
+def tone(duration_ms: int, frequency: float = 440.0, amplitude: int = 6000) -> bytes:
+    """A μ-law sine tone; handy for fake TTS output and fake caller speech."""
+    n = SAMPLE_RATE * duration_ms // 1000
+    step = 2 * math.pi * frequency / SAMPLE_RATE
+    table = _encode_table()
+    return bytes(table[int(amplitude * math.sin(i * step)) & 0xFFFF] for i in range(n))
+
+
+def silence(duration_ms: int) -> bytes:
+    return bytes([0xFF]) * (SAMPLE_RATE * duration_ms // 1000)
+
+
+# ---- sentence streaming ----
+# A sentence ends at . ! ? or the Devanagari danda, followed by whitespace (so "55.5" or a
+# chunk boundary right after the period does not split)
+_SENTENCE = re.compile(r"(.+?[.!?।])\s+", re.S)
+
+
+async def split_sentences(chunks: AsyncIterator[Union[str, object]], min_chars: int = 8) -> AsyncIterator[Union[str, object]]:
+    """Regroup streamed text chunks into complete sentences; non-text items pass through in order."""
+    buffer = ""
+    async for chunk in chunks:
+        if not isinstance(chunk, str):
+            if buffer.strip():
+                yield buffer.strip()
+            buffer = ""
+            yield chunk
+            continue
+        buffer += chunk
+        start = 0
+        for m in _SENTENCE.finditer(buffer):
+            if m.end() - start >= min_chars:
+                yield buffer[start:m.end()].strip()
+                start = m.end()
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer.strip()
+
+
+# ---- pluggable STT / TTS ----
+@dataclass
+class Transcript:
+    text: str
+    is_final: bool
+
+
+class STTSession(ABC):
+    @abstractmethod
+    def feed(self, pcm16: bytes):
+        """Push 16-bit 8 kHz PCM audio; must not block."""
+
+    @abstractmethod
+    def transcripts(self) -> AsyncIterator[Transcript]:
+        """Partial (speech started / interim) and final transcripts, until closed."""
+
+    @abstractmethod
+    async def close(self):
+        ...
+
+
+class StreamingSTT(ABC):
+    @abstractmethod
+    def open(self, call_sid: str) -> STTSession:
+        ...
+
+
+class StreamingTTS(ABC):
+    @abstractmethod
+    def synthesize(self, text: str, voice: Optional[str] = None, language: Optional[str] = None) -> AsyncIterator[bytes]:
+        """μ-law 8 kHz audio for `text`, yielded as soon as each chunk is ready.
+
+        `voice` and `language` are given in TwiML terms (e.g. "Polly.Aditi", "hi-IN") when
+        fixed prompts are pre-rendered; None means the backend's own choice.
+        """
+
+
+class FakeSTTSession(STTSession):
+    def __init__(self, script: deque, threshold: int, end_silence_ms: int):
+        self._script = script
+        self._threshold = threshold
+        self._end_frames = max(1, end_silence_ms // FRAME_MS)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending = b""
+        self._in_speech = False
+        self._silent_frames = 0
+
+    def feed(self, pcm16: bytes):
+        self._pending += pcm16
+        frame = FRAME_BYTES * 2
+        while len(self._pending) >= frame:
+            samples = array("h")
+            samples.frombytes(self._pending[:frame])
+            self._pending = self._pending[frame:]
+            loud = sum(map(abs, samples)) / len(samples) > self._threshold
+            if loud:
+                self._silent_frames = 0
+                if not self._in_speech:
+                    self._in_speech = True
+                    self._queue.put_nowait(Transcript("", False))
+            elif self._in_speech:
+                self._silent_frames += 1
+                if self._silent_frames >= self._end_frames:
+                    self._in_speech = False
+                    text = self._script.popleft() if self._script else "(unintelligible)"
+                    self._queue.put_nowait(Transcript(text, True))
+
+    async def transcripts(self):
+        while (item := await self._queue.get()) is not None:
+            yield item
+
+    async def close(self):
+        self._queue.put_nowait(None)
+
+
+class FakeSTT(StreamingSTT):
+    """Energy-based endpointing; each detected utterance is transcribed as the next scripted line."""
+
+    def __init__(self, script: Iterable[str] = (), threshold: int = 500, end_silence_ms: int = 400):
+        self.script = list(script)
+        self.threshold = threshold
+        self.end_silence_ms = end_silence_ms
+
+    def open(self, call_sid: str) -> STTSession:
+        return FakeSTTSession(deque(self.script), self.threshold, self.end_silence_ms)
+
+
+class FakeTTS(StreamingTTS):
+    """Renders `ms_per_char` of tone per character, in `chunk_ms` chunks, after `first_chunk_delay` seconds."""
+
+    def __init__(self, ms_per_char: int = 50, chunk_ms: int = 200, first_chunk_delay: float = 0.0):
+        self.ms_per_char = ms_per_char
+        self.chunk_ms = chunk_ms
+        self.first_chunk_delay = first_chunk_delay
+
+    async def synthesize(self, text: str, voice: Optional[str] = None, language: Optional[str] = None):
+        if self.first_chunk_delay:
+            await asyncio.sleep(self.first_chunk_delay)
+        remaining = max(FRAME_MS, len(text) * self.ms_per_char)
+        while remaining > 0:
+            duration = min(self.chunk_ms, remaining)
+            remaining -= duration
+            yield tone(duration)
+            await asyncio.sleep(0)
+
+
+STT_BACKENDS: dict[str, Callable[[], StreamingSTT]] = {"fake": FakeSTT}
+TTS_BACKENDS: dict[str, Callable[[], StreamingTTS]] = {"fake": FakeTTS}
+
+
+def register_stt(name: str, factory: Callable[[], StreamingSTT]):
+    STT_BACKENDS[name] = factory
+
+
+def register_tts(name: str, factory: Callable[[], StreamingTTS]):
+    TTS_BACKENDS[name] = factory
+
+
+def make_stt(name: str) -> StreamingSTT:
+    if name not in STT_BACKENDS:
+        raise ValueError(f"Unknown STT backend {name!r}; registered: {', '.join(STT_BACKENDS)}")
+    return STT_BACKENDS[name]()
+
+
+def make_tts(name: str) -> StreamingTTS:
+    if name not in TTS_BACKENDS:
+        raise ValueError(f"Unknown TTS backend {name!r}; registered: {', '.join(TTS_BACKENDS)}")
+    return TTS_BACKENDS[name]()
+
+
+# ---- session ----
+ReplyStream = Callable[[str, str], AsyncIterator[Union[str, object]]]
+
+
+class MediaStreamSession:
+    """One Twilio Media Streams WebSocket connection.
+
+    `reply(call_sid, text)` streams the agent's answer as text chunks (optionally ending
+    with HANGUP). `greeting` may be a callable of the call SID, evaluated once the stream
+    has started; the `<Parameter>`s of the `<Stream>` are in `parameters` by then. Hooks: `on_event(call_sid, message)` for call-log events,
+    `on_first_audio(call_sid, seconds)` with the delay from final transcript to first audio
+    sent, and `on_hangup(call_sid)` to end the call once the farewell has played.
+    """
+
+    def __init__(self, websocket, stt: StreamingSTT, tts: StreamingTTS, reply: ReplyStream,
+                 greeting: Union[str, Callable[[str], Optional[str]], None] = None,
+                 on_start: Optional[Callable[[str], None]] = None,
+                 on_event: Optional[Callable[[str, str], None]] = None,
+                 on_first_audio: Optional[Callable[[str, float], None]] = None,
+                 on_hangup: Optional[Callable[[str], Awaitable[None]]] = None):
+        self.websocket = websocket
+        self.stt = stt
+        self.tts = tts
+        self.reply = reply
+        self.greeting = greeting
+        self.on_start = on_start or (lambda call_sid: None)
+        self.on_event = on_event or (lambda call_sid, message: None)
+        self.on_first_audio = on_first_audio or (lambda call_sid, seconds: None)
+        self.on_hangup = on_hangup
+        self.stream_sid: Optional[str] = None
+        self.call_sid: Optional[str] = None
+        self.parameters: dict[str, str] = {}
+        self.barge_ins = 0
+        self._stt_session: Optional[STTSession] = None
+        self._tasks: list[asyncio.Task] = []
+        self._speaking: Optional[asyncio.Task] = None
+        self._marks: set[str] = set()
+        self._marks_drained = asyncio.Event()
+        self._marks_drained.set()
+        self._turn = 0
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def speaking(self) -> bool:
+        return (self._speaking is not None and not self._speaking.done()) or bool(self._marks)
+
+    async def run(self):
+        """Serve the socket until Twilio sends "stop" or disconnects."""
+        try:
+            while True:
+                try:
+                    message = json.loads(await self.websocket.receive_text())
+                except (json.JSONDecodeError, TypeError):
+                    continue
+                event = message.get("event")
+                if event == "media" and self._stt_session is not None:
+                    self._stt_session.feed(ulaw_to_pcm16(base64.b64decode(message["media"]["payload"])))
+                elif event == "start":
+                    await self._start(message)
+                elif event == "mark":
+                    self._mark_played(message.get("mark", {}).get("name"))
+                elif event == "stop":
+                    break
+        except Exception as e:
+            # Starlette raises WebSocketDisconnect; anything else is logged
+            if type(e).__name__ != "WebSocketDisconnect":
+                logger.warning("Media stream %s failed: %s", self.stream_sid, e)
+        finally:
+            await self._shutdown()
+
+    async def _start(self, message: dict):
+        start = message.get("start", {})
+        self.stream_sid = message.get("streamSid") or start.get("streamSid")
+        self.call_sid = start.get("callSid") or self.stream_sid
+        self.parameters = start.get("customParameters") or {}
+        self.on_start(self.call_sid)
+        self.on_event(self.call_sid, f"STREAM_START stream={self.stream_sid}")
+        self._stt_session = self.stt.open(self.call_sid)
+        self._tasks.append(asyncio.create_task(self._listen(self._stt_session)))
+        greeting = self.greeting(self.call_sid) if callable(self.greeting) else self.greeting
+        if greeting:
+            self._speak(self._single(greeting), started=None)
+
+    @staticmethod
+    async def _single(text: str):
+        yield text
+
+    async def _listen(self, stt_session: STTSession):
+        async for transcript in stt_session.transcripts():
+            if self.speaking:
+                await self._barge_in()
+            if transcript.is_final and transcript.text.strip():
+                self._speak(self.reply(self.call_sid, transcript.text), started=time.perf_counter())
+
+    async def _barge_in(self):
+        self.barge_ins += 1
+        if self._speaking is not None and not self._speaking.done():
+            self._speaking.cancel()
+        self._marks.clear()
+        self._marks_drained.set()
+        await self._send({"event": "clear", "streamSid": self.stream_sid})
+        self.on_event(self.call_sid, "BARGE_IN")
+
+    def _speak(self, chunks: AsyncIterator, started: Optional[float]):
+        if self._speaking is not None and not self._speaking.done():
+            self._speaking.cancel()
+        self._turn += 1
+        self._speaking = asyncio.create_task(self._play(self._turn, chunks, started))
+
+    async def _play(self, turn: int, chunks: AsyncIterator, started: Optional[float]):
+        sentence_no = 0
+        try:
+            async for sentence in split_sentences(chunks):
+                if sentence is HANGUP:
+                    await self._marks_drained.wait()
+                    if self.on_hangup is not None:
+                        await self.on_hangup(self.call_sid)
+                    return
+                async for audio in self.tts.synthesize(sentence):
+                    if started is not None:
+                        self.on_first_audio(self.call_sid, time.perf_counter() - started)
+                        started = None
+                    await self._send({"event": "media", "streamSid": self.stream_sid,
+                                      "media": {"payload": base64.b64encode(audio).decode("ascii")}})
+                sentence_no += 1
+                name = f"{turn}.{sentence_no}"
+                self._marks.add(name)
+                self._marks_drained.clear()
+                await self._send({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}})
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def _mark_played(self, name: Optional[str]):
+        self._marks.discard(name)
+        if not self._marks:
+            self._marks_drained.set()
+
+    async def _send(self, message: dict):
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(message))
+
+    async def _shutdown(self):
+        if self._speaking is not None:
+            self._speaking.cancel()
+        for task in self._tasks:
+            task.cancel()
+        if self._stt_session is not None:
+            await self._stt_session.close()
+        await asyncio.gather(*self._tasks, *(t for t in [self._speaking] if t), return_exceptions=True)
+        if self.call_sid:
+            self.on_event(self.call_sid, f"STREAM_STOP barge_ins={self.barge_ins}")
@@ -0,0 +1,201 @@
+"""In-process counters, gauges and histograms rendered in the Prometheus text format.
+
+An observation is a bisect into fixed buckets and a few additions under a per-metric
+lock (a couple of microseconds), so instrumentation can stay on in production. Bucket counts
+are stored per bucket and made cumulative only when /metrics is scraped. No
+prometheus_client dependency is needed.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional, Union
+
+# Seconds; spans sub-millisecond local work up to slow LLM turns
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: LabelKey, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        """Sum over all label values."""
+        with self._lock:
+            return sum(self._values.values())
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Metric):
+    """A settable value, or one computed at scrape time by `fn` (a number, or {label value: number})."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 fn: Optional[Callable[[], Union[float, dict]]] = None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+        self._values: dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        if self.fn is not None:
+            try:
+                value = self.fn()
+            except Exception:
+                return []
+            if isinstance(value, dict):
+                return [f"{self.name}{_labels(self.labelnames, (k,) if isinstance(k, str) else k)} {_number(v)}"
+                        for k, v in value.items()]
+            return [f"{self.name} {_number(value)}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class _Timer:
+    __slots__ = ("histogram", "key", "started")
+
+    def __init__(self, histogram: "Histogram", key: LabelKey):
+        self.histogram = histogram
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram._observe(self.key, time.perf_counter() - self.started)
+        return False
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels):
+        self._observe(self._key(labels), value)
+
+    def time(self, **labels) -> _Timer:
+        """Context manager observing the elapsed wall time of its block."""
+        return _Timer(self, self._key(labels))
+
+    def _observe(self, key: LabelKey, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _samples(self):
+        with self._lock:
+            snapshot = [(k, list(s[0]), s[1], s[2]) for k, s in self._series.items()]
+        lines = []
+        for key, counts, total, count in snapshot:
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_labels = _labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = (), fn=None) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, fn))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+async def monitor_event_loop_lag(histogram: Histogram, gauge: Gauge, interval: float = 0.5):
+    """Sleep `interval` repeatedly and record how late the loop woke us up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        histogram.observe(lag)
+        gauge.set(lag)
@@ -0,0 +1,149 @@
+"""Pre-rendered audio for fixed prompts, played with <Play> instead of <Say>.
+
+Greetings, reprompts, the farewell and the error message are the same on every call of a
+project, yet <Say> has Twilio synthesize them again each time. PromptAudio renders each
+distinct (text, voice, language) once through a pluggable TTS backend (see
+media_stream.register_tts) into an 8 kHz μ-law WAV, the format Twilio plays without
+transcoding. Assets are named by a hash of what they contain, so a changed project config
+simply produces new names, and files survive restarts. They are served from memory with
+a strong ETag, a long immutable Cache-Control and byte-range support, so Twilio fetches
+each one once and plays it from its cache afterwards.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import struct
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from media_stream import SAMPLE_RATE, StreamingTTS
+
+logger = logging.getLogger(__name__)
+
+NAME = re.compile(r"^[0-9a-f]{24}\.wav$")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+WAVE_FORMAT_MULAW = 7
+
+
+@dataclass(frozen=True)
+class PromptAsset:
+    data: bytes
+    etag: str
+
+
+def mulaw_wav(ulaw: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Mono μ-law samples wrapped in a WAV container (fmt, fact and data chunks)."""
+    fmt = struct.pack("<HHIIHHH", WAVE_FORMAT_MULAW, 1, sample_rate, sample_rate, 1, 8, 0)
+    fact = struct.pack("<I", len(ulaw))
+    pad = b"\0" if len(ulaw) & 1 else b""
+    body = (b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"fact" + struct.pack("<I", len(fact)) + fact
+            + b"data" + struct.pack("<I", len(ulaw)) + ulaw + pad)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def byte_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """(start, end inclusive) for a single-range `Range` header; None to send the whole body.
+
+    Multi-range and malformed headers, including an end before the start, are ignored,
+    as RFC 9110 requires. Raises ValueError if the range cannot be satisfied.
+    """
+    m = RANGE.match(header.strip()) if header else None
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    if not m.group(1):
+        # Suffix range: the last N bytes
+        length = int(m.group(2))
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(m.group(1))
+    if m.group(2) and int(m.group(2)) < start:
+        return None
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    return start, end
+
+
+class PromptAudio:
+    """Content-addressed prompt assets in `directory`, rendered with `tts` and kept in memory."""
+
+    def __init__(self, directory: str, tts: StreamingTTS, tts_name: str, base_url: str, concurrency: int = 4):
+        self.directory = directory
+        self.tts = tts
+        self.tts_name = tts_name
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self._assets: dict[str, PromptAsset] = {}
+        self.rendered = 0
+        self.failed = 0
+
+    def name(self, text: str, voice: str, language: str) -> str:
+        digest = hashlib.sha256("\0".join((self.tts_name, voice, language, text)).encode("utf-8")).hexdigest()
+        return digest[:24] + ".wav"
+
+    def url(self, text: str, voice: str, language: str) -> Optional[str]:
+        """Public URL of the rendered prompt, or None if it has not been rendered."""
+        name = self.name(text, voice, language)
+        return f"{self.base_url}/{name}" if name in self._assets else None
+
+    def get(self, name: str) -> Optional[PromptAsset]:
+        return self._assets.get(name)
+
+    def __len__(self) -> int:
+        return len(self._assets)
+
+    def _add(self, name: str, data: bytes):
+        self._assets[name] = PromptAsset(data, '"' + hashlib.sha256(data).hexdigest()[:32] + '"')
+
+    def load(self) -> int:
+        """Load assets rendered by earlier runs; returns how many were found."""
+        if not os.path.isdir(self.directory):
+            return 0
+        for name in os.listdir(self.directory):
+            if NAME.match(name):
+                with open(os.path.join(self.directory, name), "rb") as f:
+                    self._add(name, f.read())
+        return len(self._assets)
+
+    def _write(self, name: str, data: bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        with open(path + ".part", "wb") as f:
+            f.write(data)
+        os.replace(path + ".part", path)
+
+    async def _render_one(self, name: str, text: str, voice: str, language: str, slots: asyncio.Semaphore):
+        async with slots:
+            try:
+                chunks = [chunk async for chunk in self.tts.synthesize(text, voice=voice, language=language)]
+                data = mulaw_wav(b"".join(chunks))
+                await asyncio.to_thread(self._write, name, data)
+            except Exception as e:
+                self.failed += 1
+                logger.warning("Rendering prompt %r (%s) failed; it stays <Say>: %s", text[:40], voice, e)
+                return
+        self._add(name, data)
+        self.rendered += 1
+
+    async def render(self, prompts: Iterable[tuple[str, str, str]]) -> int:
+        """Render every (text, voice, language) without an asset yet; returns how many were added."""
+        missing: dict[str, tuple[str, str, str]] = {}
+        for text, voice, language in prompts:
+            name = self.name(text, voice, language)
+            if name not in self._assets:
+                missing[name] = (text, voice, language)
+        slots = asyncio.Semaphore(self.concurrency)
+        before = len(self._assets)
+        await asyncio.gather(*(self._render_one(name, *prompt, slots) for name, prompt in missing.items()))
+        return len(self._assets) - before
+
+    def stats(self) -> dict:
+        return {
+            "assets": len(self._assets),
+            "bytes": sum(len(a.data) for a in self._assets.values()),
+            "rendered": self.rendered,
+            "failed": self.failed,
+        }
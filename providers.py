@@ -0,0 +1,82 @@
+"""Lazily initialized SDK clients.
+
+Importing and configuring google.generativeai or building the Twilio REST client is
+deferred until first use, so a process that only serves health checks or the OpenAPI
+schema never pays for it. The app warms providers on a worker thread at startup and
+reports their state through the readiness endpoint; a request that needs a provider
+before warm-up finishes initializes it itself, and concurrent callers wait for that
+one initialization instead of racing.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Provider(Generic[T]):
+    """Builds its value once, on the first `get()` from any thread.
+
+    A failed build is not cached: the error is kept for `status()` and the next `get()`
+    tries again.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._ready = False
+        self._initializing = False
+        self.error: Optional[str] = None
+        self.init_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> T:
+        if self._ready:
+            return self._value  # type: ignore[return-value]
+        with self._lock:
+            if not self._ready:
+                self._initializing = True
+                started = time.perf_counter()
+                try:
+                    self._value = self._factory()
+                except Exception as e:
+                    self.error = f"{type(e).__name__}: {e}"
+                    raise
+                finally:
+                    self._initializing = False
+                self.init_seconds = time.perf_counter() - started
+                self.error = None
+                self._ready = True
+                logger.info("Initialized %s in %.3fs", self.name, self.init_seconds)
+        return self._value  # type: ignore[return-value]
+
+    async def warm(self):
+        """Initialize on a worker thread; a failure is logged and left for the next `get()`."""
+        try:
+            await asyncio.to_thread(self.get)
+        except Exception as e:
+            logger.warning("Warm-up of %s failed: %s", self.name, e)
+
+    def status(self) -> dict:
+        if self._ready:
+            state = "ready"
+        elif self._initializing:
+            state = "initializing"
+        elif self.error:
+            state = "failed"
+        else:
+            state = "pending"
+        return {
+            "state": state,
+            "init_seconds": round(self.init_seconds, 4) if self.init_seconds is not None else None,
+            "error": self.error,
+        }
@@ -0,0 +1,276 @@
+"""Recording post-processing in a process pool.
+
+Once a recording is on disk, a worker process decodes it with ffmpeg to 16-bit PCM,
+measures speech activity and levels per channel with NumPy over short frames, trims
+leading and trailing silence, and re-encodes what is left as low-bitrate Opus. The stats
+go into the call log and the compact file replaces the MP3. Decoding, analysis and
+encoding are CPU-bound, so they run in separate processes and scale with cores; the
+event loop only awaits results. Workers are spawned rather than forked so they do not
+inherit the server's threads and locks. This module imports only the standard library
+(and NumPy inside the worker functions), so a worker never loads the app itself unless
+the server's __main__ is a script, so the server is started as `uvicorn main:app`.
+"""
+import asyncio
+import glob
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import struct
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RecordingProcessingError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ProcessingOptions:
+    ffmpeg: str = "ffmpeg"
+    sample_rate: int = 8000
+    frame_ms: int = 20
+    # Frames quieter than this on every channel count as silence
+    silence_dbfs: float = -45.0
+    # Silence kept before the first and after the last speech frame
+    pad_ms: int = 300
+    bitrate: str = "16k"
+    # libopus effort 0-10; 5 is about twice as fast as the default 10 at a size within 1% for speech
+    compression_level: int = 5
+    # 1 mixes a dual-channel recording down to mono
+    channels: int = 1
+    keep_original: bool = False
+
+
+def _parse_wav(data: bytes) -> tuple[int, bytes]:
+    """(channels, PCM bytes) from a WAV stream; ffmpeg leaves sizes unset when writing to a pipe."""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise RecordingProcessingError("decoder did not produce WAV output")
+    pos, channels = 12, None
+    while pos + 8 <= len(data):
+        chunk, size = data[pos:pos + 4], struct.unpack_from("<I", data, pos + 4)[0]
+        body = pos + 8
+        if chunk == b"fmt ":
+            channels = struct.unpack_from("<H", data, body + 2)[0]
+        elif chunk == b"data":
+            if not channels:
+                raise RecordingProcessingError("WAV data before format chunk")
+            return channels, data[body:]
+        pos = body + size + (size & 1)
+    raise RecordingProcessingError("no audio data in decoded recording")
+
+
+def decode(path: str, options: ProcessingOptions):
+    """Samples as an int16 array of shape (samples, channels), resampled to options.sample_rate."""
+    # NumPy is imported inside the worker-side functions so the server process never loads it
+    import numpy as np
+
+    proc = subprocess.run(
+        [options.ffmpeg, "-nostdin", "-v", "error", "-i", path,
+         "-f", "wav", "-acodec", "pcm_s16le", "-ar", str(options.sample_rate), "-"],
+        capture_output=True,
+    )
+    if proc.returncode != 0:
+        raise RecordingProcessingError(f"decode failed: {proc.stderr.decode(errors='replace').strip()[-300:]}")
+    channels, pcm = _parse_wav(proc.stdout)
+    samples = np.frombuffer(pcm, dtype="<i2")
+    return samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+
+
+def frame_levels(samples, sample_rate: int, frame_ms: int):
+    """RMS level in dBFS of each frame and channel, shape (frames, channels)."""
+    import numpy as np
+
+    frame = sample_rate * frame_ms // 1000
+    n = len(samples) // frame
+    frames = samples[:n * frame].reshape(n, frame, samples.shape[1]).astype(np.float32)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1.0) / 32768)
+
+
+def _dbfs(power: float) -> float:
+    return round(10 * math.log10(max(power, 1.0) / 32768 ** 2), 1)
+
+
+def analyze(samples, options: ProcessingOptions) -> tuple[dict, int, int]:
+    """Call stats, plus the sample range to keep once leading and trailing silence are trimmed."""
+    import numpy as np
+
+    frame = options.sample_rate * options.frame_ms // 1000
+    frame_seconds = options.frame_ms / 1000
+    voiced = frame_levels(samples, options.sample_rate, options.frame_ms) > options.silence_dbfs
+    speech = voiced.any(axis=1)
+    active = np.flatnonzero(speech)
+    if active.size:
+        pad = options.pad_ms * options.sample_rate // 1000
+        start = max(0, int(active[0]) * frame - pad)
+        end = min(len(samples), (int(active[-1]) + 1) * frame + pad)
+    else:
+        start = end = 0
+
+    x = samples.astype(np.float64)
+    power = np.mean(np.square(x), axis=0) if len(x) else np.zeros(samples.shape[1])
+    peak = np.max(np.abs(x), axis=0) if len(x) else np.zeros(samples.shape[1])
+    framed = np.square(x[:len(voiced) * frame]).reshape(len(voiced), frame, samples.shape[1]).mean(axis=1)
+    duration = len(samples) / options.sample_rate
+    stats = {
+        "duration_seconds": round(duration, 2),
+        "talk_seconds": round(float(speech.sum()) * frame_seconds, 2),
+        "silence_ratio": round(1 - float(speech.mean()), 3) if len(speech) else 1.0,
+        "rms_dbfs": _dbfs(float(power.mean())),
+        "trimmed_seconds": round(duration - (end - start) / options.sample_rate, 2),
+        "channels": [
+            {
+                "talk_seconds": round(float(voiced[:, c].sum()) * frame_seconds, 2),
+                "rms_dbfs": _dbfs(float(power[c])),
+                "speech_rms_dbfs": _dbfs(float(framed[voiced[:, c], c].mean())) if voiced[:, c].any() else None,
+                "peak_dbfs": _dbfs(float(peak[c]) ** 2),
+            }
+            for c in range(samples.shape[1])
+        ],
+    }
+    if samples.shape[1] > 1:
+        stats["overlap_seconds"] = round(float(voiced.all(axis=1).sum()) * frame_seconds, 2)
+    return stats, start, end
+
+
+def encode(samples, dest: str, options: ProcessingOptions):
+    """Write int16 samples to `dest` as Ogg/Opus tuned for speech, atomically."""
+    part = dest + ".part"
+    try:
+        proc = subprocess.run(
+            [options.ffmpeg, "-nostdin", "-v", "error", "-y",
+             "-f", "s16le", "-ar", str(options.sample_rate), "-ac", str(samples.shape[1]), "-i", "-",
+             "-ac", str(options.channels), "-c:a", "libopus", "-b:a", options.bitrate,
+             "-application", "voip", "-compression_level", str(options.compression_level), "-f", "ogg", part],
+            input=samples.tobytes(), capture_output=True,
+        )
+        if proc.returncode != 0:
+            raise RecordingProcessingError(f"encode failed: {proc.stderr.decode(errors='replace').strip()[-300:]}")
+        os.replace(part, dest)
+    finally:
+        # A failed encode may leave a partial file behind; after os.replace there is none
+        if os.path.exists(part):
+            os.remove(part)
+
+
+def process_recording(path: str, options: ProcessingOptions) -> dict:
+    """Decode, analyze, trim and re-encode one recording. Runs in a worker process.
+
+    Returns the stats plus `path` (the file to keep), `bytes_in`, `bytes_out` and the
+    time spent in `seconds`.
+    """
+    started = time.perf_counter()
+    samples = decode(path, options)
+    stats, start, end = analyze(samples, options)
+    bytes_in = os.path.getsize(path)
+    if end > start:
+        dest = os.path.splitext(path)[0] + ".opus"
+        encode(samples[start:end], dest, options)
+        if not options.keep_original and dest != path:
+            os.remove(path)
+    else:
+        # Nothing but silence: keep the original rather than write an empty file
+        dest = path
+    return {**stats, "path": dest, "bytes_in": bytes_in, "bytes_out": os.path.getsize(dest),
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def format_stats(result: dict) -> str:
+    """One call-log line: `key=value` pairs, per-channel values as `ch<N>_<key>`."""
+    parts = [f"{k}={v}" for k, v in result.items() if k not in ("channels", "path")]
+    for i, channel in enumerate(result.get("channels", []), 1):
+        parts += [f"ch{i}_{k}={v}" for k, v in channel.items()]
+    return " ".join(parts + [f"path={result['path']}"])
+
+
+class RecordingProcessor:
+    """Runs `process_recording` for submitted recordings on a pool of `workers` processes.
+
+    The pool starts on first use. If ffmpeg is missing, submissions are refused with a
+    single warning so downloads keep working.
+    """
+
+    def __init__(self, workers: Optional[int] = None, options: Optional[ProcessingOptions] = None,
+                 on_event: Optional[Callable[[str, str], None]] = None,
+                 on_complete: Optional[Callable[[str, dict], None]] = None,
+                 on_result: Optional[Callable[[str, float, Optional[Exception]], None]] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.options = options or ProcessingOptions()
+        self.on_event = on_event or (lambda call_sid, message: None)
+        self.on_complete = on_complete or (lambda call_sid, result: None)
+        # Called after every recording with (call_sid, seconds, error or None)
+        self.on_result = on_result or (lambda call_sid, seconds, error: None)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._available: Optional[bool] = None
+
+    @property
+    def available(self) -> bool:
+        if self._available is None:
+            self._available = shutil.which(self.options.ffmpeg) is not None
+            if not self._available:
+                logger.warning("%s not found; recordings will not be post-processed", self.options.ffmpeg)
+        return self._available
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, call_sid: str, path: str) -> bool:
+        """Queue a recording; False if post-processing is unavailable or it is already queued."""
+        if not self.available or call_sid in self._tasks:
+            return False
+        task = asyncio.create_task(self._run(call_sid, path))
+        self._tasks[call_sid] = task
+        task.add_done_callback(lambda _t: self._tasks.pop(call_sid, None))
+        return True
+
+    def backfill(self, directory: str) -> int:
+        """Queue every downloaded MP3 in `directory` that has not been processed yet."""
+        queued = 0
+        for path in sorted(glob.glob(os.path.join(directory, "recording_*.mp3"))):
+            call_sid = os.path.basename(path)[len("recording_"):-len(".mp3")]
+            if os.path.exists(os.path.splitext(path)[0] + ".opus"):
+                continue
+            queued += self.submit(call_sid, path)
+        return queued
+
+    async def _run(self, call_sid: str, path: str):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(self._pool(), process_recording, path, self.options)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.on_result(call_sid, time.perf_counter() - started, e)
+            self.on_event(call_sid, f"RECORDING_PROCESS_FAILED {e}")
+            logger.warning("Post-processing %s failed: %s", path, e, extra={"call_sid": call_sid})
+            return
+        self.on_result(call_sid, time.perf_counter() - started, None)
+        self.on_complete(call_sid, result)
+        self.on_event(call_sid, f"RECORDING_STATS {format_stats(result)}")
+        logger.info("Recording %s processed: %s -> %s bytes", path, result["bytes_in"], result["bytes_out"],
+                    extra={"call_sid": call_sid})
+
+    async def stop(self, timeout: float = 30.0):
+        """Let in-flight recordings finish (up to `timeout`), then shut the pool down."""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks.values()), timeout=timeout)
+        for task in list(self._tasks.values()):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
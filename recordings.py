@@ -0,0 +1,177 @@
+"""Background recording downloader.
+
+Recording callbacks only enqueue a job; a small pool of worker tasks fetches each MP3
+off the event loop, streaming it in chunks to `<name>.part` and renaming it into place
+when complete. Failed attempts are retried with exponential backoff and resume from the
+bytes already on disk using an HTTP Range request.
+"""
+import asyncio
+import logging
+import os
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: Twilio can briefly 404 a just-finished recording
+RETRYABLE_STATUS = {404, 408, 429, 500, 502, 503, 504}
+CONTENT_RANGE = re.compile(r"^bytes (?:(\d+)-\d+|\*)/(\d+|\*)$")
+
+
+def content_range(header: Optional[str]) -> tuple[Optional[int], Optional[int]]:
+    """(first byte, complete length) of a Content-Range header; None for parts that are absent or "*"."""
+    m = CONTENT_RANGE.match(header.strip()) if header else None
+    if not m:
+        return None, None
+    start, total = m.groups()
+    return (int(start) if start is not None else None), (int(total) if total != "*" else None)
+
+
+class RecordingDownloadError(Exception):
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+@dataclass
+class RecordingJob:
+    call_sid: str
+    url: str
+    attempts: int = 0
+
+
+class RecordingDownloader:
+    """Bounded queue of recording downloads served by `workers` background tasks."""
+
+    def __init__(self, dest_dir: str = "recordings", workers: int = 2, queue_size: int = 1000,
+                 max_retries: int = 4, backoff_seconds: float = 2.0, chunk_size: int = 64 * 1024,
+                 timeout: Union[float, tuple[float, float]] = 30, auth: Optional[tuple[str, str]] = None,
+                 session: Optional[requests.Session] = None,
+                 on_event: Optional[Callable[[str, str], None]] = None,
+                 on_complete: Optional[Callable[[str, str], None]] = None,
+                 on_attempt: Optional[Callable[[str, float, Optional[Exception]], None]] = None):
+        self.dest_dir = dest_dir
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.auth = auth
+        self.session = session or requests.Session()
+        self.on_event = on_event or (lambda call_sid, message: None)
+        self.on_complete = on_complete or (lambda call_sid, path: None)
+        # Called after every download attempt with (call_sid, seconds, error or None)
+        self.on_attempt = on_attempt or (lambda call_sid, seconds, error: None)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, call_sid: str, url: str) -> bool:
+        """Queue a download; returns False if the downloader is not running or the queue is full."""
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait(RecordingJob(call_sid, url))
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def join(self):
+        """Wait until every queued download has finished (or given up)."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _worker(self, index: int):
+        assert self._queue is not None
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.warning("Recording worker %s failed on %s: %s", index, job.call_sid, e,
+                               extra={"call_sid": job.call_sid})
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: RecordingJob):
+        while True:
+            job.attempts += 1
+            started = time.perf_counter()
+            try:
+                path = await asyncio.to_thread(self.download, job.call_sid, job.url)
+            except RecordingDownloadError as e:
+                self.on_attempt(job.call_sid, time.perf_counter() - started, e)
+                if not e.retryable or job.attempts > self.max_retries:
+                    self.on_event(job.call_sid, f"RECORDING_DOWNLOAD_FAILED {e}")
+                    logger.warning("Giving up on recording %s after %s attempt(s): %s", job.url, job.attempts, e,
+                                   extra={"call_sid": job.call_sid})
+                    return
+                delay = self.backoff_seconds * 2 ** (job.attempts - 1) * random.uniform(0.8, 1.2)
+                logger.info("Recording download for %s failed (%s); retrying in %.1fs", job.call_sid, e, delay,
+                            extra={"call_sid": job.call_sid})
+                await asyncio.sleep(delay)
+                continue
+            self.on_attempt(job.call_sid, time.perf_counter() - started, None)
+            self.on_complete(job.call_sid, path)
+            self.on_event(job.call_sid, f"RECORDING_DOWNLOADED {path}")
+            logger.info("Recording saved as %s", path, extra={"call_sid": job.call_sid})
+            return
+
+    def download(self, call_sid: str, url: str) -> str:
+        """Stream `url` to disk, resuming a previous partial download. Runs in a worker thread."""
+        os.makedirs(self.dest_dir, exist_ok=True)
+        final = os.path.join(self.dest_dir, f"recording_{call_sid}.mp3")
+        part = final + ".part"
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        try:
+            r = self._get(url, offset)
+            start, total = content_range(r.headers.get("Content-Range"))
+            if offset and ((r.status_code == 206 and start != offset)
+                           or (r.status_code == 416 and total is not None and total != offset)):
+                # The server answered a different range than we asked for (or the part is not the
+                # file it has); appending would corrupt the recording, so fetch it whole
+                r.close()
+                logger.warning("Recording %s: resume at byte %d got %s %s; restarting from 0",
+                               call_sid, offset, r.status_code, r.headers.get("Content-Range"),
+                               extra={"call_sid": call_sid})
+                offset = 0
+                r = self._get(url, offset)
+            with r:
+                if r.status_code == 416 and offset:
+                    # Everything was already downloaded before the previous attempt failed
+                    os.replace(part, final)
+                    return final
+                if r.status_code not in (200, 206):
+                    raise RecordingDownloadError(f"status={r.status_code}", r.status_code in RETRYABLE_STATUS)
+                # A 200 means the server ignored the Range header: start over
+                mode = "ab" if r.status_code == 206 and offset else "wb"
+                with open(part, mode) as f:
+                    for chunk in r.iter_content(chunk_size=self.chunk_size):
+                        if chunk:
+                            f.write(chunk)
+        except requests.RequestException as e:
+            raise RecordingDownloadError(str(e)) from e
+        os.replace(part, final)
+        return final
+
+    def _get(self, url: str, offset: int) -> requests.Response:
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        return self.session.get(url, auth=self.auth, headers=headers, stream=True, timeout=self.timeout)
@@ -0,0 +1,149 @@
+"""LRU + TTL cache for generated assistant replies, with optional on-disk persistence.
+
+Keys are built from a normalized caller utterance plus a fingerprint of the project
+configuration, so near-identical questions ("What's the price?" / "what is the price")
+share one entry and a config change never serves stale answers.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = re.compile(r"\s+")
+# Spelling variants that speech recognition produces interchangeably in Devanagari
+SCRIPT_FOLD = str.maketrans({
+    "\u093c": None,      # nukta: ज़ -> ज
+    "\u0901": "\u0902",  # chandrabindu -> anusvara: कहाँ -> कहां
+    "\u200b": None, "\u200c": None, "\u200d": None,  # zero-width space / (non-)joiners
+    **{chr(0x0966 + d): str(d) for d in range(10)},  # Devanagari digits -> ASCII
+})
+CONTRACTIONS = {"what's": "what is", "it's": "it is", "that's": "that is", "where's": "where is"}
+
+
+def normalize_utterance(text: str) -> str:
+    """Fold case, punctuation, script variants and whitespace."""
+    text = unicodedata.normalize("NFKC", text).casefold().translate(SCRIPT_FOLD)
+    for short, full in CONTRACTIONS.items():
+        text = text.replace(short, full)
+    text = "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in text)
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def replace_name(text: str, name: str, placeholder: str) -> str:
+    """Replace whole-word occurrences of `name` in `text` with `placeholder`.
+
+    A plain substring replace would also rewrite "Ram" inside "program", and the cached
+    reply would then put another caller's name there.
+    """
+    if not name.strip():
+        return text
+    return re.sub(r"(?<!\w)" + re.escape(name) + r"(?!\w)", lambda _m: placeholder, text)
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: float = 24 * 3600,
+                 path: Optional[str] = None, save_every: int = 25):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.save_every = save_every
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(utterance: str, config: Iterable[str]) -> str:
+        fingerprint = "\x1f".join(config)
+        return hashlib.sha1(f"{fingerprint}\x1e{normalize_utterance(utterance)}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty += 1
+
+    def needs_save(self) -> bool:
+        return bool(self.path) and self._dirty >= self.save_every
+
+    def load(self):
+        """Load unexpired entries from `path`, if configured and present."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning("Ignoring unreadable response cache %s: %s", self.path, e)
+            return
+        now = time.time()
+        with self._lock:
+            for key, value, expires_at in data.get("entries", []):
+                if expires_at > now:
+                    self._entries[key] = (value, expires_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info("Loaded %s cached responses from %s", len(self._entries), self.path)
+
+    def save(self):
+        """Atomically write the cache to `path` (oldest entries first, preserving LRU order)."""
+        if not self.path:
+            return
+        now = time.time()
+        with self._lock:
+            entries = [[k, v, exp] for k, (v, exp) in self._entries.items() if exp > now]
+            self._dirty = 0
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".response_cache.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning("Failed to persist response cache: %s", e)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "persistent": bool(self.path),
+            }
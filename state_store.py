@@ -0,0 +1,317 @@
+"""Pluggable per-call state storage shared by every worker.
+
+Values are JSON-serializable and always handed out as copies; the only way to change
+a stored dict is `update(key, fn)`, which runs `fn` on a fresh copy and writes the result
+back atomically for that key. Backends:
+
+- ``memory``                     process-local dict (single worker; the default)
+- ``sqlite:///path/to/state.db`` shared file for several processes on one host
+- ``redis://host:6379/0``        any Redis-protocol server, for several hosts
+
+The `a`-prefixed methods (`aget`, `aupdate`, ...) are for async code: the SQLite and Redis
+backends run them in a worker thread so a slow or locked store never stalls the event loop.
+Both also give up after `timeout` seconds (SQLite's busy timeout, Redis's socket timeout)
+rather than queueing behind a stuck writer.
+"""
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_TIMEOUT_SECONDS = 2.0
+
+
+class StateStore(ABC):
+    """Key/value store scoped to one namespace (e.g. "call_state")."""
+
+    # Whether operations do I/O; if so the async methods run them in a worker thread
+    blocking = True
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a copy of the value, or `default`."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        ...
+
+    @abstractmethod
+    def add(self, key: str, value: Any) -> bool:
+        """Store `value` only if `key` is absent; returns True if it was stored."""
+
+    @abstractmethod
+    def update(self, key: str, fn: Callable[[dict], T], default: Optional[dict] = None) -> Optional[T]:
+        """Atomically apply `fn` to the dict stored at `key` and persist it.
+
+        `fn` mutates its argument in place and may return a value, which is passed back.
+        If the key is absent, `fn` runs on a copy of `default`; with no default the call
+        is a no-op that returns None.
+        """
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def keys(self) -> list[str]:
+        ...
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    async def _run(self, method: Callable[..., T], *args) -> T:
+        if not self.blocking:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        return await self._run(self.get, key, default)
+
+    async def aset(self, key: str, value: Any):
+        await self._run(self.set, key, value)
+
+    async def aadd(self, key: str, value: Any) -> bool:
+        return await self._run(self.add, key, value)
+
+    async def aupdate(self, key: str, fn: Callable[[dict], T], default: Optional[dict] = None) -> Optional[T]:
+        return await self._run(self.update, key, fn, default)
+
+    async def adelete(self, key: str):
+        await self._run(self.delete, key)
+
+
+class InMemoryStateStore(StateStore):
+    blocking = False
+
+    def __init__(self, namespace: str):
+        super().__init__(namespace)
+        self._data: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key)
+        return copy.deepcopy(value) if value is not None else default
+
+    def set(self, key, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = value
+
+    def add(self, key, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            if key in self._data:
+                return False
+            self._data[key] = value
+            return True
+
+    def update(self, key, fn, default=None):
+        with self._lock:
+            current = self._data.get(key)
+            if current is None:
+                if default is None:
+                    return None
+                current = default
+            value = copy.deepcopy(current)
+            result = fn(value)
+            self._data[key] = value
+            return result
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class SQLiteStateStore(StateStore):
+    """Shared SQLite file; `update` runs inside a BEGIN IMMEDIATE transaction.
+
+    A write that cannot get the lock within `timeout` seconds raises sqlite3.OperationalError.
+    """
+
+    def __init__(self, namespace: str, path: str, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        super().__init__(namespace)
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS state (namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "updated_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly where needed
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._conn().execute(
+            "SELECT value FROM state WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO state (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value), time.time()),
+        )
+
+    def add(self, key, value):
+        cur = self._conn().execute(
+            "INSERT OR IGNORE INTO state (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value), time.time()),
+        )
+        return cur.rowcount == 1
+
+    def update(self, key, fn, default=None):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+            if row is None and default is None:
+                conn.execute("ROLLBACK")
+                return None
+            value = json.loads(row[0]) if row else copy.deepcopy(default)
+            result = fn(value)
+            conn.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), time.time()),
+            )
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM state WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def keys(self):
+        rows = self._conn().execute("SELECT key FROM state WHERE namespace = ?", (self.namespace,))
+        return [r[0] for r in rows]
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM state WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+
+
+class RedisStateStore(StateStore):
+    """Redis-protocol backend; `update` is an optimistic WATCH/MULTI/EXEC transaction.
+
+    Pass `client` to use an existing connection (e.g. a fakeredis instance in tests);
+    otherwise the optional `redis` package is imported and connected to `url`.
+    """
+
+    def __init__(self, namespace: str, url: Optional[str] = None, client: Any = None, prefix: str = "voice_agent",
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        super().__init__(namespace)
+        try:
+            import redis  # type: ignore
+        except ImportError as e:
+            raise RuntimeError("STATE_BACKEND=redis://... requires the 'redis' package (pip install redis)") from e
+        self._watch_error = redis.WatchError
+        self.client = client if client is not None else redis.Redis.from_url(
+            url or "redis://localhost:6379/0", socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._prefix = f"{prefix}:{namespace}:"
+        self._index = f"{prefix}:{namespace}:__keys__"
+
+    def _key(self, key: str) -> str:
+        return self._prefix + key
+
+    def get(self, key, default=None):
+        raw = self.client.get(self._key(key))
+        return json.loads(raw) if raw is not None else default
+
+    def set(self, key, value):
+        pipe = self.client.pipeline()
+        pipe.set(self._key(key), json.dumps(value))
+        pipe.sadd(self._index, key)
+        pipe.execute()
+
+    def add(self, key, value):
+        if not self.client.set(self._key(key), json.dumps(value), nx=True):
+            return False
+        self.client.sadd(self._index, key)
+        return True
+
+    def update(self, key, fn, default=None):
+        full_key = self._key(key)
+        while True:
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(full_key)
+                    raw = pipe.get(full_key)
+                    if raw is None and default is None:
+                        pipe.unwatch()
+                        return None
+                    value = json.loads(raw) if raw is not None else copy.deepcopy(default)
+                    result = fn(value)
+                    pipe.multi()
+                    pipe.set(full_key, json.dumps(value))
+                    pipe.sadd(self._index, key)
+                    pipe.execute()
+                    return result
+                except self._watch_error:
+                    # Another writer changed the key between WATCH and EXEC: retry with fresh state
+                    continue
+
+    def delete(self, key):
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(key))
+        pipe.srem(self._index, key)
+        pipe.execute()
+
+    def keys(self):
+        return [k.decode() if isinstance(k, bytes) else k for k in self.client.smembers(self._index)]
+
+    def __contains__(self, key):
+        return bool(self.client.exists(self._key(key)))
+
+    def __len__(self):
+        return int(self.client.scard(self._index))
+
+
+def make_state_store(backend: str, namespace: str, timeout: float = DEFAULT_TIMEOUT_SECONDS) -> StateStore:
+    """Build a store from a STATE_BACKEND setting: memory | sqlite:///path | redis://..."""
+    if not backend or backend == "memory":
+        return InMemoryStateStore(namespace)
+    if backend.startswith("sqlite:///"):
+        return SQLiteStateStore(namespace, backend[len("sqlite:///"):], timeout=timeout)
+    if backend.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStateStore(namespace, url=backend, timeout=timeout)
+    raise ValueError(f"Unsupported STATE_BACKEND: {backend}")
@@ -0,0 +1,282 @@
+"""Project registry: one worker pool serving many real-estate projects.
+
+Projects are listed in a JSON config file. Each one is compiled once into a Tenant: its
+persona prompt, intent answers, speech hints and TwiML templates. A call is routed by
+its `campaign` parameter (a project key or one of the project's campaign codes) or by
+the Twilio number involved, and falls back to the default project built from the
+COMPANY_NAME/PROJECT_* environment variables, so routing a turn is a dict lookup.
+
+A watcher re-reads the file when it changes, compiles what changed off the event loop
+and swaps the whole set in with one assignment. Calls in progress keep going and pick
+up their project's new config on their next turn. An invalid file is logged and the
+running config stays in place.
+
+    {"projects": [{"key": "skyline", "company": "Basant Realty", "project": "Skyline Towers",
+                   "location": "Sector 62, Noida", "starting_price": "₹72 lakhs",
+                   "unit_types": "2BHK–4BHK", "numbers": ["+911204567890"],
+                   "campaigns": ["diwali-2025"], "hints": ["Skyline", "Noida"]}]}
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from intents import IntentEngine
+from twiml_templates import TwimlTemplates
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEY = "default"
+KEY = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+NUMBER_JUNK = re.compile(r"[\s().-]")
+UNIT_SEPARATORS = re.compile(r"\s*(?:[,/–—]|-(?!\d)|\bto\b)\s*")
+
+
+@dataclass(frozen=True)
+class Project:
+    key: str
+    company: str
+    project: str
+    location: str = ""
+    starting_price: str = ""
+    unit_types: str = ""
+    # Twilio numbers that route to this project; the first is the caller ID for its outbound calls
+    numbers: tuple[str, ...] = ()
+    # Other values of the `campaign` parameter that route here
+    campaigns: tuple[str, ...] = ()
+    # Extra speech-recognition hints (project and place names the recognizer would miss)
+    hints: tuple[str, ...] = ()
+
+
+def normalize_number(number: str) -> str:
+    """E.164 as Twilio sends it: no spaces, dashes or parentheses."""
+    return NUMBER_JUNK.sub("", number)
+
+
+def speech_hints(base: str, *extra: Iterable[str]) -> str:
+    """`base` hints plus extra phrases, comma-separated with duplicates dropped."""
+    phrases, seen = [], set()
+    for phrase in [p.strip() for p in base.split(",")] + [p.strip() for group in extra for p in group]:
+        if phrase and phrase.casefold() not in seen:
+            seen.add(phrase.casefold())
+            phrases.append(phrase)
+    return ", ".join(phrases)
+
+
+def project_hints(project: Project, reply_base: str, qualify_base: str) -> tuple[str, str]:
+    """(reply, qualify) Gather hints: the base hints plus the project's names and unit types."""
+    names = [project.project, project.company, *project.location.split(","), *project.hints]
+    units = [u for u in UNIT_SEPARATORS.split(project.unit_types) if not u.isdigit()]
+    return speech_hints(reply_base, names), speech_hints(qualify_base, units)
+
+
+def parse_projects(payload: Any, default: Project) -> list[Project]:
+    """Projects from a decoded config file; raises ValueError if it is malformed."""
+    items = payload.get("projects") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise ValueError('expected {"projects": [...]} or a list of projects')
+    projects: list[Project] = []
+    keys: set[str] = set()
+    routes: dict[str, str] = {}
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"project #{i} is not an object")
+        key = str(item.get("key") or "")
+        if not KEY.match(key):
+            raise ValueError(f"project #{i} needs a key of letters, digits, '_', '.' or '-'")
+        if key in keys:
+            raise ValueError(f"duplicate project key {key!r}")
+        keys.add(key)
+        unknown = set(item) - {f for f in Project.__dataclass_fields__}
+        if unknown:
+            raise ValueError(f"project {key!r}: unknown field(s) {', '.join(sorted(unknown))}")
+        for name in ("numbers", "campaigns", "hints"):
+            if not isinstance(item.get(name, []), list):
+                raise ValueError(f"project {key!r}: {name} must be a list")
+        project = Project(
+            key=key,
+            # Anything not set falls back to the default project's (environment) value
+            company=str(item.get("company") or default.company),
+            project=str(item.get("project") or default.project),
+            location=str(item.get("location", default.location)),
+            starting_price=str(item.get("starting_price") or default.starting_price),
+            unit_types=str(item.get("unit_types") or default.unit_types),
+            numbers=tuple(normalize_number(str(n)) for n in item.get("numbers", [])),
+            campaigns=tuple(str(c) for c in item.get("campaigns", [])),
+            hints=tuple(str(h) for h in item.get("hints", [])),
+        )
+        for route in [f"number {n}" for n in project.numbers] + [f"campaign {c}" for c in project.campaigns]:
+            if route in routes:
+                raise ValueError(f"{route} is claimed by both {routes[route]!r} and {key!r}")
+            routes[route] = key
+        projects.append(project)
+    return projects
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """Everything a call turn needs for one project, compiled once per config."""
+    project: Project
+    persona: str
+    intents: IntentEngine
+    twiml: TwimlTemplates
+    # Replies are cached per project config
+    cache_config: tuple
+    # Caller ID for outbound calls
+    from_number: Optional[str]
+
+    @property
+    def key(self) -> str:
+        return self.project.key
+
+
+@dataclass(frozen=True)
+class TenantSet:
+    """An immutable, fully compiled set of tenants; replaced as a whole on reload."""
+    default: Tenant
+    by_key: dict[str, Tenant]
+    by_campaign: dict[str, Tenant]
+    by_number: dict[str, Tenant]
+    projects: dict[str, Project] = field(default_factory=dict)
+
+
+class TenantRegistry:
+    """Compiled tenants for the default project and every project in `path`.
+
+    `compile(project)` builds a tenant; a project whose config is unchanged by a reload
+    keeps its compiled tenant, and a recompiled one keeps counting intent stats where its
+    predecessor left off. The first load raises on an invalid file so a broken deploy
+    fails at startup instead of silently serving only the default project.
+    """
+
+    def __init__(self, compile: Callable[[Project], Tenant], default: Project, path: Optional[str] = None):
+        self.path = path
+        self._compile = compile
+        self._default = default
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[tuple[int, int]] = None
+        self.reloads = 0
+        self.loaded_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self._set = self._build([], None)
+        if path:
+            self.reload()
+
+    @property
+    def default(self) -> Tenant:
+        return self._set.default
+
+    def find(self, campaign: Optional[str]) -> Optional[Tenant]:
+        """Tenant for a project key or campaign code; None if nothing matches."""
+        if not campaign:
+            return None
+        tenants = self._set
+        return tenants.by_key.get(campaign) or tenants.by_campaign.get(campaign)
+
+    def resolve(self, campaign: Optional[str] = None, *numbers: Optional[str]) -> Tenant:
+        """Tenant for a `campaign` parameter, else the first routed number, else the default."""
+        tenants = self._set
+        if campaign:
+            tenant = tenants.by_key.get(campaign) or tenants.by_campaign.get(campaign)
+            if tenant is not None:
+                return tenant
+        for number in numbers:
+            tenant = tenants.by_number.get(number) if number else None
+            if tenant is not None:
+                return tenant
+        return tenants.default
+
+    def __len__(self) -> int:
+        return len(self._set.by_key)
+
+    def tenants(self) -> list[Tenant]:
+        return list(self._set.by_key.values())
+
+    def _build(self, projects: list[Project], previous: Optional[TenantSet], recompile: bool = False) -> TenantSet:
+        compiled: dict[str, Tenant] = {}
+        configs: dict[str, Project] = {}
+        # A file entry keyed "default" replaces the environment default
+        for project in [self._default] + projects:
+            old = previous.by_key.get(project.key) if previous is not None else None
+            if old is not None and not recompile and previous.projects.get(project.key) == project:  # type: ignore[union-attr]
+                compiled[project.key] = old
+            else:
+                compiled[project.key] = self._compile(project)
+                if old is not None:
+                    compiled[project.key].intents.share_stats(old.intents)
+            configs[project.key] = project
+        return TenantSet(
+            default=compiled[DEFAULT_KEY],
+            by_key=compiled,
+            by_campaign={c: compiled[p.key] for p in configs.values() for c in p.campaigns},
+            by_number={n: compiled[p.key] for p in configs.values() for n in p.numbers},
+            projects=configs,
+        )
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the file if it changed (or `force`); True if a new set was swapped in.
+
+        Raises ValueError/OSError when the file cannot be loaded; the current set is kept.
+        """
+        if not self.path:
+            return False
+        with self._lock:
+            started = time.perf_counter()
+            fingerprint = None
+            try:
+                st = os.stat(self.path)
+                fingerprint = (st.st_mtime_ns, st.st_size)
+                if fingerprint == self._fingerprint and not force:
+                    return False
+                with open(self.path, "r", encoding="utf-8") as f:
+                    projects = parse_projects(json.load(f), self._default)
+                tenants = self._build(projects, self._set)
+            except (ValueError, OSError) as e:
+                self.error = f"{type(e).__name__}: {e}"
+                # Remember the bad version so the watcher does not retry it every interval
+                self._fingerprint = fingerprint
+                raise
+            self._set = tenants
+            self._fingerprint = fingerprint
+            self.reloads += 1
+            self.loaded_at = time.time()
+            self.error = None
+        logger.info("Loaded %s project(s) from %s in %.3fs", len(projects), self.path, time.perf_counter() - started)
+        return True
+
+    def rebuild(self):
+        """Recompile every tenant from its current config, e.g. once prompt audio it plays is rendered."""
+        with self._lock:
+            projects = [p for p in self._set.projects.values() if p is not self._default]
+            self._set = self._build(projects, self._set, recompile=True)
+
+    async def watch(self, interval: float, on_reload: Optional[Callable[[bool, Optional[str]], None]] = None):
+        """Poll the file every `interval` seconds and reload it when it changes."""
+        on_reload = on_reload or (lambda ok, error: None)
+        last_error = None
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await asyncio.to_thread(self.reload):
+                    last_error = None
+                    on_reload(True, None)
+            except (ValueError, OSError) as e:
+                # A missing file fails every interval; report each distinct failure once
+                if str(e) != last_error:
+                    last_error = str(e)
+                    logger.error("Keeping current projects; reloading %s failed: %s", self.path, e)
+                    on_reload(False, str(e))
+
+    def status(self) -> dict:
+        return {
+            "path": self.path,
+            "projects": len(self._set.by_key),
+            "reloads": self.reloads,
+            "loaded_at": self.loaded_at,
+            "error": self.error,
+        }
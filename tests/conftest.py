@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_main(tmp_path_factory):
+    env = {"PUBLIC_URL": "http://localhost:8000", "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+           "TWILIO_AUTH_TOKEN": "test", "GEMINI_API_KEY": "test", "LOG_FILE": "", "LOG_LEVEL": "CRITICAL",
+           "WARM_UP_PROVIDERS": "false", "CALL_STORE_PATH": str(tmp_path_factory.mktemp("calls") / "calls.db")}
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        import main
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return main
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+
+import pytest
+
+from call_lifecycle import CallLifecycle
+from state_store import InMemoryStateStore, SQLiteStateStore
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def make_lifecycle(clock, activity=None, tracked=(), evicted=None, on_evict=None) -> CallLifecycle:
+    if evicted is not None:
+        on_evict = lambda call_sid, reason: evicted.append((call_sid, reason))  # noqa: E731
+    return CallLifecycle(activity if activity is not None else InMemoryStateStore("call_lifecycle"), tracked=tracked,
+                         grace_seconds=300, idle_ttl_seconds=3600, on_evict=on_evict, clock=clock)
+
+
+def test_ended_and_idle_calls_expire(clock):
+    state = InMemoryStateStore("call_state")
+    evicted = []
+    lifecycle = make_lifecycle(clock, tracked=(state,), evicted=evicted)
+    for call_sid in ("CAended", "CAidle", "CAlive"):
+        state.set(call_sid, {"stage": "intro"})
+        lifecycle.touch(call_sid)
+    lifecycle.mark_ended("CAended", "completed")
+
+    clock.now += 299
+    lifecycle.touch("CAlive")
+    assert lifecycle.sweep() == []
+    clock.now += 1
+    assert lifecycle.sweep() == [("CAended", "ended")]
+    clock.now += 3600 - 300
+    assert lifecycle.sweep() == [("CAidle", "leaked")]
+
+    assert evicted == [("CAended", "ended"), ("CAidle", "leaked")]
+    assert state.keys() == ["CAlive"] and lifecycle.activity.keys() == ["CAlive"]
+    stats = lifecycle.stats()
+    assert (stats["live"], stats["ending"], stats["evicted"], stats["leaked"], stats["sweeps"]) == (1, 0, 2, 1, 3)
+
+
+def test_activity_after_the_end_does_not_restart_the_grace_period(clock):
+    lifecycle = make_lifecycle(clock)
+    lifecycle.touch("CA1")
+    lifecycle.mark_ended("CA1", "completed")
+    clock.now += 200
+    # A late recording callback, then a duplicate status callback
+    lifecycle.touch("CA1")
+    lifecycle.mark_ended("CA1", "failed")
+    assert lifecycle.activity.get("CA1")["status"] == "completed"
+    clock.now += 100
+    assert lifecycle.sweep() == [("CA1", "ended")]
+
+
+def test_ended_calls_are_swept_once(clock):
+    evicted = []
+    lifecycle = make_lifecycle(clock, evicted=evicted)
+    lifecycle.mark_ended("CA1", "completed")
+    clock.now += 300
+    assert lifecycle.sweep() == [("CA1", "ended")]
+    assert lifecycle.sweep() == [] and lifecycle.sweep(clock.now + 10**6) == []
+    assert evicted == [("CA1", "ended")] and lifecycle.stats()["evicted"] == 1
+
+
+def test_a_second_sweeper_skips_a_call_being_evicted(clock):
+    """Workers share the activity store; the "evicting" claim lets only one of them evict a call."""
+    activity = InMemoryStateStore("call_lifecycle")
+    first_evicted, second_evicted = [], []
+    second = make_lifecycle(clock, activity=activity, evicted=second_evicted)
+
+    def evict_while_the_other_worker_sweeps(call_sid, reason):
+        first_evicted.append((call_sid, reason))
+        # The claimed record is still in the store while the first worker evicts it
+        assert activity.get(call_sid)["evicting"]
+        second_evicted.extend(second.sweep())
+
+    first = make_lifecycle(clock, activity=activity, on_evict=evict_while_the_other_worker_sweeps)
+    first.mark_ended("CA1", "completed")
+    clock.now += 300
+    assert first.sweep() == [("CA1", "ended")]
+    assert first_evicted == [("CA1", "ended")] and second_evicted == []
+    assert second.stats()["evicted"] == 0
+
+
+def test_concurrent_sweepers_evict_each_call_once(clock, tmp_path):
+    path = str(tmp_path / "state.db")
+    evicted = []
+    lock = threading.Lock()
+
+    def on_evict(call_sid, reason):
+        with lock:
+            evicted.append(call_sid)
+
+    # Separate stores on one file, as separate workers would have
+    sweepers = [make_lifecycle(clock, activity=SQLiteStateStore("call_lifecycle", path), on_evict=on_evict)
+                for _ in range(4)]
+    for i in range(50):
+        sweepers[0].mark_ended(f"CA{i}", "completed")
+    clock.now += 300
+    barrier = threading.Barrier(len(sweepers))
+
+    def sweep(lifecycle):
+        barrier.wait()
+        lifecycle.sweep()
+
+    threads = [threading.Thread(target=sweep, args=(s,)) for s in sweepers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(evicted) == sorted(f"CA{i}" for i in range(50))
+    assert sum(s.stats()["evicted"] for s in sweepers) == 50
+
+
+def test_call_touched_during_the_sweep_is_kept(clock):
+    class TouchedOnRead(InMemoryStateStore):
+        def get(self, key, default=None):
+            record = super().get(key, default)
+            if key == "CA1":
+                # A webhook for the call lands between the sweep's read and its claim
+                clock.now += 1
+                lifecycle.touch(key)
+            return record
+
+    lifecycle = make_lifecycle(clock, activity=TouchedOnRead("call_lifecycle"))
+    lifecycle.touch("CA1")
+    clock.now += 3600
+    assert lifecycle.sweep() == []
+    assert "CA1" in lifecycle.activity and not lifecycle.activity.get("CA1").get("evicting")
+
+
+def test_orphaned_entries_are_adopted_and_expire(clock):
+    state, log_files = InMemoryStateStore("call_state"), InMemoryStateStore("call_log_files")
+    lifecycle = make_lifecycle(clock, tracked=(state, log_files))
+    # Written after the call was evicted, e.g. by a late callback, so it has no activity record
+    log_files.set("CAorphan", "call_logs/call_CAorphan.log")
+    state.set("CAorphan", {"stage": "intro"})
+
+    assert lifecycle.sweep() == []
+    assert lifecycle.activity.get("CAorphan")["last_seen"] == clock.now
+    assert lifecycle.sweep() == [] and lifecycle.stats()["adopted"] == 1
+    clock.now += 3600
+    assert lifecycle.sweep() == [("CAorphan", "leaked")]
+    assert state.keys() == log_files.keys() == lifecycle.activity.keys() == []
+
+
+def test_async_touch_and_mark_ended(clock):
+    lifecycle = make_lifecycle(clock)
+
+    async def run():
+        await lifecycle.atouch("CA1")
+        await lifecycle.atouch(None)
+        clock.now += 10
+        await lifecycle.amark_ended("CA1", "completed")
+
+    asyncio.run(run())
+    assert lifecycle.activity.get("CA1") == {"started": 1000.0, "last_seen": 1010.0, "ended_at": 1010.0,
+                                             "status": "completed"}
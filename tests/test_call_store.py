@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from call_store import CallStore, decode_cursor, encode_cursor, parse_event
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CallStore(str(tmp_path / "calls.db"))
+    for i in range(7):
+        store.upsert_call(f"CA{i}", started_at=f"2026-01-01T00:00:0{i}", from_number="+911" if i % 2 else "+912",
+                          to_number="+910", status="completed" if i < 5 else "in-progress")
+        store.record_event(f"CA{i % 2}", f"2026-01-01T00:00:0{i}", f"USER hello {i}")
+    assert store.flush()
+    yield store
+    store.stop()
+
+
+def pages(fetch, limit: int) -> list[list[dict]]:
+    result, cursor = [], None
+    while True:
+        rows, cursor = fetch(cursor=cursor, limit=limit)
+        result.append(rows)
+        if cursor is None:
+            return result
+
+
+def test_parse_event():
+    assert parse_event("USER hello there") == ("USER", "hello there")
+    assert parse_event("CALL END") == ("CALL_END", "")
+
+
+def test_calls_page_newest_first(store):
+    result = pages(store.list_calls, 3)
+    assert [len(p) for p in result] == [3, 3, 1]
+    assert [r["call_sid"] for p in result for r in p] == [f"CA{i}" for i in reversed(range(7))]
+
+
+def test_calls_filtered_by_phone_and_status(store):
+    sids = [r["call_sid"] for p in pages(lambda **kw: store.list_calls(phone="+911", **kw), 1) for r in p]
+    assert sids == ["CA5", "CA3", "CA1"]
+    rows, _ = store.list_calls(status="in-progress")
+    assert {r["call_sid"] for r in rows} == {"CA5", "CA6"}
+
+
+def test_events_page_oldest_first(store):
+    result = pages(lambda **kw: store.list_events(call_sid="CA1", **kw), 2)
+    assert [e["text"] for p in result for e in p] == ["hello 1", "hello 3", "hello 5"]
+
+
+@pytest.mark.parametrize("values", [[], ["2026-01-01"], ["2026-01-01", "CA1", "x"], [1, "CA1"], ["2026", None],
+                                    ["2026", ["CA1"]], {"started_at": "2026", "call_sid": "CA1"}, "CA1", 5])
+def test_malformed_call_cursor(store, values):
+    with pytest.raises(ValueError):
+        store.list_calls(cursor=encode_cursor(values))
+
+
+@pytest.mark.parametrize("values", [[], ["3"], [3.5], [True], [[3]], [3, 4], {"id": 3}, 3])
+def test_malformed_event_cursor(store, values):
+    with pytest.raises(ValueError):
+        store.list_events(cursor=encode_cursor(values))
+
+
+def test_undecodable_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor!")
+
+
+@pytest.mark.parametrize("path", ["/api/calls", "/api/events"])
+def test_endpoints_reject_bad_cursor(app_main, store, monkeypatch, path):
+    httpx = pytest.importorskip("httpx")
+    monkeypatch.setattr(app_main, "CALL_STORE", store)
+    monkeypatch.setattr(app_main, "API_KEY", None)
+
+    async def get(params):
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.get(path, params=params)
+
+    response = asyncio.run(get({"cursor": encode_cursor([{"x": 1}, 2]), "limit": 2}))
+    assert response.status_code == 400 and response.json()["detail"] == "invalid cursor"
+    first = asyncio.run(get({"limit": 2})).json()
+    assert first["count"] == 2 and first["next_cursor"]
+    assert asyncio.run(get({"cursor": first["next_cursor"], "limit": 2})).status_code == 200
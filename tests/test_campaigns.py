@@ -0,0 +1,337 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from campaigns import CampaignScheduler, Lead, NotLeaderError, TokenBucket, parse_leads
+from state_store import InMemoryStateStore
+
+
+class FakeDialer:
+    """Stands in for the Twilio dial: scripted per number, records every attempt."""
+
+    def __init__(self, script: dict[str, list[str]] = None):
+        # Per number: "ok" returns a call, "none" fails the dial request, "raise" throws
+        self.script = {n: list(outcomes) for n, outcomes in (script or {}).items()}
+        self.calls: list[tuple[str, str, str, float]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, to: str, language_pref: str, project):
+        with self._lock:
+            self.calls.append((to, language_pref, project, time.monotonic()))
+            outcomes = self.script.get(to)
+            outcome = outcomes.pop(0) if outcomes else "ok"
+            n = len(self.calls)
+        if outcome == "raise":
+            raise RuntimeError("Twilio unavailable")
+        return SimpleNamespace(sid=f"CA{n:032d}") if outcome == "ok" else None
+
+    def times(self, to: str) -> list[float]:
+        return [t for number, _, _, t in self.calls if number == to]
+
+
+async def drive(scheduler: CampaignScheduler, campaign, statuses: dict[str, list[str]], timeout: float = 5.0):
+    """Answer each live call with its number's next scripted status ("completed" by default)."""
+    statuses = {n: list(s) for n, s in statuses.items()}
+    deadline = time.monotonic() + timeout
+    while campaign.state == "running":
+        assert time.monotonic() < deadline, campaign.summary(include_leads=True)
+        for lead in campaign.leads:
+            if lead.status == "live":
+                queue = statuses.get(lead.to_number)
+                await scheduler.on_status(lead.call_sid, queue.pop(0) if queue else "completed")
+        await asyncio.sleep(0.005)
+
+
+def leads(*numbers: str) -> list[Lead]:
+    return [Lead(n) for n in numbers]
+
+
+# ---- parse_leads ----
+def test_parse_csv_with_header():
+    data = b"Name,Phone,Project\nAsha,+911,skyline\nRavi,+912,\n,,\nDup,+911,x\n"
+    parsed = parse_leads(data, "leads.csv", project="default-proj")
+    assert [(l.to_number, l.name, l.project) for l in parsed] == [
+        ("+911", "Asha", "skyline"), ("+912", "Ravi", "default-proj")]
+
+
+def test_parse_csv_one_number_per_line():
+    assert [l.to_number for l in parse_leads(b"+911\n\n+912\n+911\n")] == ["+911", "+912"]
+
+
+def test_parse_json_forms():
+    assert [l.to_number for l in parse_leads(b'["+911", 912]')] == ["+911", "912"]
+    parsed = parse_leads(b'{"leads": [{"to_number": "+911", "language_pref": "hindi", "campaign": "diwali"}]}')
+    assert (parsed[0].language_pref, parsed[0].project) == ("hindi", "diwali")
+    assert parse_leads(b'[{"mobile": "+913"}]', content_type="application/json")[0].to_number == "+913"
+
+
+@pytest.mark.parametrize("data", [b"5", b'"+911"', b"true", b"null", b'{"numbers": ["+911"]}', b'{"leads": 5}',
+                                  b"[null]", b'[["+911"]]', b"[true]", b"[1,", b"[]"])
+def test_parse_rejects_malformed_json_with_value_error(data):
+    # The endpoint turns ValueError into a 400
+    with pytest.raises(ValueError):
+        parse_leads(data, "leads.json")
+
+
+@pytest.mark.parametrize("data", [b"", b"\n,\n", b"phone,name\n", b"\xff\xfe+91"])
+def test_parse_rejects_empty_or_undecodable_csv(data):
+    with pytest.raises(ValueError):
+        parse_leads(data, "leads.csv")
+
+
+# ---- token bucket ----
+def test_token_bucket_rate_and_burst():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=5)
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        burst = time.monotonic() - started
+        for _ in range(10):
+            await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(run())
+    assert burst < 0.05
+    # Ten more tokens at 20/s after the burst is spent
+    assert 0.45 <= total < 1.0
+
+
+def test_token_bucket_is_shared_by_concurrent_acquirers():
+    async def run():
+        bucket = TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(11)))
+        return time.monotonic() - started
+
+    assert 0.18 <= asyncio.run(run()) < 0.6
+
+
+# ---- scheduler ----
+def test_dials_are_paced_by_the_shared_bucket():
+    dialer = FakeDialer()
+
+    async def run():
+        scheduler = CampaignScheduler(dialer, calls_per_second=25, max_concurrent=100)
+        numbers = [f"+91{i:03d}" for i in range(20)]
+        # Two campaigns share the account-wide rate
+        first, second = scheduler.create(leads(*numbers[:10])), scheduler.create(leads(*numbers[10:]))
+        await asyncio.gather(drive(scheduler, first, {}), drive(scheduler, second, {}))
+        await scheduler.stop()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.state == second.state == "completed"
+    times = sorted(t for *_, t in dialer.calls)
+    # The bucket starts with 25 tokens; the first 20 dials go out at once, then at most 25/s
+    assert len(times) == 20 and times[-1] - times[0] < 0.5
+
+    dialer = FakeDialer()
+
+    async def paced():
+        scheduler = CampaignScheduler(dialer, calls_per_second=20, max_concurrent=100)
+        scheduler.bucket = TokenBucket(20, capacity=1)
+        campaign = scheduler.create(leads(*[f"+92{i:03d}" for i in range(11)]))
+        await drive(scheduler, campaign, {})
+        await scheduler.stop()
+
+    asyncio.run(paced())
+    times = sorted(t for *_, t in dialer.calls)
+    assert times[-1] - times[0] >= 0.45
+
+
+def test_max_concurrent_live_calls():
+    dialer = FakeDialer()
+
+    async def run():
+        scheduler = CampaignScheduler(dialer, calls_per_second=100, max_concurrent=2)
+        campaign = scheduler.create(leads("+1", "+2", "+3", "+4"))
+        await asyncio.sleep(0.2)
+        live_before = campaign.live, len(dialer.calls)
+        # Answering one call frees one slot
+        live = [l for l in campaign.leads if l.status == "live"]
+        await scheduler.on_status(live[0].call_sid, "completed")
+        await asyncio.sleep(0.2)
+        after = campaign.live, len(dialer.calls)
+        await drive(scheduler, campaign, {})
+        await scheduler.stop()
+        return live_before, after, campaign
+
+    before, after, campaign = asyncio.run(run())
+    assert before == (2, 2) and after == (2, 3)
+    assert campaign.summary()["counts"] == {"completed": 4}
+
+
+def test_retries_with_exponential_backoff():
+    dialer = FakeDialer({"+dial-error": ["none", "none", "none"], "+flaky": ["raise", "ok"]})
+
+    async def run():
+        scheduler = CampaignScheduler(dialer, calls_per_second=100, max_attempts=3, retry_backoff_seconds=0.05)
+        campaign = scheduler.create(leads("+busy", "+dial-error", "+flaky", "+no-answer"))
+        await drive(scheduler, campaign, {"+busy": ["busy"], "+no-answer": ["no-answer"] * 3})
+        await scheduler.stop()
+        return campaign
+
+    campaign = asyncio.run(run())
+    by_number = {l.to_number: l for l in campaign.leads}
+    assert (by_number["+busy"].status, by_number["+busy"].attempts) == ("completed", 2)
+    assert (by_number["+flaky"].status, by_number["+flaky"].attempts) == ("completed", 2)
+    # Out of attempts: the last outcome stays
+    assert (by_number["+dial-error"].status, by_number["+dial-error"].attempts) == ("dial-error", 3)
+    assert (by_number["+no-answer"].status, by_number["+no-answer"].attempts) == ("no-answer", 3)
+    t = dialer.times("+dial-error")
+    assert t[1] - t[0] >= 0.05 and t[2] - t[1] >= 0.1
+
+
+def test_failed_calls_are_not_retried():
+    dialer = FakeDialer()
+
+    async def run():
+        scheduler = CampaignScheduler(dialer, calls_per_second=100, retry_backoff_seconds=0.01)
+        campaign = scheduler.create(leads("+1"))
+        await drive(scheduler, campaign, {"+1": ["failed"]})
+        await scheduler.stop()
+        return campaign
+
+    campaign = asyncio.run(run())
+    assert (campaign.leads[0].status, campaign.leads[0].attempts) == ("failed", 1)
+
+
+def test_live_timeout_frees_the_slot():
+    dialer = FakeDialer()
+
+    async def run():
+        scheduler = CampaignScheduler(dialer, calls_per_second=100, live_timeout_seconds=0.05)
+        campaign = scheduler.create(leads("+1"))
+        deadline = time.monotonic() + 5
+        while campaign.state == "running" and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        await scheduler.stop()
+        return campaign
+
+    campaign = asyncio.run(run())
+    assert campaign.state == "completed" and campaign.leads[0].status == "timeout"
+
+
+def test_cancel_stops_pending_leads():
+    dialer = FakeDialer()
+
+    async def run():
+        scheduler = CampaignScheduler(dialer, calls_per_second=100, max_concurrent=1)
+        campaign = scheduler.create(leads("+1", "+2", "+3"))
+        await asyncio.sleep(0.1)
+        assert scheduler.cancel(campaign.campaign_id)
+        assert not scheduler.cancel(campaign.campaign_id)
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        return campaign
+
+    campaign = asyncio.run(run())
+    assert campaign.state == "canceled" and len(dialer.calls) == 1
+    assert [l.status for l in campaign.leads] == ["live", "canceled", "canceled"]
+
+
+def test_summary_reports_wall_clock_dial_times():
+    dialer = FakeDialer()
+
+    async def run():
+        scheduler = CampaignScheduler(dialer, calls_per_second=100)
+        campaign = scheduler.create(leads("+1", "+2"), max_attempts=1)
+        await drive(scheduler, campaign, {})
+        await scheduler.stop()
+        return campaign
+
+    before = time.time()
+    summary = asyncio.run(run()).summary(include_leads=True)
+    assert all(before <= lead["dialed_at"] <= time.time() for lead in summary["leads"])
+    assert summary["attempts"] == 2 and summary["finished_at"] >= summary["created_at"]
+
+
+def test_project_is_passed_to_the_dialer():
+    dialer = FakeDialer()
+
+    async def run():
+        scheduler = CampaignScheduler(dialer, calls_per_second=100)
+        campaign = scheduler.create([Lead("+1", language_pref="hindi", project="skyline")])
+        await drive(scheduler, campaign, {})
+        await scheduler.stop()
+
+    asyncio.run(run())
+    assert dialer.calls[0][:3] == ("+1", "hindi", "skyline")
+
+
+async def wait_until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_only_the_lease_holder_schedules():
+    store = InMemoryStateStore("campaigns")
+
+    async def run():
+        first = CampaignScheduler(FakeDialer(), store=store, lease_seconds=60)
+        second = CampaignScheduler(FakeDialer(), store=store, lease_seconds=60)
+        assert await first.claim_leadership() and not await second.claim_leadership()
+        with pytest.raises(NotLeaderError):
+            second.create(leads("+1"))
+        # Stopping hands the lease over without waiting for it to expire
+        await first.stop()
+        return await second.claim_leadership()
+
+    assert asyncio.run(run())
+
+
+def test_status_callback_on_another_worker_frees_the_slot():
+    dialer = FakeDialer()
+    store = InMemoryStateStore("campaigns")
+
+    async def run():
+        leader = CampaignScheduler(dialer, calls_per_second=100, max_concurrent=1, store=store)
+        follower = CampaignScheduler(FakeDialer(), store=store)
+        assert await leader.claim_leadership()
+        campaign = leader.create(leads("+1", "+2"))
+        await wait_until(lambda: campaign.leads[0].status == "live")
+        assert not await follower.on_status("CAunknown", "completed")
+        assert await follower.on_status(campaign.leads[0].call_sid, "completed")
+        await wait_until(lambda: campaign.leads[1].status == "live")
+        assert await follower.on_status(campaign.leads[1].call_sid, "failed")
+        await wait_until(lambda: campaign.state == "completed")
+        await leader.stop()
+        return campaign
+
+    campaign = asyncio.run(run())
+    assert [l.status for l in campaign.leads] == ["completed", "failed"]
+    # Handed-over calls are dropped from the store once their slot is freed
+    assert store.keys() == ["leader"]
+
+
+def test_completed_status_callback_frees_a_slot(app_main, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    httpx = pytest.importorskip("httpx")
+    dialer = FakeDialer()
+
+    async def run():
+        scheduler = CampaignScheduler(dialer, calls_per_second=100, max_concurrent=1,
+                                      store=InMemoryStateStore("campaigns"))
+        monkeypatch.setattr(app_main, "CAMPAIGN_SCHEDULER", scheduler)
+        assert await scheduler.claim_leadership()
+        campaign = scheduler.create(leads("+1", "+2"))
+        await wait_until(lambda: campaign.leads[0].status == "live")
+        await asyncio.sleep(0.1)
+        assert len(dialer.calls) == 1  # the only slot is taken
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_main.app), base_url="http://test") as c:
+            response = await c.post("/api/callback/twilio/status",
+                                    data={"CallSid": campaign.leads[0].call_sid, "CallStatus": "completed"})
+        assert response.status_code == 200
+        await wait_until(lambda: len(dialer.calls) == 2)
+        await scheduler.stop()
+        return campaign
+
+    campaign = asyncio.run(run())
+    assert app_main.CALL_LOG_WRITER.flush(close=True, wait=True)
+    assert campaign.leads[0].status == "completed" and campaign.leads[1].status == "live"
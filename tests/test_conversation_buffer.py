@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+
+from conversation_buffer import ConversationBuffer
+
+
+def filled(capacity: int, n: int) -> ConversationBuffer:
+    buffer = ConversationBuffer(capacity)
+    for i in range(n):
+        buffer.append("USER" if i % 2 == 0 else "ASSISTANT", f"line {i}", f"CA{i % 3}")
+    return buffer
+
+
+def seqs(records) -> list[int]:
+    return [r.seq for r in records]
+
+
+def test_oldest_entries_are_overwritten():
+    buffer = filled(3, 5)
+    assert len(buffer) == 3 and buffer.first_seq == 2
+    records, cursor = buffer.page()
+    assert seqs(records) == [2, 3, 4] and cursor == 4
+    assert [r.text for r in records] == ["line 2", "line 3", "line 4"]
+
+
+def test_cursor_pagination():
+    buffer = filled(10, 5)
+    records, cursor = buffer.page(limit=2)
+    assert seqs(records) == [0, 1] and cursor == 1
+    records, cursor = buffer.page(cursor, limit=2)
+    assert seqs(records) == [2, 3] and cursor == 3
+    records, cursor = buffer.page(cursor, limit=2)
+    assert seqs(records) == [4] and cursor == 4
+    # Polling at the end returns nothing until new entries arrive
+    assert buffer.page(cursor) == ([], 4)
+    buffer.append("USER", "new")
+    assert seqs(buffer.page(cursor)[0]) == [5]
+
+
+def test_stale_cursor_resumes_from_the_oldest_entry():
+    buffer = filled(3, 10)
+    records, cursor = buffer.page(cursor=2)
+    assert seqs(records) == [7, 8, 9] and cursor == 9
+
+
+def test_filters_and_bounded_scan():
+    buffer = filled(100, 30)
+    records, _ = buffer.page(call_sid="CA1", speaker="USER")
+    assert all(r.call_sid == "CA1" and r.speaker == "USER" for r in records) and seqs(records) == [4, 10, 16, 22, 28]
+    # A filtered poll examines at most max_scan entries and reports how far it got
+    records, cursor = buffer.page(call_sid="CA0", limit=10, max_scan=4)
+    assert seqs(records) == [0, 3] and cursor == 3
+    assert seqs(buffer.page(cursor, call_sid="CA0", limit=10, max_scan=4)[0]) == [6]
+
+
+def test_iter_walks_every_match_in_chunks():
+    buffer = filled(50, 40)
+    assert seqs(buffer.iter(chunk=7)) == list(range(40))
+    assert seqs(buffer.iter(cursor=35, call_sid="CA2", chunk=2)) == [38]
+
+
+def test_empty_buffer():
+    buffer = ConversationBuffer(4)
+    assert buffer.page() == ([], None) and list(buffer.iter()) == []
+
+
+def test_endpoint_pages_and_exports(app_main, monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    monkeypatch.setattr(app_main, "conversation_log", filled(4, 6))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_main.app), base_url="http://test") as c:
+            first = (await c.get("/api/conversation/current", params={"limit": 3})).json()
+            second = (await c.get("/api/conversation/current",
+                                  params={"cursor": first["next_cursor"], "limit": 3})).json()
+            export = await c.get("/api/conversation/current", params={"format": "ndjson", "speaker": "USER"})
+        return first, second, export
+
+    first, second, export = asyncio.run(run())
+    assert [e["seq"] for e in first["log"]] == [2, 3, 4] and first["buffered"] == 4 and first["next_cursor"] == 4
+    assert [e["text"] for e in second["log"]] == ["line 5"] and second["count"] == 1
+    assert [json.loads(line)["seq"] for line in export.text.splitlines()] == [2, 4]
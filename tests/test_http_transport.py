@@ -0,0 +1,154 @@
+import http.server
+import json
+import shutil
+import ssl
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from http_transport import HttpTransport
+
+ACCOUNT_SID = "AC" + "0" * 32
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        self.request = self.server.tls.wrap_socket(self.request, server_side=True)
+        with self.server.lock:
+            self.server.connections += 1
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send(201, json.dumps({"sid": "CA" + "1" * 32, "account_sid": ACCOUNT_SID, "status": "queued"}).encode())
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.peak = max(self.server.peak, self.server.in_flight)
+        time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.in_flight -= 1
+        self._send(200, b"ok")
+
+    def _send(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def certificate(tmp_path_factory):
+    if not shutil.which("openssl"):
+        pytest.skip("needs the openssl binary for a throwaway certificate")
+    workdir = tmp_path_factory.mktemp("tls")
+    cert, key = str(workdir / "cert.pem"), str(workdir / "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-keyout", key, "-out", cert, "-subj", "/CN=localhost",
+                    "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+                   check=True, capture_output=True)
+    return cert, key
+
+
+@pytest.fixture
+def server(certificate, monkeypatch):
+    """A local HTTPS stand-in for api.twilio.com that counts TLS connections."""
+    # requests would let these override the session's CA bundle
+    monkeypatch.delenv("REQUESTS_CA_BUNDLE", raising=False)
+    monkeypatch.delenv("CURL_CA_BUNDLE", raising=False)
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    httpd.tls = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    httpd.tls.load_cert_chain(*certificate)
+    httpd.lock = threading.Lock()
+    httpd.connections = httpd.in_flight = httpd.peak = 0
+    httpd.delay = 0.0
+    httpd.cert = certificate[0]
+    httpd.url = f"https://localhost:{httpd.server_address[1]}"
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_transport(server, **kwargs) -> HttpTransport:
+    transport = HttpTransport(**kwargs)
+    transport.session.verify = server.cert
+    return transport
+
+
+def test_sequential_requests_reuse_one_connection(server):
+    transport = make_transport(server)
+    for _ in range(20):
+        assert transport.session.get(server.url + "/recording", timeout=transport.timeout).status_code == 200
+    assert server.connections == 1
+    assert transport.stats() == {"hosts": 1, "pool_size": 20, "connections_opened": 1, "requests": 20,
+                                 "reuse_ratio": 0.95}
+    transport.close()
+
+
+def test_blocking_pool_caps_connections(server):
+    server.delay = 0.05
+    transport = make_transport(server, pool_size=3, pool_block=True)
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        statuses = list(pool.map(lambda _: transport.session.get(server.url + "/r").status_code, range(24)))
+    assert statuses == [200] * 24
+    assert server.connections <= 3 and server.peak <= 3
+    transport.close()
+
+
+def test_non_blocking_pool_overflows_but_keeps_pool_size(server):
+    server.delay = 0.05
+    transport = make_transport(server, pool_size=2)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: transport.session.get(server.url + "/r"), range(8)))
+    # Extra connections were opened for the burst...
+    assert server.connections > 2
+    opened = server.connections
+    # ...but only pool_size were kept for reuse
+    manager = transport.adapter.poolmanager
+    assert all(manager.pools[key].pool.qsize() <= 2 for key in manager.pools.keys())
+    server.delay = 0.0
+    for _ in range(5):
+        transport.session.get(server.url + "/r")
+    assert server.connections == opened
+    transport.close()
+
+
+def test_host_pools_are_capped_by_pool_hosts(server):
+    transport = make_transport(server, pool_hosts=1)
+    port = server.server_address[1]
+    for host in ("localhost", "127.0.0.1", "localhost"):
+        transport.session.get(f"https://{host}:{port}/r")
+    assert transport.stats()["hosts"] == 1
+    transport.close()
+
+
+def test_twilio_http_client_sends_through_the_shared_session(server):
+    from twilio.rest import Client
+
+    transport = make_transport(server, connect_timeout=2.0, read_timeout=7.0)
+    http_client = transport.twilio_http_client()
+    assert http_client.session is transport.session
+    assert http_client.timeout == (2.0, 7.0)
+
+    twilio = Client(ACCOUNT_SID, "test", http_client=http_client)
+    twilio.api.base_url = server.url
+    for _ in range(5):
+        call = twilio.calls.create(to="+15555550100", from_="+15555550199", url="https://example.test/twiml")
+        assert call.sid == "CA" + "1" * 32
+    # Downloads share the pool with the REST client
+    transport.session.get(server.url + "/recording")
+    stats = transport.stats()
+    assert server.connections == 1 and stats["requests"] == 6 and stats["connections_opened"] == 1
+    transport.close()
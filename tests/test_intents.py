@@ -0,0 +1,81 @@
+import pytest
+
+from intents import AhoCorasick, build_intent_engine
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return build_intent_engine("Basant Realty", "Skyline Towers", "Sector 62, Noida", "₹72 lakhs", "2BHK–4BHK")
+
+
+def intents(engine, text: str) -> list[str]:
+    return [m.intent for m in engine.classify(text)]
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("What is the price?", ["price"]),
+    ("what are the prices", ["price"]),
+    ("How much does it cost?", ["price"]),
+    ("rates kya hai", ["price"]),
+    ("Do you have 3 BHK?", ["configuration"]),
+    ("I want a 2BHK", ["configuration"]),
+    ("Do you have 3BHK flats", ["configuration"]),
+    ("mujhe 2BHK chahiye", ["configuration"]),
+    ("any 1bhk or 4BHKs?", ["configuration"]),
+    ("price of 2BHK", ["price", "configuration"]),
+    ("how many bedrooms", ["configuration"]),
+    ("Where is the project?", ["location"]),
+    ("project ka पता बताइए", ["location"]),
+    ("पता क्या है?", ["location"]),
+    ("Is a home loan available from banks?", ["loan"]),
+    ("Can I book a site visit?", ["site_visit"]),
+    ("I am interested in visiting the site", ["site_visit"]),
+    ("फ्लैट दिखाइए", ["site_visit"]),
+    ("price and location please", ["price", "location"]),
+    ("okay goodbye", ["end"]),
+])
+def test_classify(engine, text, expected):
+    assert intents(engine, text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "I need a costume for the party",      # cost
+    "the visitor parking is full",         # visit
+    "we live separately",                  # rate
+    "मुझे नहीं पता",                        # पता as "know"
+    "I don't know, मुझे इसका पता नहीं",
+    "he went bankrupt",                    # bank
+    "my locationally challenged friend",   # location
+    "pricey neighbourhood",                # price
+])
+def test_no_intent_inside_other_words(engine, text):
+    assert intents(engine, text) == []
+
+
+def test_end_phrases_keep_substring_semantics(engine):
+    assert engine.is_end_of_call("goodbye!") and engine.is_end_of_call("ok bye")
+
+
+def test_respond_only_single_short_questions(engine):
+    answer = engine.respond("What is the price?")
+    assert answer.intent == "price" and "₹72 lakhs" in answer.answer
+    assert "₹72 lakhs" in engine.respond("कीमत क्या है?").answer
+    assert engine.respond("What is the price and where is it?") is None
+    # Asks about a specific unit size; not answered by asking for the configuration again
+    assert engine.respond("price of 2BHK") is None
+    assert engine.respond("I want a 2BHK").intent == "configuration"
+    assert engine.respond("I need a costume") is None
+    long = "I have been thinking about buying a home for a long time and would like to know the price"
+    assert engine.respond(long) is None
+    stats = engine.stats()
+    assert stats["hits"] >= 2 and stats["misses"] >= 3
+
+
+def test_degraded_answer_falls_back_to_overview(engine):
+    assert "₹72 lakhs" in engine.degraded_answer("Tell me everything about the price and the visit")
+    assert engine.degraded_answer("मुझे नहीं पता") == engine.answers["overview"]["hi"]
+
+
+def test_aho_corasick_reports_overlapping_matches():
+    matcher = AhoCorasick(["he", "she", "hers", "his"])
+    assert sorted(matcher.iter_matches("ushers")) == [(1, 1), (2, 0), (2, 2)]
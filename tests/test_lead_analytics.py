@@ -0,0 +1,157 @@
+import gzip
+import re
+
+import pytest
+
+import lead_analytics
+from lead_analytics import LeadExtractor, parse_call_log, run_analytics, summarize
+
+
+def extract(*turns: str) -> dict:
+    """Fields after the given turns; "A: ..." turns are the assistant's, the rest the caller's."""
+    lead = LeadExtractor()
+    for turn in turns:
+        if turn.startswith("A: "):
+            lead.assistant(turn[3:])
+        else:
+            lead.user(turn)
+    return lead.fields()
+
+
+# ---- numbers ----
+@pytest.mark.parametrize("text,number", [("do", "do"), ("2.5 lakh", "2.5"), ("teen", "teen"), ("दो", "दो")])
+def test_number_words_match(text, number):
+    assert re.search(lead_analytics._NUM, text).group(1) == number
+
+
+@pytest.mark.parametrize("text", ["done", "teenage", "charge", "sixty", "दोनों", "v2"])
+def test_number_words_do_not_match_as_prefixes(text):
+    assert re.search(lead_analytics._NUM, text) is None
+
+
+# ---- unit preference ----
+@pytest.mark.parametrize("text,unit", [
+    ("I am looking for a 2 BHK flat", "2BHK"), ("3bhk", "3BHK"), ("do bhk chahiye", "2BHK"),
+    ("teen bedroom", "3BHK"), ("4-bhk", "4BHK"), ("मुझे दो बीएचके चाहिए", "2BHK"),
+])
+def test_unit_preference(text, unit):
+    assert extract(text)["unit_preference"] == unit
+
+
+@pytest.mark.parametrize("text", ["I am done for today", "my teenage son", "Is there parking?", "bhk options?"])
+def test_no_unit_preference(text):
+    assert extract(text)["unit_preference"] is None
+
+
+# ---- budget ----
+@pytest.mark.parametrize("text,budget", [
+    ("my budget is around 60 lakhs", (60.0, 60.0)),
+    ("between 50 to 70 lakh", (50.0, 70.0)),
+    ("under 1.2 crore", (None, 120.0)),
+    ("80 लाख तक", (None, 80.0)),
+    ("90 lakh se 1 crore", (90.0, 100.0)),
+    ("above do crore", (200.0, None)),
+])
+def test_budget(text, budget):
+    fields = extract(text)
+    assert (fields["budget_min_lakhs"], fields["budget_max_lakhs"]) == budget
+
+
+@pytest.mark.parametrize("text", ["I have 2 kids", "call me at 5", "it's done, thanks"])
+def test_no_budget(text):
+    fields = extract(text)
+    assert fields["budget_min_lakhs"] is None and fields["budget_max_lakhs"] is None
+
+
+# ---- timeline ----
+@pytest.mark.parametrize("text,timeline,months", [
+    ("immediately", "immediate", 0.0), ("we want to move in 3 months", "3 months", 3.0),
+    ("teen mahine mein", "3 months", 3.0), ("next year", "12 months", 12.0),
+    ("within 2 years", "24 months", 24.0), ("just exploring for now", "exploring", None),
+])
+def test_timeline(text, timeline, months):
+    fields = extract(text)
+    assert (fields["timeline"], fields["timeline_months"]) == (timeline, months)
+
+
+def test_no_timeline_from_unrelated_numbers():
+    assert extract("I have lived here for 3 years now", "my son is a teenage boy")["timeline"] is None
+
+
+# ---- financing ----
+@pytest.mark.parametrize("text", ["I will take a home loan", "EMI is fine", "bank se finance karenge",
+                                  "No, I will take a home loan", "I don't know the area, but we need a loan"])
+def test_financing_loan(text):
+    assert extract(text)["financing"] == "loan"
+
+
+@pytest.mark.parametrize("text", ["I do not want a loan", "I don't need a home loan", "loan nahi chahiye",
+                                  "लोन नहीं चाहिए", "full payment, no loan", "we will pay cash",
+                                  "loan ki zarurat nahi hai"])
+def test_financing_self(text):
+    assert extract(text)["financing"] == "self"
+
+
+def test_no_financing():
+    assert extract("What is the location exactly?", "Thik hai.")["financing"] is None
+
+
+def test_negated_loan_does_not_raise_the_score_as_a_loan():
+    assert extract("I do not want a loan")["financing"] != "loan"
+
+
+# ---- site visit ----
+@pytest.mark.parametrize("turns,visit,when", [
+    (["I would like a site visit this saturday"], True, "saturday"),
+    (["A: Kya aap site visit ke liye aana chahenge?", "Yes, tomorrow works"], True, "tomorrow"),
+    (["A: Would you like to visit the site?", "haan ji"], True, None),
+    (["No, a site visit on sunday is fine"], True, "sunday"),
+    (["I don't want a site visit"], False, None),
+    (["site visit nahi chahiye"], False, None),
+    (["A: Would you like to visit the site?", "No, not right now"], False, None),
+    (["Yes, what is the price?"], False, None),
+])
+def test_site_visit(turns, visit, when):
+    fields = extract(*turns)
+    assert (fields["site_visit"], fields["site_visit_when"]) == (visit, when)
+
+
+def test_lead_score_and_tier():
+    hot = extract("2 bhk", "budget 60 lakh", "in 3 months", "home loan", "site visit on saturday")
+    assert (hot["lead_score"], hot["lead_tier"]) == (6, "hot")
+    cold = extract("Hello?", "I am done, thanks")
+    assert (cold["lead_score"], cold["lead_tier"]) == (0, "cold")
+
+
+# ---- logs ----
+LOG = """CALL START 2025-03-01 10:00:00 SID=CA1
+[2025-03-01T10:00:01] PROJECT skyline
+[2025-03-01T10:00:02] ASSISTANT Namaste! Aapka naam kya hai?
+[2025-03-01T10:00:05] USER Mera naam Asha hai
+[2025-03-01T10:00:05] NAME_CAPTURED Asha
+[2025-03-01T10:00:09] USER I want a 3 BHK under 1 crore, I do not want a loan
+[2025-03-01T10:00:12] INTENT property_inquiry
+[2025-03-01T10:00:20] STATUS completed
+[2025-03-01T10:00:21] CALL END
+"""
+
+
+def test_parse_call_log_and_incremental_runs(tmp_path):
+    logs = tmp_path / "call_logs"
+    logs.mkdir()
+    (logs / "call_20250301_100000_CA1.log").write_text(LOG, encoding="utf-8")
+    with gzip.open(logs / "call_20250302_090000_CA2.log.gz", "wt", encoding="utf-8") as f:
+        f.write(LOG.replace("CA1", "CA2").replace("PROJECT skyline\n", "PROJECT meadows\n"))
+    (logs / "notes.txt").write_text("not a call log")
+
+    row = parse_call_log(str(logs / "call_20250301_100000_CA1.log"))
+    assert (row["call_sid"], row["project"], row["caller_name"], row["complete"]) == ("CA1", "skyline", "Asha", True)
+    assert (row["unit_preference"], row["budget_max_lakhs"], row["financing"]) == ("3BHK", 100.0, "self")
+
+    output = str(tmp_path / "analytics" / "leads.csv")
+    first = run_analytics(str(logs), output, workers=1)
+    assert (first["logs"], first["parsed"], first["rows"]) == (2, 2, 2)
+    assert run_analytics(str(logs), output, workers=1)["parsed"] == 0
+    summary = summarize(output)
+    assert summary["projects"] == {"skyline": 1, "meadows": 1}
+    assert summary["financing"] == {"self": 2} and summary["unit_preference"] == {"3BHK": 2}
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm_resilience import Bulkhead, BulkheadFull, CircuitBreaker, ResilientLLM, current_slot
+
+
+def test_slot_released_on_exit():
+    async def run():
+        bulkhead = Bulkhead(1, queue_timeout=0.05)
+        async with bulkhead.slot() as slot:
+            assert current_slot() is slot and bulkhead.in_flight == 1
+            with pytest.raises(BulkheadFull):
+                async with bulkhead.slot():
+                    pass
+        assert current_slot() is None
+        async with bulkhead.slot():
+            pass
+        return bulkhead.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0 and stats["abandoned"] == 0 and stats["rejected"] == 1
+
+
+def test_abandoned_work_keeps_its_slot():
+    release = threading.Event()
+
+    async def run():
+        bulkhead = Bulkhead(2, queue_timeout=0.05)
+        with ThreadPoolExecutor(4) as executor:
+            for _ in range(2):
+                async with bulkhead.slot() as slot:
+                    slot.hold_until(executor.submit(release.wait, 5))
+            assert bulkhead.in_flight == 2 and bulkhead.abandoned == 2
+            with pytest.raises(BulkheadFull):
+                async with bulkhead.slot():
+                    pass
+            release.set()
+            async with bulkhead.slot(timeout=1):
+                pass
+            for _ in range(100):
+                if not bulkhead.abandoned:
+                    break
+                await asyncio.sleep(0.01)
+        return bulkhead.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0 and stats["abandoned"] == 0
+
+
+def test_finished_work_releases_at_once():
+    async def run():
+        bulkhead = Bulkhead(1, queue_timeout=0.05)
+        with ThreadPoolExecutor(1) as executor:
+            async with bulkhead.slot() as slot:
+                work = executor.submit(lambda: "done")
+                slot.hold_until(work)
+                await asyncio.wrap_future(work)
+        return bulkhead.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0 and stats["abandoned"] == 0
+
+
+def test_breaker_opens_on_slow_calls():
+    now = [0.0]
+    breaker = CircuitBreaker("m", window=4, min_calls=4, slow_call_seconds=1, slow_threshold=0.5,
+                             open_seconds=10, clock=lambda: now[0])
+    for seconds in (0.1, 2, 0.1, 2):
+        assert breaker.allow()
+        breaker.record(True, seconds)
+    assert not breaker.allow()
+    now[0] = 11
+    assert breaker.allow()
+
+
+def test_falls_back_after_primary_timeout():
+    async def call(model, seconds):
+        if model == "primary":
+            await asyncio.sleep(seconds + 1)
+        return f"from {model}"
+
+    async def run():
+        guard = ResilientLLM(["primary", "fallback"], Bulkhead(2, queue_timeout=0.1),
+                             lambda m: CircuitBreaker(m), primary_share=0.5)
+        return await guard.generate(lambda m, s: asyncio.wait_for(call(m, s), s), 0.2)
+
+    assert asyncio.run(run()) == ("from fallback", "fallback", "ok")
+
+
+def test_timed_out_generations_stay_within_bulkhead(app_main, monkeypatch):
+    """Sustained timeouts must not pile more upstream requests onto the executor than the bulkhead admits."""
+    release = threading.Event()
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def hung_gemini(*args):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait(5)
+        with lock:
+            running[0] -= 1
+        return "late"
+
+    monkeypatch.setattr(app_main, "get_gemini_response", hung_gemini)
+    monkeypatch.setattr(app_main, "llm_executor", ThreadPoolExecutor(8))
+
+    async def turn(guard):
+        return await guard.generate(lambda m, s: app_main.get_gemini_response_async("hi", timeout=s, model_name=m),
+                                    0.05)
+
+    async def run():
+        guard = ResilientLLM(["primary"], Bulkhead(2, queue_timeout=0.01), lambda m: CircuitBreaker(m, min_calls=100))
+        outcomes = [(await turn(guard))[2] for _ in range(6)]
+        abandoned = guard.bulkhead.abandoned
+        release.set()
+        await asyncio.sleep(0.2)
+        return outcomes, abandoned, guard.bulkhead.stats()
+
+    try:
+        outcomes, abandoned, stats = asyncio.run(run())
+    finally:
+        release.set()
+        app_main.llm_executor.shutdown(wait=True)
+    assert outcomes == ["timeout", "timeout"] + ["bulkhead_full"] * 4
+    assert peak[0] == 2 and abandoned == 2
+    assert stats["in_flight"] == 0 and stats["abandoned"] == 0
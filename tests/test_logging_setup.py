@@ -0,0 +1,116 @@
+import json
+import logging
+import threading
+
+import pytest
+
+import logging_setup
+from logging_setup import log_payload, sampled, setup_logging, stop_logging
+
+
+@pytest.fixture
+def configure(tmp_path):
+    """setup_logging writing to a file; the root logger is restored afterwards."""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    path = tmp_path / "app.log"
+
+    def configure(**kwargs) -> "LogFile":
+        setup_logging(path=str(path), console=False, **kwargs)
+        return LogFile(path)
+
+    yield configure
+    stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    logging_setup._payload_sample_rate = 0.0
+
+
+class LogFile:
+    def __init__(self, path):
+        self.path = path
+
+    def lines(self) -> list[str]:
+        stop_logging()  # drains the queue
+        return self.path.read_text(encoding="utf-8").splitlines()
+
+    def records(self) -> list[dict]:
+        return [json.loads(line) for line in self.lines()]
+
+
+class Payload:
+    """Records which thread turned it into text."""
+
+    def __init__(self, text: str = "payload"):
+        self.text = text
+        self.threads: list[str] = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return self.text
+
+
+def test_json_records_carry_extra_fields_and_tracebacks(configure):
+    log = configure(level="INFO")
+    logger = logging.getLogger("voice.test")
+    logger.info("Turn %s for %s", 3, "CA1", extra={"call_sid": "CA1"})
+    logger.debug("not emitted")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Handler failed")
+    first, second = log.records()
+    assert (first["level"], first["logger"], first["msg"], first["call_sid"]) == ("INFO", "voice.test",
+                                                                                  "Turn 3 for CA1", "CA1")
+    assert second["msg"] == "Handler failed" and "ValueError: boom" in second["exc"]
+
+
+def test_messages_are_formatted_on_the_listener_thread(configure):
+    log = configure(level="INFO")
+    payload = Payload("Devanagari नमस्ते")
+    logging.getLogger("voice.test").info("Reply: %s", payload)
+    assert log.records()[0]["msg"] == "Reply: Devanagari नमस्ते"
+    assert payload.threads and threading.current_thread().name not in payload.threads
+
+
+def test_text_format(configure):
+    log = configure(level="INFO", fmt="text")
+    logging.getLogger("voice.test").warning("Queue full; dropping %s", "rec.mp3")
+    assert log.lines()[0].endswith(" - voice.test - WARNING - Queue full; dropping rec.mp3")
+
+
+def test_payloads_are_skipped_unless_debug_or_sampled(configure):
+    log = configure(level="INFO", payload_sample_rate=0.0)
+    payload = Payload()
+    log_payload(logging.getLogger("voice.test"), "Twilio form", payload, "CA1")
+    # Not even stringified when it would not be emitted
+    assert log.lines() == [] and payload.threads == []
+
+
+def test_sampled_payloads_log_at_info_and_are_truncated(configure):
+    log = configure(level="INFO", payload_sample_rate=1.0)
+    log_payload(logging.getLogger("voice.test"), "TwiML", b"<Response>" + b"x" * 50, "CA1", max_chars=20)
+    record = log.records()[0]
+    assert record["level"] == "INFO" and record["payload"] == "TwiML" and record["call_sid"] == "CA1"
+    assert record["msg"] == "TwiML (len=60): <Response>xxxxxxxxxx... [truncated]"
+
+
+def test_debug_level_logs_every_payload(configure):
+    log = configure(level="DEBUG", payload_sample_rate=0.0)
+    log_payload(logging.getLogger("voice.test"), "Twilio form", {"CallSid": "CA1"}, "CA1")
+    record = log.records()[0]
+    assert record["level"] == "DEBUG" and record["msg"] == "Twilio form (len=18): {'CallSid': 'CA1'}"
+
+
+def test_sampling_is_per_call(monkeypatch):
+    monkeypatch.setattr(logging_setup, "_payload_sample_rate", 0.5)
+    call_sids = [f"CA{i:032d}" for i in range(400)]
+    decisions = [sampled(sid) for sid in call_sids]
+    # A call is either fully sampled or not at all, and roughly half the calls are
+    assert decisions == [sampled(sid) for sid in call_sids]
+    assert 120 < sum(decisions) < 280
+    monkeypatch.setattr(logging_setup, "_payload_sample_rate", 0.0)
+    assert not any(sampled(sid) for sid in call_sids)
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV = {
+    "PUBLIC_URL": "http://localhost:8000",
+    "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+    "TWILIO_AUTH_TOKEN": "test",
+    "GEMINI_API_KEY": "test",
+    "LOG_FILE": "",
+    "LOG_LEVEL": "CRITICAL",
+    "WARM_UP_PROVIDERS": "false",
+}
+
+
+def import_main(tmp_path, **env) -> subprocess.CompletedProcess:
+    # main configures itself from the environment at import, so each case gets a fresh interpreter
+    return subprocess.run([sys.executable, "-c", "import main"], cwd=tmp_path, capture_output=True, text=True,
+                          env={**os.environ, **ENV, "PYTHONPATH": ROOT, **env})
+
+
+def test_stream_mode_refuses_fake_backends(tmp_path):
+    result = import_main(tmp_path, CONVERSATION_MODE="stream")
+    assert result.returncode != 0
+    assert "ALLOW_FAKE_BACKENDS" in result.stderr
+
+
+def test_stream_mode_runs_on_fakes_when_allowed(tmp_path):
+    result = import_main(tmp_path, CONVERSATION_MODE="stream", ALLOW_FAKE_BACKENDS="true")
+    assert result.returncode == 0, result.stderr
+
+
+def test_gather_mode_does_not_need_stream_backends(tmp_path):
+    assert import_main(tmp_path).returncode == 0
+
+
+def test_fake_prompt_audio_needs_opt_in(tmp_path):
+    result = import_main(tmp_path, PROMPT_AUDIO_TTS="fake")
+    assert result.returncode != 0 and "ALLOW_FAKE_BACKENDS" in result.stderr
+    assert import_main(tmp_path, PROMPT_AUDIO_TTS="fake", ALLOW_FAKE_BACKENDS="true").returncode == 0
+
+
+def test_slow_call_threshold_must_fit_primary_budget(tmp_path):
+    result = import_main(tmp_path, LLM_SLOW_CALL_SECONDS="5")
+    assert result.returncode != 0 and "LLM_SLOW_CALL_SECONDS" in result.stderr
+    assert import_main(tmp_path, LLM_SLOW_CALL_SECONDS="5", LLM_TIMEOUT_SECONDS="10").returncode == 0
+
+
+def test_default_slow_call_threshold_is_reachable(app_main):
+    breaker = app_main.LLM_GUARD.breakers[app_main.GEMINI_MODEL]
+    assert 0 < breaker.slow_call_seconds < app_main.LLM_TIMEOUT_SECONDS * app_main.LLM_GUARD.primary_share
+
+
+def test_script_hands_over_to_uvicorn(tmp_path):
+    # Spawned recording workers re-import a script __main__, so `python main.py` must not serve as one
+    code = ("import os, runpy, sys\n"
+            "os.execv = lambda path, argv: (print(argv[1:]), sys.stdout.flush(), os._exit(0))\n"
+            f"runpy.run_path({os.path.join(ROOT, 'main.py')!r}, run_name='__main__')\n")
+    # A regression would start the server here; the timeout turns that into a failure
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, capture_output=True, text=True,
+                            env={**os.environ, **ENV, "PYTHONPATH": ROOT}, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1].startswith("['-m', 'uvicorn', 'main:app'")
@@ -0,0 +1,56 @@
+import struct
+
+import pytest
+
+from media_stream import _ulaw_decode, _ulaw_encode, pcm16_to_ulaw, ulaw_to_pcm16
+
+# Segment end points of the reference G.711 encoder (Sun g711.c), in 14-bit units
+SEG_UEND = (0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF)
+
+
+def reference_ulaw(sample: int) -> int:
+    """Straight port of g711.c linear2ulaw as audioop.lin2ulaw applies it to 16-bit samples."""
+    pcm = sample >> 2
+    if pcm < 0:
+        pcm, mask = -pcm, 0x7F
+    else:
+        mask = 0xFF
+    pcm = min(pcm, 8159) + (0x84 >> 2)
+    seg = next((i for i, end in enumerate(SEG_UEND) if pcm <= end), 8)
+    if seg >= 8:
+        return 0x7F ^ mask
+    return ((seg << 4) | ((pcm >> (seg + 1)) & 0x0F)) ^ mask
+
+
+REFERENCE = bytes(reference_ulaw(s) for s in range(-32768, 32768))
+
+
+def test_encode_matches_reference_over_int16_range():
+    encoded = bytes(_ulaw_encode(s) for s in range(-32768, 32768))
+    mismatches = [s for s, (a, b) in zip(range(-32768, 32768), zip(encoded, REFERENCE)) if a != b]
+    assert mismatches == []
+
+
+def test_encode_small_negative_samples():
+    assert _ulaw_encode(-1) == 0x7E
+    assert _ulaw_encode(0) == 0xFF
+    assert _ulaw_encode(-32768) == 0x00
+    assert _ulaw_encode(32767) == 0x80
+
+
+def test_pcm16_to_ulaw_uses_the_same_table():
+    pcm = struct.pack("<65536h", *range(-32768, 32768))
+    assert pcm16_to_ulaw(pcm) == REFERENCE
+
+
+def test_matches_audioop_where_available():
+    audioop = pytest.importorskip("audioop")
+    pcm = struct.pack("<65536h", *range(-32768, 32768))
+    assert pcm16_to_ulaw(pcm) == audioop.lin2ulaw(pcm, 2)
+    ulaw = bytes(range(256))
+    assert ulaw_to_pcm16(ulaw) == audioop.ulaw2lin(ulaw, 2)
+
+
+def test_decode_then_encode_is_identity():
+    # 0x7F and 0xFF both decode to 0, which encodes as 0xFF
+    assert [_ulaw_encode(_ulaw_decode(u)) for u in range(256) if u != 0x7F] == [u for u in range(256) if u != 0x7F]
@@ -0,0 +1,93 @@
+import asyncio
+import re
+import time
+
+import pytest
+
+from metrics import Registry, monitor_event_loop_lag
+
+
+def test_counter_and_label_escaping():
+    registry = Registry()
+    turns = registry.counter("turns_total", "Turns", ("path",))
+    turns.inc(path="llm")
+    turns.inc(2, path="llm")
+    turns.inc(path='say "hi"\n')
+    assert turns.value(path="llm") == 3 and turns.total() == 4
+    assert registry.render().splitlines() == [
+        "# HELP turns_total Turns",
+        "# TYPE turns_total counter",
+        'turns_total{path="llm"} 3',
+        'turns_total{path="say \\"hi\\"\\n"} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    stage = registry.histogram("stage_seconds", "Stage", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        stage.observe(value, stage="llm")
+    lines = registry.render().splitlines()[2:]
+    assert lines == [
+        'stage_seconds_bucket{stage="llm",le="0.1"} 2',  # a value on a bound falls in that bucket
+        'stage_seconds_bucket{stage="llm",le="1.0"} 3',
+        'stage_seconds_bucket{stage="llm",le="+Inf"} 4',
+        'stage_seconds_sum{stage="llm"} 3.65',
+        'stage_seconds_count{stage="llm"} 4',
+    ]
+
+
+def test_histogram_timer():
+    registry = Registry()
+    stage = registry.histogram("stage_seconds", "Stage")
+    with stage.time():
+        time.sleep(0.01)
+    total = float(re.search(r"^stage_seconds_sum (\S+)$", registry.render(), re.M).group(1))
+    assert 0.01 <= total < 1
+
+
+def test_gauges_computed_at_scrape_time():
+    registry = Registry()
+    registry.gauge("live", "Live", fn=lambda: 3)
+    registry.gauge("by_tier", "By tier", ("tier",), fn=lambda: {"primary": 1, "local": 2})
+    registry.gauge("broken", "Broken", fn=lambda: 1 / 0)
+    set_gauge = registry.gauge("lag", "Lag")
+    set_gauge.set(0.5)
+    samples = [line for line in registry.render().splitlines() if not line.startswith("#")]
+    assert samples == ["live 3", 'by_tier{tier="primary"} 1', 'by_tier{tier="local"} 2', "lag 0.5"]
+
+
+def test_event_loop_lag_is_recorded():
+    registry = Registry()
+    histogram = registry.histogram("lag_seconds", "Lag")
+    gauge = registry.gauge("lag_last", "Lag")
+
+    async def run():
+        monitor = asyncio.create_task(monitor_event_loop_lag(histogram, gauge, interval=0.01))
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # blocks the loop past the monitor's timer
+        await asyncio.sleep(0.03)
+        monitor.cancel()
+
+    asyncio.run(run())
+    rendered = registry.render()
+    assert float(re.search(r"^lag_seconds_sum (\S+)$", rendered, re.M).group(1)) >= 0.05
+    assert int(re.search(r"^lag_seconds_count (\d+)$", rendered, re.M).group(1)) >= 1
+
+
+def test_metrics_endpoint_reports_webhook_stages(app_main, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    httpx = pytest.importorskip("httpx")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_main.app), base_url="http://test") as c:
+            await c.post("/api/callback/twilio/voice", data={"CallSid": "CAmetrics", "From": "+919800000000"})
+            return await c.get("/metrics")
+
+    response = asyncio.run(run())
+    # Call log paths are relative; write them before the working directory is restored
+    assert app_main.CALL_LOG_WRITER.flush(close=True, wait=True)
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    count = re.search(r'^voice_agent_stage_seconds_count\{handler="voice",stage="total"\} (\d+)$', response.text, re.M)
+    assert count and int(count.group(1)) >= 1
+    assert "# TYPE voice_agent_event_loop_lag_seconds histogram" in response.text
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import struct
+
+import pytest
+
+from media_stream import FakeTTS, StreamingTTS
+from prompt_audio import PromptAudio, byte_range, mulaw_wav
+from twiml_templates import VOICE, TwimlTemplates
+
+BASE_URL = "http://localhost:8000/api/prompts"
+TEXT = "Are you still there? क्या आप अभी भी हैं?"
+
+
+class FailingTTS(StreamingTTS):
+    async def synthesize(self, text, voice=None, language=None):
+        raise RuntimeError("TTS down")
+        yield b""
+
+
+def rendered_store(directory, text: str = TEXT) -> PromptAudio:
+    store = PromptAudio(str(directory), FakeTTS(), "fake", BASE_URL)
+    asyncio.run(store.render([(text, VOICE["voice"], VOICE["language"])]))
+    return store
+
+
+# ---- byte_range ----
+@pytest.mark.parametrize("header,expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-10", (990, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=0-1,5-9", None),   # multi-range: send the whole body
+    ("items=0-9", None),
+    ("bytes=-", None),
+    ("bytes=10-5", None),      # end before start: invalid, so ignored
+    ("bytes=2000-1500", None),
+])
+def test_byte_range(header, expected):
+    assert byte_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-1000", "bytes=2000-3000", "bytes=-0"])
+def test_unsatisfiable_byte_range(header):
+    with pytest.raises(ValueError):
+        byte_range(header, 1000)
+
+
+# ---- rendering ----
+def test_mulaw_wav_header():
+    wav = mulaw_wav(b"\xff" * 801)
+    assert wav[:4] == b"RIFF" and wav[8:12] == b"WAVE"
+    assert struct.unpack_from("<I", wav, 4)[0] == len(wav) - 8
+    fmt, channels, rate, byte_rate, align, bits = struct.unpack_from("<HHIIHH", wav, 20)
+    assert (fmt, channels, rate, byte_rate, align, bits) == (7, 1, 8000, 8000, 1, 8)
+    assert wav[38:42] == b"fact" and struct.unpack_from("<I", wav, 46)[0] == 801
+    assert wav[50:54] == b"data" and struct.unpack_from("<I", wav, 54)[0] == 801
+    assert len(wav) % 2 == 0
+
+
+def test_render_once_and_reload_from_disk(tmp_path):
+    store = PromptAudio(str(tmp_path), FakeTTS(), "fake", BASE_URL)
+    assert store.url(TEXT, VOICE["voice"], VOICE["language"]) is None
+    prompts = [(TEXT, VOICE["voice"], VOICE["language"]), (TEXT, "Polly.Joanna", "en-US")]
+    assert asyncio.run(store.render(prompts + prompts)) == 2
+    url = store.url(TEXT, VOICE["voice"], VOICE["language"])
+    assert url.startswith(BASE_URL + "/") and url.endswith(".wav")
+    assert sorted(os.listdir(tmp_path)) == sorted(store.name(*p) for p in prompts)
+    assert asyncio.run(store.render(prompts)) == 0
+
+    restarted = PromptAudio(str(tmp_path), FakeTTS(), "fake", BASE_URL)
+    assert restarted.load() == 2
+    assert restarted.url(TEXT, VOICE["voice"], VOICE["language"]) == url
+    # Another backend or voice is another asset
+    other = PromptAudio(str(tmp_path), FakeTTS(), "polly", BASE_URL)
+    assert other.name(*prompts[0]) != store.name(*prompts[0]) != store.name(*prompts[1])
+
+
+def test_failed_render_keeps_say(tmp_path):
+    store = PromptAudio(str(tmp_path), FailingTTS(), "broken", BASE_URL)
+    assert asyncio.run(store.render([(TEXT, VOICE["voice"], VOICE["language"])])) == 0
+    assert store.stats()["failed"] == 1 and os.listdir(tmp_path) == []
+    templates = TwimlTemplates("http://cb", "http://result", "XYZ", "2BHK", "₹55 lakhs",
+                               audio=lambda text, voice: store.url(text, voice["voice"], voice["language"]))
+    assert "<Play>" not in templates.reply.render(reply="Hi", seq=1).decode()
+
+
+def test_templates_play_rendered_prompts(tmp_path):
+    store = rendered_store(tmp_path)
+    templates = TwimlTemplates("http://cb", "http://result", "XYZ", "2BHK", "₹55 lakhs",
+                               audio=lambda text, voice: store.url(text, voice["voice"], voice["language"]))
+    xml = templates.reply.render(reply="Namaste", seq=2).decode()
+    assert f"<Play>{store.url(TEXT, VOICE['voice'], VOICE['language'])}</Play>" in xml
+    # The generated reply is still spoken
+    assert xml.count("<Say") == 1 and "Namaste" in xml
+    assert (TEXT, VOICE["voice"], VOICE["language"]) in templates.prompts
+
+
+# ---- GET /api/prompts/{name} ----
+@pytest.fixture
+def client(app_main, tmp_path, monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    store = rendered_store(tmp_path)
+    monkeypatch.setattr(app_main, "PROMPT_AUDIO", store)
+    name = store.name(TEXT, VOICE["voice"], VOICE["language"])
+    data = store.get(name).data
+
+    def request(method: str = "GET", path: str = "/api/prompts/" + name, **headers):
+        async def send():
+            transport = httpx.ASGITransport(app=app_main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+                return await c.request(method, path, headers=headers)
+        return asyncio.run(send())
+
+    request.data = data
+    request.etag = store.get(name).etag
+    return request
+
+
+def test_serves_asset_with_caching_headers(client):
+    response = client()
+    assert response.status_code == 200 and response.content == client.data
+    assert response.headers["content-type"] == "audio/wav"
+    assert response.headers["etag"] == client.etag
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert int(response.headers["content-length"]) == len(client.data)
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", '"other", {etag}', "*"])
+def test_if_none_match_gives_304(client, if_none_match):
+    response = client(**{"If-None-Match": if_none_match.format(etag=client.etag)})
+    assert response.status_code == 304 and response.content == b""
+    assert response.headers["etag"] == client.etag
+
+
+def test_stale_if_none_match_gives_200(client):
+    assert client(**{"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_single_range_gives_206(client):
+    size = len(client.data)
+    response = client(Range="bytes=10-109")
+    assert response.status_code == 206 and response.content == client.data[10:110]
+    assert response.headers["content-range"] == f"bytes 10-109/{size}"
+    assert response.headers["content-length"] == "100"
+    suffix = client(Range="bytes=-16")
+    assert suffix.status_code == 206 and suffix.content == client.data[-16:]
+
+
+def test_if_range(client):
+    # Matching validator: the range applies
+    response = client(Range="bytes=0-9", **{"If-Range": client.etag})
+    assert response.status_code == 206 and response.content == client.data[:10]
+    # The client holds another version: the whole current body
+    response = client(Range="bytes=0-9", **{"If-Range": '"old"'})
+    assert response.status_code == 200 and response.content == client.data
+
+
+def test_unsatisfiable_range_gives_416(client):
+    size = len(client.data)
+    response = client(Range=f"bytes={size}-")
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{size}"
+
+
+def test_inverted_range_gives_200(client):
+    response = client(Range="bytes=100-10")
+    assert response.status_code == 200 and response.content == client.data
+
+
+def test_head(client):
+    response = client("HEAD")
+    assert response.status_code == 200 and response.content == b""
+    assert int(response.headers["content-length"]) == len(client.data)
+
+
+@pytest.mark.parametrize("path", ["/api/prompts/" + "0" * 24 + ".wav", "/api/prompts/main.py",
+                                  "/api/prompts/..%2Fmain.py"])
+def test_unknown_assets_give_404(client, path):
+    assert client(path=path).status_code == 404
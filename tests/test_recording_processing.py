@@ -0,0 +1,52 @@
+import os
+import stat
+import struct
+
+import pytest
+
+from recording_processing import ProcessingOptions, RecordingProcessingError, _parse_wav, encode, format_stats
+
+
+class Samples:
+    """Just what encode() reads from an int16 NumPy array."""
+
+    shape = (4, 1)
+
+    def tobytes(self) -> bytes:
+        return b"\0" * 8
+
+
+def fake_ffmpeg(tmp_path, exit_code: int) -> str:
+    # Writes its last argument (the output file) like ffmpeg does before failing or finishing
+    script = tmp_path / "ffmpeg"
+    script.write_text(f'#!/bin/sh\nfor last; do :; done\necho partial > "$last"\necho boom >&2\nexit {exit_code}\n')
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="shell script stand-in for ffmpeg")
+def test_failed_encode_leaves_no_partial_file(tmp_path):
+    dest = tmp_path / "recording_CA1.opus"
+    with pytest.raises(RecordingProcessingError, match="boom"):
+        encode(Samples(), str(dest), ProcessingOptions(ffmpeg=fake_ffmpeg(tmp_path, 1)))
+    assert not dest.exists() and not (tmp_path / "recording_CA1.opus.part").exists()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="shell script stand-in for ffmpeg")
+def test_encode_replaces_destination(tmp_path):
+    dest = tmp_path / "recording_CA1.opus"
+    encode(Samples(), str(dest), ProcessingOptions(ffmpeg=fake_ffmpeg(tmp_path, 0)))
+    assert dest.read_text() == "partial\n" and not (tmp_path / "recording_CA1.opus.part").exists()
+
+
+def test_parse_wav_without_sizes():
+    fmt = struct.pack("<HHIIHH", 1, 2, 8000, 32000, 4, 16)
+    data = b"RIFF\xff\xff\xff\xffWAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data\xff\xff\xff\xff" + b"\1\2"
+    assert _parse_wav(data) == (2, b"\1\2")
+    with pytest.raises(RecordingProcessingError):
+        _parse_wav(b"not a wav file")
+
+
+def test_format_stats():
+    line = format_stats({"talk_seconds": 3.5, "channels": [{"rms_dbfs": -20.0}], "path": "/r/a.opus"})
+    assert line == "talk_seconds=3.5 ch1_rms_dbfs=-20.0 path=/r/a.opus"
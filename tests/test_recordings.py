@@ -0,0 +1,165 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from recordings import RecordingDownloader, RecordingDownloadError, content_range
+
+BODY = bytes(range(256)) * 40
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves BODY with Range support; `server.script` lists overrides for successive requests."""
+
+    def do_GET(self):
+        server = self.server
+        server.ranges.append(self.headers.get("Range"))
+        action = server.script.pop(0) if server.script else "ok"
+        if isinstance(action, int):
+            self.send_response(action)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start = int(self.headers["Range"][6:-1]) if self.headers.get("Range") else None
+        if action == "ignore_range":
+            start = None
+        elif action == "wrong_offset" and start is not None:
+            start = 0
+        if start is None:
+            self.send_response(200)
+            body = BODY
+        elif start >= len(BODY):
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(BODY)}")
+            body = b""
+        else:
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+            body = BODY[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.script, httpd.ranges = [], []
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/recording.mp3"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    return RecordingDownloader(dest_dir=str(tmp_path), backoff_seconds=0.01, max_retries=2, timeout=5)
+
+
+def write_part(downloader, data: bytes):
+    with open(f"{downloader.dest_dir}/recording_CA1.mp3.part", "wb") as f:
+        f.write(data)
+
+
+def read_final(downloader) -> bytes:
+    with open(f"{downloader.dest_dir}/recording_CA1.mp3", "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("bytes 100-199/200", (100, 200)),
+    ("bytes 0-0/*", (0, None)),
+    ("bytes */200", (None, 200)),
+    ("items 1-2/3", (None, None)),
+    (None, (None, None)),
+])
+def test_content_range(header, expected):
+    assert content_range(header) == expected
+
+
+def test_fresh_download(server, downloader, tmp_path):
+    path = downloader.download("CA1", server.url)
+    assert read_final(downloader) == BODY and path.endswith("recording_CA1.mp3")
+    assert server.ranges == [None] and sorted(p.name for p in tmp_path.iterdir()) == ["recording_CA1.mp3"]
+
+
+def test_resumes_from_part(server, downloader):
+    write_part(downloader, BODY[:1000])
+    downloader.download("CA1", server.url)
+    assert server.ranges == ["bytes=1000-"] and read_final(downloader) == BODY
+
+
+def test_416_for_complete_part_finishes(server, downloader):
+    write_part(downloader, BODY)
+    downloader.download("CA1", server.url)
+    assert server.ranges == [f"bytes={len(BODY)}-"] and read_final(downloader) == BODY
+
+
+def test_416_for_oversized_part_restarts(server, downloader):
+    write_part(downloader, BODY + b"junk")
+    downloader.download("CA1", server.url)
+    assert server.ranges == [f"bytes={len(BODY) + 4}-", None] and read_final(downloader) == BODY
+
+
+def test_200_to_range_request_starts_over(server, downloader):
+    server.script = ["ignore_range"]
+    write_part(downloader, b"stale bytes")
+    downloader.download("CA1", server.url)
+    assert read_final(downloader) == BODY
+
+
+def test_206_at_wrong_offset_restarts(server, downloader):
+    server.script = ["wrong_offset"]
+    write_part(downloader, BODY[:1000])
+    downloader.download("CA1", server.url)
+    assert server.ranges == ["bytes=1000-", None] and read_final(downloader) == BODY
+
+
+@pytest.mark.parametrize("status,retryable", [(503, True), (404, True), (403, False)])
+def test_status_errors(server, downloader, status, retryable):
+    server.script = [status]
+    with pytest.raises(RecordingDownloadError) as e:
+        downloader.download("CA1", server.url)
+    assert e.value.retryable is retryable
+
+
+def run_job(downloader, url):
+    events, attempts = [], []
+    downloader.on_event = lambda call_sid, message: events.append(message)
+    downloader.on_attempt = lambda call_sid, seconds, error: attempts.append(error)
+
+    async def run():
+        await downloader.start()
+        assert downloader.submit("CA1", url)
+        await asyncio.wait_for(downloader.join(), 10)
+        await downloader.stop()
+
+    asyncio.run(run())
+    return events, attempts
+
+
+def test_retries_retryable_status_then_completes(server, downloader):
+    server.script = [503, 429]
+    events, attempts = run_job(downloader, server.url)
+    assert len(attempts) == 3 and attempts[-1] is None
+    assert events == [f"RECORDING_DOWNLOADED {downloader.dest_dir}/recording_CA1.mp3"]
+    assert read_final(downloader) == BODY
+
+
+def test_gives_up_after_max_retries(server, downloader):
+    server.script = [503] * 5
+    events, attempts = run_job(downloader, server.url)
+    assert len(attempts) == downloader.max_retries + 1
+    assert events == ["RECORDING_DOWNLOAD_FAILED status=503"]
+
+
+def test_does_not_retry_permanent_errors(server, downloader):
+    server.script = [403]
+    events, attempts = run_job(downloader, server.url)
+    assert len(attempts) == 1 and events == ["RECORDING_DOWNLOAD_FAILED status=403"]
@@ -0,0 +1,131 @@
+import asyncio
+import os
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, normalize_utterance, replace_name
+
+
+@pytest.mark.parametrize("a,b", [
+    ("What's the price?", "what is the price"),
+    ("  PRICE,   please!! ", "price please"),
+    ("कहाँ है?", "कहां है"),
+    ("फ़्लैट", "फ्लैट"),
+    ("२ BHK", "2 bhk"),
+])
+def test_normalize_utterance_folds_variants(a, b):
+    assert normalize_utterance(a) == normalize_utterance(b)
+
+
+def test_key_depends_on_utterance_and_config():
+    key = ResponseCache.make_key("What's the price?", ["Skyline", "₹72 lakhs"])
+    assert key == ResponseCache.make_key("what is the price", ["Skyline", "₹72 lakhs"])
+    assert key != ResponseCache.make_key("what is the price", ["Skyline", "₹75 lakhs"])
+    assert key != ResponseCache.make_key("where is it", ["Skyline", "₹72 lakhs"])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_lru_eviction(clock):
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # "b" is now least recently used
+    cache.put("c", "C")
+    assert cache.get("b") is None and cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry(clock):
+    cache = ResponseCache(ttl_seconds=60)
+    cache.put("a", "A")
+    clock[0] += 59
+    assert cache.get("a") == "A"
+    clock[0] += 1
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["entries"] == 0 and stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_save_and_load_round_trip(tmp_path, clock):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(ttl_seconds=60, path=path, save_every=2)
+    cache.put("old", "expires")
+    clock[0] += 30
+    cache.put("a", "A")
+    assert cache.needs_save()
+    cache.put("b", "B")
+    cache.save()
+    assert not cache.needs_save()
+    assert os.listdir(tmp_path) == ["cache.json"]
+
+    clock[0] += 40  # "old" has expired, "a" and "b" have not
+    loaded = ResponseCache(ttl_seconds=60, path=path, max_entries=1)
+    loaded.load()
+    # Saved oldest first, so trimming to max_entries keeps the most recent
+    assert loaded.stats()["entries"] == 1 and loaded.get("b") == "B"
+
+
+def test_failed_save_keeps_previous_file(tmp_path, clock, monkeypatch):
+    path = tmp_path / "cache.json"
+    cache = ResponseCache(path=str(path))
+    cache.put("a", "A")
+    cache.save()
+    before = path.read_text()
+
+    def broken_dump(*args, **kwargs):
+        raise OSError("disk full")
+
+    cache.put("b", "B")
+    monkeypatch.setattr(response_cache.json, "dump", broken_dump)
+    cache.save()
+    assert path.read_text() == before and os.listdir(tmp_path) == ["cache.json"]
+
+
+def test_unreadable_file_is_ignored(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text("{not json")
+    cache = ResponseCache(path=str(path))
+    cache.load()
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.parametrize("text,name,expected", [
+    ("Thanks Ram, the price is fixed.", "Ram", "Thanks {n}, the price is fixed."),
+    ("Our program suits Ram.", "Ram", "Our program suits {n}."),
+    ("Ramesh and Ram", "Ram", "Ramesh and {n}"),
+    ("Shall I arrange a visit, Ravi Kumar?", "Ravi Kumar", "Shall I arrange a visit, {n}?"),
+    ("धन्यवाद राम जी", "राम", "धन्यवाद {n} जी"),
+    ("Price is (approx) fixed", "(approx", "Price is {n}) fixed"),
+    ("No name here", "", "No name here"),
+])
+def test_replace_name_whole_words_only(text, name, expected):
+    assert replace_name(text, name, "{n}") == expected
+
+
+def test_cached_reply_names_the_next_caller(app_main, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    replies = ["Ram, Ramesh from our sales team will call you, Ram."]
+
+    class Guard:
+        async def generate(self, call, timeout):
+            return replies.pop(), app_main.GEMINI_MODEL, "ok"
+
+    monkeypatch.setattr(app_main, "LLM_GUARD", Guard())
+    monkeypatch.setattr(app_main, "RESPONSE_CACHE", ResponseCache())
+    tenant = app_main.TENANTS.default
+    for call_sid, name in (("CAcache1", "Ram"), ("CAcache2", "Priya")):
+        app_main.CALL_STATE.add(call_sid, {"name": name, "stage": "qualified_intro"})
+
+    first = asyncio.run(app_main.generate_reply(tenant, "CAcache1", "payment plans?"))
+    second = asyncio.run(app_main.generate_reply(tenant, "CAcache2", "payment plans?"))
+    # Call log paths are relative; write them before the working directory is restored
+    assert app_main.CALL_LOG_WRITER.flush(close=True, wait=True)
+    assert first == "Ram, Ramesh from our sales team will call you, Ram."
+    assert second == "Priya, Ramesh from our sales team will call you, Priya."
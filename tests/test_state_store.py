@@ -0,0 +1,211 @@
+import asyncio
+import multiprocessing
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from state_store import InMemoryStateStore, RedisStateStore, SQLiteStateStore, make_state_store
+
+WORKERS = 8
+INCREMENTS = 50
+
+
+def increment(state: dict) -> int:
+    state["count"] += 1
+    state.setdefault("seen", []).append(state["count"])
+    return state["count"]
+
+
+@pytest.fixture
+def redis_server():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def make_store(request, tmp_path):
+    """Factory for stores that share one backend, as separate workers would."""
+    if request.param == "memory":
+        store = InMemoryStateStore("test")
+        return lambda namespace="test": store if namespace == "test" else InMemoryStateStore(namespace)
+    if request.param == "sqlite":
+        path = str(tmp_path / "state.db")
+        return lambda namespace="test": SQLiteStateStore(namespace, path)
+    server = request.getfixturevalue("redis_server")
+    import fakeredis
+    return lambda namespace="test": RedisStateStore(namespace, client=fakeredis.FakeRedis(server=server))
+
+
+def test_values_are_copies(make_store):
+    store = make_store()
+    value = {"turns": [1]}
+    store.set("CA1", value)
+    value["turns"].append(2)
+    fetched = store.get("CA1")
+    fetched["turns"].append(3)
+    assert store.get("CA1") == {"turns": [1]}
+    assert store.get("missing", {"x": 1}) == {"x": 1}
+
+
+def test_add_only_stores_once(make_store):
+    store = make_store()
+    assert store.add("CA1", {"n": 1})
+    assert not store.add("CA1", {"n": 2})
+    assert store.get("CA1") == {"n": 1}
+
+
+def test_update_without_default_is_a_no_op(make_store):
+    store = make_store()
+    assert store.update("CA1", increment) is None
+    assert "CA1" not in store
+    assert store.update("CA1", increment, default={"count": 0}) == 1
+    assert store.get("CA1") == {"count": 1, "seen": [1]}
+
+
+def test_failed_update_leaves_value_unchanged(make_store):
+    store = make_store()
+    store.set("CA1", {"count": 5})
+
+    def fail(state):
+        state["count"] = 99
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        store.update("CA1", fail)
+    assert store.get("CA1") == {"count": 5}
+
+
+def test_keys_delete_and_namespaces(make_store):
+    store, other = make_store(), make_store("other")
+    store.set("a", {})
+    store.set("b", {})
+    other.set("a", {"other": True})
+    assert sorted(store.keys()) == ["a", "b"] and len(store) == 2
+    store.delete("a")
+    assert store.keys() == ["b"] and "a" not in store
+    assert other.get("a") == {"other": True}
+
+
+def test_update_is_atomic_across_threads(make_store):
+    store = make_store()
+    store.set("CA1", {"count": 0})
+    # Each thread gets its own store (and connection) on the shared backend
+    stores = [make_store() for _ in range(WORKERS)]
+    barrier = threading.Barrier(WORKERS)
+    results: list[int] = []
+
+    def worker(s):
+        barrier.wait()
+        for _ in range(INCREMENTS):
+            results.append(s.update("CA1", increment))
+
+    threads = [threading.Thread(target=worker, args=(s,)) for s in stores]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    state = store.get("CA1")
+    assert state["count"] == WORKERS * INCREMENTS
+    # No update was lost or applied twice: every count was handed out exactly once
+    assert sorted(results) == state["seen"] == list(range(1, WORKERS * INCREMENTS + 1))
+
+
+def _increment_in_process(path: str, start, n: int):
+    store = SQLiteStateStore("test", path)
+    start.wait()
+    for _ in range(n):
+        store.update("CA1", increment)
+
+
+def test_sqlite_update_is_atomic_across_processes(tmp_path):
+    path = str(tmp_path / "state.db")
+    SQLiteStateStore("test", path).set("CA1", {"count": 0})
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    procs = [ctx.Process(target=_increment_in_process, args=(path, start, INCREMENTS)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    start.set()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+    state = SQLiteStateStore("test", path).get("CA1")
+    assert state["count"] == 4 * INCREMENTS and state["seen"] == list(range(1, 4 * INCREMENTS + 1))
+
+
+def test_redis_update_retries_after_a_concurrent_write(redis_server):
+    import fakeredis
+    store = RedisStateStore("test", client=fakeredis.FakeRedis(server=redis_server))
+    other = RedisStateStore("test", client=fakeredis.FakeRedis(server=redis_server))
+    store.set("CA1", {"count": 0})
+    calls = []
+
+    def racing_increment(state):
+        calls.append(dict(state))
+        if len(calls) == 1:
+            # Another worker commits between this worker's WATCH and EXEC
+            other.update("CA1", increment)
+        return increment(state)
+
+    assert store.update("CA1", racing_increment) == 2
+    assert [c["count"] for c in calls] == [0, 1]
+    assert store.get("CA1")["count"] == 2
+
+
+def test_async_methods(make_store):
+    store = make_store()
+
+    async def run():
+        assert await store.aadd("CA1", {"count": 0})
+        assert not await store.aadd("CA1", {"count": 5})
+        assert await store.aupdate("CA1", increment) == 1
+        await store.aset("CA2", {"n": 1})
+        await store.adelete("CA2")
+        return await store.aget("CA1"), await store.aget("CA2", "gone")
+
+    assert asyncio.run(run()) == ({"count": 1, "seen": [1]}, "gone")
+
+
+def test_locked_sqlite_write_neither_blocks_the_loop_nor_waits_long(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = SQLiteStateStore("test", path, timeout=0.3)
+    store.set("CA1", {"count": 0})
+    # Another worker holds the write lock and never lets go
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        task = asyncio.create_task(ticker())
+        started = time.monotonic()
+        try:
+            with pytest.raises(sqlite3.OperationalError):
+                await store.aupdate("CA1", increment)
+            return time.monotonic() - started
+        finally:
+            task.cancel()
+
+    try:
+        elapsed = asyncio.run(run())
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+    assert 0.25 < elapsed < 2
+    # The loop kept running while the write waited for the lock
+    assert len(ticks) > 10
+    assert store.update("CA1", increment) == 1
+
+
+def test_make_state_store_backends(tmp_path):
+    assert isinstance(make_state_store("memory", "n"), InMemoryStateStore)
+    store = make_state_store(f"sqlite:///{tmp_path}/s.db", "n", timeout=0.5)
+    assert isinstance(store, SQLiteStateStore) and store.timeout == 0.5
+    with pytest.raises(ValueError):
+        make_state_store("postgres://x", "n")
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from intents import build_intent_engine
+from tenants import DEFAULT_KEY, Project, Tenant, TenantRegistry, parse_projects
+
+DEFAULT = Project(DEFAULT_KEY, "Basant Realty", "Skyline Towers", "Noida", "₹72 lakhs", "2BHK–4BHK")
+
+
+def compile_tenant(project: Project) -> Tenant:
+    intents = build_intent_engine(project.company, project.project, project.location,
+                                  project.starting_price, project.unit_types)
+    return Tenant(project, f"persona for {project.company}", intents, None, (project.company,),
+                  project.numbers[0] if project.numbers else None)
+
+
+def write(path, projects, version: int):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"projects": projects}, f)
+    # A distinct mtime per version, however quickly the test writes
+    os.utime(path, ns=(version * 10**9, version * 10**9))
+
+
+PROJECTS = [
+    {"key": "lake", "company": "Lake Homes", "numbers": ["+91 120 000 0001"], "campaigns": ["diwali"]},
+    {"key": "hill", "company": "Hill Estates", "numbers": ["+911200000002"]},
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "projects.json"
+    write(path, PROJECTS, 1)
+    return str(path)
+
+
+def test_routing(path):
+    registry = TenantRegistry(compile_tenant, DEFAULT, path)
+    assert len(registry) == 3
+    assert registry.resolve("lake").project.company == "Lake Homes"
+    assert registry.resolve("diwali").key == "lake"
+    assert registry.resolve(None, None, "+911200000002").key == "hill"
+    assert registry.resolve("unknown", "+919999999999") is registry.default
+    assert registry.find("unknown") is None
+
+
+@pytest.mark.parametrize("payload,error", [
+    ({"projects": {}}, "expected"),
+    ([{"key": "a"}, {"key": "a"}], "duplicate"),
+    ([{"key": "bad key"}], "needs a key"),
+    ([{"key": "a", "colour": "red"}], "unknown field"),
+    ([{"key": "a", "numbers": ["+1"]}, {"key": "b", "numbers": ["+1"]}], "claimed by both"),
+])
+def test_parse_rejects_invalid_config(payload, error):
+    with pytest.raises(ValueError, match=error):
+        parse_projects(payload, DEFAULT)
+
+
+def test_first_load_of_invalid_file_raises(tmp_path):
+    path = tmp_path / "projects.json"
+    path.write_text("{broken")
+    with pytest.raises(ValueError):
+        TenantRegistry(compile_tenant, DEFAULT, str(path))
+
+
+def test_reload_recompiles_only_changed_projects(path):
+    registry = TenantRegistry(compile_tenant, DEFAULT, path)
+    before = {t.key: t for t in registry.tenants()}
+    assert not registry.reload()
+
+    write(path, [dict(PROJECTS[0], company="Lakeside Homes"), PROJECTS[1]], 2)
+    assert registry.reload()
+    after = {t.key: t for t in registry.tenants()}
+    assert after["hill"] is before["hill"] and after[DEFAULT_KEY] is before[DEFAULT_KEY]
+    assert after["lake"] is not before["lake"] and after["lake"].project.company == "Lakeside Homes"
+    assert registry.status()["reloads"] == 2 and registry.status()["error"] is None
+
+
+def test_reload_and_rebuild_keep_intent_stats(path):
+    registry = TenantRegistry(compile_tenant, DEFAULT, path)
+    registry.find("lake").intents.respond("What is the price?")
+    registry.find("hill").intents.respond("tell me a story")
+
+    write(path, [dict(PROJECTS[0], starting_price="₹80 lakhs"), PROJECTS[1]], 2)
+    assert registry.reload()
+    lake = registry.find("lake").intents
+    assert "₹80 lakhs" in lake.respond("What is the price?").answer
+    assert lake.stats()["hits_by_intent"] == {"price": 2}
+
+    registry.rebuild()
+    assert registry.find("lake").intents is not lake
+    assert registry.find("lake").intents.stats()["hits_by_intent"] == {"price": 2}
+    assert registry.find("hill").intents.stats()["misses"] == 1
+
+
+def test_invalid_reload_keeps_running_config(path):
+    registry = TenantRegistry(compile_tenant, DEFAULT, path)
+    tenants = registry.tenants()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"projects": [{"key": "lake"}, {"key": "lake"}]}')
+    os.utime(path, ns=(2 * 10**9, 2 * 10**9))
+    with pytest.raises(ValueError):
+        registry.reload()
+    assert registry.tenants() == tenants and "duplicate" in registry.status()["error"]
+    # The broken version is not retried until the file changes again
+    assert not registry.reload()
+
+    write(path, PROJECTS[:1], 3)
+    assert registry.reload() and len(registry) == 2 and registry.status()["error"] is None
+
+
+def test_readers_always_see_a_complete_set(path):
+    registry = TenantRegistry(compile_tenant, DEFAULT, path)
+    stop = threading.Event()
+    seen, errors = set(), []
+
+    def read():
+        while not stop.is_set():
+            tenant = registry.resolve(None, "+911200000001")
+            # Routed by number to a tenant that the same set also knows by key
+            if tenant.key != "lake" or registry.find("diwali") is None:
+                errors.append(tenant.key)
+            seen.add(tenant.project.company)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for t in readers:
+        t.start()
+    try:
+        for version in range(2, 30):
+            write(path, [dict(PROJECTS[0], company=f"Lake {version}"), PROJECTS[1]], version)
+            assert registry.reload()
+    finally:
+        stop.set()
+        for t in readers:
+            t.join()
+    assert not errors and len(seen) > 1
+
+
+def test_watch_reloads_and_reports_each_failure_once(path):
+    registry = TenantRegistry(compile_tenant, DEFAULT, path)
+    events = []
+
+    async def until(n: int):
+        for _ in range(200):
+            if len(events) >= n:
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"expected {n} reload events, got {events}")
+
+    async def run():
+        watcher = asyncio.create_task(registry.watch(0.01, lambda ok, error: events.append(ok)))
+        try:
+            write(path, PROJECTS[:1], 2)
+            await until(1)
+            assert len(registry) == 2
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("{broken")
+            os.utime(path, ns=(3 * 10**9, 3 * 10**9))
+            await until(2)
+            os.remove(path)
+            await until(3)
+            await asyncio.sleep(0.1)  # the missing file fails every interval but is reported once
+            write(path, PROJECTS, 4)
+            await until(4)
+        finally:
+            watcher.cancel()
+
+    asyncio.run(run())
+    assert events == [True, False, False, True] and len(registry) == 3
@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+VOICE = "/api/callback/twilio/voice"
+RESULT = "/api/callback/twilio/voice/result"
+SIDS = (f"CAwebhook{i}" for i in itertools.count())
+
+
+@pytest.fixture
+def app(app_main, monkeypatch, tmp_path):
+    """The app with a slow, counting stand-in for reply generation."""
+    # Call logs are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    httpx = pytest.importorskip("httpx")
+    calls = []
+    app = SimpleNamespace(main=app_main, calls=calls, delay=0.0)
+
+    async def generate_reply(tenant, call_sid, speech, timeout=None):
+        calls.append((call_sid, speech))
+        await asyncio.sleep(app.delay)
+        return f"reply {len(calls)} to {speech}"
+
+    monkeypatch.setattr(app_main, "generate_reply", generate_reply)
+    monkeypatch.setattr(app_main, "THINK_THEN_SPEAK", False)
+
+    async def post(call_sid, speech=None, seq=None, token=None, url=VOICE, params=None):
+        data = {"CallSid": call_sid, "From": "+919800000000", "To": "+911200000000"}
+        if speech is not None:
+            data["SpeechResult"] = speech
+        if seq is not None:
+            params = {**(params or {}), "seq": seq}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_main.app), base_url="http://test") as c:
+            response = await c.post(url, data=data, params=params,
+                                    headers={"I-Twilio-Idempotency-Token": token} if token else None)
+        assert response.status_code == 200
+        return response.text
+
+    async def new_call() -> str:
+        # Greeting, then the name turn, so the next utterance goes to generate_reply
+        call_sid = next(SIDS)
+        await post(call_sid)
+        await post(call_sid, "Ravi", seq=1)
+        return call_sid
+
+    app.post, app.new_call = post, new_call
+    yield app
+    # Call log paths are relative; write them before the working directory is restored
+    assert app_main.CALL_LOG_WRITER.flush(close=True, wait=True)
+
+
+def test_sequential_retry_answered_from_first_attempt(app):
+    async def run():
+        call_sid = await app.new_call()
+        first = await app.post(call_sid, "tell me about amenities", seq=2)
+        retry = await app.post(call_sid, "tell me about amenities", seq=2)
+        return first, retry
+
+    first, retry = asyncio.run(run())
+    assert len(app.calls) == 1 and first == retry and "reply 1" in first
+
+
+def test_concurrent_retry_waits_for_first_attempt(app):
+    app.delay = 0.3
+
+    async def run():
+        call_sid = await app.new_call()
+        return await asyncio.gather(*(app.post(call_sid, "tell me about amenities", seq=2) for _ in range(3)))
+
+    bodies = asyncio.run(run())
+    assert len(app.calls) == 1 and len(set(bodies)) == 1 and "reply 1" in bodies[0]
+
+
+def test_new_speech_in_same_turn_is_not_a_retry(app):
+    async def run():
+        call_sid = await app.new_call()
+        return [await app.post(call_sid, speech, seq=2) for speech in ("amenities please", "parking please")]
+
+    first, second = asyncio.run(run())
+    assert len(app.calls) == 2 and first != second
+
+
+def test_idempotency_token_without_seq(app):
+    async def run():
+        call_sid = await app.new_call()
+        bodies = [await app.post(call_sid, "tell me about amenities", token="tok-1") for _ in range(2)]
+        bodies.append(await app.post(call_sid, "tell me about amenities", token="tok-2"))
+        return bodies
+
+    first, retry, other = asyncio.run(run())
+    assert first == retry and len(app.calls) == 2 and "reply 2" in other
+
+
+def test_retry_falls_back_when_first_attempt_outlives_the_wait(app, monkeypatch):
+    monkeypatch.setattr(app.main, "WEBHOOK_RETRY_WAIT_SECONDS", 0.1)
+    app.delay = 0.5
+
+    async def run():
+        call_sid = await app.new_call()
+        first = asyncio.create_task(app.post(call_sid, "tell me about amenities", seq=2))
+        await asyncio.sleep(0.05)
+        retry = await app.post(call_sid, "tell me about amenities", seq=2)
+        return await first, retry
+
+    first, retry = asyncio.run(run())
+    assert len(app.calls) == 1 and "reply 1" in first
+    assert app.main.LLM_TIMEOUT_FALLBACK in retry
+
+
+def test_retry_on_another_worker_polls_call_state(app):
+    """A first attempt running elsewhere is only visible through CALL_STATE."""
+    main = app.main
+
+    async def run():
+        call_sid = await app.new_call()
+        assert await main.claim_webhook(call_sid, "7:abc") == (True, None)
+        assert await main.claim_webhook(call_sid, "7:abc") == (False, None)
+        waiter = asyncio.create_task(main.wait_for_webhook(call_sid, "7:abc", timeout=2))
+        await asyncio.sleep(0.15)
+        await main.settle_webhook(call_sid, "7:abc", b"<Response/>")
+        return await waiter, await main.claim_webhook(call_sid, "7:abc")
+
+    body, claim = asyncio.run(run())
+    assert body == b"<Response/>" and claim == (False, "<Response/>")
+
+
+def test_think_then_speak_holds_then_serves_the_reply(app, monkeypatch):
+    monkeypatch.setattr(app.main, "THINK_THEN_SPEAK", True)
+    app.delay = 0.2
+
+    async def poll(call_sid, turn, wait):
+        return await app.post(call_sid, seq=3, url=RESULT, params={"turn": turn, "wait": wait})
+
+    async def run():
+        call_sid = await app.new_call()
+        holding = await app.post(call_sid, "tell me about amenities", seq=2)
+        pending = await poll(call_sid, 1, 0)
+        await asyncio.sleep(0.3)
+        reply = await poll(call_sid, 1, 1)
+        retried = await poll(call_sid, 1, 1)
+        unknown = await poll(call_sid, 9, 0)
+        return holding, pending, reply, retried, unknown
+
+    holding, pending, reply, retried, unknown = asyncio.run(run())
+    # An immediate filler, then a redirect to the result endpoint for turn 1
+    assert "<Pause" in holding and "turn=1&amp;wait=0&amp;seq=3" in holding and "reply" not in holding
+    # Still generating: wait again, without repeating the filler
+    assert "turn=1&amp;wait=1&amp;seq=3" in pending and "<Say" not in pending
+    assert "reply 1 to tell me about amenities" in reply and retried == reply
+    assert app.main.LLM_TIMEOUT_FALLBACK in unknown and len(app.calls) == 1
+
+
+def test_webhook_key(app_main):
+    webhook_key = app_main.webhook_key
+    assert webhook_key(2, "hello", "tok") == webhook_key(2, "hello", None) != webhook_key(2, "hello!", None)
+    assert webhook_key(None, "hello", "tok") == "token:tok"
+    assert webhook_key(None, "hello", None) is None
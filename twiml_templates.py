@@ -0,0 +1,220 @@
+"""Precompiled TwiML responses.
+
+Responses whose shape is fixed for a given config are built once with the Twilio
+builders, serialized, and split around named slots into ready-to-send byte chunks.
+Rendering is then a join of those chunks with the XML-escaped slot values, instead of
+building and serializing a VoiceResponse tree on every webhook.
+
+Fixed phrases (greetings, reprompts, farewell, error) go through an optional `audio`
+lookup: when a pre-rendered recording of the phrase exists it is played with <Play>,
+otherwise it is spoken with <Say> as before.
+"""
+from typing import Callable, Optional
+from xml.sax.saxutils import escape
+
+from twilio.twiml.voice_response import Connect, Gather, VoiceResponse
+
+VOICE = {"voice": "Polly.Aditi", "language": "hi-IN"}
+ENGLISH_VOICE = {"voice": "Polly.Joanna", "language": "en-US"}
+GATHER_DEFAULTS = {
+    "input": "speech",
+    "speechTimeout": "auto",
+    "method": "POST",
+    "language": "en-US hi-IN",  # Support both English and Hindi
+    "timeout": 5,
+    "profanityFilter": False,
+}
+NAME_HINTS = "my name is, I am, this is, नाम, मेरा नाम"
+REPLY_HINTS = "sell, property, home, Basant, price, location, घर, संपत्ति, बेचना, बसंत, कीमत"
+QUALIFY_HINTS = "1BHK,2BHK,3BHK,budget,price,कीमत,बजट"
+
+FAREWELL = "Thank you for calling! Have a great day! धन्यवाद और शुभ दिन!"
+ERROR_MESSAGE = "I'm sorry, an error occurred. Please try again later."
+
+_XML_ESCAPES = {'"': "&quot;", "'": "&apos;"}
+
+
+def with_query(url: str, query: str) -> str:
+    """`url` with `query` appended, whether or not it already has a query string."""
+    return f"{url}{'&' if '?' in url else '?'}{query}"
+
+
+def _marker(slot: str) -> str:
+    return f"@@slot:{slot}@@"
+
+
+class TwimlTemplate:
+    """A serialized TwiML document with named text slots.
+
+    `build` receives one marker string per slot and returns the VoiceResponse; slots
+    must only appear in text or attribute values, which are escaped on render.
+    """
+
+    def __init__(self, build: Callable[..., VoiceResponse], *slots: str):
+        self.slots = slots
+        xml = str(build(*(_marker(s) for s in slots)))
+        self._chunks: list[bytes] = []
+        self._order: list[str] = []
+        rest = xml
+        while True:
+            positions = [(rest.find(_marker(s)), s) for s in slots if _marker(s) in rest]
+            if not positions:
+                break
+            pos, slot = min(positions)
+            self._chunks.append(rest[:pos].encode("utf-8"))
+            self._order.append(slot)
+            rest = rest[pos + len(_marker(slot)):]
+        self._chunks.append(rest.encode("utf-8"))
+        self.static = b"".join(self._chunks) if not slots else None
+
+    def render(self, **values) -> bytes:
+        if self.static is not None:
+            return self.static
+        encoded = {s: escape(str(values[s]), _XML_ESCAPES).encode("utf-8") for s in self.slots}
+        out = [self._chunks[0]]
+        for slot, chunk in zip(self._order, self._chunks[1:]):
+            out.append(encoded[slot])
+            out.append(chunk)
+        return b"".join(out)
+
+
+class TwimlTemplates:
+    """Every fixed-shape response for one project config, compiled once.
+
+    `stream_parameters` are sent to the Media Streams WebSocket as custom parameters
+    (Twilio does not pass query strings on stream URLs). `audio(text, voice)` returns the
+    URL of a pre-rendered recording of a fixed phrase, or None to <Say> it; every such
+    phrase is listed in `prompts` as (text, voice, language) so it can be rendered.
+    """
+
+    def __init__(self, callback_url: str, result_url: str, company: str, unit_types: str,
+                 starting_price: str, poll_seconds: int = 1, stream_url: Optional[str] = None,
+                 reply_hints: str = REPLY_HINTS, qualify_hints: str = QUALIFY_HINTS,
+                 stream_parameters: Optional[dict[str, str]] = None,
+                 audio: Optional[Callable[[str, dict[str, str]], Optional[str]]] = None):
+        self.callback_url = callback_url
+        self.unit_types = unit_types
+        self.starting_price = starting_price
+        self.prompts: list[tuple[str, str, str]] = []
+
+        def speak(node, text: str, voice: dict[str, str]):
+            """Play the recording of a fixed phrase if there is one, else say it."""
+            prompt = (text, voice["voice"], voice["language"])
+            if prompt not in self.prompts:
+                self.prompts.append(prompt)
+            url = audio(text, voice) if audio else None
+            if url:
+                node.play(url)
+            else:
+                node.say(text, **voice)
+
+        # Each Gather posts back with the sequence number of the turn it collects, so a
+        # retried webhook can be told apart from the caller repeating themselves
+        def gather(hints: str, seq) -> Gather:
+            return Gather(action=with_query(callback_url, f"seq={seq}"), hints=hints, **GATHER_DEFAULTS)
+
+        def outbound_greeting(language_pref: str) -> Callable[[], VoiceResponse]:
+            if language_pref == "english":
+                greeting = f"Hello! This is your real estate advisor from {company}. Before we begin, may I know your name?"
+                voice = ENGLISH_VOICE
+            elif language_pref == "hindi":
+                greeting = f"नमस्ते! मैं {company} से आपका रियल एस्टेट सलाहकार हूँ। शुरू करने से पहले, आपका नाम जान सकता/सकती हूँ?"
+                voice = VOICE
+            else:
+                greeting = f"Hello! नमस्ते! I’m your real‑estate advisor from {company}. Before we begin, may I know your name?"
+                voice = VOICE
+
+            def build() -> VoiceResponse:
+                vr = VoiceResponse()
+                speak(vr, greeting, voice)
+                # After the greeting above, Gather will capture the name
+                vr.append(gather(NAME_HINTS, 1))
+                speak(vr, "I didn't hear you. Please tell me your name. मैंने नहीं सुना—कृपया अपना नाम बताइए।", VOICE)
+                vr.redirect(callback_url)
+                return vr
+            return build
+
+        self.outbound_greeting = {
+            pref: TwimlTemplate(outbound_greeting(pref)) for pref in ("english", "hindi", "both")
+        }
+
+        self.inbound_greeting_text = (
+            f"Hello! नमस्ते! I’m your real‑estate advisor from {company}. "
+            f"Before we begin, may I know your name?"
+        )
+
+        def inbound_greeting() -> VoiceResponse:
+            vr = VoiceResponse()
+            g = gather(NAME_HINTS, 1)
+            speak(g, self.inbound_greeting_text, VOICE)
+            vr.append(g)
+            speak(vr, "If I didn’t hear you, please tell me your name.", ENGLISH_VOICE)
+            vr.redirect(callback_url)
+            return vr
+        self.inbound_greeting = TwimlTemplate(inbound_greeting)
+
+        def name_intro(caller_name: str, seq: str) -> VoiceResponse:
+            vr = VoiceResponse()
+            g = gather(qualify_hints, seq)
+            g.say(self.name_intro_text(caller_name), **VOICE)
+            vr.append(g)
+            speak(vr, "If I didn’t hear you, please share your preferred configuration or budget.", ENGLISH_VOICE)
+            vr.redirect(callback_url)
+            return vr
+        self.name_intro = TwimlTemplate(name_intro, "caller_name", "seq")
+
+        def reply(text: str, seq: str) -> VoiceResponse:
+            vr = VoiceResponse()
+            # Continue conversation with another gather
+            g = gather(reply_hints, seq)
+            g.say(text, **VOICE)
+            vr.append(g)
+            # If user doesn't respond, prompt them
+            speak(vr, "Are you still there? क्या आप अभी भी हैं?", VOICE)
+            vr.redirect(callback_url)
+            return vr
+        self.reply = TwimlTemplate(reply, "reply", "seq")
+
+        def holding(filler: bool) -> Callable[[str, str, str], VoiceResponse]:
+            def build(turn: str, wait: str, seq: str) -> VoiceResponse:
+                vr = VoiceResponse()
+                if filler:
+                    speak(vr, "One moment, please. एक क्षण।", VOICE)
+                vr.pause(length=poll_seconds)
+                vr.redirect(with_query(result_url, f"turn={turn}&wait={wait}&seq={seq}"), method="POST")
+                return vr
+            return build
+        self.holding = {filler: TwimlTemplate(holding(filler), "turn", "wait", "seq") for filler in (True, False)}
+
+        def farewell() -> VoiceResponse:
+            vr = VoiceResponse()
+            speak(vr, FAREWELL, VOICE)
+            vr.hangup()
+            return vr
+        self.farewell = TwimlTemplate(farewell)
+
+        def error() -> VoiceResponse:
+            vr = VoiceResponse()
+            speak(vr, ERROR_MESSAGE, VOICE)
+            return vr
+        self.error = TwimlTemplate(error)
+
+        # Media Streams mode: hand the call to the WebSocket, which does its own greeting
+        self.stream_connect: Optional[TwimlTemplate] = None
+        if stream_url:
+            def stream_connect() -> VoiceResponse:
+                vr = VoiceResponse()
+                connect = Connect()
+                stream = connect.stream(url=stream_url)
+                for name, value in (stream_parameters or {}).items():
+                    stream.parameter(name=name, value=value)
+                vr.append(connect)
+                return vr
+            self.stream_connect = TwimlTemplate(stream_connect)
+
+    def name_intro_text(self, caller_name: str) -> str:
+        return (
+            f"Nice to meet you, {caller_name}. "
+            f"We have {self.unit_types} homes with prices starting around {self.starting_price}. "
+            f"Do you prefer 1BHK, 2BHK or 3BHK—or a budget range?"
+        )